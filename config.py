@@ -50,6 +50,12 @@ MAX_DOWNLOADS_ATTEMPTS = 3      # 最大尝试下载次数
 MAX_GIF_FPS = 24                # 下载的最大 gif 帧数
 GIF_QUEUE_ALERT_THRESHOLD = 2   # GIF 任务数达到此值时告警
 GIF_ALERT_COOLDOWN = 300        # operator 告警冷却（秒）
+STICKER_CACHE_DIR = os.path.join(DATA_DIR, "stickerCache")   # 表情包原始文件 / 转换结果磁盘缓存目录
+STICKER_CACHE_MAX_BYTES = 512 * 1024 * 1024                    # 表情包磁盘缓存上限（字节，超出按最近使用淘汰）
+FFMPEG_MAX_CONCURRENT = 0                                      # 全局同时运行的 ffmpeg 转换数（0 = 按 CPU 核数自动：核数 - 1，至少 1）
+TGS_RENDER_MAX_SIZE = 512                                      # TGS 动画渲染边长上限（像素）
+TGS_MAX_FRAMES = 90                                            # TGS 单张最多渲染帧数（超出时降帧率，保持时长）
+TGS_RENDER_TIMEOUT = 60                                        # 单张 TGS 渲染 + 编码超时（秒）
 DEFAULT_READ_TIMEOUT = 300      # 请求发出后，等待返回响应的超时缓冲区 (秒)
 DEFAULT_WRITE_TIMEOUT = 60      # 将请求上传至 Telegram 请求体的超时缓冲区（秒）
 
@@ -179,6 +185,10 @@ LLM_REQUEST_MAX_RETRIES = 2                                    # LLM 请求最
 LLM_REQUEST_RETRY_DELAY = 3                                    # 重试间隔（秒）
 LLM_KNOWLEDGE_DB_PATH = os.path.join(DATA_DIR, "llm", "knowledge.db")  # 知识库数据库
 LLM_KNOWLEDGE_DIR = os.path.join(DATA_DIR, "llm", "knowledge")         # 知识库 Markdown 文件目录
+LLM_VISION_CACHE_DB_PATH = os.path.join(DATA_DIR, "llm", "visionCache.db")  # 图片描述缓存数据库
+LLM_VISION_CACHE_TTL = 30 * 86400                              # 图片描述缓存 TTL（秒，默认 30 天）
+LLM_VISION_CACHE_MAX_ENTRIES = 2000                            # 图片描述缓存最大条数（超出按最近使用淘汰）
+LLM_RETRIEVAL_CACHE_TTL = 120                                  # 知识库 / 记忆检索结果缓存 TTL（秒，兜底离线脚本改库；0 为不限）
 
 
 
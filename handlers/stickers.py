@@ -23,6 +23,7 @@ from utils.core.errorDecorators import handleTelegramErrors
 from utils.stickerDownloader import createStickerZip, deleteMessageLater, registerFileCleanup, getActiveGifJobs
 from utils.fileSender import sendFileSmart
 from utils.memoryMonitor import isMemoryLow, registerStickerTask, unregisterStickerTask, cancelAllStickerTasks
+from utils.conversionScheduler import getConversionQueuePosition
 from utils.core.logger import logAction, LogLevel, LogChildType
 from utils.operators import getOperatorsWithPermission, hasPermission
 
@@ -38,6 +39,7 @@ _stickerCache: dict[str, tuple[Any, float]] = {}
 _stickerLock = threading.RLock()
 
 _lastGifAlertTime: float = 0.0  # GIF 过载告警时间戳（防告警风暴）
+_QUEUE_FEEDBACK_INTERVAL = 3    # GIF 转换排队位置刷新间隔（秒）
 
 
 def getCachedSticker(setName: str) -> Optional[Any]:
@@ -279,12 +281,13 @@ async def onDownloadPressed(update: Update, context: ContextTypes.DEFAULT_TYPE):
                         pass
 
 
-    await query.edit_message_text(
+    receivedText = (
         f"收到——\n"
         f"表情包 {stickerSet.title}，\n"
         f"现在就给 @{query.from_user.username or query.from_user.first_name}下载喵……"
         + gifQueueNote
     )
+    await query.edit_message_text(receivedText)
     await logAction(
         query.from_user,
         "下载按钮被点击",
@@ -301,14 +304,22 @@ async def onDownloadPressed(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 context.bot,
                 stickerSet,
                 setName,
-                stickerSuffix
+                stickerSuffix,
+                ownerID=query.from_user.id
             )
         )
         registerStickerTask(task)
+        feedback = None
+        if stickerSuffix == "gif":
+            feedback = asyncio.create_task(
+                _reportQueuePosition(query, query.from_user.id, receivedText)
+            )
         try:
             zipPath = await task
         finally:
             unregisterStickerTask(task)
+            if feedback is not None:
+                feedback.cancel()
 
         # 智能发送（自动分卷）
         messages = await sendFileSmart(
@@ -366,6 +377,36 @@ async def onDownloadPressed(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 
+async def _reportQueuePosition(query, ownerID, baseText: str):
+    """
+    GIF 转换排队期间，把用户在全局转换队列里的位置编辑进"收到"消息
+
+    位置变化时才编辑；轮到该用户（有转换开始运行）后提示一次并结束。
+    由 onDownloadPressed 在下载任务结束时 cancel。
+    """
+    lastPosition = 0
+    while True:
+        await asyncio.sleep(_QUEUE_FEEDBACK_INTERVAL)
+        position = getConversionQueuePosition(ownerID)
+        if position == lastPosition:
+            continue
+
+        if position == 0:
+            text = baseText + "\n\n轮到你啦，正在转换喵——"
+        else:
+            text = baseText + f"\n\nGIF 转换排队中，现在排在第 {position} 位喵……"
+        try:
+            await query.edit_message_text(text)
+        except Exception:
+            pass    # 消息已被删除 / 内容未变化等，不影响下载
+
+        if position == 0:
+            return
+        lastPosition = position
+
+
+
+
 def register():
     return {
         "handlers": [
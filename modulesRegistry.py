@@ -45,10 +45,15 @@ MODULES = {
             "utils/llm/promptSafety.py",
             "utils/llm/review.py",
             "utils/llm/vision.py",
+            "utils/llm/visionCache.py",
             "utils/llm/urlIntent.py",
             "utils/llm/urlReader.py",
+            "utils/llm/retrievalCache.py",
+            "utils/llm/urlCache.py",
+            "utils/llm/urlExtract.py",
             "utils/llm/client/__init__.py",
             "utils/llm/client/_base.py",
+            "utils/llm/client/_conversation.py",
             "utils/llm/client/_generate.py",
             "utils/llm/client/_guardrails.py",
             "utils/llm/client/_request.py",
@@ -59,12 +64,18 @@ MODULES = {
             "utils/llm/memory/__init__.py",
             "utils/llm/memory/database.py",
             "utils/llm/memory/action.py",
+            "utils/llm/memory/contentCache.py",
+            "utils/llm/memory/relevance.py",
             "utils/llm/memory/ui.py",
             "utils/llm/knowledge/__init__.py",
             "utils/llm/knowledge/database.py",
             "utils/llm/knowledge/loader.py",
             "utils/llm/knowledge/retriever.py",
+            "utils/llm/knowledge/index.py",
+            "utils/llm/knowledge/vectorScorer.py",
+            "utils/llm/knowledge/semantic.py",
             "utils/llm/knowledge/tokenizer.py",
+            "utils/llm/knowledge/watcher.py",
             "utils/fileEditor.py",
             "utils/inputHelper.py",
             "utils/command/llm.py",
@@ -74,12 +85,23 @@ MODULES = {
             "tests/utils/llm/test_review.py",
             "tests/utils/llm/test_state.py",
             "tests/utils/llm/test_urlReader.py",
+            "tests/utils/llm/test_visionCache.py",
+            "tests/utils/llm/test_retrievalCache.py",
+            "tests/utils/llm/test_urlCache.py",
+            "tests/utils/llm/test_urlExtract.py",
             "tests/utils/llm/client/test_generate.py",
+            "tests/utils/llm/client/test_conversation.py",
             "tests/utils/llm/knowledge/test_loader.py",
             "tests/utils/llm/knowledge/test_tokenizer.py",
+            "tests/utils/llm/knowledge/test_retriever.py",
+            "tests/utils/llm/knowledge/test_vectorScorer.py",
+            "tests/utils/llm/knowledge/test_semantic.py",
+            "tests/utils/llm/knowledge/test_watcher.py",
             "tests/utils/llm/memory/test_action_parsing.py",
             "tests/utils/llm/memory/test_database_crypto.py",
             "tests/utils/llm/memory/test_retrieval.py",
+            "tests/utils/llm/memory/test_contentCache.py",
+            "tests/utils/llm/memory/test_relevance.py",
             "tests/handlers/test_llmCommand.py",
         ],
         "handlers": ["handlers/llm.py", "handlers/llmCommand.py", "handlers/llmReview.py"],
@@ -87,10 +109,12 @@ MODULES = {
             "utils.chatHistory:initDatabase",
             "utils.llm.memory:initDatabase",
             "utils.llm.knowledge:initDatabase",
+            "utils.llm.visionCache:initDatabase",
             "utils.llm.urlReader:registerResources",
         ],
         "backgroundTasks": [
             "utils.llm.knowledge:reindexOnStartup",
+            "utils.llm.knowledge:watchKnowledgeBase",
         ],
         "dependencies": [],
         "githubRepo": None,
@@ -111,15 +135,20 @@ MODULES = {
             "utils/afc/executor.py",
             "utils/afc/contextBuilder.py",
             "utils/afc/toolManager.py",
+            "utils/afc/resultCache.py",
+            "utils/afc/workerPool.py",
             "utils/llm/afcApi/__init__.py",
             "utils/llm/afcApi/contextBlock.py",
             "utils/llm/afcApi/responseHandler.py",
+            "tests/utils/llm/afcApi/test_responseHandler.py",
             "tests/handlers/test_afc.py",
             "tests/utils/afc/test_afcIntent.py",
             "tests/utils/afc/test_registry.py",
             "tests/utils/afc/test_executor.py",
             "tests/utils/afc/test_contextBuilder.py",
             "tests/utils/afc/test_toolManager.py",
+            "tests/utils/afc/test_resultCache.py",
+            "tests/utils/afc/test_workerPool.py",
             "tests/scripts/test_afc_tools_paths.py",
             "tests/scripts/test_afc_tools_uninstall.py",
             "tests/scripts/test_afc_tools_install.py",
@@ -249,12 +278,18 @@ MODULES = {
         "files": [
             "handlers/stickers.py",
             "utils/stickerDownloader.py",
+            "utils/stickerCache.py",
+            "utils/conversionScheduler.py",
+            "utils/tgsRenderer.py",
             "utils/archiver.py",
             "utils/fileSender.py",
             "utils/memoryMonitor.py",
             "utils/operators.py",
             "utils/command/killsticker.py",
             "tests/utils/test_stickerDownloader.py",
+            "tests/utils/test_stickerCache.py",
+            "tests/utils/test_conversionScheduler.py",
+            "tests/utils/test_tgsRenderer.py",
             "tests/utils/test_archiver.py",
             "tests/utils/test_fileSender.py",
             "tests/utils/test_memoryMonitor.py",
@@ -49,6 +49,26 @@ def pytest_collection_modifyitems(config, items):
             item.add_marker(pytest.mark.integration)
 
 
+# ============================================================================
+# 模块级缓存隔离
+# ============================================================================
+
+@pytest.fixture(autouse=True)
+def _clearRetrievalCaches():
+    """检索结果缓存 / 记忆解密缓存 / URL 读取缓存是模块级状态，每个测试前清空，避免跨测试命中（未导入则跳过）"""
+    module = sys.modules.get("utils.llm.retrievalCache")
+    if module is not None:
+        module.knowledgeCache.clear()
+        module.memoryCache.clear()
+    module = sys.modules.get("utils.llm.memory.contentCache")
+    if module is not None:
+        module.decryptedCache.clear()
+    module = sys.modules.get("utils.llm.urlCache")
+    if module is not None:
+        module.urlCache.clear()
+    yield
+
+
 # ============================================================================
 # 数据库 Fixture
 # ============================================================================
@@ -4,10 +4,12 @@ tests/handlers/test_stickers.py
 测试 handlers/stickers.py 的表情包搜索与下载功能
 """
 
+import asyncio
+
 import pytest
 from unittest.mock import patch, AsyncMock, MagicMock
 
-from handlers.stickers import findSticker, getCachedSticker, setCachedSticker, register
+from handlers.stickers import findSticker, getCachedSticker, setCachedSticker, register, _reportQueuePosition
 
 
 @pytest.fixture(autouse=True)
@@ -131,6 +133,30 @@ class TestStickerCache:
         assert result is None
 
 
+# ============================================================================
+# TestQueueFeedback - GIF 转换排队位置反馈
+# ============================================================================
+
+class TestQueueFeedback:
+    """测试 _reportQueuePosition"""
+
+    @pytest.mark.asyncio
+    async def test_edits_on_change_and_stops_when_running(self):
+        """位置变化时编辑消息，轮到后提示一次并结束"""
+        query = MagicMock()
+        query.edit_message_text = AsyncMock()
+        positions = iter([0, 2, 2, 1, 0])
+
+        with patch('handlers.stickers._QUEUE_FEEDBACK_INTERVAL', 0), \
+             patch('handlers.stickers.getConversionQueuePosition', side_effect=lambda _: next(positions)):
+            await asyncio.wait_for(_reportQueuePosition(query, 42, "收到"), timeout=1)
+
+        texts = [call.args[0] for call in query.edit_message_text.call_args_list]
+        assert len(texts) == 3
+        assert "第 2 位" in texts[0] and "第 1 位" in texts[1]
+        assert "轮到你啦" in texts[2]
+
+
 # ============================================================================
 # TestStickersRegister - 注册测试
 # ============================================================================
@@ -0,0 +1,136 @@
+"""
+tests/utils/afc/test_resultCache.py
+
+测试 AFC 工具结果缓存（resultCache.py）及其在 executor / registry / toolManager 中的接入
+"""
+
+import json
+from unittest.mock import patch, AsyncMock
+
+import pytest
+
+import utils.afc.resultCache as resultCache
+from utils.afc.resultCache import (
+    afcCacheable,
+    getCachePolicy,
+    makeCacheKey,
+    getCachedResult,
+    storeResult,
+    clearResultCache,
+)
+
+
+@pytest.fixture(autouse=True)
+def _cleanCache():
+    clearResultCache()
+    yield
+    clearResultCache()
+
+
+_POLICY = {"ttl": 60.0, "maxSize": 2}
+
+
+# ============================================================================
+# 装饰器 / 键
+# ============================================================================
+
+class TestDeclaration:
+    """测试 @afcCacheable 声明"""
+
+    def test_decorator_keeps_function(self):
+        """装饰器不包装函数，只挂策略属性"""
+        async def tool(x: str) -> str:
+            return x
+
+        decorated = afcCacheable(ttl=10, maxSize=5)(tool)
+        assert decorated is tool
+        assert getCachePolicy(tool) == {"ttl": 10.0, "maxSize": 5}
+
+    def test_undecorated_has_no_policy(self):
+        async def tool(x: str) -> str:
+            return x
+
+        assert getCachePolicy(tool) is None
+
+    def test_invalid_policy_rejected(self):
+        with pytest.raises(ValueError):
+            afcCacheable(ttl=0)
+
+    def test_key_normalizes_whitespace_and_order(self):
+        """字符串去首尾空白、参数顺序无关"""
+        assert makeCacheKey({"a": " 2+3 ", "b": 1}) == makeCacheKey({"b": 1, "a": "2+3"})
+        assert makeCacheKey({"a": "2+3"}) != makeCacheKey({"a": "2+4"})
+
+
+# ============================================================================
+# 读写 / 淘汰
+# ============================================================================
+
+class TestStore:
+    """测试缓存读写、TTL 与条数上限"""
+
+    def test_miss_then_hit(self):
+        assert getCachedResult("calc.calculate", "k") == (False, None)
+        storeResult("calc.calculate", "k", "5", _POLICY)
+        assert getCachedResult("calc.calculate", "k") == (True, "5")
+
+    def test_error_text_not_stored(self):
+        """工具入口返回的错误文本不缓存"""
+        assert storeResult("calc.calculate", "k", "错误：除数不能为零", _POLICY) is False
+        assert getCachedResult("calc.calculate", "k") == (False, None)
+
+    def test_expired_entry_misses(self, monkeypatch):
+        storeResult("calc.calculate", "k", "5", _POLICY)
+        now = resultCache.time.monotonic()
+        monkeypatch.setattr(resultCache.time, "monotonic", lambda: now + 61)
+        assert getCachedResult("calc.calculate", "k") == (False, None)
+
+    def test_lru_eviction(self):
+        """超出 maxSize 时淘汰最久未使用的条目"""
+        storeResult("calc.calculate", "a", "1", _POLICY)
+        storeResult("calc.calculate", "b", "2", _POLICY)
+        getCachedResult("calc.calculate", "a")
+        storeResult("calc.calculate", "c", "3", _POLICY)
+
+        assert getCachedResult("calc.calculate", "b") == (False, None)
+        assert getCachedResult("calc.calculate", "a") == (True, "1")
+        assert resultCache.getCacheStats()["calc.calculate"]["evictions"] == 1
+
+
+# ============================================================================
+# executor / toolManager 接入
+# ============================================================================
+
+@pytest.mark.asyncio
+class TestExecutorIntegration:
+    """测试 executor 对声明了缓存的工具走缓存"""
+
+    async def test_calc_second_call_hits_cache(self):
+        from utils.afc.executor import execute
+        from utils.afc.registry import getToolCachePolicy
+        from utils.afc.toolManager import getAfcCacheStats
+
+        assert getToolCachePolicy("calc", "calculate") is not None
+
+        with patch("utils.afc.executor.logSystemEvent", new=AsyncMock()), \
+             patch("utils.afc.tools.calc.calculator.calculate", new=AsyncMock(return_value="5")) as mockCalc:
+            first = await execute(json.dumps({"tool": "calc", "parameters": {"expression": "2+3"}}))
+            second = await execute(json.dumps({"tool": "calc", "parameters": {"expression": " 2+3 "}}))
+
+        assert first == second == "<FUNCTION_RESULT>5</FUNCTION_RESULT>"
+        assert mockCalc.await_count == 1
+
+        stats = getAfcCacheStats()["calc.calculate"]
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["size"] == 1
+
+    async def test_uncached_tool_not_recorded(self):
+        """未声明缓存的工具不进入统计"""
+        from utils.afc.executor import execute
+        from utils.afc.toolManager import getAfcCacheStats
+
+        with patch("utils.afc.executor.logSystemEvent", new=AsyncMock()):
+            await execute(json.dumps({"tool": "datetime", "function": "getCurrentTime", "parameters": {}}))
+
+        assert "datetime.getCurrentTime" not in getAfcCacheStats()
@@ -260,6 +260,8 @@ class TestScanRespectsEnabled:
         registry._schemaBuilt = False
         registry._toolsSchema.clear()
         registry._toolsCallable.clear()
+        registry._toolsCachePolicy.clear()
+        registry._toolsExecPolicy.clear()
         registry._scanTools()
 
     def _resetScanCaches(self):
@@ -276,6 +278,8 @@ class TestScanRespectsEnabled:
         registry._schemaBuilt = False
         registry._toolsSchema.clear()
         registry._toolsCallable.clear()
+        registry._toolsCachePolicy.clear()
+        registry._toolsExecPolicy.clear()
 
     def test_disabled_tool_not_scanned(self, isolatedState):
         """禁用 datetime 后，重扫不应注册其触发词 / schema"""
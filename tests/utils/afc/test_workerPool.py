@@ -0,0 +1,110 @@
+"""
+tests/utils/afc/test_workerPool.py
+
+测试 AFC 同步工具专用执行池（workerPool.py）
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+import utils.afc.workerPool as workerPool
+from utils.afc.errors import ToolBusyError
+from utils.afc.workerPool import afcExecution, getExecPolicy, runSyncTool, getPoolStats
+
+
+@pytest.fixture(autouse=True)
+def _resetCounts():
+    workerPool._inFlight.clear()
+    workerPool._orphans.clear()
+    yield
+    workerPool._inFlight.clear()
+    workerPool._orphans.clear()
+
+
+def _add(a: int, b: int) -> int:
+    return a + b
+
+
+class TestDeclaration:
+    """测试 @afcExecution 声明"""
+
+    def test_decorator_keeps_function(self):
+        def tool(x: str) -> str:
+            return x
+
+        assert afcExecution(maxConcurrency=3)(tool) is tool
+        assert getExecPolicy(tool) == {"maxConcurrency": 3, "isolateProcess": False}
+
+    def test_default_concurrency(self):
+        def tool(x: str) -> str:
+            return x
+
+        afcExecution(isolateProcess=True)(tool)
+        assert getExecPolicy(tool)["maxConcurrency"] == workerPool._DEFAULT_MAX_CONCURRENCY
+
+    def test_invalid_concurrency_rejected(self):
+        with pytest.raises(ValueError):
+            afcExecution(maxConcurrency=0)
+
+    def test_process_isolation_requires_picklable(self):
+        """模块级函数可提交到进程池；嵌套函数在注册时即报错"""
+        workerPool.checkProcessIsolation(_add, "t.add")
+
+        def nested(x: str) -> str:
+            return x
+
+        with pytest.raises(TypeError, match="t.nested"):
+            workerPool.checkProcessIsolation(nested, "t.nested")
+
+
+@pytest.mark.asyncio
+class TestRunSyncTool:
+    """测试线程池执行、并发上限与孤儿计数"""
+
+    async def test_runs_in_dedicated_thread(self):
+        """在 afc-tool 线程中运行，而非默认线程池"""
+        def whoAmI():
+            return threading.current_thread().name
+
+        name = await runSyncTool("t.whoAmI", whoAmI, {})
+        assert name.startswith("afc-tool")
+        assert getPoolStats() == {}
+
+    async def test_exception_propagates_and_releases(self):
+        def boom():
+            raise ValueError("bad")
+
+        with pytest.raises(ValueError):
+            await runSyncTool("t.boom", boom, {})
+        assert getPoolStats() == {}
+
+    async def test_timeout_leaves_orphan_until_thread_ends(self):
+        """超时后线程仍在跑：计为孤儿并占用名额，线程结束后释放"""
+        gate = threading.Event()
+        policy = {"maxConcurrency": 1, "isolateProcess": False}
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(runSyncTool("t.hang", gate.wait, {}, policy), timeout=0.05)
+
+        assert getPoolStats()["t.hang"] == {"inFlight": 1, "orphans": 1}
+        with pytest.raises(ToolBusyError):
+            await runSyncTool("t.hang", gate.wait, {}, policy)
+
+        gate.set()
+        for _ in range(100):
+            if not getPoolStats():
+                break
+            await asyncio.sleep(0.01)
+        assert getPoolStats() == {}
+
+    async def test_process_isolation(self):
+        """isolateProcess=True 时在进程池运行"""
+        policy = {"maxConcurrency": 1, "isolateProcess": True}
+        try:
+            assert await runSyncTool("t.add", _add, {"a": 2, "b": 3}, policy) == 5
+            # 子进程不是 fork 出来的：不会继承 bot 其他线程持有的锁
+            assert workerPool._processPool._mp_context.get_start_method() in ("forkserver", "spawn")
+        finally:
+            await workerPool.shutdownPools()
@@ -12,8 +12,10 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 import aiohttp
 
+from utils.afc.errors import ToolDependencyError
 from utils.afc.tools.weather import getWeather
-from utils.afc.tools.weather.cache import clearCache, getCacheKey, getFromCache, saveToCache
+from utils.afc.tools.weather import cache as weatherCache
+from utils.afc.tools.weather.cache import clearCache, fetchWithCache, getCacheKey, getFromCache, saveToCache
 from utils.afc.tools.weather.dateParser import parseDate
 from utils.afc.tools.weather.formatter import formatWeatherResponse
 
@@ -114,7 +116,7 @@ def mockSession():
 
 
 # ====================================================================================================
-# 1. Cache 模块测试（5 个用例）
+# 1. Cache 模块测试（10 个用例）
 # ====================================================================================================
 
 def test_cache_key_generation():
@@ -170,6 +172,87 @@ def test_cache_clear():
     assert getFromCache(getCacheKey("上海", 1)) is None
 
 
+def test_cache_lru_bound():
+    """超出条数上限时淘汰最久未用的条目"""
+    with patch('utils.afc.tools.weather.config.WEATHER_CACHE_MAX_ENTRIES', 2):
+        saveToCache("a:0", {"n": 1})
+        saveToCache("b:0", {"n": 2})
+        getFromCache("a:0")
+        saveToCache("c:0", {"n": 3})
+
+    assert getFromCache("b:0") is None
+    assert getFromCache("a:0") == {"n": 1}
+    assert getFromCache("c:0") == {"n": 3}
+
+
+def test_cache_sweep_removes_expired_entries():
+    """写入时定期清扫超出 stale 窗口的条目，不必等同一个 key 再被读取"""
+    with patch('time.time', return_value=1000.0):
+        saveToCache("old:0", {"n": 1})
+
+    with patch('time.time', return_value=1000.0 + 600 + 600 + 1):
+        saveToCache("new:0", {"n": 2})
+
+    assert "old:0" not in weatherCache._cache
+    assert "new:0" in weatherCache._cache
+
+
+@pytest.mark.asyncio
+async def test_fetch_with_cache_coalesces_concurrent_requests():
+    """并发查询同一 key 只调用一次 API"""
+    calls = 0
+
+    async def _fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"n": calls}
+
+    results = await asyncio.gather(*(fetchWithCache("北京:0", _fetch) for _ in range(5)))
+
+    assert calls == 1
+    assert [data for data, _ in results] == [{"n": 1}] * 5
+    assert sorted(source for _, source in results) == ["fetched"] + ["shared"] * 4
+
+
+@pytest.mark.asyncio
+async def test_fetch_with_cache_serves_stale_and_refreshes():
+    """过期条目立即返回旧数据，后台刷新后变为新数据"""
+    with patch('time.time', return_value=time.time() - 700):
+        saveToCache("北京:0", {"n": "old"})
+
+    refreshed = asyncio.Event()
+
+    async def _fetch():
+        refreshed.set()
+        return {"n": "new"}
+
+    data, source = await fetchWithCache("北京:0", _fetch)
+    assert (data, source) == ({"n": "old"}, "stale")
+
+    await asyncio.wait_for(refreshed.wait(), timeout=1)
+    await asyncio.sleep(0)
+    assert getFromCache("北京:0") == {"n": "new"}
+
+
+@pytest.mark.asyncio
+async def test_fetch_with_cache_refresh_failure_keeps_stale():
+    """后台刷新失败只记日志，旧数据继续提供"""
+    with patch('time.time', return_value=time.time() - 700):
+        saveToCache("北京:0", {"n": "old"})
+
+    async def _fail():
+        raise ToolDependencyError("服务不可用")
+
+    with patch('utils.afc.tools.weather.cache.logSystemEvent', new_callable=AsyncMock) as mockLog:
+        await fetchWithCache("北京:0", _fail)
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+    assert mockLog.await_count == 1
+    assert weatherCache._lookup("北京:0") == ({"n": "old"}, False)
+
+
 # ====================================================================================================
 # 2. DateParser 模块测试（7 个用例）
 # ====================================================================================================
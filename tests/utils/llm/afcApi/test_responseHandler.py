@@ -0,0 +1,244 @@
+"""
+tests/utils/llm/afcApi/test_responseHandler.py
+
+测试 AFC 下游桥接（utils/llm/afcApi/responseHandler.py）。
+
+验证：
+    - extractAFCAction 去除代码块标记
+    - 工具循环复用同一个 conversation：工具结果增量追加为 user 消息，不重建上下文
+    - 无 <AFC_ACTION> 时不追加消息、不发请求
+    - 达到 maxIterations 后停止并清除残留标签
+    - 同一回复内多个 <AFC_ACTION> 并发执行，结果合并为一条 follow-up
+    - 并发上限、单回复调用数上限、同一 action 本轮成功后只执行一次；失败的会在后续迭代重试
+"""
+
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock
+
+import utils.llm.afcApi.responseHandler as responseHandler
+from utils.llm.afcApi.responseHandler import (
+    extractAFCAction,
+    extractAFCActions,
+    handleAFCInLLMResponse,
+)
+from utils.llm.client._conversation import LLMConversation
+
+
+_ACTION = '<AFC_ACTION>{"tool": "calc", "parameters": {"expression": "1+1"}}</AFC_ACTION>'
+
+
+def _makeConversation(replies: list[str]) -> LLMConversation:
+    """构造首轮已完成的 conversation；后续 request() 依次返回 replies。"""
+    conversation = LLMConversation(
+        provider=None,
+        model="test-model",
+        systemMessages=["system"],
+        maxTokens=100,
+        temperature=0.5,
+    )
+    conversation.appendUser("首轮上下文")
+    conversation.appendAssistant(_ACTION)
+    return conversation
+
+
+@pytest.fixture(autouse=True)
+def _silenceLog():
+    with patch("utils.llm.afcApi.responseHandler.logSystemEvent", new_callable=AsyncMock):
+        yield
+
+
+def test_extract_strips_code_fence():
+    raw = '<AFC_ACTION>\n```json\n{"tool": "calc"}\n```\n</AFC_ACTION>'
+    assert extractAFCAction(raw) == '{"tool": "calc"}'
+
+
+def test_extract_none_without_action():
+    assert extractAFCAction("普通回复") is None
+
+
+@pytest.mark.asyncio
+async def test_loop_appends_to_same_conversation():
+    """工具结果追加为 user 消息，请求时携带完整历史"""
+    conversation = _makeConversation([])
+    sentMessages = []
+
+    async def _fakeRequest(provider, *, systemMessages, messages, **kwargs):
+        sentMessages.append([dict(m) for m in messages])
+        assert systemMessages == ["system"]
+        return "最终回复"
+
+    with patch("utils.llm.afcApi.responseHandler.executeAFCTool",
+               new=AsyncMock(return_value="<FUNCTION_RESULT>2</FUNCTION_RESULT>")), \
+         patch("utils.llm.client._conversation.requestMessagesWithRetry", side_effect=_fakeRequest):
+        result = await handleAFCInLLMResponse(_ACTION, conversation, "算一下 1+1")
+
+    assert result == "最终回复"
+    assert len(sentMessages) == 1
+    roles = [m["role"] for m in sentMessages[0]]
+    assert roles == ["user", "assistant", "user"]
+    assert sentMessages[0][0]["content"] == "首轮上下文"
+    assert "FUNCTION_RESULT" in sentMessages[0][2]["content"]
+    assert "算一下 1+1" in sentMessages[0][2]["content"]
+    # 最终回复也记入 conversation
+    assert conversation.messages[-1] == {"role": "assistant", "content": "最终回复"}
+
+
+@pytest.mark.asyncio
+async def test_no_action_no_request():
+    """首轮回复无工具调用时直接返回"""
+    conversation = _makeConversation([])
+    with patch("utils.llm.client._conversation.requestMessagesWithRetry", new=AsyncMock()) as mockRequest:
+        result = await handleAFCInLLMResponse("你好呀", conversation, "你好")
+
+    assert result == "你好呀"
+    mockRequest.assert_not_called()
+    assert len(conversation.messages) == 2
+
+
+@pytest.mark.asyncio
+async def test_max_iterations_strips_residual_action():
+    """LLM 反复调用同一工具时在 maxIterations 处停止、结果复用，并清除残留标签"""
+    conversation = _makeConversation([])
+    with patch("utils.llm.afcApi.responseHandler.executeAFCTool",
+               new=AsyncMock(return_value="<FUNCTION_RESULT>2</FUNCTION_RESULT>")) as mockExec, \
+         patch("utils.llm.client._conversation.requestMessagesWithRetry",
+               new=AsyncMock(return_value=f"再算一次{_ACTION}")):
+        result = await handleAFCInLLMResponse(_ACTION, conversation, "算", maxIterations=3)
+
+    # 同一 action 本轮只真正执行一次
+    assert mockExec.await_count == 1
+    assert "AFC_ACTION" not in result
+    # 首轮 2 条 + 每轮 user/assistant 各 1 条
+    assert len(conversation.messages) == 2 + 3 * 2
+
+
+@pytest.mark.asyncio
+async def test_failed_action_retried_in_later_iteration():
+    """FUNCTION_ERROR 不复用：LLM 下一轮重发同一 action 时重新执行"""
+    conversation = _makeConversation([])
+    outcomes = ["<FUNCTION_ERROR>超时</FUNCTION_ERROR>", "<FUNCTION_RESULT>2</FUNCTION_RESULT>"]
+    replies = [f"重试{_ACTION}", "答案是 2"]
+
+    with patch("utils.llm.afcApi.responseHandler.executeAFCTool", new=AsyncMock(side_effect=outcomes)) as mockExec, \
+         patch("utils.llm.client._conversation.requestMessagesWithRetry", new=AsyncMock(side_effect=replies)):
+        result = await handleAFCInLLMResponse(_ACTION, conversation, "算")
+
+    assert mockExec.await_count == 2
+    assert result == "答案是 2"
+    assert "超时" in conversation.messages[2]["content"]
+    assert "FUNCTION_RESULT＞2" in conversation.messages[4]["content"]
+
+
+
+# ============================================================================
+# 多 action 并发
+# ============================================================================
+
+def _action(tool: str, city: str) -> str:
+    return f'<AFC_ACTION>{{"tool": "{tool}", "parameters": {{"city": "{city}"}}}}</AFC_ACTION>'
+
+
+def test_extract_all_actions_in_order():
+    text = f"先查{_action('weather', '北京')}再查{_action('weather', '上海')}"
+    actions = extractAFCActions(text)
+    assert len(actions) == 2
+    assert "北京" in actions[0] and "上海" in actions[1]
+
+
+@pytest.mark.asyncio
+async def test_multiple_actions_run_concurrently_single_follow_up():
+    """两个 action 同时在跑（互相等待也不会死锁），结果按顺序合并进一条 follow-up"""
+    first = _action("weather", "北京")
+    second = _action("weather", "上海")
+    conversation = _makeConversation([])
+    conversation.messages[-1]["content"] = first + second
+
+    running = 0
+    peak = 0
+    bothStarted = asyncio.Event()
+
+    async def _fakeExecute(actionJSON):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        if running == 2:
+            bothStarted.set()
+        await asyncio.wait_for(bothStarted.wait(), timeout=1)
+        running -= 1
+        return f"<FUNCTION_RESULT>{actionJSON}</FUNCTION_RESULT>"
+
+    mockRequest = AsyncMock(return_value="两地天气如下")
+    with patch("utils.llm.afcApi.responseHandler.executeAFCTool", side_effect=_fakeExecute), \
+         patch("utils.llm.client._conversation.requestMessagesWithRetry", new=mockRequest):
+        result = await handleAFCInLLMResponse(first + second, conversation, "北京和上海天气")
+
+    assert result == "两地天气如下"
+    assert peak == 2
+    mockRequest.assert_awaited_once()
+    followUp = conversation.messages[2]["content"]
+    assert "工具执行结果 1/2" in followUp and "工具执行结果 2/2" in followUp
+    assert followUp.index("北京") < followUp.index("上海")
+
+
+@pytest.mark.asyncio
+async def test_parallel_cap_respected(monkeypatch):
+    """同时在跑的工具数不超过 _MAX_PARALLEL_TOOLS"""
+    monkeypatch.setattr(responseHandler, "_MAX_PARALLEL_TOOLS", 2)
+    text = "".join(_action("weather", f"城市{i}") for i in range(5))
+    conversation = _makeConversation([])
+
+    running = 0
+    peak = 0
+
+    async def _fakeExecute(actionJSON):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "<FUNCTION_RESULT>ok</FUNCTION_RESULT>"
+
+    with patch("utils.llm.afcApi.responseHandler.executeAFCTool", side_effect=_fakeExecute) as mockExec, \
+         patch("utils.llm.client._conversation.requestMessagesWithRetry", new=AsyncMock(return_value="完成")):
+        await handleAFCInLLMResponse(text, conversation, "查天气")
+
+    assert mockExec.call_count == 5
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_actions_over_limit_reported(monkeypatch):
+    """超出单回复调用数上限的 action 不执行，并在结果里说明"""
+    monkeypatch.setattr(responseHandler, "_MAX_ACTIONS_PER_RESPONSE", 2)
+    text = "".join(_action("weather", f"城市{i}") for i in range(3))
+    conversation = _makeConversation([])
+
+    with patch("utils.llm.afcApi.responseHandler.executeAFCTool",
+               new=AsyncMock(return_value="<FUNCTION_RESULT>ok</FUNCTION_RESULT>")) as mockExec, \
+         patch("utils.llm.client._conversation.requestMessagesWithRetry", new=AsyncMock(return_value="完成")):
+        await handleAFCInLLMResponse(text, conversation, "查天气")
+
+    assert mockExec.await_count == 2
+    assert "其余 1 个已忽略" in conversation.messages[2]["content"]
+
+
+@pytest.mark.asyncio
+async def test_executor_exception_becomes_function_error():
+    """单个工具意外抛异常时转为 FUNCTION_ERROR，不影响其他结果"""
+    first = _action("weather", "北京")
+    second = _action("weather", "上海")
+    conversation = _makeConversation([])
+
+    async def _fakeExecute(actionJSON):
+        if "北京" in actionJSON:
+            raise RuntimeError("boom")
+        return "<FUNCTION_RESULT>上海晴</FUNCTION_RESULT>"
+
+    with patch("utils.llm.afcApi.responseHandler.executeAFCTool", side_effect=_fakeExecute), \
+         patch("utils.llm.client._conversation.requestMessagesWithRetry", new=AsyncMock(return_value="完成")):
+        await handleAFCInLLMResponse(first + second, conversation, "查天气")
+
+    followUp = conversation.messages[2]["content"]
+    assert "RuntimeError" in followUp
+    assert "上海晴" in followUp
@@ -0,0 +1,72 @@
+"""
+tests/utils/llm/client/test_conversation.py
+
+测试多轮对话支持：
+    - LLMProvider.requestMessages 默认实现（单条直通 requestReply / 多轮折叠为单条）
+    - LLMConversation.request 追加 assistant 回复
+"""
+
+import pytest
+from unittest.mock import patch, AsyncMock
+
+from utils.llm.client._base import LLMProvider
+from utils.llm.client._conversation import LLMConversation
+
+
+class _EchoProvider(LLMProvider):
+    """只实现 requestReply 的 provider，记录收到的 userContent。"""
+
+    def __init__(self):
+        super().__init__("key")
+        self.received = []
+
+    async def requestReply(self, *, systemMessages, userContent, model, maxTokens, temperature):
+        self.received.append(userContent)
+        return "ok"
+
+
+@pytest.mark.asyncio
+async def test_default_request_messages_single_passthrough():
+    """单条消息时原样交给 requestReply（含多模态 list）"""
+    provider = _EchoProvider()
+    content = [{"type": "text", "text": "hi"}]
+    await provider.requestMessages(
+        systemMessages=[], messages=[{"role": "user", "content": content}],
+        model="m", maxTokens=10, temperature=0.1,
+    )
+    assert provider.received == [content]
+
+
+@pytest.mark.asyncio
+async def test_default_request_messages_folds_multi_turn():
+    """多轮时按顺序折叠为带角色标记的单条文本"""
+    provider = _EchoProvider()
+    await provider.requestMessages(
+        systemMessages=[],
+        messages=[
+            {"role": "user", "content": [{"type": "text", "text": "问题"}]},
+            {"role": "assistant", "content": "调用工具"},
+            {"role": "user", "content": "工具结果"},
+        ],
+        model="m", maxTokens=10, temperature=0.1,
+    )
+    folded = provider.received[0]
+    assert folded.index("问题") < folded.index("调用工具") < folded.index("工具结果")
+    assert "[助手回复]" in folded
+
+
+@pytest.mark.asyncio
+async def test_conversation_request_appends_reply():
+    conversation = LLMConversation(
+        provider=_EchoProvider(), model="m", systemMessages=["s"], maxTokens=10, temperature=0.1,
+    )
+    conversation.appendUser("hello")
+
+    with patch("utils.llm.client._request.logSystemEvent", new_callable=AsyncMock):
+        reply = await conversation.request()
+
+    assert reply == "ok"
+    assert conversation.messages == [
+        {"role": "user", "content": "hello"},
+        {"role": "assistant", "content": "ok"},
+    ]
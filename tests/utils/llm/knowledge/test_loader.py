@@ -249,4 +249,157 @@ Content without closing delimiter.
     )
 
     result = _parseMarkdownFile(str(md_file))
-    assert result is None
\ No newline at end of file
+    assert result is None
+
+# ============================================================================
+# reindexKnowledgeBase()：文件 mtime / size 快速跳过
+# ============================================================================
+
+@pytest.fixture
+def knowledgeEnv(tmp_path, inMemoryDb, monkeypatch):
+    """临时知识目录 + 内存数据库 + 干净索引"""
+    from unittest.mock import patch, AsyncMock
+    import utils.llm.knowledge.loader as loader
+    import utils.llm.knowledge.retriever as retriever
+    from utils.core.schema import loadSchema
+    from utils.llm.knowledge.database import knowledgeDB
+    from utils.llm.knowledge.index import KnowledgeIndex
+
+    inMemoryDb.executescript(loadSchema("llmKnowledge"))
+    monkeypatch.setattr(loader, "LLM_KNOWLEDGE_DIR", str(tmp_path))
+    monkeypatch.setattr(retriever, "_index", KnowledgeIndex())
+
+    async def _run(func):
+        return func(inMemoryDb)
+
+    with patch.object(knowledgeDB, "run", side_effect=_run), \
+         patch.object(loader, "logSystemEvent", new=AsyncMock()):
+        yield tmp_path
+
+
+def _writeEntry(directory, name, title, content):
+    (directory / name).write_text(
+        f"---\ncategory: custom\ntitle: {title}\ntags: [t]\n---\n{content}\n",
+        encoding="utf-8",
+    )
+
+
+@pytest.mark.asyncio
+async def test_reindex_skips_unchanged_files(knowledgeEnv):
+    """第二次 reindex 时未变化的文件不再解析"""
+    from unittest.mock import patch
+    import utils.llm.knowledge.loader as loader
+
+    _writeEntry(knowledgeEnv, "a.md", "A", "alpha")
+    first = await loader.reindexKnowledgeBase()
+    assert first["added"] == 1
+
+    with patch.object(loader, "_parseMarkdownFile", side_effect=AssertionError("不应解析")):
+        second = await loader.reindexKnowledgeBase()
+    assert second == {"added": 0, "updated": 0, "removed": 0, "skipped": 1}
+
+
+@pytest.mark.asyncio
+async def test_reindex_picks_up_modified_file(knowledgeEnv):
+    import os
+    import utils.llm.knowledge.loader as loader
+    from utils.llm.knowledge.retriever import retrieveKnowledge
+
+    _writeEntry(knowledgeEnv, "a.md", "A", "alpha")
+    await loader.reindexKnowledgeBase()
+
+    _writeEntry(knowledgeEnv, "a.md", "A", "omega omega")
+    path = knowledgeEnv / "a.md"
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    result = await loader.reindexKnowledgeBase()
+    assert result["updated"] == 1
+    assert [r["title"] for r in await retrieveKnowledge("omega", minScore=0.1)] == ["A"]
+
+
+# ============================================================================
+# bulkUpsertKnowledgeEntries()：单事务批量写入
+# ============================================================================
+
+def _parsed(sourceFile, title, content, sourceHash, priority=0):
+    return {
+        "category": "custom", "title": title, "content": content, "tags": ["t"],
+        "source_file": sourceFile, "source_hash": sourceHash, "priority": priority,
+    }
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_reports_counts(knowledgeEnv, inMemoryDb):
+    from utils.llm.knowledge.database import bulkUpsertKnowledgeEntries
+
+    first = await bulkUpsertKnowledgeEntries([
+        _parsed("knowledge/a.md", "A", "alpha", "h1"),
+        _parsed("knowledge/b.md", "B", "beta", "h2"),
+    ])
+    assert first == {"inserted": 2, "updated": 0, "unchanged": 0, "removed": 0}
+
+    inMemoryDb.execute("UPDATE knowledge_entries SET updated_at = 'old'")
+    second = await bulkUpsertKnowledgeEntries([
+        _parsed("knowledge/a.md", "A", "alpha", "h1"),
+        _parsed("knowledge/b.md", "B", "beta", "h2", priority=3),   # priority 不参与 hash，也算变更
+    ])
+    assert second == {"inserted": 0, "updated": 1, "unchanged": 1, "removed": 0}
+
+    rows = dict(inMemoryDb.execute("SELECT title, updated_at FROM knowledge_entries").fetchall())
+    assert rows["A"] == "old"
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_removes_vanished_and_renamed(knowledgeEnv, inMemoryDb):
+    from utils.llm.knowledge.database import bulkUpsertKnowledgeEntries
+
+    await bulkUpsertKnowledgeEntries([
+        _parsed("knowledge/a.md", "A", "alpha", "h1"),
+        _parsed("knowledge/b.md", "B", "beta", "h2"),
+    ])
+
+    result = await bulkUpsertKnowledgeEntries(
+        [_parsed("knowledge/a.md", "A2", "alpha", "h3")],
+        currentSources={"knowledge/a.md"},
+    )
+
+    assert result == {"inserted": 1, "updated": 0, "unchanged": 0, "removed": 2}
+    titles = [row[0] for row in inMemoryDb.execute("SELECT title FROM knowledge_entries")]
+    assert titles == ["A2"]
+
+
+@pytest.mark.asyncio
+async def test_reindex_removes_deleted_file(knowledgeEnv):
+    import utils.llm.knowledge.loader as loader
+
+    _writeEntry(knowledgeEnv, "a.md", "A", "alpha")
+    _writeEntry(knowledgeEnv, "b.md", "B", "beta")
+    await loader.reindexKnowledgeBase()
+
+    (knowledgeEnv / "b.md").unlink()
+    result = await loader.reindexKnowledgeBase()
+
+    assert result == {"added": 0, "updated": 0, "removed": 1, "skipped": 1}
+
+
+def test_init_schema_dedupes_legacy_rows(inMemoryDb):
+    """旧库里重复的 (source_file, title) 在建唯一索引前被清理，保留最新一行"""
+    from utils.llm.knowledge.database import initSchema
+
+    inMemoryDb.execute(
+        "CREATE TABLE knowledge_entries (id INTEGER PRIMARY KEY AUTOINCREMENT, category TEXT NOT NULL, "
+        "title TEXT NOT NULL, content TEXT NOT NULL, tags_json TEXT NOT NULL DEFAULT '[]', "
+        "source_file TEXT NOT NULL, source_hash TEXT NOT NULL, priority INTEGER DEFAULT 0, "
+        "enabled INTEGER DEFAULT 1, created_at DATETIME, updated_at DATETIME)"
+    )
+    for content in ("旧", "新"):
+        inMemoryDb.execute(
+            "INSERT INTO knowledge_entries (category, title, content, source_file, source_hash) "
+            "VALUES ('custom', 'A', ?, 'knowledge/a.md', 'h')",
+            (content,),
+        )
+
+    initSchema(inMemoryDb)
+
+    assert [row[0] for row in inMemoryDb.execute("SELECT content FROM knowledge_entries")] == ["新"]
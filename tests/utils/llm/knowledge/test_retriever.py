@@ -0,0 +1,251 @@
+"""
+tests/utils/llm/knowledge/test_retriever.py
+
+测试 utils/llm/knowledge/index.py 倒排索引与 retriever.py 检索流程
+"""
+
+import json
+from collections import Counter
+from unittest.mock import patch
+
+import pytest
+
+import utils.llm.knowledge.retriever as retriever
+from utils.core.schema import loadSchema
+from utils.llm.knowledge.index import KnowledgeIndex
+from utils.llm.knowledge.tokenizer import countTokens, bm25Idf, tokenize
+
+
+def _entry(entryID, title, content, tags=(), category="custom", priority=0):
+    return {
+        "id": entryID,
+        "category": category,
+        "title": title,
+        "content": content,
+        "tags": list(tags),
+        "priority": priority,
+    }
+
+
+# ============================================================================
+# tokenizer 新增函数
+# ============================================================================
+
+def test_count_tokens_keeps_frequency():
+    """countTokens 保留词频，tokenize 仍去重"""
+    counts = countTokens("hello hello world")
+    assert counts["hello"] == 2
+    assert counts["world"] == 1
+    assert tokenize("hello hello world") == ["hello", "world"]
+
+
+def test_idf_rare_term_weighs_more():
+    assert bm25Idf(100, 1) > bm25Idf(100, 50) > 0
+
+
+# ============================================================================
+# KnowledgeIndex
+# ============================================================================
+
+class TestKnowledgeIndex:
+    """测试倒排索引的增删与评分"""
+
+    def test_only_matching_docs_scored(self):
+        index = KnowledgeIndex()
+        index.rebuild([
+            _entry(1, "Python", "异步编程"),
+            _entry(2, "Rust", "所有权"),
+        ])
+        scores = index.scoreTerms(["python"])
+        assert set(scores) == {1}
+
+    def test_rare_term_outranks_common_term(self):
+        """IDF：只出现在一条里的词比处处都有的词分数高"""
+        index = KnowledgeIndex()
+        index.rebuild([
+            _entry(1, "common", "rare"),
+            _entry(2, "common", "other"),
+            _entry(3, "common", "stuff"),
+        ])
+        assert index.scoreTerms(["rare"])[1] > index.scoreTerms(["common"])[1]
+
+    def test_field_weights(self):
+        """同一个词出现在 tags 比出现在 content 分数高"""
+        index = KnowledgeIndex()
+        index.rebuild([
+            _entry(1, "a", "b", tags=["python"]),
+            _entry(2, "a", "python"),
+        ])
+        scores = index.scoreTerms(["python"])
+        assert scores[1] > scores[2]
+
+    def test_remove_document_cleans_postings(self):
+        index = KnowledgeIndex()
+        index.rebuild([_entry(1, "Python", "x"), _entry(2, "Rust", "y")])
+        index.removeDocument(1)
+
+        assert 1 not in index
+        assert index.scoreTerms(["python"]) == {}
+        assert "python" not in index._postings
+
+    def test_add_document_replaces(self):
+        index = KnowledgeIndex()
+        index.addDocument(1, {"title": Counter({"old": 1})}, "custom", 0)
+        index.addDocument(1, {"title": Counter({"new": 1})}, "custom", 0)
+
+        assert len(index) == 1
+        assert index.scoreTerms(["old"]) == {}
+        assert 1 in index.scoreTerms(["new"])
+
+
+# ============================================================================
+# retrieveKnowledge()
+# ============================================================================
+
+@pytest.fixture
+def knowledgeDb(inMemoryDb, monkeypatch):
+    """内存知识库 + 干净索引"""
+    inMemoryDb.executescript(loadSchema("llmKnowledge"))
+    monkeypatch.setattr(retriever, "_index", KnowledgeIndex())
+    monkeypatch.setattr(retriever, "_semanticModel", None)
+
+    async def _run(func):
+        return func(inMemoryDb)
+
+    with patch.object(retriever.knowledgeDB, "run", side_effect=_run):
+        yield inMemoryDb
+
+
+def _insert(conn, category, title, content, tags=(), priority=0, enabled=1, sourceHash="h"):
+    cursor = conn.execute(
+        "INSERT INTO knowledge_entries (category, title, content, tags_json, source_file, source_hash, priority, enabled) "
+        "VALUES (?, ?, ?, ?, 'knowledge/t.md', ?, ?, ?)",
+        (category, title, content, json.dumps(list(tags), ensure_ascii=False), sourceHash, priority, enabled),
+    )
+    return cursor.lastrowid
+
+
+@pytest.mark.asyncio
+class TestRetrieveKnowledge:
+    """测试检索流程"""
+
+    async def test_returns_best_match_with_full_fields(self, knowledgeDb):
+        _insert(knowledgeDb, "interests", "编程语言偏好", "熟悉 Python 和 Rust", tags=["Python", "编程"])
+        _insert(knowledgeDb, "custom", "猫", "喜欢猫猫", tags=["动物"])
+
+        results = await retriever.retrieveKnowledge("python 怎么样", limit=3, minScore=0.5)
+
+        assert results[0]["title"] == "编程语言偏好"
+        assert results[0]["tags"] == ["Python", "编程"]
+        assert results[0]["content"] == "熟悉 Python 和 Rust"
+        assert "score" in results[0]
+
+    async def test_category_bonus_without_term_match(self, knowledgeDb):
+        """意图触发词命中时，同类别条目即使不命中词也能召回"""
+        _insert(knowledgeDb, "identity", "ZincNya", "一只猫娘")
+
+        results = await retriever.retrieveKnowledge("你是谁", limit=3, minScore=0.5)
+        assert [r["title"] for r in results] == ["ZincNya"]
+        assert results[0]["score"] >= 5.0
+
+    async def test_priority_bonus_applies(self, knowledgeDb):
+        _insert(knowledgeDb, "custom", "置顶", "无关内容", priority=2)
+
+        results = await retriever.retrieveKnowledge("python", limit=3, minScore=0.5)
+        assert [r["title"] for r in results] == ["置顶"]
+
+    async def test_disabled_entries_excluded(self, knowledgeDb):
+        _insert(knowledgeDb, "custom", "Python", "python", enabled=0)
+
+        assert await retriever.retrieveKnowledge("python", limit=3, minScore=0.1) == []
+
+    async def test_rebuild_reflects_new_entries(self, knowledgeDb):
+        """rebuildTokenCacheFromDB 后新增条目可检索"""
+        _insert(knowledgeDb, "custom", "Python", "python")
+        await retriever.retrieveKnowledge("python")
+
+        _insert(knowledgeDb, "custom", "Rust", "rust")
+        assert await retriever.retrieveKnowledge("rust") == []
+
+        await retriever.rebuildTokenCacheFromDB()
+        assert [r["title"] for r in await retriever.retrieveKnowledge("rust")] == ["Rust"]
+
+
+
+# ============================================================================
+# syncKnowledgeIndex()：持久化 + 增量
+# ============================================================================
+
+@pytest.mark.asyncio
+class TestSyncKnowledgeIndex:
+    """测试持久化索引的加载与增量更新"""
+
+    async def test_first_sync_tokenizes_and_persists(self, knowledgeDb):
+        _insert(knowledgeDb, "custom", "Python", "python")
+
+        result = await retriever.syncKnowledgeIndex()
+
+        assert result["tokenized"] == 1
+        row = knowledgeDb.execute("SELECT fields_json FROM knowledge_index_docs").fetchone()
+        assert json.loads(row["fields_json"])["title"] == {"python": 1}
+
+    async def test_restart_loads_without_tokenizing(self, knowledgeDb, monkeypatch):
+        """新进程（内存索引为空）直接读持久化词频表，不重新分词"""
+        _insert(knowledgeDb, "custom", "Python", "python")
+        await retriever.syncKnowledgeIndex()
+
+        monkeypatch.setattr(retriever, "_index", KnowledgeIndex())
+        with patch.object(retriever, "tokenizeEntry", side_effect=AssertionError("不应重新分词")):
+            result = await retriever.syncKnowledgeIndex()
+
+        assert result == {"total": 1, "changed": 1, "tokenized": 0, "removed": 0}
+        assert [r["title"] for r in await retriever.retrieveKnowledge("python")] == ["Python"]
+
+    async def test_only_changed_hash_retokenized(self, knowledgeDb):
+        _insert(knowledgeDb, "custom", "Python", "python", sourceHash="a")
+        rustID = _insert(knowledgeDb, "custom", "Rust", "rust", sourceHash="b")
+        await retriever.syncKnowledgeIndex()
+
+        knowledgeDb.execute(
+            "UPDATE knowledge_entries SET content = 'golang', source_hash = 'c' WHERE id = ?", (rustID,)
+        )
+        result = await retriever.syncKnowledgeIndex()
+
+        assert result["changed"] == 1
+        assert result["tokenized"] == 1
+        assert [r["title"] for r in await retriever.retrieveKnowledge("golang")] == ["Rust"]
+
+    async def test_tokenizer_version_bump_invalidates(self, knowledgeDb, monkeypatch):
+        _insert(knowledgeDb, "custom", "Python", "python")
+        await retriever.syncKnowledgeIndex()
+
+        monkeypatch.setattr(retriever, "_index", KnowledgeIndex())
+        monkeypatch.setattr(retriever, "TOKENIZER_VERSION", retriever.TOKENIZER_VERSION + 1)
+        result = await retriever.syncKnowledgeIndex()
+
+        assert result["tokenized"] == 1
+
+    async def test_removed_and_disabled_entries_dropped(self, knowledgeDb):
+        pythonID = _insert(knowledgeDb, "custom", "Python", "python")
+        rustID = _insert(knowledgeDb, "custom", "Rust", "rust")
+        await retriever.syncKnowledgeIndex()
+
+        knowledgeDb.execute("DELETE FROM knowledge_entries WHERE id = ?", (pythonID,))
+        knowledgeDb.execute("UPDATE knowledge_entries SET enabled = 0 WHERE id = ?", (rustID,))
+        result = await retriever.syncKnowledgeIndex()
+
+        assert result["removed"] == 2
+        assert len(retriever._index) == 0
+        assert knowledgeDb.execute("SELECT COUNT(*) FROM knowledge_index_docs").fetchone()[0] == 0
+
+    async def test_priority_change_applies_without_retokenizing(self, knowledgeDb):
+        """priority / category 不参与 source_hash，变更后仍同步到索引"""
+        entryID = _insert(knowledgeDb, "custom", "置顶", "无关内容")
+        await retriever.syncKnowledgeIndex()
+        assert await retriever.retrieveKnowledge("python") == []
+
+        knowledgeDb.execute("UPDATE knowledge_entries SET priority = 2 WHERE id = ?", (entryID,))
+        result = await retriever.syncKnowledgeIndex()
+
+        assert result["tokenized"] == 0
+        assert [r["title"] for r in await retriever.retrieveKnowledge("python")] == ["置顶"]
@@ -0,0 +1,184 @@
+"""
+tests/utils/llm/knowledge/test_semantic.py
+
+测试 utils/llm/knowledge/semantic.py LSA 语义表示与 retriever 的 RRF 重排
+"""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+import utils.llm.knowledge.retriever as retriever
+from utils.core.schema import loadSchema
+from utils.llm.knowledge import semantic
+from utils.llm.knowledge.index import KnowledgeIndex
+
+
+pytestmark = pytest.mark.skipif(not semantic.available(), reason="需要 NumPy")
+
+
+def _entry(entryID, title, content, tags=(), sourceHash=None):
+    return {
+        "id": entryID,
+        "category": "custom",
+        "title": title,
+        "content": content,
+        "tags": list(tags),
+        "priority": 0,
+        "source_hash": sourceHash or f"h{entryID}",
+    }
+
+
+_CORPUS = [
+    _entry(1, "猫", "喵 猫 毛球 铲屎官"),
+    _entry(2, "宠物", "猫 毛球 罐头 铲屎官"),
+    _entry(3, "Python", "python 代码 编程 异步"),
+    _entry(4, "Rust", "rust 代码 编程 所有权"),
+]
+
+
+@pytest.fixture
+def corpusIndex():
+    index = KnowledgeIndex()
+    index.rebuild(_CORPUS)
+    return index
+
+
+# ============================================================================
+# LSA 模型
+# ============================================================================
+
+class TestLSAModel:
+    """测试拟合、相似度与持久化"""
+
+    def test_latent_similarity_beyond_shared_terms(self, corpusIndex):
+        """「喵」只出现在条目 1，但与同主题的条目 2 的相似度高于编程类条目"""
+        model = semantic.fitModel(semantic.indexSnapshot(corpusIndex))
+        sims = model.similarities(retriever.tokenize("喵"), [2, 3, 4])
+
+        assert sims[2] > sims[3]
+        assert sims[2] > sims[4]
+
+    def test_unknown_query_terms(self, corpusIndex):
+        model = semantic.fitModel(semantic.indexSnapshot(corpusIndex))
+        assert model.similarities(["完全陌生"], [1, 2]) == {}
+
+    def test_too_few_documents(self):
+        index = KnowledgeIndex()
+        index.rebuild([_CORPUS[0]])
+        assert semantic.fitModel(semantic.indexSnapshot(index)) is None
+
+    def test_signature_tracks_source_hash(self, corpusIndex):
+        before = semantic.computeSignature(corpusIndex.sourceHashes())
+        corpusIndex.addEntry(_entry(2, "宠物", "猫 毛球", sourceHash="changed"))
+        assert semantic.computeSignature(corpusIndex.sourceHashes()) != before
+
+    def test_persist_roundtrip(self, corpusIndex, inMemoryDb):
+        inMemoryDb.executescript(loadSchema("llmKnowledge"))
+        model = semantic.fitModel(semantic.indexSnapshot(corpusIndex))
+        model.saveTo(inMemoryDb)
+
+        loaded = semantic.LSAModel.loadFrom(inMemoryDb, model.signature)
+        tokens = retriever.tokenize("毛球 代码")
+        assert loaded.similarities(tokens, [1, 2, 3, 4]) == pytest.approx(model.similarities(tokens, [1, 2, 3, 4]))
+        assert semantic.LSAModel.loadFrom(inMemoryDb, "other") is None
+
+
+# ============================================================================
+# retriever：RRF 重排
+# ============================================================================
+
+class _FixedSimilarity:
+    def __init__(self, sims):
+        self._sims = sims
+
+    def similarities(self, queryTokens, entryIDs):
+        return {entryID: self._sims[entryID] for entryID in entryIDs if entryID in self._sims}
+
+
+def test_rrf_fuses_bm25_and_semantic_ranks(monkeypatch):
+    """BM25 名次 1/2/3、语义名次 2/3/1 → 融合后 1 > 3 > 2"""
+    monkeypatch.setattr(retriever, "_semanticModel", _FixedSimilarity({1: 0.1, 2: 0.0, 3: 0.9}))
+
+    fused = retriever._rerankSemantic(["x"], [(1, 5.0), (2, 4.0), (3, 3.0)])
+
+    assert fused == [(1, 5.0), (3, 3.0), (2, 4.0)]
+
+
+def test_rrf_without_model_keeps_bm25_order(monkeypatch):
+    monkeypatch.setattr(retriever, "_semanticModel", None)
+    ranked = [(1, 5.0), (2, 4.0)]
+    assert retriever._rerankSemantic(["x"], ranked) == ranked
+
+
+@pytest.fixture
+def knowledgeDb(inMemoryDb, monkeypatch):
+    inMemoryDb.executescript(loadSchema("llmKnowledge"))
+    monkeypatch.setattr(retriever, "_index", KnowledgeIndex())
+    monkeypatch.setattr(retriever, "_semanticModel", None)
+
+    async def _run(func):
+        return func(inMemoryDb)
+
+    with patch.object(retriever.knowledgeDB, "run", side_effect=_run):
+        yield inMemoryDb
+
+
+def _insertCorpus(conn):
+    for entry in _CORPUS:
+        conn.execute(
+            "INSERT INTO knowledge_entries (id, category, title, content, tags_json, source_file, source_hash) "
+            "VALUES (?, ?, ?, ?, ?, 'knowledge/t.md', ?)",
+            (entry["id"], entry["category"], entry["title"], entry["content"],
+             json.dumps(entry["tags"]), entry["source_hash"]),
+        )
+
+
+@pytest.mark.asyncio
+class TestSemanticSync:
+    """测试 reindex 时拟合 / 读回模型"""
+
+    async def test_sync_fits_and_persists(self, knowledgeDb):
+        _insertCorpus(knowledgeDb)
+        await retriever.syncKnowledgeIndex()
+
+        assert retriever._semanticModel is not None
+        assert knowledgeDb.execute("SELECT COUNT(*) FROM knowledge_semantic").fetchone()[0] == 1
+
+    async def test_restart_loads_without_fitting(self, knowledgeDb, monkeypatch):
+        _insertCorpus(knowledgeDb)
+        await retriever.syncKnowledgeIndex()
+
+        monkeypatch.setattr(retriever, "_index", KnowledgeIndex())
+        monkeypatch.setattr(retriever, "_semanticModel", None)
+        with patch.object(semantic, "fitModel", side_effect=AssertionError("不应重新拟合")):
+            await retriever.syncKnowledgeIndex()
+
+        assert retriever._semanticModel is not None
+
+    async def test_deferred_sync_keeps_old_model_then_refits(self, knowledgeDb, monkeypatch):
+        """单文件刷新不立即拟合，继续用旧模型；延迟到期后拟合一次"""
+        _insertCorpus(knowledgeDb)
+        await retriever.syncKnowledgeIndex()
+        oldModel = retriever._semanticModel
+
+        knowledgeDb.execute("UPDATE knowledge_entries SET content = '猫猫 写代码', source_hash = 'changed' WHERE id = 1")
+        monkeypatch.setattr(retriever, "_SEMANTIC_REFIT_DELAY", 0)
+        with patch.object(semantic, "fitModel", wraps=semantic.fitModel) as mockFit:
+            await retriever.syncKnowledgeIndex(deferSemantic=True)
+            assert retriever._semanticModel is oldModel
+            mockFit.assert_not_called()
+
+            await retriever._pendingSemanticRefit
+
+        assert mockFit.call_count == 1
+        assert retriever._semanticModel is not oldModel
+
+    async def test_rerank_limits_results(self, knowledgeDb):
+        _insertCorpus(knowledgeDb)
+
+        results = await retriever.retrieveKnowledge("猫 代码", limit=2, minScore=0.1, rerankTopK=4)
+
+        assert len(results) == 2
+        assert all("score" in r for r in results)
@@ -0,0 +1,105 @@
+"""
+tests/utils/llm/knowledge/test_vectorScorer.py
+
+测试 utils/llm/knowledge/vectorScorer.py 向量化评分与纯 Python 评分的一致性
+"""
+
+import random
+
+import pytest
+
+import utils.llm.knowledge.retriever as retriever
+from utils.llm.knowledge.index import KnowledgeIndex
+from utils.llm.knowledge.vectorScorer import VectorScorer, available
+
+
+pytestmark = pytest.mark.skipif(not available(), reason="需要 NumPy")
+
+
+_WORDS = ["python", "rust", "猫猫", "编程", "喜欢", "说话", "风格", "天气", "音乐", "游戏", "名字", "避免"]
+_CATEGORIES = ["identity", "interests", "style", "pitfalls", "custom"]
+
+
+def _randomCorpus(seed: int, size: int) -> list[dict]:
+    rng = random.Random(seed)
+    entries = []
+    for entryID in range(1, size + 1):
+        entries.append({
+            "id": entryID * 3,   # 非连续 id，检验位置映射
+            "category": rng.choice(_CATEGORIES),
+            "title": " ".join(rng.choices(_WORDS, k=rng.randint(1, 3))),
+            "content": " ".join(rng.choices(_WORDS, k=rng.randint(3, 20))),
+            "tags": rng.sample(_WORDS, k=rng.randint(0, 4)),
+            "priority": rng.choice([0, 0, 0, 1, -1]),
+        })
+    return entries
+
+
+def _pythonRank(query, limit, minScore):
+    tokens = retriever.tokenize(query)
+    scores = retriever._scoreQuery(tokens, retriever._triggeredBonuses(query))
+    return sorted(
+        ((entryID, score) for entryID, score in scores.items() if score >= minScore),
+        key=lambda item: (-item[1], item[0]),
+    )[:limit]
+
+
+@pytest.fixture
+def corpusIndex(monkeypatch):
+    index = KnowledgeIndex()
+    index.rebuild(_randomCorpus(seed=7, size=120))
+    monkeypatch.setattr(retriever, "_index", index)
+    return index
+
+
+@pytest.mark.parametrize("query", [
+    "python 编程",
+    "你喜欢什么音乐",
+    "你叫什么名字",
+    "说话风格要避免什么",
+    "完全无关的查询",
+])
+@pytest.mark.parametrize("minScore", [0.0, 0.5, 3.0])
+def test_parity_with_python_scorer(corpusIndex, query, minScore):
+    """同一索引上，两种后端的排序与分数一致"""
+    tokens = retriever.tokenize(query)
+    bonuses = retriever._triggeredBonuses(query)
+
+    expected = _pythonRank(query, limit=10, minScore=minScore)
+    actual = VectorScorer().rank(corpusIndex, tokens, bonuses, limit=10, minScore=minScore)
+
+    assert [entryID for entryID, _ in actual] == [entryID for entryID, _ in expected]
+    for (_, a), (_, b) in zip(actual, expected):
+        assert a == pytest.approx(b)
+
+
+def test_rebuilds_after_index_change(corpusIndex):
+    """索引增删后矩阵按 generation 重建"""
+    scorer = VectorScorer()
+    scorer.rank(corpusIndex, ["python"], {}, limit=5, minScore=0.0)
+
+    corpusIndex.addEntry({
+        "id": 10_000, "category": "custom", "title": "独一无二", "content": "独一无二", "tags": [], "priority": 0,
+    })
+    ranked = scorer.rank(corpusIndex, retriever.tokenize("独一无二"), {}, limit=1, minScore=2.0)
+    assert [entryID for entryID, _ in ranked] == [10_000]
+
+    corpusIndex.removeDocument(10_000)
+    assert scorer.rank(corpusIndex, retriever.tokenize("独一无二"), {}, limit=1, minScore=2.0) == []
+
+
+def test_empty_index():
+    assert VectorScorer().rank(KnowledgeIndex(), ["python"], {}, limit=3, minScore=0.0) == []
+
+
+def test_retriever_uses_vector_backend_above_threshold(corpusIndex, monkeypatch):
+    """条目数达到阈值时 _rankQuery 走向量后端，结果与纯 Python 一致"""
+    monkeypatch.setattr(retriever, "_VECTOR_MIN_DOCS", 1)
+    monkeypatch.setattr(retriever, "_vectorScorer", VectorScorer())
+
+    ranked = retriever._rankQuery(
+        retriever.tokenize("python 编程"), retriever._triggeredBonuses("python 编程"), 5, 0.5
+    )
+    expected = _pythonRank("python 编程", 5, 0.5)
+    assert [entryID for entryID, _ in ranked] == [entryID for entryID, _ in expected]
+    assert [score for _, score in ranked] == pytest.approx([score for _, score in expected])
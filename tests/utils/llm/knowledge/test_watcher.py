@@ -0,0 +1,195 @@
+"""
+tests/utils/llm/knowledge/test_watcher.py
+
+测试 utils/llm/knowledge/watcher.py 目录监听、去抖，以及 loader.reindexKnowledgeFiles 的按文件刷新
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+import utils.llm.knowledge.watcher as watcher
+
+
+def _writeEntry(directory, name, title, content):
+    (directory / name).write_text(
+        f"---\ncategory: custom\ntitle: {title}\ntags: [t]\n---\n{content}\n",
+        encoding="utf-8",
+    )
+
+
+# ============================================================================
+# 事件解析 / 去抖
+# ============================================================================
+
+def test_parse_events():
+    """name 字段按 len 截取并去掉 \\0 填充"""
+    data = (
+        watcher._EVENT_STRUCT.pack(1, watcher._IN_CLOSE_WRITE, 0, 16) + b"a.md".ljust(16, b"\0")
+        + watcher._EVENT_STRUCT.pack(1, watcher._IN_Q_OVERFLOW, 0, 0)
+    )
+    assert watcher._parseEvents(data) == [("a.md", watcher._IN_CLOSE_WRITE), ("", watcher._IN_Q_OVERFLOW)]
+
+
+class _FakeWatcher:
+    """按预定时间依次产出事件批次"""
+
+    def __init__(self, batches):
+        self._batches = list(batches)   # [(延迟秒数, 批次)]
+
+    async def next(self):
+        if not self._batches:
+            await asyncio.Event().wait()
+        delay, batch = self._batches.pop(0)
+        await asyncio.sleep(delay)
+        return batch
+
+
+@pytest.mark.asyncio
+async def test_collect_batch_merges_until_quiet():
+    fake = _FakeWatcher([(0, {"a.md"}), (0.01, {"b.md"}), (0.01, {"a.md"})])
+    assert await watcher._collectBatch(fake, debounce=0.2) == {"a.md", "b.md"}
+
+
+@pytest.mark.asyncio
+async def test_collect_batch_rescan_wins():
+    fake = _FakeWatcher([(0, {"a.md"}), (0.01, None), (0.01, {"b.md"})])
+    assert await watcher._collectBatch(fake, debounce=0.2) is None
+
+
+# ============================================================================
+# 监听后端
+# ============================================================================
+
+@pytest.mark.asyncio
+async def test_polling_detects_create_modify_delete(tmp_path):
+    _writeEntry(tmp_path, "a.md", "A", "alpha")
+    _writeEntry(tmp_path, "b.md", "B", "beta")
+    poller = watcher._PollingWatcher(str(tmp_path), interval=0.01)
+
+    _writeEntry(tmp_path, "c.md", "C", "gamma")
+    _writeEntry(tmp_path, "a.md", "A", "alpha 更长的正文")
+    (tmp_path / "b.md").unlink()
+    (tmp_path / "notes.txt").write_text("忽略", encoding="utf-8")
+
+    assert await asyncio.wait_for(poller.next(), timeout=2) == {"a.md", "b.md", "c.md"}
+
+
+@pytest.mark.asyncio
+async def test_polling_debounce_spans_poll_interval(tmp_path, monkeypatch):
+    """轮询时去抖不短于扫描间隔：相隔一次扫描的两次写入合并为一批"""
+    monkeypatch.setattr(watcher, "_DEBOUNCE_SECONDS", 0.02)
+    poller = watcher._PollingWatcher(str(tmp_path), interval=0.1)
+    assert poller.debounce > 0.1
+
+    collecting = asyncio.create_task(watcher._collectBatch(poller))
+    _writeEntry(tmp_path, "a.md", "A", "alpha")
+    await asyncio.sleep(0.15)
+    _writeEntry(tmp_path, "b.md", "B", "beta")
+
+    assert await asyncio.wait_for(collecting, timeout=3) == {"a.md", "b.md"}
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify 仅 Linux")
+@pytest.mark.asyncio
+async def test_inotify_reports_written_and_removed_files(tmp_path):
+    try:
+        inotify = watcher._InotifyWatcher(str(tmp_path))
+    except OSError as e:
+        pytest.skip(f"inotify 不可用：{e}")
+
+    try:
+        _writeEntry(tmp_path, "a.md", "A", "alpha")
+        (tmp_path / "a.md").rename(tmp_path / "b.md")
+        (tmp_path / "notes.txt").write_text("忽略", encoding="utf-8")
+
+        changed = await asyncio.wait_for(watcher._collectBatch(inotify, debounce=0.1), timeout=2)
+        assert changed == {"a.md", "b.md"}
+    finally:
+        inotify.close()
+
+
+def test_open_watcher_falls_back_to_polling(tmp_path, monkeypatch):
+    def _fail(directory):
+        raise OSError("不支持")
+
+    monkeypatch.setattr(watcher, "_InotifyWatcher", _fail)
+    assert isinstance(watcher._openWatcher(str(tmp_path)), watcher._PollingWatcher)
+
+
+# ============================================================================
+# reindexKnowledgeFiles()：只处理改动的文件
+# ============================================================================
+
+@pytest.fixture
+def knowledgeEnv(tmp_path, inMemoryDb, monkeypatch):
+    from unittest.mock import patch, AsyncMock
+    import utils.llm.knowledge.loader as loader
+    import utils.llm.knowledge.retriever as retriever
+    from utils.core.schema import loadSchema
+    from utils.llm.knowledge.database import knowledgeDB
+    from utils.llm.knowledge.index import KnowledgeIndex
+
+    inMemoryDb.executescript(loadSchema("llmKnowledge"))
+    monkeypatch.setattr(loader, "LLM_KNOWLEDGE_DIR", str(tmp_path))
+    monkeypatch.setattr(retriever, "_index", KnowledgeIndex())
+
+    async def _run(func):
+        return func(inMemoryDb)
+
+    # 延迟语义拟合由 test_semantic 覆盖，这里不留后台任务
+    with patch.object(knowledgeDB, "run", side_effect=_run), \
+         patch.object(loader, "logSystemEvent", new=AsyncMock()), \
+         patch.object(retriever, "_scheduleSemanticRefit"):
+        yield tmp_path
+
+
+@pytest.mark.asyncio
+async def test_reindex_files_touches_only_given_files(knowledgeEnv, inMemoryDb):
+    from unittest.mock import patch
+    import utils.llm.knowledge.loader as loader
+    from utils.llm.knowledge.retriever import retrieveKnowledge
+
+    _writeEntry(knowledgeEnv, "a.md", "A", "alpha")
+    _writeEntry(knowledgeEnv, "b.md", "B", "beta")
+    await loader.reindexKnowledgeBase()
+
+    _writeEntry(knowledgeEnv, "a.md", "A", "omega")
+    _writeEntry(knowledgeEnv, "new.md", "N", "nova")
+    (knowledgeEnv / "b.md").unlink()
+
+    realParse = loader._parseMarkdownFile
+    parsed = []
+
+    def _spyParse(filepath):
+        parsed.append(os.path.basename(filepath))
+        return realParse(filepath)
+
+    with patch.object(loader, "_parseMarkdownFile", side_effect=_spyParse), \
+         patch.object(loader.os, "listdir", side_effect=AssertionError("不应扫描目录")):
+        result = await loader.reindexKnowledgeFiles(["a.md", "b.md", "new.md"])
+
+    assert result == {"added": 1, "updated": 1, "removed": 1, "skipped": 0}
+    assert sorted(parsed) == ["a.md", "new.md"]
+    assert [r["title"] for r in await retrieveKnowledge("omega", minScore=0.1)] == ["A"]
+    assert await retrieveKnowledge("beta", minScore=0.1) == []
+
+    # 按文件记录的 mtime / size 已更新：下一次全量扫描不再解析这些文件
+    with patch.object(loader, "_parseMarkdownFile", side_effect=AssertionError("不应解析")):
+        assert (await loader.reindexKnowledgeBase())["skipped"] == 2
+
+
+@pytest.mark.asyncio
+async def test_reindex_files_keeps_entries_of_invalid_file(knowledgeEnv):
+    """编辑途中写出的半截文件不删除已有条目"""
+    import utils.llm.knowledge.loader as loader
+
+    _writeEntry(knowledgeEnv, "a.md", "A", "alpha")
+    await loader.reindexKnowledgeBase()
+
+    (knowledgeEnv / "a.md").write_text("---\ntitle: A\n", encoding="utf-8")
+    result = await loader.reindexKnowledgeFiles(["a.md"])
+
+    assert result == {"added": 0, "updated": 0, "removed": 0, "skipped": 1}
@@ -0,0 +1,97 @@
+"""
+tests/utils/llm/memory/test_contentCache.py
+
+测试 utils/llm/memory/contentCache.py 记忆正文解密缓存。
+
+验证：
+    - 字节限额 LRU 淘汰与统计
+    - 密文不一致（库被改过）时不命中
+    - 稳态下重复检索不再解密；updateMemory / deleteMemory 写入后丢弃对应条目
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+import utils.core.crypto as crypto
+from utils.core.schema import loadSchema
+from utils.llm.memory import database as memoryDatabase
+from utils.llm.memory.contentCache import DecryptedContentCache, decryptedCache
+from utils.llm.retrievalCache import memoryCache
+
+
+# ============================================================================
+# DecryptedContentCache
+# ============================================================================
+
+def test_byte_cap_evicts_least_recently_used():
+    cache = DecryptedContentCache(maxBytes=30)
+    cache.put(1, b"c" * 10, "a")     # 11 字节
+    cache.put(2, b"c" * 10, "b")     # 11 字节
+    assert cache.get(1, b"c" * 10) == "a"   # 1 变为最近使用
+
+    cache.put(3, b"c" * 10, "c")     # 超出 30 字节，淘汰 2
+
+    assert cache.get(2, b"c" * 10) is None
+    stats = cache.stats()
+    assert (stats["size"], stats["bytes"], stats["evictions"]) == (2, 22, 1)
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_changed_ciphertext_misses():
+    cache = DecryptedContentCache()
+    cache.put(1, b"old-token", "旧内容")
+    assert cache.get(1, b"new-token") is None
+
+
+def test_oversized_and_plaintext_rows_not_cached():
+    cache = DecryptedContentCache(maxBytes=8)
+    cache.put(1, b"0123456789", "x")
+    cache.put(2, "历史明文", "历史明文")
+    assert len(cache) == 0
+
+
+# ============================================================================
+# 与 memory/database.py 的集成
+# ============================================================================
+
+@pytest.fixture
+def memoryDb(inMemoryDb, tmp_path, monkeypatch):
+    monkeypatch.setattr(crypto, "KEY_PATH", str(tmp_path / ".chatKey"))
+    monkeypatch.setattr(crypto, "_fernetCache", None)
+    inMemoryDb.executescript(loadSchema("llmMemory"))
+
+    async def _run(func):
+        return func(inMemoryDb)
+
+    with patch.object(memoryDatabase.memoryDB, "run", side_effect=_run):
+        yield inMemoryDb
+
+
+@pytest.mark.asyncio
+async def test_steady_state_does_no_crypto(memoryDb):
+    await memoryDatabase.addMemory("global", None, "偏好简体中文")
+    await memoryDatabase.addMemory("chat", "1", "群里在聊编程")
+    await memoryDatabase.retrieveMemories(chatID="1")
+
+    # 不同 scope 组合不命中结果缓存，但共享行的明文已缓存
+    memoryCache.clear()
+    with patch.object(memoryDatabase, "decryptText", side_effect=AssertionError("不应解密")):
+        result = await memoryDatabase.retrieveMemories(chatID="1", userID="9")
+
+    assert sorted(m["content"] for m in result) == ["偏好简体中文", "群里在聊编程"]
+    assert decryptedCache.stats()["hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_writes_discard_entries(memoryDb):
+    memID = await memoryDatabase.addMemory("chat", "1", "旧内容")
+    await memoryDatabase.getMemoryByID(memID)
+    assert len(decryptedCache) == 1
+
+    await memoryDatabase.updateMemory(memID, content="新内容")
+    assert len(decryptedCache) == 0
+    assert (await memoryDatabase.getMemoryByID(memID))["content"] == "新内容"
+
+    await memoryDatabase.deleteMemory(memID)
+    assert len(decryptedCache) == 0
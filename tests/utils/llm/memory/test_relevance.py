@@ -0,0 +1,80 @@
+"""
+tests/utils/llm/memory/test_relevance.py
+
+测试 utils/llm/memory/relevance.py 按相关性挑选记忆与字符预算。
+
+验证：
+    - 与消息相关的记忆排在只靠 priority 的记忆前面；priority 仍参与加分
+    - 与消息无关时保持 retrieveMemories 的原顺序
+    - 字符预算：放不下的长条目被跳过，后面的短条目仍可入选
+    - buildStructuredMemoryContext 取更大的候选池，按当前消息挑选
+"""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from utils.llm.contextBuilder import buildStructuredMemoryContext
+from utils.llm.memory.database import _formatMemoryLine
+from utils.llm.memory.relevance import scoreMemories, selectRelevantMemories
+
+
+def _memory(memoryID, content, priority=0, tags=(), scopeType="chat"):
+    return {
+        "id": memoryID, "scope_type": scopeType, "scope_id": "1",
+        "content": content, "tags": list(tags), "priority": priority, "source": "manual",
+    }
+
+
+_POOL = [
+    _memory(1, "用户偏好简体中文", priority=2, scopeType="global"),
+    _memory(2, "群里经常讨论 python 异步编程", tags=["编程"]),
+    _memory(3, "小明养了一只橘猫", tags=["宠物"]),
+    _memory(4, "群规：不要刷屏"),
+]
+
+
+def test_relevant_memory_ranks_first():
+    selected = selectRelevantMemories(_POOL, "你养猫吗", limit=2, maxChars=10_000)
+    assert [m["id"] for m in selected] == [3, 1]
+
+
+def test_tags_count_towards_relevance():
+    scores = scoreMemories(_POOL, "编程")
+    assert scores[2] > scores[4]
+
+
+def test_unrelated_query_keeps_original_order():
+    selected = selectRelevantMemories(_POOL, "hello", limit=10, maxChars=10_000)
+    assert [m["id"] for m in selected] == [1, 2, 3, 4]
+
+
+def test_budget_skips_lines_that_do_not_fit():
+    pool = [
+        _memory(1, "猫" * 200, priority=5),
+        _memory(2, "短的记忆"),
+        _memory(3, "另一条短记忆"),
+    ]
+    budget = len(_formatMemoryLine(pool[1])) + len(_formatMemoryLine(pool[2])) + 2
+
+    selected = selectRelevantMemories(pool, "", limit=10, maxChars=budget)
+
+    assert [m["id"] for m in selected] == [2, 3]
+
+
+def test_empty_inputs():
+    assert selectRelevantMemories([], "猫", limit=5, maxChars=1000) == []
+    assert selectRelevantMemories(_POOL, "猫", limit=0, maxChars=1000) == []
+
+
+@pytest.mark.asyncio
+async def test_context_uses_candidate_pool_and_query():
+    with patch("utils.llm.contextBuilder.retrieveMemories", new_callable=AsyncMock) as mock_retrieve, \
+         patch("utils.llm.contextBuilder.logSystemEvent", new_callable=AsyncMock):
+        mock_retrieve.return_value = _POOL
+
+        result = await buildStructuredMemoryContext(chatID="1", totalLimit=1, query="橘猫", maxChars=1000)
+
+    assert mock_retrieve.call_args.kwargs["totalLimit"] > 1
+    assert "橘猫" in result
+    assert "简体中文" not in result
@@ -9,13 +9,17 @@ tests/utils/llm/memory/test_retrieval.py
     ③ 块头含相关性门控措辞
     ④ retrieveMemories 同 scope 溢出（放宽后低优先级入池）
     ⑤ retrieveMemories scope 专属度兜底（priority 打平时 session>global）
-    ⑥ 异常路径降级（mock 抛异常返 []，脏数据不拖垮 sort）
+    ⑥ 异常路径降级（mock 抛异常返 []，脏数据不拖垮排序）
+    ⑦ 单 scope / 总上限在 SQL 内生效，只解密最终入选的行
 """
 
 import pytest
-from datetime import datetime
 from unittest.mock import patch, AsyncMock
 
+import utils.core.crypto as crypto
+from utils.core.crypto import encryptText
+from utils.core.schema import loadSchema
+from utils.llm.memory import database as memoryDatabase
 from utils.llm.memory.database import (
     buildMemoryContextBlock,
     retrieveMemories,
@@ -77,54 +81,75 @@ def test_build_memory_context_block_empty():
 # retrieveMemories() 检索逻辑测试
 # ============================================================================
 
+@pytest.fixture
+def memoryRows(inMemoryDb, tmp_path, monkeypatch):
+    """内存库 + 临时密钥；返回插入一行的函数（content 按真实路径加密）"""
+    monkeypatch.setattr(crypto, "KEY_PATH", str(tmp_path / ".chatKey"))
+    monkeypatch.setattr(crypto, "_fernetCache", None)
+    inMemoryDb.executescript(loadSchema("llmMemory"))
+
+    def _insert(memoryID, scopeType, scopeID, priority, updatedAt, enabled=1):
+        inMemoryDb.execute(
+            "INSERT INTO memory_entries (id, scope_type, scope_id, content, priority, enabled, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (memoryID, scopeType, scopeID, encryptText(f"记忆 {memoryID}"), priority, enabled, updatedAt),
+        )
+
+    async def _run(func):
+        return func(inMemoryDb)
+
+    with patch.object(memoryDatabase.memoryDB, "run", side_effect=_run):
+        yield _insert
+
+
 @pytest.mark.asyncio
-async def test_retrieve_memories_same_scope_overflow():
+async def test_retrieve_memories_same_scope_overflow(memoryRows):
     """④ 同 scope 溢出判别：global 有 4 条 [p3, p3, p3, p2]，
     perScopeLimit=20 全量入池，p2 入选（旧逻辑 limit=3 会砍掉 p2）"""
-    with patch("utils.llm.memory.database.getMemories", new_callable=AsyncMock) as mock_get:
-        # global scope 返 4 条，3×p3 + 1×p2
-        mock_get.return_value = [
-            {"id": 1, "priority": 3, "scope_type": "global", "scope_id": "global", "updated_at": datetime(2024, 1, 1)},
-            {"id": 2, "priority": 3, "scope_type": "global", "scope_id": "global", "updated_at": datetime(2024, 1, 2)},
-            {"id": 3, "priority": 3, "scope_type": "global", "scope_id": "global", "updated_at": datetime(2024, 1, 3)},
-            {"id": 4, "priority": 2, "scope_type": "global", "scope_id": "global", "updated_at": datetime(2024, 1, 4)},
-        ]
+    for memoryID, priority, day in [(1, 3, 1), (2, 3, 2), (3, 3, 3), (4, 2, 4)]:
+        memoryRows(memoryID, "global", "global", priority, f"2024-01-0{day} 00:00:00")
 
-        result = await retrieveMemories(totalLimit=10)
+    result = await retrieveMemories(totalLimit=10)
 
-        # 新逻辑：4 条全入池，p2 也入选
-        assert len(result) == 4
-        ids = [m["id"] for m in result]
-        assert 4 in ids  # p2 的那条
+    # 4 条全入池，p2 也入选；同 priority 按 updated_at DESC
+    assert [m["id"] for m in result] == [3, 2, 1, 4]
+    assert result[0]["content"] == "记忆 3"
 
 
 @pytest.mark.asyncio
-async def test_retrieve_memories_scope_rank_tiebreaker():
+async def test_retrieve_memories_scope_rank_tiebreaker(memoryRows):
     """⑤ scope 专属度兜底：同 priority=2 时，chat 排在 global 之前"""
-    with patch("utils.llm.memory.database.getMemories", new_callable=AsyncMock) as mock_get:
-        async def _mock_get(scopeType, scopeID, enabledOnly, limit):
-            if scopeType == "global":
-                return [{"id": 10, "priority": 2, "scope_type": "global", "scope_id": "global", "updated_at": datetime(2024, 1, 1)}]
-            if scopeType == "chat":
-                return [{"id": 20, "priority": 2, "scope_type": "chat", "scope_id": "123", "updated_at": datetime(2024, 1, 1)}]
-            return []
+    memoryRows(10, "global", "global", 2, "2024-01-01 00:00:00")
+    memoryRows(20, "chat", "123", 2, "2024-01-01 00:00:00")
+    memoryRows(30, "chat", "999", 9, "2024-01-01 00:00:00")   # 其他群，不应召回
 
-        mock_get.side_effect = _mock_get
+    result = await retrieveMemories(chatID="123", totalLimit=10)
 
-        result = await retrieveMemories(chatID="123", totalLimit=10)
+    # 同 p2，chat(rank=1) > global(rank=0)，chat 条目排前
+    assert [m["id"] for m in result] == [20, 10]
 
-        # 同 p2，chat(rank=1) > global(rank=0)，chat 条目排前
-        assert len(result) == 2
-        assert result[0]["id"] == 20  # chat
-        assert result[1]["id"] == 10  # global
+
+@pytest.mark.asyncio
+async def test_retrieve_memories_limits_in_sql(memoryRows):
+    """单 scope 上限与总上限都在 SQL 内生效；禁用条目不召回；只解密最终入选的行"""
+    for memoryID in range(1, 6):
+        memoryRows(memoryID, "global", "global", 5, f"2024-01-0{memoryID} 00:00:00")
+    memoryRows(6, "user", "7", 1, "2024-01-01 00:00:00")
+    memoryRows(7, "user", "7", 9, "2024-01-01 00:00:00", enabled=0)
+
+    with patch.object(memoryDatabase, "_decryptContent", wraps=memoryDatabase._decryptContent) as spy:
+        result = await retrieveMemories(userID="7", perScopeLimit=2, totalLimit=3)
+
+    assert [m["id"] for m in result] == [5, 4, 6]
+    assert spy.call_count == 3
 
 
 @pytest.mark.asyncio
 async def test_retrieve_memories_exception_fallback():
-    """⑥ 异常路径降级：getMemories 抛异常，返回 []（不冒泡）"""
-    with patch("utils.llm.memory.database.getMemories", new_callable=AsyncMock) as mock_get:
+    """⑥ 异常路径降级：数据库抛异常，返回 []（不冒泡）"""
+    with patch.object(memoryDatabase.memoryDB, "run", new_callable=AsyncMock) as mock_run:
         with patch("utils.llm.memory.database.logSystemEvent", new_callable=AsyncMock):
-            mock_get.side_effect = RuntimeError("DB explosion")
+            mock_run.side_effect = RuntimeError("DB explosion")
 
             result = await retrieveMemories(totalLimit=10)
 
@@ -133,16 +158,12 @@ async def test_retrieve_memories_exception_fallback():
 
 
 @pytest.mark.asyncio
-async def test_retrieve_memories_dirty_data_does_not_crash_sort():
-    """⑥ 脏数据兜底：updated_at=None 的记忆混在正常记忆中，sort 不抛 TypeError"""
-    with patch("utils.llm.memory.database.getMemories", new_callable=AsyncMock) as mock_get:
-        # 1 条脏数据（updated_at=None）+ 1 条正常
-        mock_get.return_value = [
-            {"id": 1, "priority": 1, "scope_type": "global", "scope_id": "global", "updated_at": None},
-            {"id": 2, "priority": 1, "scope_type": "global", "scope_id": "global", "updated_at": datetime(2024, 1, 1)},
-        ]
-
-        result = await retrieveMemories(totalLimit=10)
-
-        # 不抛异常，正常返回 2 条
-        assert len(result) == 2
+async def test_retrieve_memories_dirty_data_does_not_crash_sort(memoryRows):
+    """⑥ 脏数据兜底：updated_at=NULL 的记忆混在正常记忆中，排序不出错、排在最后"""
+    memoryRows(1, "global", "global", 1, None)
+    memoryRows(2, "global", "global", 1, "2024-01-01 00:00:00")
+
+    result = await retrieveMemories(totalLimit=10)
+
+    assert [m["id"] for m in result] == [2, 1]
+    assert result[1]["updated_at"] is None
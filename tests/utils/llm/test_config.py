@@ -23,6 +23,8 @@ from utils.llm.config import (
     removeURLReadBlockedHost,
     setKnowledgeMaxResults,
     setKnowledgeMinScore,
+    setKnowledgeRerankTopK,
+    setMemoryContextMaxChars,
 )
 
 
@@ -367,4 +369,24 @@ def test_set_knowledge_min_score_valid():
 def test_set_knowledge_min_score_invalid():
     """无效的 minScore 抛出异常"""
     with pytest.raises(ValueError, match="必须是大于等于 0 的数"):
-        setKnowledgeMinScore(-1)
\ No newline at end of file
+        setKnowledgeMinScore(-1)
+
+
+def test_set_knowledge_rerank_top_k():
+    """rerankTopK 允许 0（关闭），超出 0-50 抛出异常"""
+    with patch("utils.llm.config._setConfig") as mock_set:
+        setKnowledgeRerankTopK(0)
+        mock_set.assert_called_once_with(knowledgeRerankTopK=0)
+
+    with pytest.raises(ValueError, match="必须在 0-50 之间"):
+        setKnowledgeRerankTopK(51)
+
+
+def test_set_memory_context_max_chars():
+    """memoryContextMaxChars 范围 200-20000"""
+    with patch("utils.llm.config._setConfig") as mock_set:
+        setMemoryContextMaxChars(1500)
+        mock_set.assert_called_once_with(memoryContextMaxChars=1500)
+
+    with pytest.raises(ValueError, match="必须在 200-20000 之间"):
+        setMemoryContextMaxChars(100)
@@ -121,6 +121,22 @@ async def test_build_structured_memory_context_with_memories():
                 assert "低信任长期记忆" in result
 
 
+@pytest.mark.asyncio
+async def test_build_structured_memory_context_uses_llm_config_snapshot():
+    """传入 llmConfig 时字符预算取自快照，不再读盘"""
+    with patch("utils.llm.contextBuilder.retrieveMemories", new_callable=AsyncMock, return_value=[]), \
+         patch("utils.llm.contextBuilder.selectRelevantMemories", return_value=[]) as mock_select, \
+         patch("utils.llm.contextBuilder.getMemoryContextMaxChars") as mock_getter, \
+         patch("utils.llm.contextBuilder.logSystemEvent", new_callable=AsyncMock):
+        await buildStructuredMemoryContext(
+            chatID="test_chat",
+            llmConfig={"memoryContextMaxChars": 1234},
+        )
+
+    assert mock_select.call_args.kwargs["maxChars"] == 1234
+    mock_getter.assert_not_called()
+
+
 # ============================================================================
 # buildHistoryContext() 测试
 # ============================================================================
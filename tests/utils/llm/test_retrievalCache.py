@@ -0,0 +1,184 @@
+"""
+tests/utils/llm/test_retrievalCache.py
+
+测试 utils/llm/retrievalCache.py 检索结果缓存，以及知识库 / 记忆写入路径的失效。
+
+验证：
+    - LRU 淘汰与命中统计
+    - scope 代计数：只让涉及被写 scope 的结果过期
+    - 查询途中发生写入时，结果一写入即过期
+    - TTL 兜底：绕过写接口的改库最多复用 TTL 秒
+    - retrieveMemories / retrieveKnowledge 命中时不再回库，写入后重新查询
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+import utils.core.crypto as crypto
+import utils.llm.knowledge.retriever as retriever
+from utils.core.schema import loadSchema
+from utils.llm.knowledge import database as knowledgeDatabase
+from utils.llm.knowledge.index import KnowledgeIndex
+from utils.llm.memory import database as memoryDatabase
+from utils.llm.retrievalCache import RetrievalCache, knowledgeCache, memoryCache
+
+
+# ============================================================================
+# RetrievalCache
+# ============================================================================
+
+def test_lru_eviction_and_stats():
+    cache = RetrievalCache(maxSize=2)
+    for key in ("a", "b"):
+        cache.put(key, [key], cache.stamp())
+    assert cache.get("a") == ["a"]        # a 变为最近使用
+
+    cache.put("c", ["c"], cache.stamp())  # 淘汰 b
+
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["hitRate"] == pytest.approx(0.5)
+
+
+def test_bump_only_invalidates_matching_scope():
+    cache = RetrievalCache()
+    cache.put("chat1", [1], cache.stamp([("global", "global"), ("chat", "1")]))
+    cache.put("chat2", [2], cache.stamp([("global", "global"), ("chat", "2")]))
+
+    cache.bump(("chat", "1"))
+
+    assert cache.get("chat1") is None
+    assert cache.get("chat2") == [2]
+    assert cache.stats()["stale"] == 1
+
+
+def test_write_during_query_is_not_masked():
+    """stamp 取于查询开始前：途中的写入让这次结果立即过期"""
+    cache = RetrievalCache()
+    stamp = cache.stamp()
+    cache.bump()
+    cache.put("q", ["旧结果"], stamp)
+
+    assert cache.get("q") is None
+
+
+def test_ttl_backstop_expires_entries():
+    """绕过写接口的改库（离线脚本）不递增代计数，靠 TTL 兜底过期"""
+    cache = RetrievalCache(ttl=60)
+    with patch("utils.llm.retrievalCache.time.monotonic", return_value=1000.0):
+        cache.put("q", ["结果"], cache.stamp())
+    with patch("utils.llm.retrievalCache.time.monotonic", return_value=1059.0):
+        assert cache.get("q") == ["结果"]
+    with patch("utils.llm.retrievalCache.time.monotonic", return_value=1061.0):
+        assert cache.get("q") is None
+    assert cache.stats()["stale"] == 1
+
+
+def test_returns_copies():
+    cache = RetrievalCache()
+    cache.put("q", [{"tags": ["a"]}], cache.stamp())
+    cache.get("q")[0]["tags"].append("被调用方改动")
+
+    assert cache.get("q") == [{"tags": ["a"]}]
+
+
+# ============================================================================
+# retrieveMemories
+# ============================================================================
+
+@pytest.fixture
+def memoryDb(inMemoryDb, tmp_path, monkeypatch):
+    monkeypatch.setattr(crypto, "KEY_PATH", str(tmp_path / ".chatKey"))
+    monkeypatch.setattr(crypto, "_fernetCache", None)
+    inMemoryDb.executescript(loadSchema("llmMemory"))
+
+    calls = []
+
+    async def _run(func):
+        calls.append(func)
+        return func(inMemoryDb)
+
+    with patch.object(memoryDatabase.memoryDB, "run", side_effect=_run):
+        yield calls
+
+
+@pytest.mark.asyncio
+class TestMemoryCache:
+
+    async def test_hit_skips_database(self, memoryDb):
+        await memoryDatabase.addMemory("chat", "1", "群里在聊编程")
+        first = await memoryDatabase.retrieveMemories(chatID="1")
+
+        memoryDb.clear()
+        second = await memoryDatabase.retrieveMemories(chatID="1")
+
+        assert second == first
+        assert memoryDb == []
+        assert memoryCache.stats()["hits"] == 1
+
+    async def test_writes_invalidate_by_scope(self, memoryDb):
+        memID = await memoryDatabase.addMemory("chat", "1", "旧内容")
+        await memoryDatabase.retrieveMemories(chatID="1")
+        await memoryDatabase.retrieveMemories(chatID="2")
+
+        await memoryDatabase.updateMemory(memID, content="新内容")
+
+        assert [m["content"] for m in await memoryDatabase.retrieveMemories(chatID="1")] == ["新内容"]
+        memoryDb.clear()
+        await memoryDatabase.retrieveMemories(chatID="2")
+        assert memoryDb == []   # chat 2 不受影响，仍命中
+
+        await memoryDatabase.deleteMemory(memID)
+        assert await memoryDatabase.retrieveMemories(chatID="1") == []
+
+    async def test_global_write_invalidates_every_chat(self, memoryDb):
+        assert await memoryDatabase.retrieveMemories(chatID="1") == []
+
+        await memoryDatabase.addMemory("global", None, "偏好简体中文")
+
+        assert len(await memoryDatabase.retrieveMemories(chatID="1")) == 1
+
+
+# ============================================================================
+# retrieveKnowledge
+# ============================================================================
+
+@pytest.fixture
+def knowledgeDb(inMemoryDb, monkeypatch):
+    inMemoryDb.executescript(loadSchema("llmKnowledge"))
+    monkeypatch.setattr(retriever, "_index", KnowledgeIndex())
+    monkeypatch.setattr(retriever, "_semanticModel", None)
+
+    async def _run(func):
+        return func(inMemoryDb)
+
+    with patch.object(retriever.knowledgeDB, "run", side_effect=_run):
+        yield inMemoryDb
+
+
+@pytest.mark.asyncio
+class TestKnowledgeCache:
+
+    async def test_same_token_set_hits(self, knowledgeDb):
+        await knowledgeDatabase.upsertKnowledgeEntry("custom", "Python", "python 编程", [], "knowledge/t.md", "h1")
+        await retriever.syncKnowledgeIndex()
+
+        first = await retriever.retrieveKnowledge("python 编程", minScore=0.1)
+        with patch.object(retriever, "_loadEntriesByIDs", side_effect=AssertionError("不应回库")):
+            second = await retriever.retrieveKnowledge("编程 python python", minScore=0.1)
+
+        assert second == first
+        assert knowledgeCache.stats()["hits"] == 1
+
+    async def test_upsert_invalidates(self, knowledgeDb):
+        await knowledgeDatabase.upsertKnowledgeEntry("custom", "Python", "python 旧正文", [], "knowledge/t.md", "h1")
+        await retriever.syncKnowledgeIndex()
+        await retriever.retrieveKnowledge("python", minScore=0.1)
+
+        await knowledgeDatabase.upsertKnowledgeEntry("custom", "Python", "python 新正文", [], "knowledge/t.md", "h1")
+        results = await retriever.retrieveKnowledge("python", minScore=0.1)
+
+        assert results[0]["content"] == "python 新正文"
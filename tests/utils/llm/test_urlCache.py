@@ -0,0 +1,178 @@
+"""
+tests/utils/llm/test_urlCache.py
+
+测试 utils/llm/urlCache.py URL 读取结果缓存，以及 urlReader._fetchURL 的缓存 / 条件请求集成。
+
+验证：
+    - URL 规范化；按最终 URL 存储、请求 URL 别名命中
+    - 过期条目只有带校验器才返回；负缓存过期即作废；字节上限变化不复用
+    - 新鲜命中不联网；过期条目带 If-None-Match 请求，304 沿用正文、不再解析
+    - 失败结果负缓存；缓存命中后新加的 blocked host 仍然生效
+"""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+import utils.llm.urlCache as urlCacheModule
+import utils.llm.urlReader as urlReader
+from utils.llm.urlCache import URLCache, normalizeURL, urlCache
+
+
+def _okResult(finalUrl, text="正文", contentType="text/html"):
+    return {"finalUrl": finalUrl, "ok": True, "status": 200, "contentType": contentType,
+            "title": "标题", "text": text, "error": "", "bytesRead": 10, "truncatedBytes": False}
+
+
+def _failedResult(url):
+    return {"finalUrl": url, "ok": False, "status": 404, "contentType": "",
+            "title": "", "text": "", "error": "HTTP 404", "bytesRead": 0, "truncatedBytes": False}
+
+
+# ============================================================================
+# URLCache
+# ============================================================================
+
+def test_normalize_url():
+    assert normalizeURL("HTTPS://Example.COM.:443#frag") == "https://example.com/"
+    assert normalizeURL("http://example.com:8080/a?b=1") == "http://example.com:8080/a?b=1"
+
+
+def test_alias_resolves_to_final_url():
+    cache = URLCache()
+    cache.store("https://t.co/x", _okResult("https://example.com/post"), maxBytes=100)
+
+    hit = cache.lookup("https://T.co/x", maxBytes=100)
+    assert hit["fresh"] and hit["result"]["text"] == "正文"
+    assert cache.lookup("https://example.com/post", maxBytes=100) is not None
+    assert cache.lookup("https://t.co/x", maxBytes=200) is None
+
+
+def test_expired_entries(monkeypatch):
+    cache = URLCache()
+    cache.store("https://a.com/", _okResult("https://a.com/"), maxBytes=100, etag='"v1"')
+    cache.store("https://b.com/", _okResult("https://b.com/"), maxBytes=100)
+    cache.store("https://c.com/", _failedResult("https://c.com/"), maxBytes=100)
+
+    now = urlCacheModule.time.monotonic()
+    monkeypatch.setattr(urlCacheModule.time, "monotonic", lambda: now + 24 * 3600)
+
+    stale = cache.lookup("https://a.com/", maxBytes=100)
+    assert not stale["fresh"] and stale["etag"] == '"v1"'
+    assert cache.lookup("https://b.com/", maxBytes=100) is None   # 无校验器，无法条件请求
+    assert cache.lookup("https://c.com/", maxBytes=100) is None
+    assert len(cache) == 2
+
+
+def test_byte_cap_evicts_least_recently_used():
+    cache = URLCache(maxBytes=50)   # 每条 15 + 标题 6 字节
+    cache.store("https://a.com/", _okResult("https://a.com/", text="a" * 15), maxBytes=1)
+    cache.store("https://b.com/", _okResult("https://b.com/", text="b" * 15), maxBytes=1)
+    cache.lookup("https://a.com/", maxBytes=1)
+    cache.store("https://c.com/", _okResult("https://c.com/", text="c" * 15), maxBytes=1)
+
+    assert cache.lookup("https://b.com/", maxBytes=1) is None
+    assert cache.stats()["evictions"] == 1
+
+
+# ============================================================================
+# _fetchURL 集成
+# ============================================================================
+
+class _FakeResponse:
+    def __init__(self, status, headers, body=b""):
+        self.status = status
+        self.headers = headers
+        self._body = body
+        self.content = self
+
+    async def iter_chunked(self, size):
+        yield self._body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _FakeSession:
+    """按顺序返回预设响应，记录每次请求的 URL 与请求头"""
+
+    def __init__(self, responses):
+        self._responses = list(responses)
+        self.requests = []
+
+    def get(self, url, *, allow_redirects, headers=None):
+        self.requests.append((url, headers))
+        return self._responses.pop(0)
+
+
+_HTML = b"<html><head><title>T</title></head><body><article>hello cache</article></body></html>"
+
+
+@pytest.fixture
+def fetchEnv():
+    with patch.object(urlReader, "logSystemEvent", new=AsyncMock()), \
+         patch.object(urlReader, "getURLReadBlockedHosts", return_value=[]), \
+         patch.object(urlReader, "getURLReadMaxRetries", return_value=0):
+        yield
+
+
+@pytest.mark.asyncio
+async def test_fresh_hit_skips_network(fetchEnv):
+    session = _FakeSession([_FakeResponse(200, {"Content-Type": "text/html"}, _HTML)])
+    with patch.object(urlReader, "_getSession", new=AsyncMock(return_value=session)):
+        first = await urlReader._fetchURL("https://example.com/a")
+        second = await urlReader._fetchURL("https://example.com/a#top")
+
+    assert len(session.requests) == 1
+    assert second["ok"] and second["text"] == first["text"] == "hello cache"
+    assert second["cache"] == "hit" and second["requestedUrl"] == "https://example.com/a#top"
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_revalidates_with_304(fetchEnv, monkeypatch):
+    session = _FakeSession([
+        _FakeResponse(301, {"Location": "https://example.com/final"}),
+        _FakeResponse(200, {"Content-Type": "text/html", "ETag": '"v1"'}, _HTML),
+        _FakeResponse(301, {"Location": "https://example.com/final"}),
+        _FakeResponse(304, {}),
+    ])
+    with patch.object(urlReader, "_getSession", new=AsyncMock(return_value=session)):
+        await urlReader._fetchURL("https://example.com/short")
+
+        now = urlCacheModule.time.monotonic()
+        monkeypatch.setattr(urlCacheModule.time, "monotonic", lambda: now + 24 * 3600)
+        with patch.object(urlReader, "extractOffLoop", side_effect=AssertionError("不应重新解析")):
+            result = await urlReader._fetchURL("https://example.com/short")
+
+    assert session.requests[2][1] is None                       # redirect 跳不带条件头
+    assert session.requests[3] == ("https://example.com/final", {"If-None-Match": '"v1"'})
+    assert result["ok"] and result["status"] == 200 and result["text"] == "hello cache"
+    assert result["cache"] == "revalidated"
+    limits = {"maxBytes": urlReader.getURLReadMaxBytes(), "maxChars": urlReader.getURLReadMaxChars()}
+    assert urlCache.lookup("https://example.com/short", **limits)["fresh"]
+
+
+@pytest.mark.asyncio
+async def test_failures_are_negatively_cached(fetchEnv):
+    session = _FakeSession([_FakeResponse(404, {})])
+    with patch.object(urlReader, "_getSession", new=AsyncMock(return_value=session)):
+        await urlReader._fetchURL("https://example.com/missing")
+        result = await urlReader._fetchURL("https://example.com/missing")
+
+    assert len(session.requests) == 1
+    assert not result["ok"] and result["error"] == "HTTP 404"
+
+
+@pytest.mark.asyncio
+async def test_hit_rechecks_blocked_hosts(fetchEnv):
+    session = _FakeSession([_FakeResponse(200, {"Content-Type": "text/plain"}, b"plain text")])
+    with patch.object(urlReader, "_getSession", new=AsyncMock(return_value=session)):
+        await urlReader._fetchURL("https://example.com/a.txt")
+        with patch.object(urlReader, "getURLReadBlockedHosts", return_value=["example.com"]):
+            result = await urlReader._fetchURL("https://example.com/a.txt")
+
+    assert len(session.requests) == 1
+    assert not result["ok"] and "blocked host" in result["error"]
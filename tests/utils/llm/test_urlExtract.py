@@ -0,0 +1,237 @@
+"""
+tests/utils/llm/test_urlExtract.py
+
+测试 utils/llm/urlExtract.py 正文提取与执行位置选择
+"""
+
+import threading
+
+import pytest
+
+import utils.llm.urlExtract as urlExtract
+from utils.llm.urlExtract import (
+    decodeAndExtract,
+    extractHTML,
+    extractOffLoop,
+    normalizeText,
+)
+
+
+# ============================================================================
+# normalizeText() 测试
+# ============================================================================
+
+def test_normalize_text_basic():
+    """基本文本规范化"""
+    result = normalizeText("  Hello  \n  World  ")
+    # 两行非空内容之间没有空行
+    assert result == "Hello\nWorld"
+
+
+def test_normalize_text_multiple_empty_lines():
+    """合并过多空行为最多两行"""
+    text = "Line 1\n\n\n\n\nLine 2"
+    result = normalizeText(text)
+    # 最多保留两个空行（即三个换行符）
+    assert result == "Line 1\n\n\nLine 2"
+
+
+def test_normalize_text_trailing_whitespace():
+    """去除行尾空白"""
+    text = "Line 1   \nLine 2\t\n"
+    result = normalizeText(text)
+    # 两行非空内容之间没有空行
+    assert result == "Line 1\nLine 2"
+
+
+def test_normalize_text_empty():
+    """空文本返回空字符串"""
+    assert normalizeText("") == ""
+    assert normalizeText("   \n\n   ") == ""
+
+
+# ============================================================================
+# extractHTML() 测试
+# ============================================================================
+
+def test_extract_html_basic():
+    """基本 HTML 提取"""
+    html = "<html><head><title>Test Page</title></head><body><p>Hello World</p></body></html>"
+    title, body, _ = extractHTML(html)
+    assert title == "Test Page"
+    assert "Hello World" in body
+
+
+def test_extract_html_remove_script():
+    """移除 script 标签"""
+    html = "<html><body><p>Content</p><script>alert('xss')</script></body></html>"
+    title, body, _ = extractHTML(html)
+    assert "alert" not in body
+    assert "Content" in body
+
+
+def test_extract_html_remove_style():
+    """移除 style 标签"""
+    html = "<html><body><p>Content</p><style>body { color: red; }</style></body></html>"
+    title, body, _ = extractHTML(html)
+    assert "color" not in body
+    assert "Content" in body
+
+
+def test_extract_html_markdown_body():
+    """优先提取 markdown-body 类"""
+    html = """
+    <html><body>
+        <div>Sidebar</div>
+        <article class="markdown-body">Main Content</article>
+    </body></html>
+    """
+    title, body, _ = extractHTML(html)
+    assert "Main Content" in body
+    assert "Sidebar" not in body
+
+
+def test_extract_html_article():
+    """提取 article 标签"""
+    html = """
+    <html><body>
+        <div>Header</div>
+        <article>Article Content</article>
+        <div>Footer</div>
+    </body></html>
+    """
+    title, body, _ = extractHTML(html)
+    assert "Article Content" in body
+
+
+def test_extract_html_main():
+    """提取 main 标签"""
+    html = """
+    <html><body>
+        <nav>Navigation</nav>
+        <main>Main Content</main>
+        <footer>Footer</footer>
+    </body></html>
+    """
+    title, body, _ = extractHTML(html)
+    assert "Main Content" in body
+
+
+def test_extract_html_no_title():
+    """无 title 标签"""
+    html = "<html><body><p>Content</p></body></html>"
+    title, body, _ = extractHTML(html)
+    assert title == ""
+    assert "Content" in body
+
+
+def test_extract_html_fallback_to_body():
+    """无特殊容器时回退到 body"""
+    html = "<html><body><p>Paragraph 1</p><p>Paragraph 2</p></body></html>"
+    title, body, _ = extractHTML(html)
+    assert "Paragraph 1" in body
+    assert "Paragraph 2" in body
+
+
+def test_extract_html_invalid():
+    """无效 HTML 回退到纯文本"""
+    html = "Not really HTML <unclosed tag"
+    title, body, _ = extractHTML(html)
+    # 应该不抛异常，返回某种文本
+    assert isinstance(title, str)
+    assert isinstance(body, str)
+
+
+def test_extract_html_lxml_and_soup_agree():
+    """lxml 快速路径与 BeautifulSoup 回退路径结果一致"""
+    html = """
+    <html><head><title> Page </title></head><body>
+        <nav>Navigation</nav>
+        <main><h1>Heading</h1><!-- comment --><p>First <b>bold</b> tail</p>
+        <script>var x = 1;</script>after script<p>Second</p></main>
+    </body></html>
+    """
+    assert extractHTML(html) == urlExtract._extractHTMLWithSoup(html, None)
+    assert extractHTML(html)[1] == "Heading\nFirst\nbold\ntail\nafter script\nSecond"
+
+
+def test_extract_html_stops_at_max_chars():
+    """攒够 maxChars 即停止遍历，并标记截断"""
+    html = "<html><body>" + "".join(f"<p>{'段落' * 10} {i}</p>" for i in range(1000)) + "</body></html>"
+    title, body, truncated = extractHTML(html, maxChars=200)
+    assert truncated
+    assert 200 < len(body) < 300
+
+    _, fullBody, fullTruncated = extractHTML(html)
+    assert not fullTruncated and fullBody.startswith(body)
+
+
+def test_decode_and_extract_uses_charset():
+    raw = "<html><body><p>中文内容</p></body></html>".encode("gbk")
+    assert decodeAndExtract(raw, "text/html; charset=gbk")[1] == "中文内容"
+    assert decodeAndExtract(b'{"a": 1}  \n', "application/json") == ("", '{"a": 1}', False)
+
+
+# ============================================================================
+# extractOffLoop() 执行位置
+# ============================================================================
+
+def test_choose_executor_by_size():
+    assert urlExtract._chooseExecutor(1024) == "inline"
+    assert urlExtract._chooseExecutor(200 * 1024) == "thread"
+    assert urlExtract._chooseExecutor(4 * 1024 * 1024) == "process"
+
+
+@pytest.mark.asyncio
+async def test_large_payload_runs_off_loop(monkeypatch):
+    """超过内联阈值的响应在工作线程中提取，事件循环不被占用"""
+    seen = []
+    realExtract = urlExtract.decodeAndExtract
+
+    def _spy(*args):
+        seen.append(threading.current_thread().name)
+        return realExtract(*args)
+
+    monkeypatch.setattr(urlExtract, "decodeAndExtract", _spy)
+    raw = ("<html><body>" + "<p>x</p>" * 10000 + "</body></html>").encode()
+
+    try:
+        title, body, _ = await extractOffLoop(raw, "text/html", maxChars=100)
+    finally:
+        await urlExtract.shutdownPools()
+
+    assert seen and seen[0].startswith("url-extract")
+    assert body.startswith("x\nx")
+
+
+@pytest.mark.asyncio
+async def test_process_pool_does_not_fork(monkeypatch):
+    """进程池用 forkserver / spawn 启动子进程，提取结果照常返回"""
+    monkeypatch.setattr(urlExtract, "_chooseExecutor", lambda size: "process")
+    raw = "<html><head><title>标题</title></head><body><p>正文</p></body></html>".encode()
+
+    try:
+        result = await extractOffLoop(raw, "text/html")
+        pool = urlExtract._processPool
+        assert pool is not None
+        assert pool._mp_context.get_start_method() in ("forkserver", "spawn")
+    finally:
+        await urlExtract.shutdownPools()
+
+    assert result == ("标题", "正文", False)
+
+
+@pytest.mark.asyncio
+async def test_broken_process_pool_falls_back_to_thread(monkeypatch):
+    def _broken():
+        raise OSError("无法创建子进程")
+
+    monkeypatch.setattr(urlExtract, "_chooseExecutor", lambda size: "process")
+    monkeypatch.setattr(urlExtract, "_getProcessPool", _broken)
+
+    try:
+        result = await extractOffLoop(b"plain text", "text/plain")
+    finally:
+        await urlExtract.shutdownPools()
+
+    assert result == ("", "plain text", False)
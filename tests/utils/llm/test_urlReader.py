@@ -4,15 +4,20 @@ tests/utils/llm/test_urlReader.py
 测试 utils/llm/urlReader.py
 """
 
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
 import pytest
+
+import utils.llm.urlReader as urlReader
+from utils.llm.urlCache import urlCache
 from utils.llm.urlReader import (
     _isSafeIPAddress,
     _validateURL,
     extractURLs,
     _isTextContentType,
     _isBinaryContent,
-    _normalizeText,
-    _extractHTML,
 )
 
 
@@ -280,125 +285,141 @@ def test_is_binary_content_empty():
 
 
 # ============================================================================
-# _normalizeText() 测试
+# _SafeResolver 解析缓存
 # ============================================================================
 
-def test_normalize_text_basic():
-    """基本文本规范化"""
-    result = _normalizeText("  Hello  \n  World  ")
-    # 两行非空内容之间没有空行
-    assert result == "Hello\nWorld"
+def _addr(ip):
+    return {"hostname": "example.com", "host": ip, "port": 443, "family": 2, "proto": 6, "flags": 0}
+
+
+@pytest.fixture
+async def resolver():
+    r = urlReader._SafeResolver()   # DefaultResolver 需要在事件循环中创建
+    r._resolver = AsyncMock()
+    with patch.object(urlReader, "getURLReadBlockedHosts", return_value=[]):
+        yield r
+
+
+@pytest.mark.asyncio
+async def test_resolver_caches_validated_addresses(resolver):
+    resolver._resolver.resolve.return_value = [_addr("93.184.216.34")]
+
+    first = await resolver.resolve("Example.com", 443)
+    first[0]["host"] = "10.0.0.1"   # 调用方改动返回值不影响缓存
+    second = await resolver.resolve("example.com.", 443)
+
+    assert resolver._resolver.resolve.await_count == 1
+    assert second == [_addr("93.184.216.34")]
 
 
-def test_normalize_text_multiple_empty_lines():
-    """合并过多空行为最多两行"""
-    text = "Line 1\n\n\n\n\nLine 2"
-    result = _normalizeText(text)
-    # 最多保留两个空行（即三个换行符）
-    assert result == "Line 1\n\n\nLine 2"
+@pytest.mark.asyncio
+async def test_resolver_negative_entry_for_private_address(resolver):
+    resolver._resolver.resolve.return_value = [_addr("93.184.216.34"), _addr("127.0.0.1")]
 
+    for _ in range(2):
+        with pytest.raises(OSError, match="不是可路由公网地址"):
+            await resolver.resolve("rebind.example", 443)
 
-def test_normalize_text_trailing_whitespace():
-    """去除行尾空白"""
-    text = "Line 1   \nLine 2\t\n"
-    result = _normalizeText(text)
-    # 两行非空内容之间没有空行
-    assert result == "Line 1\nLine 2"
+    assert resolver._resolver.resolve.await_count == 1
 
 
-def test_normalize_text_empty():
-    """空文本返回空字符串"""
-    assert _normalizeText("") == ""
-    assert _normalizeText("   \n\n   ") == ""
+@pytest.mark.asyncio
+async def test_resolver_hit_rechecks_blocked_hosts(resolver):
+    resolver._resolver.resolve.return_value = [_addr("93.184.216.34")]
+    await resolver.resolve("api.example.com", 443)
+
+    with patch.object(urlReader, "getURLReadBlockedHosts", return_value=["example.com"]):
+        with pytest.raises(OSError, match="blocked host"):
+            await resolver.resolve("api.example.com", 443)
+
+
+@pytest.mark.asyncio
+async def test_resolver_entries_expire(resolver, monkeypatch):
+    resolver._resolver.resolve.return_value = [_addr("93.184.216.34")]
+    await resolver.resolve("example.com", 443)
+
+    now = time.monotonic()
+    monkeypatch.setattr(urlReader.time, "monotonic", lambda: now + urlReader._DNS_CACHE_TTL + 1)
+    await resolver.resolve("example.com", 443)
+
+    assert resolver._resolver.resolve.await_count == 2
 
 
 # ============================================================================
-# _extractHTML() 测试
+# readURLContextsForUserText() 测试 — 并发与总时限
 # ============================================================================
 
-def test_extract_html_basic():
-    """基本 HTML 提取"""
-    html = "<html><head><title>Test Page</title></head><body><p>Hello World</p></body></html>"
-    title, body = _extractHTML(html)
-    assert title == "Test Page"
-    assert "Hello World" in body
-
-
-def test_extract_html_remove_script():
-    """移除 script 标签"""
-    html = "<html><body><p>Content</p><script>alert('xss')</script></body></html>"
-    title, body = _extractHTML(html)
-    assert "alert" not in body
-    assert "Content" in body
-
-
-def test_extract_html_remove_style():
-    """移除 style 标签"""
-    html = "<html><body><p>Content</p><style>body { color: red; }</style></body></html>"
-    title, body = _extractHTML(html)
-    assert "color" not in body
-    assert "Content" in body
-
-
-def test_extract_html_markdown_body():
-    """优先提取 markdown-body 类"""
-    html = """
-    <html><body>
-        <div>Sidebar</div>
-        <article class="markdown-body">Main Content</article>
-    </body></html>
-    """
-    title, body = _extractHTML(html)
-    assert "Main Content" in body
-    assert "Sidebar" not in body
-
-
-def test_extract_html_article():
-    """提取 article 标签"""
-    html = """
-    <html><body>
-        <div>Header</div>
-        <article>Article Content</article>
-        <div>Footer</div>
-    </body></html>
-    """
-    title, body = _extractHTML(html)
-    assert "Article Content" in body
-
-
-def test_extract_html_main():
-    """提取 main 标签"""
-    html = """
-    <html><body>
-        <nav>Navigation</nav>
-        <main>Main Content</main>
-        <footer>Footer</footer>
-    </body></html>
-    """
-    title, body = _extractHTML(html)
-    assert "Main Content" in body
-
-
-def test_extract_html_no_title():
-    """无 title 标签"""
-    html = "<html><body><p>Content</p></body></html>"
-    title, body = _extractHTML(html)
-    assert title == ""
-    assert "Content" in body
-
-
-def test_extract_html_fallback_to_body():
-    """无特殊容器时回退到 body"""
-    html = "<html><body><p>Paragraph 1</p><p>Paragraph 2</p></body></html>"
-    title, body = _extractHTML(html)
-    assert "Paragraph 1" in body
-    assert "Paragraph 2" in body
-
-
-def test_extract_html_invalid():
-    """无效 HTML 回退到纯文本"""
-    html = "Not really HTML <unclosed tag"
-    title, body = _extractHTML(html)
-    # 应该不抛异常，返回某种文本
-    assert isinstance(title, str)
-    assert isinstance(body, str)
\ No newline at end of file
+_DELAYS = {}
+
+
+async def _fakeFetchWithRedirect(url, redirectLimit, result, *, conditional=None):
+    await asyncio.sleep(_DELAYS.get(url, 0))
+    result.update(finalUrl=url, ok=True, status=200, contentType="text/plain", text=f"body of {url}")
+
+
+@pytest.fixture
+def readEnv():
+    _DELAYS.clear()
+    with patch.object(urlReader, "getURLReadEnabled", return_value=True), \
+         patch.object(urlReader, "getURLReadMaxUrls", return_value=3), \
+         patch.object(urlReader, "getURLReadMaxRetries", return_value=1), \
+         patch.object(urlReader, "_fetchWithRedirect", side_effect=_fakeFetchWithRedirect), \
+         patch.object(urlReader, "logSystemEvent", new=AsyncMock()), \
+         patch.object(urlReader, "_TOTAL_FETCH_DEADLINE", 0.3), \
+         patch.object(urlReader, "_DEADLINE_GRACE_SECONDS", 0.1):
+        yield
+
+
+async def _read(*urls):
+    return await urlReader.readURLContextsForUserText(intentText="#url", candidateText=" ".join(urls))
+
+
+@pytest.mark.asyncio
+async def test_read_urls_concurrently_in_original_order(readEnv):
+    _DELAYS.update({"https://a.com/": 0.15, "https://b.com/": 0.15, "https://c.com/": 0})
+
+    start = time.monotonic()
+    results = await _read("https://a.com/", "https://b.com/", "https://c.com/")
+
+    assert time.monotonic() - start < 0.28
+    assert [r["requestedUrl"] for r in results] == ["https://a.com/", "https://b.com/", "https://c.com/"]
+    assert all(r["ok"] for r in results)
+
+
+@pytest.mark.asyncio
+async def test_slow_host_bounded_by_remaining_budget(readEnv):
+    """慢 URL 在总时限到点时以失败结果收尾，不重试、不写负缓存，其他 URL 照常返回"""
+    _DELAYS.update({"https://slow.com/": 10})
+
+    start = time.monotonic()
+    slow, fast = await _read("https://slow.com/", "https://fast.com/")
+
+    assert time.monotonic() - start < 0.4
+    assert not slow["ok"] and "总时限" in slow["error"]
+    assert fast["ok"]
+    assert urlReader._fetchWithRedirect.call_count == 2
+    assert urlCache.lookup("https://slow.com/", maxBytes=urlReader.getURLReadMaxBytes(),
+                           maxChars=urlReader.getURLReadMaxChars()) is None
+
+
+@pytest.mark.asyncio
+async def test_stragglers_cancelled_after_grace(readEnv):
+    """不理会 deadline 的任务在宽限期后被取消，位置上留下失败结果"""
+    cancelled = asyncio.Event()
+    realFetch = urlReader._fetchURL
+
+    async def _stuckFetch(url, *, deadline=None):
+        if "stuck" not in url:
+            return await realFetch(url, deadline=deadline)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with patch.object(urlReader, "_fetchURL", side_effect=_stuckFetch):
+        stuck, ok = await _read("https://stuck.com/", "https://ok.com/")
+
+    assert cancelled.is_set()
+    assert not stuck["ok"] and stuck["requestedUrl"] == "https://stuck.com/"
+    assert ok["ok"]
@@ -0,0 +1,186 @@
+"""
+tests/utils/llm/test_visionCache.py
+
+测试 utils/llm/visionCache.py 图片描述持久缓存。
+
+验证：
+    - computeImageKeys：uid 键仅在全部图片带 fileUniqueID 时生成；sha256 键始终生成
+    - store → get 往返（库中为密文）
+    - 模型名隔离、TTL 过期、条数上限淘汰
+    - sha256 键命中后回填 uid 键
+    - _describeImages 命中缓存时不调用视觉模型
+"""
+
+import base64
+import pytest
+from unittest.mock import patch, AsyncMock
+
+import utils.core.crypto as crypto
+import utils.llm.visionCache as visionCache
+from utils.core.schema import loadSchema
+from utils.llm.visionCache import (
+    computeImageKeys,
+    getCachedDescription,
+    storeDescription,
+)
+
+
+def _img(raw: bytes, uid=None) -> dict:
+    return {"data": base64.b64encode(raw).decode("ascii"), "mimeType": "image/png", "fileUniqueID": uid}
+
+
+@pytest.fixture
+def tmpKey(tmp_path, monkeypatch):
+    """把密钥指向临时文件并清空缓存。"""
+    monkeypatch.setattr(crypto, "KEY_PATH", str(tmp_path / ".chatKey"))
+    monkeypatch.setattr(crypto, "_fernetCache", None)
+
+
+@pytest.fixture
+def cacheDb(inMemoryDb, tmpKey):
+    """初始化 vision_descriptions 表，并把 visionCacheDB.run 指向内存库。"""
+    inMemoryDb.executescript(loadSchema("llmVisionCache"))
+
+    async def _run(func):
+        return func(inMemoryDb)
+
+    with patch.object(visionCache.visionCacheDB, "run", side_effect=_run):
+        yield inMemoryDb
+
+
+# ============================================================================
+# computeImageKeys()
+# ============================================================================
+
+def test_keys_with_unique_ids():
+    """全部图片带 fileUniqueID → uid 键在前，sha256 键在后"""
+    keys = computeImageKeys([_img(b"a", "U1"), _img(b"b", "U2")])
+    assert keys[0] == "uid:U1,U2"
+    assert keys[1].startswith("sha256:")
+    assert len(keys) == 2
+
+
+def test_keys_without_unique_id_only_hash():
+    """任一图片缺 fileUniqueID → 只生成 sha256 键"""
+    keys = computeImageKeys([_img(b"a", "U1"), _img(b"b")])
+    assert len(keys) == 1
+    assert keys[0].startswith("sha256:")
+
+
+def test_keys_hash_deterministic_and_content_sensitive():
+    """同内容同键，不同内容不同键"""
+    assert computeImageKeys([_img(b"same")]) == computeImageKeys([_img(b"same")])
+    assert computeImageKeys([_img(b"one")]) != computeImageKeys([_img(b"two")])
+
+
+def test_keys_empty():
+    assert computeImageKeys([]) == []
+
+
+# ============================================================================
+# store / get
+# ============================================================================
+
+@pytest.mark.asyncio
+async def test_store_then_get_roundtrip(cacheDb):
+    """写入后可读回，库中存的是密文"""
+    keys = computeImageKeys([_img(b"sticker", "U1")])
+    await storeDescription(keys, "一只猫猫贴纸", model="vision-a")
+
+    assert await getCachedDescription(keys, model="vision-a") == "一只猫猫贴纸"
+
+    raw = cacheDb.execute("SELECT description FROM vision_descriptions LIMIT 1").fetchone()[0]
+    assert "一只猫猫贴纸".encode("utf-8") not in raw
+
+
+@pytest.mark.asyncio
+async def test_model_isolation(cacheDb):
+    """换视觉模型后不命中旧描述"""
+    keys = computeImageKeys([_img(b"sticker", "U1")])
+    await storeDescription(keys, "描述", model="vision-a")
+
+    assert await getCachedDescription(keys, model="vision-b") is None
+
+
+@pytest.mark.asyncio
+async def test_hash_hit_backfills_uid_key(cacheDb):
+    """先以无 uid 的转发图入库，之后带 uid 查询时经 hash 键命中并回填 uid 键"""
+    await storeDescription(computeImageKeys([_img(b"fwd")]), "转发图", model="m")
+
+    keysWithUID = computeImageKeys([_img(b"fwd", "U9")])
+    assert await getCachedDescription(keysWithUID, model="m") == "转发图"
+
+    row = cacheDb.execute(
+        "SELECT 1 FROM vision_descriptions WHERE image_key = ?", ("uid:U9",)
+    ).fetchone()
+    assert row is not None
+
+
+@pytest.mark.asyncio
+async def test_expired_entry_not_returned(cacheDb, monkeypatch):
+    """超过 TTL 的条目不命中"""
+    keys = computeImageKeys([_img(b"old", "U1")])
+    await storeDescription(keys, "旧描述", model="m")
+    cacheDb.execute("UPDATE vision_descriptions SET created_at = created_at - ?", (visionCache.LLM_VISION_CACHE_TTL + 10,))
+
+    assert await getCachedDescription(keys, model="m") is None
+
+
+@pytest.mark.asyncio
+async def test_size_eviction_keeps_recent(cacheDb, monkeypatch):
+    """超出条数上限时淘汰最久未使用的条目"""
+    monkeypatch.setattr(visionCache, "LLM_VISION_CACHE_MAX_ENTRIES", 2)
+
+    for i in range(3):
+        await storeDescription([f"uid:U{i}"], f"描述{i}", model="m")
+        cacheDb.execute(
+            "UPDATE vision_descriptions SET last_used_at = ? WHERE image_key = ?",
+            (1_000_000 + i, f"uid:U{i}"),
+        )
+    await storeDescription(["uid:U3"], "描述3", model="m")
+
+    remaining = {r[0] for r in cacheDb.execute("SELECT image_key FROM vision_descriptions")}
+    assert remaining == {"uid:U2", "uid:U3"}
+
+
+@pytest.mark.asyncio
+async def test_get_failure_returns_none():
+    """数据库异常时返回 None，不抛出"""
+    with patch.object(visionCache.visionCacheDB, "run", side_effect=Exception("db down")), \
+         patch("utils.llm.visionCache.logSystemEvent", new_callable=AsyncMock):
+        assert await getCachedDescription(["uid:U1"], model="m") is None
+
+
+# ============================================================================
+# _describeImages() 集成
+# ============================================================================
+
+@pytest.mark.asyncio
+async def test_describe_images_uses_cache():
+    """缓存命中时不调用视觉模型"""
+    from utils.llm.client import _generate
+
+    with patch.object(_generate, "getCachedDescription", new=AsyncMock(return_value="缓存描述")), \
+         patch.object(_generate, "requestWithRetry", new=AsyncMock()) as mockRequest, \
+         patch.object(_generate, "logSystemEvent", new=AsyncMock()):
+        result = await _generate._describeImages([_img(b"x", "U1")], model="m")
+
+    assert result == "缓存描述"
+    mockRequest.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_describe_images_stores_valid_description():
+    """缓存未命中时调用视觉模型，并写入通过长度校验的描述"""
+    from utils.llm.client import _generate
+
+    description = "描" * 200
+    with patch.object(_generate, "getCachedDescription", new=AsyncMock(return_value=None)), \
+         patch.object(_generate, "storeDescription", new=AsyncMock()) as mockStore, \
+         patch.object(_generate, "getProvider"), \
+         patch.object(_generate, "requestWithRetry", new=AsyncMock(return_value=description)), \
+         patch.object(_generate, "logSystemEvent", new=AsyncMock()):
+        result = await _generate._describeImages([_img(b"x", "U1")], model="m")
+
+    assert result == description
+    mockStore.assert_awaited_once()
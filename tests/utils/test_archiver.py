@@ -10,7 +10,7 @@ import tempfile
 
 import pytest
 
-from utils.archiver import createZip, create7zVolumes
+from utils.archiver import ZipStream, createZip, create7zVolumes
 
 
 # ============================================================================
@@ -55,6 +55,46 @@ def test_createZip_returns_zip_extension():
         assert zipPath.endswith(".zip")
 
 
+# ============================================================================
+# ZipStream 测试
+# ============================================================================
+
+@pytest.mark.asyncio
+async def test_zipStream_stored_and_deflated(tmp_path):
+    """已压缩格式 stored，其余 deflate；removeAfter 删除源文件"""
+    webp = tmp_path / "1.webp"
+    webp.write_bytes(b"webp" * 100)
+    text = tmp_path / "readme.txt"
+    text.write_text("hello " * 100)
+
+    archive = ZipStream(str(tmp_path / "out.zip"))
+    await archive.add(str(webp), removeAfter=True)
+    await archive.add(str(text), "docs/readme.txt")
+    zipPath = await archive.close()
+
+    assert archive.count == 2
+    assert not webp.exists() and text.exists()
+    with zipfile.ZipFile(zipPath) as zf:
+        assert zf.getinfo("1.webp").compress_type == zipfile.ZIP_STORED
+        assert zf.getinfo("docs/readme.txt").compress_type == zipfile.ZIP_DEFLATED
+        assert zf.read("1.webp") == b"webp" * 100
+
+
+@pytest.mark.asyncio
+async def test_zipStream_abort_removes_file(tmp_path):
+    """abort 删除未完成的 ZIP，之后不能再写入"""
+    src = tmp_path / "1.gif"
+    src.write_bytes(b"gif")
+
+    archive = ZipStream(str(tmp_path / "out.zip"))
+    await archive.add(str(src))
+    await archive.abort()
+
+    assert not (tmp_path / "out.zip").exists()
+    with pytest.raises(RuntimeError):
+        await archive.add(str(src))
+
+
 # ============================================================================
 # create7zVolumes() 测试
 # ============================================================================
@@ -64,7 +104,8 @@ def test_createZip_returns_zip_extension():
     not os.path.exists("7z/7z.exe") and not os.path.exists("7z/7z"),
     reason="需要 7z 命令行工具（py7zr 0.22.0 不支持 volume 参数）"
 )
-def test_create7zVolumes_large_file():
+@pytest.mark.asyncio
+async def test_create7zVolumes_large_file():
     """大文件分成多卷，每卷不超过指定大小"""
     with tempfile.TemporaryDirectory() as tmpdir:
         # 60MB 文件
@@ -73,7 +114,7 @@ def test_create7zVolumes_large_file():
             f.write(b"\x00" * (60 * 1024 * 1024))
 
         outputBase = os.path.join(tmpdir, "large_7z")
-        volumes = create7zVolumes(testFile, outputBase, volumeSizeMB=48)
+        volumes = await create7zVolumes(testFile, outputBase, volumeSizeMB=48)
 
         assert len(volumes) >= 2
         assert all(os.path.exists(v) for v in volumes)
@@ -86,7 +127,8 @@ def test_create7zVolumes_large_file():
     not os.path.exists("7z/7z.exe") and not os.path.exists("7z/7z"),
     reason="需要 7z 命令行工具（py7zr 0.22.0 不支持 volume 参数）"
 )
-def test_create7zVolumes_small_file():
+@pytest.mark.asyncio
+async def test_create7zVolumes_small_file():
     """小文件生成至少 1 个分卷"""
     with tempfile.TemporaryDirectory() as tmpdir:
         testFile = os.path.join(tmpdir, "small.txt")
@@ -94,7 +136,7 @@ def test_create7zVolumes_small_file():
             f.write("hello")
 
         outputBase = os.path.join(tmpdir, "small_7z")
-        volumes = create7zVolumes(testFile, outputBase, volumeSizeMB=48)
+        volumes = await create7zVolumes(testFile, outputBase, volumeSizeMB=48)
 
         assert len(volumes) >= 1
         assert all(os.path.exists(v) for v in volumes)
\ No newline at end of file
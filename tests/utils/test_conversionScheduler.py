@@ -0,0 +1,102 @@
+"""
+tests/utils/test_conversionScheduler.py
+
+测试 utils/conversionScheduler.py 全局转换调度器。
+
+验证：
+    - 上限：显式配置优先，内存不足时降到 1
+    - 公平：运行中转换更少的用户先拿到槽位；运行数相同时排队更少的用户优先
+    - 取消：排队中被取消的调用方出队，槽位不泄漏
+    - 排队位置：运行中为 0，排队时按先后返回 1、2……
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+import utils.conversionScheduler as schedulerModule
+from utils.conversionScheduler import ConversionScheduler
+
+
+@pytest.fixture(autouse=True)
+def memoryOK():
+    with patch.object(schedulerModule, "isMemoryLow", return_value=False):
+        yield
+
+
+async def _queue(scheduler, ownerID, granted):
+    """申请槽位并记录拿到的顺序，拿到后一直占着，直到被取消"""
+    async with scheduler.slot(ownerID):
+        granted.append(ownerID)
+        await asyncio.Event().wait()
+
+
+def test_limit():
+    assert ConversionScheduler(maxWorkers=3).limit() == 3
+    assert ConversionScheduler().limit() >= 1
+    with patch.object(schedulerModule, "isMemoryLow", return_value=True):
+        assert ConversionScheduler(maxWorkers=3).limit() == 1
+
+
+@pytest.mark.asyncio
+async def test_fewest_running_then_smallest_queue_first():
+    scheduler = ConversionScheduler(maxWorkers=2)
+    granted = []
+
+    await scheduler.acquire("A")                           # A 占满两个槽位
+    await scheduler.acquire("A")
+    tasks = [asyncio.create_task(_queue(scheduler, owner, granted)) for owner in ("A", "A", "C")]
+    try:
+        await asyncio.sleep(0)
+        scheduler.release("A")
+        await asyncio.sleep(0)
+        assert granted == ["C"]                             # C 没有运行中的转换，先于 A
+
+        tasks += [asyncio.create_task(_queue(scheduler, owner, granted)) for owner in ("B", "B", "B")]
+        await asyncio.sleep(0)
+        scheduler.release("A")
+        await asyncio.sleep(0)
+        assert granted == ["C", "A"]                        # A、B 都没在运行，A 排队的更少
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_queue():
+    scheduler = ConversionScheduler(maxWorkers=1)
+    granted = []
+
+    await scheduler.acquire("A")
+    waiter = asyncio.create_task(_queue(scheduler, "B", granted))
+    await asyncio.sleep(0)
+    assert scheduler.stats()["waiting"] == 1
+
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    assert scheduler.stats() == {"limit": 1, "running": 1, "waiting": 0, "waitingOwners": 0}
+
+    scheduler.release("A")
+    assert scheduler.stats()["running"] == 0
+    assert granted == []
+
+
+@pytest.mark.asyncio
+async def test_queue_position():
+    scheduler = ConversionScheduler(maxWorkers=1)
+    granted = []
+
+    await scheduler.acquire("A")
+    tasks = [asyncio.create_task(_queue(scheduler, owner, granted)) for owner in ("B", "C", "C")]
+    await asyncio.sleep(0)
+
+    assert scheduler.queuePosition("A") == 0               # 正在运行
+    assert scheduler.queuePosition("B") == 1
+    assert scheduler.queuePosition("C") == 2
+    assert scheduler.queuePosition("nobody") == 0
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,147 @@
+"""
+tests/utils/test_stickerCache.py
+
+测试 utils/stickerCache.py 表情包磁盘缓存，以及 downloadEachOne 的缓存集成。
+
+验证：
+    - 原始文件按 file_unique_id 存取，扩展名保留
+    - 转换结果的键含转换参数，参数变化不复用
+    - 非法 file_unique_id（路径穿越、非字符串）不缓存
+    - 超出字节上限时淘汰最久未用的文件，命中会刷新使用时间；一次淘汰到低水位
+    - 第二次下载同一 sticker 为 GIF 时不联网、不转换
+    - 每张 sticker 只计一次命中 / 未命中
+"""
+
+import os
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+import utils.stickerDownloader as stickerDownloader
+from utils.stickerCache import StickerCache
+
+
+_PARAMS = {"format": "gif", "fps": 24, "palette": "stats_mode=full"}
+
+
+def _writeFile(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+# ============================================================================
+# StickerCache
+# ============================================================================
+
+def test_original_roundtrip(tmp_path):
+    cache = StickerCache(str(tmp_path / "cache"), maxBytes=1024)
+    src = _writeFile(tmp_path / "1.webm", b"webm-data")
+
+    cache.saveOriginal("AgADuniq", src)
+    os.remove(src)
+    restored = cache.restoreOriginal("AgADuniq", str(tmp_path / "2"))
+
+    assert restored == str(tmp_path / "2.webm")
+    with open(restored, "rb") as f:
+        assert f.read() == b"webm-data"
+    assert cache.restoreOriginal("AgADother", str(tmp_path / "3")) is None
+
+
+def test_converted_keyed_by_params(tmp_path):
+    cache = StickerCache(str(tmp_path / "cache"), maxBytes=1024)
+    cache.saveConverted("AgADuniq", _PARAMS, _writeFile(tmp_path / "1.gif", b"gif"))
+
+    assert cache.restoreConverted("AgADuniq", dict(_PARAMS), str(tmp_path / "a")) == str(tmp_path / "a.gif")
+    assert cache.restoreConverted("AgADuniq", {**_PARAMS, "fps": 12}, str(tmp_path / "b")) is None
+
+
+def test_invalid_unique_id_is_not_cached(tmp_path):
+    cache = StickerCache(str(tmp_path / "cache"), maxBytes=1024)
+    src = _writeFile(tmp_path / "1.webp", b"webp")
+
+    cache.saveOriginal("../escape", src)
+    cache.saveOriginal(MagicMock(), src)
+
+    assert cache.stats()["files"] == 0
+    assert cache.restoreOriginal("../escape", str(tmp_path / "2")) is None
+
+
+def test_byte_cap_evicts_least_recently_used(tmp_path):
+    cache = StickerCache(str(tmp_path / "cache"), maxBytes=25)
+    cache.saveOriginal("a", _writeFile(tmp_path / "a.webp", b"a" * 10))
+    cache.saveOriginal("b", _writeFile(tmp_path / "b.webp", b"b" * 10))
+    for name, mtime in (("a", 1000), ("b", 2000)):
+        os.utime(tmp_path / "cache" / "originals" / f"{name}.webp", (mtime, mtime))
+
+    assert cache.restoreOriginal("a", str(tmp_path / "hit"))   # 命中刷新 a 的使用时间
+    cache.saveOriginal("c", _writeFile(tmp_path / "c.webp", b"c" * 10))
+
+    assert cache.restoreOriginal("b", str(tmp_path / "b2")) is None
+    assert cache.restoreOriginal("a", str(tmp_path / "a2")) is not None
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["bytes"] == 20
+
+
+def test_eviction_goes_down_to_low_water(tmp_path):
+    """超限时一次删到 maxBytes 的 90%，之后的写入不必再淘汰"""
+    cache = StickerCache(str(tmp_path / "cache"), maxBytes=100)
+    for i in range(11):
+        cache.saveOriginal(f"u{i}", _writeFile(tmp_path / f"{i}.webp", b"x" * 10))
+        os.utime(tmp_path / "cache" / "originals" / f"u{i}.webp", (1000 + i, 1000 + i))
+
+    assert cache.evictions == 2
+    assert cache.stats()["bytes"] == 90
+    assert cache.restoreOriginal("u0", str(tmp_path / "r0")) is None
+    assert cache.restoreOriginal("u1", str(tmp_path / "r1")) is None
+
+    cache.saveOriginal("u11", _writeFile(tmp_path / "11.webp", b"x" * 10))
+    assert cache.evictions == 2
+
+
+def test_record_lookup_skips_uncacheable_ids(tmp_path):
+    cache = StickerCache(str(tmp_path / "cache"), maxBytes=1024)
+    cache.recordLookup("AgADuniq", True)
+    cache.recordLookup("AgADuniq", False)
+    cache.recordLookup(None, False)
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["hitRate"] == 0.5
+
+
+# ============================================================================
+# downloadEachOne 集成
+# ============================================================================
+
+@pytest.mark.asyncio
+async def test_second_gif_download_uses_cache(tmp_path):
+    cache = StickerCache(str(tmp_path / "cache"), maxBytes=1024)
+
+    async def fakeDownload(path):
+        _writeFile(path, b"webp")
+
+    async def fakeConvert(path):
+        gifPath = path.rsplit(".", 1)[0] + ".gif"
+        return _writeFile(gifPath, b"gif")
+
+    mockFile = MagicMock()
+    mockFile.download_to_drive = AsyncMock(side_effect=fakeDownload)
+    mockBot = MagicMock()
+    mockBot.get_file = AsyncMock(return_value=mockFile)
+    (tmp_path / "first").mkdir()
+    (tmp_path / "second").mkdir()
+
+    with patch.object(stickerDownloader, "stickerCache", cache), \
+         patch.object(stickerDownloader.magic, "from_file", return_value="image/webp"), \
+         patch.object(stickerDownloader, "convertToGif", side_effect=fakeConvert) as mockConvert:
+        first = await stickerDownloader.downloadEachOne(
+            mockBot, "fid1", str(tmp_path / "first" / "1.webp"), "gif", fileUniqueID="AgADuniq")
+        second = await stickerDownloader.downloadEachOne(
+            mockBot, "fid2", str(tmp_path / "second" / "1.webp"), "gif", fileUniqueID="AgADuniq")
+
+    assert first == {"ok": True, "converted": True, "cached": False, "path": str(tmp_path / "first" / "1.gif")}
+    assert second == {"ok": True, "converted": True, "cached": True, "path": str(tmp_path / "second" / "1.gif")}
+    assert mockBot.get_file.await_count == 1
+    assert mockConvert.await_count == 1
+    assert cache.hits == 1 and cache.misses == 1      # 冷查询查了两处缓存，也只计一次未命中
+    assert os.listdir(tmp_path / "second") == ["1.gif"]
@@ -4,16 +4,20 @@ tests/utils/test_stickerDownloader.py
 测试 utils/stickerDownloader.py
 """
 
+import os
 import pytest
 import asyncio
+import zipfile
 from unittest.mock import patch, AsyncMock, MagicMock
 from telegram.error import TelegramError, NetworkError
 
+from config import MAX_GIF_FPS
 from utils.stickerDownloader import (
     _sanitizeSetName,
     getActiveGifJobs,
     _ensureFFmpeg,
     convertToGif,
+    _probeSticker,
     downloadEachOne,
     createStickerZip,
     deleteLater,
@@ -84,9 +88,10 @@ def test_ensure_ffmpeg_available():
 
 @pytest.mark.asyncio
 async def test_convert_to_gif_tgs_unsupported():
-    """.tgs 格式抛出 ValueError"""
-    with pytest.raises(ValueError, match="不支持将 .tgs 格式"):
-        await convertToGif("/path/to/sticker.tgs")
+    """未安装 rlottie 时 .tgs 格式抛出 ValueError"""
+    with patch('utils.tgsRenderer.LottieAnimation', None):
+        with pytest.raises(ValueError, match="不支持将 .tgs 格式"):
+            await convertToGif("/path/to/sticker.tgs")
 
 
 @pytest.mark.asyncio
@@ -99,66 +104,106 @@ async def test_convert_to_gif_unsupported_format():
         await convertToGif("/path/to/sticker.jpg")
 
 
-@pytest.mark.asyncio
-async def test_convert_to_gif_webp_static():
-    """静态 WebP 转换（fps=1）"""
-    # Mock subprocess: probe + palettegen + paletteuse
-    probe_proc = MagicMock()
-    probe_proc.communicate = AsyncMock(
-        return_value=(b"", b"frame=    1 ... Video: vp9, yuv420p, 100x100")
+def _staticWebP(w, h):
+    """构造 VP8L（无损静态）WebP 文件头"""
+    bits = (w - 1) | ((h - 1) << 14)
+    return b"RIFF" + b"\x00" * 4 + b"WEBP" + b"VP8L" + b"\x00" * 4 + b"\x2f" + bits.to_bytes(4, "little") + b"\x00" * 8
+
+
+def _webmHeader(w, h):
+    """构造只含 Segment → Tracks → TrackEntry → Video 尺寸的最小 WebM 头"""
+    video = b"\xb0\x82" + w.to_bytes(2, "big") + b"\xba\x82" + h.to_bytes(2, "big")
+    trackEntry = b"\xe0" + bytes([0x80 | len(video)]) + video
+    tracks = b"\xae" + bytes([0x80 | len(trackEntry)]) + trackEntry
+    segment = b"\x16\x54\xae\x6b" + bytes([0x80 | len(tracks)]) + tracks
+    return b"\x1a\x45\xdf\xa3\x80" + b"\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff" + segment
+
+
+def test_probe_sticker_webp(tmp_path):
+    """WebP：VP8L 静态尺寸、VP8X 动画标志"""
+    static = tmp_path / "s.webp"
+    static.write_bytes(_staticWebP(100, 120))
+    assert _probeSticker(str(static)) == (100, 120, False)
+
+    animated = tmp_path / "a.webp"
+    animated.write_bytes(
+        b"RIFF" + b"\x00" * 4 + b"WEBP" + b"VP8X" + b"\x0a\x00\x00\x00" + b"\x02\x00\x00\x00"
+        + (511).to_bytes(3, "little") + (255).to_bytes(3, "little")
     )
-    probe_proc.returncode = 0
+    assert _probeSticker(str(animated)) == (512, 256, True)
 
-    proc1 = MagicMock()
-    proc1.communicate = AsyncMock(return_value=(b"", b""))
-    proc1.returncode = 0
 
-    proc2 = MagicMock()
-    proc2.communicate = AsyncMock(return_value=(b"", b""))
-    proc2.returncode = 0
+def test_probe_sticker_webm_and_fallback(tmp_path):
+    """WebM：从 Video 元素读尺寸；无法解析时按 512x512 动态处理"""
+    webm = tmp_path / "v.webm"
+    webm.write_bytes(_webmHeader(512, 384))
+    assert _probeSticker(str(webm)) == (512, 384, True)
 
-    procs = [probe_proc, proc1, proc2]
-    proc_iter = iter(procs)
+    broken = tmp_path / "b.webp"
+    broken.write_bytes(b"not a webp")
+    assert _probeSticker(str(broken)) == (512, 512, True)
 
-    async def mock_create_subprocess(*args, **kwargs):
-        return next(proc_iter)
+
+@pytest.mark.asyncio
+async def test_convert_to_gif_webp_static(tmp_path):
+    """静态小 WebP：单次 ffmpeg 调用，fps=1，bayer 抖动"""
+    inputPath = tmp_path / "sticker.webp"
+    inputPath.write_bytes(_staticWebP(100, 100))
+
+    proc = MagicMock()
+    proc.communicate = AsyncMock(return_value=(b"", b""))
+    proc.returncode = 0
 
     with patch('utils.stickerDownloader.FFMPEG', "/path/to/ffmpeg"):
-        with patch('utils.stickerDownloader.asyncio.create_subprocess_exec', side_effect=mock_create_subprocess):
-            with patch('utils.stickerDownloader.tempfile.TemporaryDirectory') as mock_tmp:
-                mock_tmp.return_value.__enter__ = MagicMock(return_value="/tmp/fake")
-                mock_tmp.return_value.__exit__ = MagicMock(return_value=None)
-                result = await convertToGif("/path/to/sticker.webp")
+        with patch('utils.stickerDownloader.asyncio.create_subprocess_exec', new=AsyncMock(return_value=proc)) as mock_exec:
+            result = await convertToGif(str(inputPath))
 
     assert result.endswith(".gif")
+    mock_exec.assert_awaited_once()
+    args = mock_exec.call_args.args
+    graph = args[args.index("-filter_complex") + 1]
+    assert graph.startswith("[0:v]fps=1,")
+    assert "split" in graph and "palettegen" in graph and "dither=bayer" in graph
 
 
 @pytest.mark.asyncio
-async def test_convert_to_gif_palettegen_failure():
-    """palettegen 失败抛出 RuntimeError"""
-    probe_proc = MagicMock()
-    probe_proc.communicate = AsyncMock(
-        return_value=(b"", b"frame=  100 ... Video: vp9, yuv420p, 512x512")
-    )
-    probe_proc.returncode = 0
+async def test_convert_to_gif_failure(tmp_path):
+    """ffmpeg 失败抛出 RuntimeError；WebM 按动态帧率、大尺寸抖动"""
+    inputPath = tmp_path / "sticker.webm"
+    inputPath.write_bytes(_webmHeader(512, 512))
 
-    proc1 = MagicMock()
-    proc1.communicate = AsyncMock(return_value=(b"", b"palettegen error"))
-    proc1.returncode = 1  # 失败
+    proc = MagicMock()
+    proc.communicate = AsyncMock(return_value=(b"", b"palettegen error"))
+    proc.returncode = 1  # 失败
 
-    procs = [probe_proc, proc1]
-    proc_iter = iter(procs)
+    with patch('utils.stickerDownloader.FFMPEG', "/path/to/ffmpeg"):
+        with patch('utils.stickerDownloader.asyncio.create_subprocess_exec', new=AsyncMock(return_value=proc)) as mock_exec:
+            with pytest.raises(RuntimeError, match="palettegen error"):
+                await convertToGif(str(inputPath))
 
-    async def mock_create_subprocess(*args, **kwargs):
-        return next(proc_iter)
+    args = mock_exec.call_args.args
+    graph = args[args.index("-filter_complex") + 1]
+    assert graph.startswith(f"[0:v]fps={MAX_GIF_FPS},") and "sierra2_4a" in graph
+
+
+@pytest.mark.asyncio
+async def test_convert_to_gif_cancel_kills_ffmpeg(tmp_path):
+    """转换被取消时 kill 掉 ffmpeg 进程"""
+    inputPath = tmp_path / "sticker.webm"
+    inputPath.write_bytes(_webmHeader(512, 512))
+
+    proc = MagicMock()
+    proc.communicate = AsyncMock(side_effect=asyncio.CancelledError)
+    proc.returncode = None
+    proc.wait = AsyncMock()
 
     with patch('utils.stickerDownloader.FFMPEG', "/path/to/ffmpeg"):
-        with patch('utils.stickerDownloader.asyncio.create_subprocess_exec', side_effect=mock_create_subprocess):
-            with patch('utils.stickerDownloader.tempfile.TemporaryDirectory') as mock_tmp:
-                mock_tmp.return_value.__enter__ = MagicMock(return_value="/tmp/fake")
-                mock_tmp.return_value.__exit__ = MagicMock(return_value=None)
-                with pytest.raises(RuntimeError):
-                    await convertToGif("/path/to/sticker.webp")
+        with patch('utils.stickerDownloader.asyncio.create_subprocess_exec', new=AsyncMock(return_value=proc)):
+            with pytest.raises(asyncio.CancelledError):
+                await convertToGif(str(inputPath))
+
+    proc.kill.assert_called_once()
+    proc.wait.assert_awaited_once()
 
 
 # ============================================================================
@@ -290,16 +335,15 @@ async def test_create_sticker_zip_basic(tmp_path):
         return {"ok": True, "converted": False}
 
     with patch('utils.stickerDownloader.downloadEachOne', side_effect=mock_download):
-        with patch('utils.stickerDownloader.createZip', return_value=str(tmp_path / "test.zip")):
-            with patch('utils.stickerDownloader.shutil.rmtree') as mock_rmtree:
-                with patch('utils.stickerDownloader.logAction', new_callable=AsyncMock):
-                    result = await createStickerZip(
-                        bot=mock_bot,
-                        stickerSet=mock_sticker_set,
-                        setName="test_set",
-                        stickerSuffix="webp",
-                        outputDir=str(tmp_path)
-                    )
+        with patch('utils.stickerDownloader.shutil.rmtree') as mock_rmtree:
+            with patch('utils.stickerDownloader.logAction', new_callable=AsyncMock):
+                result = await createStickerZip(
+                    bot=mock_bot,
+                    stickerSet=mock_sticker_set,
+                    setName="test_set",
+                    stickerSuffix="webp",
+                    outputDir=str(tmp_path)
+                )
 
     assert result.endswith(".zip")
     # 验证清理临时目录
@@ -325,16 +369,15 @@ async def test_create_sticker_zip_gif_counter(tmp_path):
     initial_count = getActiveGifJobs()
 
     with patch('utils.stickerDownloader.downloadEachOne', side_effect=mock_download):
-        with patch('utils.stickerDownloader.createZip', return_value=str(tmp_path / "test.zip")):
-            with patch('utils.stickerDownloader.shutil.rmtree'):
-                with patch('utils.stickerDownloader.logAction', new_callable=AsyncMock):
-                    await createStickerZip(
-                        bot=mock_bot,
-                        stickerSet=mock_sticker_set,
-                        setName="test_set",
-                        stickerSuffix="gif",
-                        outputDir=str(tmp_path)
-                    )
+        with patch('utils.stickerDownloader.shutil.rmtree'):
+            with patch('utils.stickerDownloader.logAction', new_callable=AsyncMock):
+                await createStickerZip(
+                    bot=mock_bot,
+                    stickerSet=mock_sticker_set,
+                    setName="test_set",
+                    stickerSuffix="gif",
+                    outputDir=str(tmp_path)
+                )
 
     # 任务结束后计数恢复
     assert getActiveGifJobs() == initial_count
@@ -366,6 +409,47 @@ async def test_create_sticker_zip_cleanup_on_exception(tmp_path):
                         outputDir=str(tmp_path)
                     )
 
+    # 写了一半的 zip 被删除
+    assert not any(name.endswith(".zip") for name in os.listdir(tmp_path))
+
+
+@pytest.mark.asyncio
+async def test_create_sticker_zip_streams_files(tmp_path):
+    """每张 sticker 就绪即写入 zip 并删除；已压缩格式以 stored 方式存入"""
+    stickers = []
+    for i in range(3):
+        sticker = MagicMock()
+        sticker.file_id = f"file_id_{i}"
+        stickers.append(sticker)
+
+    mock_sticker_set = MagicMock()
+    mock_sticker_set.stickers = stickers
+
+    written = []
+
+    async def mock_download(bot, fileID, outPath, *args, **kwargs):
+        with open(outPath, "wb") as f:
+            f.write(b"webp-data")
+        written.append(outPath)
+        return {"ok": True, "converted": False, "path": outPath}
+
+    with patch('utils.stickerDownloader.downloadEachOne', side_effect=mock_download):
+        with patch('utils.stickerDownloader.logAction', new_callable=AsyncMock):
+            result = await createStickerZip(
+                bot=MagicMock(),
+                stickerSet=mock_sticker_set,
+                setName="test_set",
+                stickerSuffix="webp",
+                outputDir=str(tmp_path)
+            )
+
+    assert not any(os.path.exists(path) for path in written)
+    with zipfile.ZipFile(result) as zf:
+        infos = zf.infolist()
+        assert sorted(info.filename for info in infos) == ["1.webp", "2.webp", "3.webp"]
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in infos)
+        assert zf.read("1.webp") == b"webp-data"
+
 # ============================================================================
 # deleteLater() 测试
 # ============================================================================
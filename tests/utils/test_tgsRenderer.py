@@ -0,0 +1,131 @@
+"""
+tests/utils/test_tgsRenderer.py
+
+测试 utils/tgsRenderer.py TGS 逐帧渲染，以及 convertToGif 的 .tgs 路径。
+
+rlottie-python 是可选依赖，这里用 _FakeAnimation 代替 LottieAnimation，只验证规划与接线。
+
+验证：
+    - 帧率不超过上限；帧数超限时降帧率、保持时长
+    - 尺寸按长边缩放并取偶数
+    - close 后不能再渲染；closeTgs 在线程中释放
+    - convertToGif(.tgs)：原始帧经 stdin 喂给 ffmpeg，滤镜含 unpremultiply
+    - 未安装 rlottie 时 .tgs 转换给出友好错误
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+import utils.stickerDownloader as stickerDownloader
+import utils.tgsRenderer as tgsRenderer
+from utils.tgsRenderer import TgsFrames, fitSize, planFrames
+
+
+class _FakeAnimation:
+    """模拟 rlottie_python.LottieAnimation：60fps、3 秒、512x512"""
+
+    destroyed = 0
+
+    @classmethod
+    def from_tgs(cls, path):
+        return cls()
+
+    def lottie_animation_get_size(self):
+        return 512, 512
+
+    def lottie_animation_get_totalframe(self):
+        return 180
+
+    def lottie_animation_get_framerate(self):
+        return 60.0
+
+    def lottie_animation_render(self, frame_num, width, height):
+        return bytes([frame_num % 256]) * (width * height * 4)
+
+    def lottie_animation_destroy(self):
+        _FakeAnimation.destroyed += 1
+
+
+# ============================================================================
+# 规划
+# ============================================================================
+
+def test_plan_frames_caps_fps():
+    fps, indices = planFrames(180, 60.0, maxFps=24, maxFrames=1000)
+    assert fps == 24 and len(indices) == 72
+    assert indices[0] == 0 and indices[-1] < 180
+
+
+def test_plan_frames_caps_count_keeps_duration():
+    fps, indices = planFrames(180, 60.0, maxFps=24, maxFrames=30)
+    assert len(indices) == 30 and fps == 10        # 3 秒 30 帧
+
+
+def test_plan_frames_invalid_animation():
+    assert planFrames(0, 60.0, maxFps=24, maxFrames=30) == (1.0, [0])
+
+
+def test_fit_size():
+    assert fitSize(512, 512, 256) == (256, 256)
+    assert fitSize(512, 301, 512) == (512, 300)
+    assert fitSize(100, 100, 512) == (100, 100)
+
+
+def test_frames_close():
+    with patch.object(tgsRenderer, "LottieAnimation", _FakeAnimation):
+        frames = TgsFrames("x.tgs", maxSize=64, maxFps=24, maxFrames=90)
+        assert len(frames.render(0)) == 64 * 64 * 4
+        frames.close()
+        frames.close()
+        with pytest.raises(RuntimeError):
+            frames.render(1)
+    assert _FakeAnimation.destroyed >= 1
+
+
+# ============================================================================
+# convertToGif(.tgs)
+# ============================================================================
+
+@pytest.mark.asyncio
+async def test_convert_tgs_feeds_raw_frames(tmp_path):
+    inputPath = tmp_path / "sticker.tgs"
+    inputPath.write_bytes(b"\x1f\x8b")
+
+    written = []
+    proc = MagicMock()
+    proc.returncode = 0
+    proc.stdin.write = lambda data: written.append(len(data))
+    proc.stdin.drain = AsyncMock()
+    proc.stderr.read = AsyncMock(return_value=b"")
+    proc.wait = AsyncMock()
+
+    with patch.object(tgsRenderer, "LottieAnimation", _FakeAnimation), \
+         patch.object(stickerDownloader, "FFMPEG", "/path/to/ffmpeg"), \
+         patch.object(stickerDownloader, "TGS_RENDER_MAX_SIZE", 64), \
+         patch.object(stickerDownloader.asyncio, "create_subprocess_exec", new=AsyncMock(return_value=proc)) as mockExec:
+        result = await stickerDownloader.convertToGif(str(inputPath))
+
+    assert result.endswith(".gif")
+    args = mockExec.call_args.args
+    assert args[args.index("-s") + 1] == "64x64"
+    assert args[args.index("-framerate") + 1] == "24.0"
+    assert args[args.index("-filter_complex") + 1].startswith("[0:v]unpremultiply=inplace=1,fps=24.0,")
+    assert written == [64 * 64 * 4] * 72
+    proc.stdin.close.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_close_tgs_runs_in_thread():
+    """closeTgs 经 to_thread 释放，不在事件循环里等渲染锁"""
+    frames = MagicMock()
+    with patch.object(tgsRenderer.asyncio, "to_thread", new=AsyncMock()) as mockThread:
+        await tgsRenderer.closeTgs(frames)
+    mockThread.assert_awaited_once_with(frames.close)
+
+
+@pytest.mark.asyncio
+async def test_convert_tgs_without_rlottie():
+    with patch.object(tgsRenderer, "LottieAnimation", None):
+        with pytest.raises(ValueError, match="rlottie-python"):
+            await stickerDownloader.convertToGif("/path/to/sticker.tgs")
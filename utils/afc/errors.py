@@ -17,3 +17,12 @@ class ToolDependencyError(AFCError):
     工具遇到外部依赖不可用时应抛此异常，executor 会捕获并返回降级响应。
     """
     pass
+
+
+class ToolBusyError(AFCError):
+    """
+    工具并发已满（含超时后仍未结束的孤儿线程 / 进程）。
+
+    由 workerPool 在拒绝新调用时抛出，executor 统一转为 FUNCTION_ERROR。
+    """
+    pass
@@ -13,7 +13,15 @@ import inspect
 
 from utils.core.logger import logSystemEvent, LogLevel
 
-from utils.afc.registry import getToolsSchema, getToolCallable, getAllToolNames
+from utils.afc.registry import (
+    getToolsSchema,
+    getToolCallable,
+    getAllToolNames,
+    getToolCachePolicy,
+    getToolExecPolicy,
+)
+from utils.afc.resultCache import makeCacheKey, getCachedResult, storeResult
+from utils.afc.workerPool import runSyncTool
 
 
 # 单次工具执行的超时（秒）；防止某个 skill 卡死整条回复链
@@ -92,18 +100,30 @@ async def execute(actionJSON: str) -> str:
     params = _coerceParameters(action)
     try:
         sig = inspect.signature(func)
-        sig.bind(**params)
+        bound = sig.bind(**params)
     except TypeError as e:
         return f"<FUNCTION_ERROR>参数不匹配：{e}</FUNCTION_ERROR>"
 
-    # ── 5. 执行（带超时）──
+    # ── 5. 查结果缓存（仅声明了 @afcCacheable 的函数）──
+    qualName = f"{toolName}.{funcName}"
+    cachePolicy = getToolCachePolicy(toolName, funcName)
+    cacheKey = None
+    if cachePolicy:
+        bound.apply_defaults()
+        cacheKey = makeCacheKey(bound.arguments)
+        hit, cached = getCachedResult(qualName, cacheKey)
+        if hit:
+            await logSystemEvent("AFC 缓存命中", qualName)
+            return f"<FUNCTION_RESULT>{cached}</FUNCTION_RESULT>"
+
+    # ── 6. 执行（带超时）──
     try:
         if inspect.iscoroutinefunction(func):
             result = await asyncio.wait_for(func(**params), timeout=_TOOL_TIMEOUT_SECONDS)
         else:
-            # 同步函数丢到线程池，避免阻塞事件循环
+            # 同步函数交给 AFC 专用池（与默认线程池隔离，带并发上限与孤儿计数）
             result = await asyncio.wait_for(
-                asyncio.to_thread(func, **params),
+                runSyncTool(qualName, func, params, getToolExecPolicy(toolName, funcName)),
                 timeout=_TOOL_TIMEOUT_SECONDS,
             )
     except asyncio.TimeoutError:
@@ -113,5 +133,8 @@ async def execute(actionJSON: str) -> str:
         await logSystemEvent("AFC 执行异常", f"{toolName}.{funcName}：{e}", LogLevel.ERROR)
         return f"<FUNCTION_ERROR>{e}</FUNCTION_ERROR>"
 
+    if cacheKey is not None:
+        storeResult(qualName, cacheKey, result, cachePolicy)
+
     await logSystemEvent("AFC 执行成功", f"{toolName}.{funcName}")
     return f"<FUNCTION_RESULT>{result}</FUNCTION_RESULT>"
@@ -13,11 +13,16 @@ import inspect
 from pathlib import Path
 from typing import get_type_hints, get_origin, get_args
 
+from utils.afc.resultCache import getCachePolicy
+from utils.afc.workerPool import getExecPolicy, checkProcessIsolation
+
 
 # ── 工具 schema 缓存 ──────────────────────────────
 
 _toolsSchema: dict[str, dict] = {}  # {tool_name: schema}
 _toolsCallable: dict[str, dict[str, callable]] = {}  # {tool_name: {func_name: callable}}
+_toolsCachePolicy: dict[str, dict[str, dict]] = {}  # {tool_name: {func_name: {"ttl", "maxSize"}}}，仅含声明了 @afcCacheable 的函数
+_toolsExecPolicy: dict[str, dict[str, dict]] = {}  # {tool_name: {func_name: {"maxConcurrency", "isolateProcess"}}}，仅含声明了 @afcExecution 的函数
 _schemaBuilt = False
 
 
@@ -189,6 +194,8 @@ def _scanTools():
         # 扫描模块中的公开函数（不以 _ 开头）
         toolCallables = {}
         toolSchemas = []
+        toolCachePolicies = {}
+        toolExecPolicies = {}
 
         for name, obj in inspect.getmembers(toolModule, inspect.isfunction):
             if name.startswith("_"):
@@ -205,6 +212,18 @@ def _scanTools():
             toolSchemas.append(schema)
             toolCallables[name] = obj
 
+            # 读取 @afcCacheable 声明（默认不缓存）
+            policy = getCachePolicy(obj)
+            if policy:
+                toolCachePolicies[name] = policy
+
+            # 读取 @afcExecution 声明（同步函数的并发上限 / 进程隔离）
+            execPolicy = getExecPolicy(obj)
+            if execPolicy:
+                if execPolicy["isolateProcess"]:
+                    checkProcessIsolation(obj, f"{toolName}.{name}")
+                toolExecPolicies[name] = execPolicy
+
         # 存储到缓存
         if toolSchemas:
             _toolsSchema[toolName] = {
@@ -212,6 +231,8 @@ def _scanTools():
                 "functions": toolSchemas,
             }
             _toolsCallable[toolName] = toolCallables
+            _toolsCachePolicy[toolName] = toolCachePolicies
+            _toolsExecPolicy[toolName] = toolExecPolicies
 
     _schemaBuilt = True
 
@@ -263,6 +284,40 @@ def getToolCallable(toolName: str, funcName: str) -> callable | None:
 
 
 
+def getToolCachePolicy(toolName: str, funcName: str) -> dict | None:
+    """
+    返回工具函数的结果缓存策略
+
+    参数:
+        toolName: 工具名
+        funcName: 函数名
+
+    返回:
+        {"ttl": 秒, "maxSize": 条数}；未声明 @afcCacheable 时返回 None
+    """
+    _scanTools()
+    return _toolsCachePolicy.get(toolName, {}).get(funcName)
+
+
+
+
+def getToolExecPolicy(toolName: str, funcName: str) -> dict | None:
+    """
+    返回同步工具函数的执行策略
+
+    参数:
+        toolName: 工具名
+        funcName: 函数名
+
+    返回:
+        {"maxConcurrency": n, "isolateProcess": bool}；未声明 @afcExecution 时返回 None
+    """
+    _scanTools()
+    return _toolsExecPolicy.get(toolName, {}).get(funcName)
+
+
+
+
 def getAllToolNames() -> set[str]:
     """
     返回所有已注册的工具名
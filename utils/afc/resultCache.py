@@ -0,0 +1,154 @@
+"""
+utils/afc/resultCache.py
+
+AFC 工具结果缓存（按工具声明、默认关闭）
+
+工具函数用 @afcCacheable(ttl=..., maxSize=...) 声明可缓存；registry._scanTools
+扫描时读取声明，executor 在参数绑定后按"规范化参数"查 / 写缓存：
+    - 键：绑定后的完整参数（补齐默认值、字符串去首尾空白），json.dumps(sort_keys=True)
+    - 每个函数独立一份 LRU，条数上限 maxSize，条目 TTL 到期即失效
+    - 只缓存正常结果；工具入口返回的 "错误：..." 文本与异常 / 超时都不缓存
+
+装饰器只在函数对象上挂一个属性，不包装函数，签名 / __module__ / docstring
+原样保留，schema 生成与 registry 的模块过滤不受影响。
+
+本模块不 import registry / toolManager，toolManager 可反向引用这里的统计。
+"""
+
+import json
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+# 函数对象上的缓存声明属性名
+_CACHE_POLICY_ATTR = "__afcCachePolicy__"
+
+# 工具入口出错时约定返回的前缀（见 docs/afc-error-handling.md），不缓存
+_TOOL_ERROR_PREFIX = "错误："
+
+_DEFAULT_MAX_SIZE = 128
+
+
+# ── 模块状态 ──────────────────────────────────────
+
+_caches: dict[str, OrderedDict] = {}       # {"tool.func": OrderedDict(key -> (expiresAt, result))}
+_stats: dict[str, dict[str, int]] = {}     # {"tool.func": {"hits": n, "misses": n, "evictions": n}}
+
+
+
+
+def afcCacheable(ttl: float, maxSize: int = _DEFAULT_MAX_SIZE):
+    """
+    声明工具函数的结果可缓存。
+
+    参数:
+        ttl: 条目存活秒数（必须 > 0）
+        maxSize: 该函数最多缓存的条目数（必须 > 0）
+
+    只适用于结果仅由参数决定的函数；依赖当前时间 / 外部状态的函数不要加。
+    """
+    if ttl <= 0 or maxSize <= 0:
+        raise ValueError("afcCacheable 的 ttl 和 maxSize 必须为正数")
+
+    def decorator(func):
+        setattr(func, _CACHE_POLICY_ATTR, {"ttl": float(ttl), "maxSize": int(maxSize)})
+        return func
+
+    return decorator
+
+
+def getCachePolicy(func) -> Optional[dict]:
+    """读取函数上的缓存声明，未声明返回 None"""
+    policy = getattr(func, _CACHE_POLICY_ATTR, None)
+    return policy if isinstance(policy, dict) else None
+
+
+
+
+def _normalizeValue(value):
+    """参数值规范化：字符串去首尾空白，容器递归处理"""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (list, tuple)):
+        return [_normalizeValue(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _normalizeValue(v) for k, v in value.items()}
+    return value
+
+
+def makeCacheKey(boundArguments: dict) -> str:
+    """由绑定（已补齐默认值）后的参数生成缓存键"""
+    normalized = {name: _normalizeValue(value) for name, value in boundArguments.items()}
+    return json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def _statsFor(qualName: str) -> dict[str, int]:
+    return _stats.setdefault(qualName, {"hits": 0, "misses": 0, "evictions": 0})
+
+
+
+
+def getCachedResult(qualName: str, key: str):
+    """
+    查询缓存。
+
+    返回:
+        (True, result) 命中；(False, None) 未命中或已过期
+    """
+    cache = _caches.get(qualName)
+    entry = cache.get(key) if cache is not None else None
+
+    if entry is not None:
+        expiresAt, result = entry
+        if expiresAt > time.monotonic():
+            cache.move_to_end(key)
+            _statsFor(qualName)["hits"] += 1
+            return True, result
+        del cache[key]
+
+    _statsFor(qualName)["misses"] += 1
+    return False, None
+
+
+def storeResult(qualName: str, key: str, result, policy: dict) -> bool:
+    """
+    写入缓存（超出 maxSize 时淘汰最久未使用的条目）。
+
+    返回:
+        是否写入（错误文本不写入）
+    """
+    if isinstance(result, str) and result.startswith(_TOOL_ERROR_PREFIX):
+        return False
+
+    cache = _caches.setdefault(qualName, OrderedDict())
+    cache[key] = (time.monotonic() + policy["ttl"], result)
+    cache.move_to_end(key)
+
+    while len(cache) > policy["maxSize"]:
+        cache.popitem(last=False)
+        _statsFor(qualName)["evictions"] += 1
+    return True
+
+
+
+
+def getCacheStats() -> dict[str, dict[str, int]]:
+    """
+    返回各函数的缓存统计快照。
+
+    返回:
+        {"tool.func": {"hits": n, "misses": n, "evictions": n, "size": n}}
+    """
+    snapshot = {}
+    for qualName in set(_stats) | set(_caches):
+        entry = dict(_statsFor(qualName))
+        entry["size"] = len(_caches.get(qualName, ()))
+        snapshot[qualName] = entry
+    return snapshot
+
+
+def clearResultCache() -> None:
+    """清空所有缓存条目与统计（工具重载 / 测试用）"""
+    _caches.clear()
+    _stats.clear()
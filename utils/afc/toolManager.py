@@ -19,6 +19,8 @@ AFC 工具状态管理器。
 - 本模块不 import afcIntent / registry，保持单向依赖，避免循环。
 - isAfcToolEnabled() 只读 JSON 状态文件，不 import 任何工具代码。
 - getAllAfcTools() 也只读三个 JSON + 扫描目录发现 local-draft，不 import 工具代码。
+- getAfcCacheStats() / getAfcPoolStats() 转发 resultCache / workerPool 的运行统计
+  （两者都不依赖本模块）。
 """
 
 import os
@@ -26,6 +28,9 @@ import json
 
 from config import PROJECT_ROOT
 
+from utils.afc.resultCache import getCacheStats
+from utils.afc.workerPool import getPoolStats
+
 
 # ── 状态文件路径 ──────────────────────────────────
 
@@ -149,6 +154,37 @@ def isAfcToolEnabled(toolName: str) -> bool:
 
 
 
+def getAfcCacheStats() -> dict:
+    """
+    返回 AFC 工具结果缓存的命中统计（仅本进程内存态）。
+
+    返回格式：
+    {
+      "calc.calculate": {"hits": 3, "misses": 5, "evictions": 0, "size": 5},
+      ...
+    }
+    只包含声明了 @afcCacheable 且至少被调用过一次的函数。
+    """
+    return getCacheStats()
+
+
+def getAfcPoolStats() -> dict:
+    """
+    返回同步工具执行池的占用情况（仅本进程内存态）。
+
+    返回格式：
+    {
+      "someTool.heavyFunc": {"inFlight": 2, "orphans": 1},
+      ...
+    }
+    orphans 为超时后调用方已放弃、但线程 / 进程仍未结束的任务数，
+    它们同样计入 inFlight，占用该函数的并发名额。空闲的函数不出现。
+    """
+    return getPoolStats()
+
+
+
+
 def getAllAfcTools() -> dict:
     """
     返回所有工具（builtin + custom + local-draft），合并后用于 CLI 展示。
@@ -4,9 +4,13 @@ utils/afc/tools/calc/__init__.py
 计算器工具
 """
 
+from utils.afc.resultCache import afcCacheable
+
 from . import calculator
 
 
+# 纯函数：结果只由表达式决定，可放心缓存
+@afcCacheable(ttl=3600, maxSize=256)
 async def calculate(expression: str) -> str:
     """
     计算数学表达式。
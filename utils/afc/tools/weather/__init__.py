@@ -52,28 +52,25 @@ async def getWeather(city: str, date: str = "today") -> str:
     if targetDateOffset is None:
         return f"错误：不支持的日期参数（{date}），仅支持 today/明天/后天 或 YYYY-MM-DD 格式（未来 0-2 天）"
 
-    # 检查缓存
+    # 查缓存 / 调用 API（并发查询同一城市共享一次请求，过期条目先返回旧数据并后台刷新）
     cacheKey = cache.getCacheKey(city, targetDateOffset)
-    cachedData = cache.getFromCache(cacheKey)
-    if cachedData is not None:
-        await logSystemEvent(
-            "weather_cache_hit",
-            f"天气缓存命中：{city}, offset={targetDateOffset}"
-        )
-        return formatter.formatWeatherResponse(cachedData, targetDateOffset)
-
-    # 调用 API
     try:
-        data = await client.fetchWeather(city, targetDateOffset)
-
-        # 保存到缓存
-        cache.saveToCache(cacheKey, data)
-
-        await logSystemEvent(
-            "weather_api_success",
-            f"天气查询成功：{city}, offset={targetDateOffset}"
+        data, source = await cache.fetchWithCache(
+            cacheKey,
+            lambda: client.fetchWeather(city, targetDateOffset),
         )
 
+        if source == "fetched":
+            await logSystemEvent(
+                "weather_api_success",
+                f"天气查询成功：{city}, offset={targetDateOffset}"
+            )
+        else:
+            await logSystemEvent(
+                "weather_cache_hit",
+                f"天气缓存命中（{source}）：{city}, offset={targetDateOffset}"
+            )
+
         return formatter.formatWeatherResponse(data, targetDateOffset)
 
     except ValueError as e:
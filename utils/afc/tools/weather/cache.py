@@ -1,17 +1,32 @@
 """
 天气数据缓存。
 
-基于内存的 TTL 缓存，避免短时间内重复查询同一城市。
+基于内存的 TTL 缓存，避免短时间内重复查询同一城市：
+    - 有界 LRU：最多 WEATHER_CACHE_MAX_ENTRIES 条，超出时淘汰最久未用的城市 / 日期
+    - 定期清扫：写入时每隔 WEATHER_CACHE_SWEEP_INTERVAL 秒顺带删掉彻底过期的条目，
+      不再依赖"同一个 key 过期后被再次读取"才删除
+    - 请求合并：同一 key 同时只有一个 fetchWeather 在跑，并发查询共享它的结果
+    - stale-while-revalidate：过期不超过 WEATHER_CACHE_STALE_TTL 的条目直接返回，
+      同时在后台刷新；超过这个窗口才同步等待 API
 """
 
+import asyncio
 import time
-from typing import Dict, Tuple, Any, Optional
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from utils.core.logger import logSystemEvent
 
 from . import config
 
 
-# 缓存存储
-_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+# 缓存存储：key -> (写入时间, API 响应)，按最近使用排序
+_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+# 正在进行的 API 请求：key -> Task（请求合并 / 后台刷新共用）
+_inflight: Dict[str, asyncio.Task] = {}
+
+_lastSweep = 0.0
 
 
 
@@ -34,6 +49,27 @@ def getCacheKey(city: str, targetDateOffset: int) -> str:
     return f"{city.lower()}:{targetDateOffset}"
 
 
+def _lookup(cacheKey: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """
+    查找条目。
+
+    返回：
+        (数据, 是否新鲜)；不存在或已超出 stale 窗口时返回 (None, False)
+    """
+    item = _cache.get(cacheKey)
+    if item is None:
+        return None, False
+
+    cachedTs, cachedData = item
+    age = time.time() - cachedTs
+    if age >= config.WEATHER_CACHE_TTL + config.WEATHER_CACHE_STALE_TTL:
+        del _cache[cacheKey]
+        return None, False
+
+    _cache.move_to_end(cacheKey)
+    return cachedData, age < config.WEATHER_CACHE_TTL
+
+
 def getFromCache(cacheKey: str) -> Optional[Dict[str, Any]]:
     """
     从缓存获取数据。
@@ -42,17 +78,10 @@ def getFromCache(cacheKey: str) -> Optional[Dict[str, Any]]:
         cacheKey: 缓存 key
 
     返回：
-        缓存的 API 响应 dict，或 None（未命中或已过期）
+        缓存的 API 响应 dict，或 None（未命中或已过期；过期条目仍保留供 stale 返回）
     """
-    if cacheKey in _cache:
-        cachedTs, cachedData = _cache[cacheKey]
-        if time.time() - cachedTs < config.WEATHER_CACHE_TTL:
-            return cachedData
-
-        # 过期则删除
-        del _cache[cacheKey]
-
-    return None
+    data, fresh = _lookup(cacheKey)
+    return data if fresh else None
 
 
 def saveToCache(cacheKey: str, data: Dict[str, Any]) -> None:
@@ -63,12 +92,98 @@ def saveToCache(cacheKey: str, data: Dict[str, Any]) -> None:
         cacheKey: 缓存 key
         data: API 响应 dict
     """
-    _cache[cacheKey] = (time.time(), data)
+    now = time.time()
+    _cache[cacheKey] = (now, data)
+    _cache.move_to_end(cacheKey)
+
+    _sweep(now)
+    while len(_cache) > config.WEATHER_CACHE_MAX_ENTRIES:
+        _cache.popitem(last=False)
+
+
+def _sweep(now: float) -> None:
+    """每隔 WEATHER_CACHE_SWEEP_INTERVAL 秒删掉超出 stale 窗口的条目"""
+    global _lastSweep
+    if now - _lastSweep < config.WEATHER_CACHE_SWEEP_INTERVAL:
+        return
+    _lastSweep = now
+
+    maxAge = config.WEATHER_CACHE_TTL + config.WEATHER_CACHE_STALE_TTL
+    for key in [k for k, (ts, _) in _cache.items() if now - ts >= maxAge]:
+        del _cache[key]
 
 
 def clearCache() -> None:
     """
     清空所有缓存（用于测试）。
     """
+    global _lastSweep
     _cache.clear()
-    
\ No newline at end of file
+    _inflight.clear()
+    _lastSweep = 0.0
+
+
+
+
+# ==============================================================================
+# 请求合并 / stale-while-revalidate
+# ==============================================================================
+
+def _startFetch(cacheKey: str, fetch: Callable[[], Awaitable[Dict[str, Any]]]) -> asyncio.Task:
+    """同一 key 只启动一个请求，成功后写缓存；已有请求则直接复用"""
+    task = _inflight.get(cacheKey)
+    if task is not None and not task.done():
+        return task
+
+    async def _run() -> Dict[str, Any]:
+        try:
+            data = await fetch()
+            saveToCache(cacheKey, data)
+            return data
+        finally:
+            if _inflight.get(cacheKey) is task:
+                del _inflight[cacheKey]
+
+    task = asyncio.create_task(_run())
+    _inflight[cacheKey] = task
+    return task
+
+
+async def fetchWithCache(cacheKey: str, fetch: Callable[[], Awaitable[Dict[str, Any]]]) -> Tuple[Dict[str, Any], str]:
+    """
+    按缓存策略获取天气数据。
+
+    参数：
+        cacheKey: 缓存 key
+        fetch: 无参协程工厂，实际调用 API（如 lambda: client.fetchWeather(city, offset)）
+
+    返回：
+        (API 响应 dict, 来源)；来源为 "hit"（新鲜缓存）/ "stale"（过期缓存，后台刷新中）/
+        "fetched"（本次发起的请求）/ "shared"（复用了并发查询的请求）
+
+    异常：
+        fetch 抛出的异常原样透传（并发等待同一请求的调用方都会收到）
+    """
+    data, fresh = _lookup(cacheKey)
+    if data is not None:
+        if not fresh and cacheKey not in _inflight:
+            task = _startFetch(cacheKey, fetch)
+            task.add_done_callback(_reportRefreshFailure)
+        return data, "hit" if fresh else "stale"
+
+    shared = cacheKey in _inflight
+    task = _startFetch(cacheKey, fetch)
+    # shield：调用方超时 / 取消不会打断共享的请求
+    return await asyncio.shield(task), "shared" if shared else "fetched"
+
+
+def _reportRefreshFailure(task: asyncio.Task) -> None:
+    """后台刷新失败只记日志，旧数据继续在 stale 窗口内提供"""
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        asyncio.get_running_loop().create_task(logSystemEvent(
+            "weather_refresh_error",
+            f"天气缓存后台刷新失败：{type(exc).__name__}: {exc}"
+        ))
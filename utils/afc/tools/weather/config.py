@@ -21,7 +21,7 @@ WeatherAPI.com API 密钥，从 https://www.weatherapi.com/signup.aspx 免费注
 
 # 其他配置
 
-非敏感配置（API base URL、预报天数、超时、缓存 TTL）在此文件定义默认值，
+非敏感配置（API base URL、预报天数、超时、缓存 TTL / 容量）在此文件定义默认值，
 如需自定义可直接修改本文件常量（不建议通过环境变量覆盖）。
 """
 
@@ -54,3 +54,12 @@ WEATHER_HTTP_PROXY = os.getenv("WEATHER_HTTP_PROXY", None)
 
 # 缓存 TTL（秒），默认 10 分钟，避免短时间重复查询同一城市
 WEATHER_CACHE_TTL = 600
+
+# 过期后仍可直接返回旧数据的窗口（秒），期间后台刷新；超出后同步等待 API
+WEATHER_CACHE_STALE_TTL = 600
+
+# 缓存条数上限，超出时淘汰最久未用的城市 / 日期
+WEATHER_CACHE_MAX_ENTRIES = 256
+
+# 清扫超出 stale 窗口条目的最小间隔（秒），在写入缓存时顺带执行
+WEATHER_CACHE_SWEEP_INTERVAL = 300
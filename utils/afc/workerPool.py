@@ -0,0 +1,247 @@
+"""
+utils/afc/workerPool.py
+
+AFC 同步工具专用执行池
+
+同步工具函数以前走 asyncio.to_thread，与 Database.run、日志写入、归档任务共用
+默认线程池；超时只取消 await、不会终止线程，卡死的工具会一直占着默认池的线程。
+这里给 AFC 单独开池：
+    - 线程池：有界（_THREAD_POOL_SIZE），与默认线程池隔离
+    - 进程池：可选，工具用 @afcExecution(isolateProcess=True) 声明后在子进程运行，
+      CPU 密集的工具不再与事件循环争 GIL（函数和参数须可 pickle，registry 注册时检查函数）；
+      子进程用 forkserver（不支持时 spawn）启动，不 fork 正在运行事件循环、数据库线程、
+      AFC 线程池（可能还有超时未结束的工具线程）的 bot 进程，避免子进程继承被占用的锁而卡死
+    - 每个工具函数的并发上限（默认 _DEFAULT_MAX_CONCURRENCY，可用装饰器覆盖）
+    - 孤儿计数：超时后仍在运行的线程 / 进程任务计入该函数的占用，
+      直到真正结束；占用达到上限时新调用直接以 ToolBusyError 拒绝，
+      避免一个卡死的工具不断吃掉池里的线程
+
+池均为惰性创建，首次使用时向 resourceManager 注册关闭回调。
+"""
+
+import pickle
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
+from typing import Callable, Optional
+
+from utils.afc.errors import ToolBusyError
+
+
+_THREAD_POOL_SIZE = 4
+_PROCESS_POOL_SIZE = 2
+_DEFAULT_MAX_CONCURRENCY = 2
+
+# 函数对象上的执行声明属性名
+_EXEC_POLICY_ATTR = "__afcExecPolicy__"
+
+
+# ── 模块状态 ──────────────────────────────────────
+
+_threadPool: Optional[ThreadPoolExecutor] = None
+_processPool: Optional[ProcessPoolExecutor] = None
+_poolLock = threading.Lock()
+_shutdownRegistered = False
+
+# 以下计数在工作线程的 done 回调里也会修改，统一由 _countLock 保护
+_countLock = threading.Lock()
+_inFlight: dict[str, int] = {}   # {"tool.func": 已提交且未结束的任务数（含孤儿）}
+_orphans: dict[str, int] = {}    # {"tool.func": 调用方已放弃、但仍在运行的任务数}
+
+
+
+
+def afcExecution(maxConcurrency: Optional[int] = None, isolateProcess: bool = False):
+    """
+    声明同步工具函数的执行方式。
+
+    参数:
+        maxConcurrency: 该函数同时在跑的任务上限（含超时未结束的），默认 _DEFAULT_MAX_CONCURRENCY
+        isolateProcess: True 时在进程池中运行（适合 CPU 密集的工具）。
+            子进程以 forkserver / spawn 启动，函数按"模块名 + 限定名"pickle 后在子进程里重新 import，
+            因此必须是工具包里的模块级函数（不能是闭包、lambda、嵌套函数），参数与返回值也须可 pickle；
+            registry 注册工具时会检查函数能否 pickle，不能则抛 TypeError
+
+    与 @afcCacheable 相同，只挂属性、不包装函数。对 async 工具函数无效。
+    """
+    if maxConcurrency is not None and maxConcurrency <= 0:
+        raise ValueError("afcExecution 的 maxConcurrency 必须为正数")
+
+    def decorator(func):
+        setattr(func, _EXEC_POLICY_ATTR, {
+            "maxConcurrency": maxConcurrency or _DEFAULT_MAX_CONCURRENCY,
+            "isolateProcess": bool(isolateProcess),
+        })
+        return func
+
+    return decorator
+
+
+def getExecPolicy(func) -> Optional[dict]:
+    """读取函数上的执行声明，未声明返回 None"""
+    policy = getattr(func, _EXEC_POLICY_ATTR, None)
+    return policy if isinstance(policy, dict) else None
+
+
+def checkProcessIsolation(func, qualName: str) -> None:
+    """
+    检查声明了 isolateProcess 的函数能否提交到进程池（registry 注册时调用）。
+
+    异常:
+        TypeError: 函数无法 pickle（闭包、lambda、嵌套函数，或模块属性不是它本身）
+    """
+    try:
+        pickle.dumps(func)
+    except Exception as e:
+        raise TypeError(
+            f"工具 {qualName} 声明了 isolateProcess=True，但函数无法 pickle：{e}"
+            "（须为工具包中的模块级函数）"
+        ) from e
+
+
+
+
+def _getThreadPool() -> ThreadPoolExecutor:
+    global _threadPool
+    with _poolLock:
+        if _threadPool is None:
+            _threadPool = ThreadPoolExecutor(
+                max_workers=_THREAD_POOL_SIZE,
+                thread_name_prefix="afc-tool",
+            )
+            _registerShutdown()
+        return _threadPool
+
+
+def _processContext():
+    """进程池的启动方式：forkserver，平台不支持时（Windows）用 spawn；不用 fork"""
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def _getProcessPool() -> ProcessPoolExecutor:
+    global _processPool
+    with _poolLock:
+        if _processPool is None:
+            _processPool = ProcessPoolExecutor(
+                max_workers=_PROCESS_POOL_SIZE,
+                mp_context=_processContext(),
+            )
+            _registerShutdown()
+        return _processPool
+
+
+def _registerShutdown() -> None:
+    """首次建池时注册关闭回调（调用方已持有 _poolLock）"""
+    global _shutdownRegistered
+    if _shutdownRegistered:
+        return
+    from utils.core.resourceManager import getResourceManager
+    getResourceManager().register("AFC 工具执行池", shutdownPools, priority=5)
+    _shutdownRegistered = True
+
+
+async def shutdownPools() -> None:
+    """
+    关闭执行池（由 resourceManager 调用）。
+
+    不等待仍在运行的任务：卡死的工具线程不应拖住退出流程。
+    """
+    global _threadPool, _processPool
+    with _poolLock:
+        threadPool, processPool = _threadPool, _processPool
+        _threadPool = None
+        _processPool = None
+    if threadPool is not None:
+        threadPool.shutdown(wait=False, cancel_futures=True)
+    if processPool is not None:
+        processPool.shutdown(wait=False, cancel_futures=True)
+
+
+
+
+def _release(qualName: str, orphaned: bool) -> None:
+    with _countLock:
+        _inFlight[qualName] = max(0, _inFlight.get(qualName, 0) - 1)
+        if orphaned:
+            _orphans[qualName] = max(0, _orphans.get(qualName, 0) - 1)
+
+
+def _markOrphan(qualName: str, future: Future) -> None:
+    """调用方放弃等待（超时 / 取消）但任务仍在跑：计入孤儿，结束时再扣除"""
+    with _countLock:
+        _orphans[qualName] = _orphans.get(qualName, 0) + 1
+    future.add_done_callback(lambda _f: _release(qualName, orphaned=True))
+
+
+async def runSyncTool(qualName: str, func: Callable, params: dict, policy: Optional[dict] = None):
+    """
+    在 AFC 专用池中运行同步工具函数。
+
+    参数:
+        qualName: "tool.func"，用于并发计数
+        func: 同步工具函数
+        params: 关键字参数
+        policy: getExecPolicy(func) 的结果；None 时按默认并发上限、线程池运行
+
+    返回:
+        工具函数返回值
+
+    异常:
+        ToolBusyError: 该函数的占用（在跑 + 孤儿）已达上限
+        其余异常原样透传；调用方被取消（如 wait_for 超时）时任务转为孤儿
+    """
+    policy = policy or {"maxConcurrency": _DEFAULT_MAX_CONCURRENCY, "isolateProcess": False}
+    limit = policy["maxConcurrency"]
+
+    with _countLock:
+        running = _inFlight.get(qualName, 0)
+        if running >= limit:
+            orphans = _orphans.get(qualName, 0)
+            raise ToolBusyError(
+                f"工具 {qualName} 并发已满（{running}/{limit}，其中 {orphans} 个为超时未结束的任务）"
+            )
+        _inFlight[qualName] = running + 1
+
+    try:
+        pool = _getProcessPool() if policy["isolateProcess"] else _getThreadPool()
+        future = pool.submit(func, **params)
+    except BaseException:
+        _release(qualName, orphaned=False)
+        raise
+
+    try:
+        result = await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        # 还在排队的任务直接撤掉；已开始运行的线程无法中断，转为孤儿
+        future.cancel()
+        if not future.done():
+            _markOrphan(qualName, future)
+        else:
+            _release(qualName, orphaned=False)
+        raise
+    except BaseException:
+        _release(qualName, orphaned=False)
+        raise
+
+    _release(qualName, orphaned=False)
+    return result
+
+
+
+
+def getPoolStats() -> dict[str, dict[str, int]]:
+    """
+    返回各函数的占用快照。
+
+    返回:
+        {"tool.func": {"inFlight": n, "orphans": n}}
+    """
+    with _countLock:
+        names = set(_inFlight) | set(_orphans)
+        return {
+            name: {"inFlight": _inFlight.get(name, 0), "orphans": _orphans.get(name, 0)}
+            for name in names
+            if _inFlight.get(name, 0) or _orphans.get(name, 0)
+        }
@@ -1,18 +1,33 @@
 """
 utils/archiver.py
 
-文件打包模块（基础 ZIP + 7z 分卷）
+文件打包模块（基础 ZIP + 流式 ZIP + 7z 分卷）
+
+    - createZip：把一个目录整体打成 ZIP（同步，shutil.make_archive）
+    - ZipStream：文件一就绪就写入 ZIP，不必先把全部文件攒进临时目录再回读打包；
+      写入在线程中进行，已压缩格式（WebP / GIF / WebM 等）以 stored 方式存入，不再白跑 deflate
+    - create7zVolumes：7z 分卷（py7zr 在线程中执行，命令行 7z 用 asyncio 子进程），不阻塞事件循环
 """
 
 import os
 import re
 import sys
 import shutil
-import subprocess
+import asyncio
+import zipfile
+import threading
 
 from config import PROJECT_ROOT, TELEGRAM_FILE_SIZE_LIMIT_MB
 
 
+# 本身已经压缩过的格式：deflate 几乎压不动，直接 stored
+_STORED_EXTS = {
+    ".webp", ".webm", ".gif", ".tgs",
+    ".png", ".jpg", ".jpeg", ".mp4",
+    ".zip", ".7z", ".gz",
+}
+
+
 
 
 def createZip(srcDir: str, outputBase: str) -> str:
@@ -40,7 +55,88 @@ def createZip(srcDir: str, outputBase: str) -> str:
         raise RuntimeError(f"ZIP 打包失败喵：{e}")
 
 
-def create7zVolumes(srcPath: str, outputBase: str, volumeSizeMB: int = None) -> list[str]:
+
+
+class ZipStream:
+    """
+    边产出边写入的 ZIP
+
+    每个文件下载 / 转换完成后立即 add 进压缩包（可选写完即删源文件），
+    临时目录里只留正在处理的文件，close 时也不用再把整包读一遍。
+
+    zipfile 不是线程安全的：所有写入与关闭都在工作线程里持有同一把 threading.Lock，
+    调用方被取消时，已经开始的写入会在线程里写完，不会与下一个条目交错。
+
+    示例：
+        archive = ZipStream("/download/stickers_abc.zip")
+        try:
+            await archive.add("/download/tmp/1.webp", removeAfter=True)
+            zipPath = await archive.close()
+        except BaseException:
+            await archive.abort()
+            raise
+    """
+
+    def __init__(self, zipPath: str):
+        self.zipPath = zipPath
+        self.count = 0
+        self._lock = threading.Lock()
+        self._zip = zipfile.ZipFile(zipPath, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True)
+
+
+    async def add(self, srcPath: str, arcname: str = None, *, removeAfter: bool = False):
+        """
+        把一个文件写入压缩包
+
+        参数：
+            srcPath: 源文件路径
+            arcname: 包内文件名，默认取源文件名
+            removeAfter: 写入后删除源文件
+        """
+        arcname = arcname or os.path.basename(srcPath)
+        ext = os.path.splitext(srcPath)[1].lower()
+        compressType = zipfile.ZIP_STORED if ext in _STORED_EXTS else zipfile.ZIP_DEFLATED
+
+        await asyncio.to_thread(self._writeSync, srcPath, arcname, compressType)
+        if removeAfter:
+            os.remove(srcPath)
+
+
+    def _writeSync(self, srcPath: str, arcname: str, compressType: int):
+        with self._lock:
+            if self._zip is None:
+                raise RuntimeError("ZIP 已关闭喵")
+            self._zip.write(srcPath, arcname, compress_type=compressType)
+            self.count += 1
+
+
+    async def close(self) -> str:
+        """写入中央目录并关闭，返回 ZIP 路径"""
+        await asyncio.to_thread(self._closeSync)
+        return self.zipPath
+
+
+    async def abort(self):
+        """放弃打包：关闭并删除未完成的 ZIP"""
+        try:
+            await asyncio.to_thread(self._closeSync)
+        finally:
+            try:
+                os.remove(self.zipPath)
+            except OSError:
+                pass
+
+
+    def _closeSync(self):
+        with self._lock:
+            if self._zip is not None:
+                self._zip.close()
+                self._zip = None
+
+
+
+
+async def create7zVolumes(srcPath: str, outputBase: str, volumeSizeMB: int = None) -> list[str]:
     """
     创建 7z 分卷压缩包
 
@@ -60,7 +156,7 @@ def create7zVolumes(srcPath: str, outputBase: str, volumeSizeMB: int = None) ->
         RuntimeError: 分卷失败
 
     示例：
-        volumes = create7zVolumes("/download/stickers.zip", "/download/stickers_7z", 48)
+        volumes = await create7zVolumes("/download/stickers.zip", "/download/stickers_7z", 48)
         # 返回 ["/download/stickers_7z.7z.001", "/download/stickers_7z.7z.002"]
     """
     if volumeSizeMB is None:
@@ -74,18 +170,9 @@ def create7zVolumes(srcPath: str, outputBase: str, volumeSizeMB: int = None) ->
     if not os.path.isfile(srcPath):
         raise ValueError(f"源文件不存在：{os.path.basename(srcPath)}")
 
-    # 优先尝试 py7zr（如果支持 volume 参数）
+    # 优先尝试 py7zr（如果支持 volume 参数），在线程中执行
     try:
-        import py7zr
-
-        with py7zr.SevenZipFile(
-            f"{outputBase}.7z",
-            "w",
-            volume=volumeBytes  # py7zr 0.22.0 不支持，会落入 except
-        ) as archive:
-            archive.write(srcPath, arcname=os.path.basename(srcPath))
-
-        volumes = _collectVolumes(outputBase)
+        volumes = await asyncio.to_thread(_create7zWithPy7zr, srcPath, outputBase, volumeBytes)
         if volumes:
             return volumes
 
@@ -106,15 +193,21 @@ def create7zVolumes(srcPath: str, outputBase: str, volumeSizeMB: int = None) ->
     volumeSpec = f"{volumeSizeMB}m"
     os.makedirs(os.path.dirname(outputPath), exist_ok=True)
 
+    proc = await asyncio.create_subprocess_exec(
+        sevenZipPath, "a", f"-v{volumeSpec}", outputPath, srcPath,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
     try:
-        subprocess.run(
-            [sevenZipPath, "a", f"-v{volumeSpec}", outputPath, srcPath],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError(f"7z 分卷失败喵：{e.stderr}")
+        stdout, stderr = await proc.communicate()
+    except asyncio.CancelledError:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        raise
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"7z 分卷失败喵：{(stderr or stdout).decode(errors='ignore')}")
 
     volumes = _collectVolumes(outputBase)
     if not volumes:
@@ -125,6 +218,20 @@ def create7zVolumes(srcPath: str, outputBase: str, volumeSizeMB: int = None) ->
 
 
 
+def _create7zWithPy7zr(srcPath: str, outputBase: str, volumeBytes: int) -> list[str]:
+    """py7zr 分卷（同步，供 to_thread 调用）；不支持 volume 参数时抛 TypeError"""
+    import py7zr
+
+    with py7zr.SevenZipFile(
+        f"{outputBase}.7z",
+        "w",
+        volume=volumeBytes  # py7zr 0.22.0 不支持，会落入调用方的 except
+    ) as archive:
+        archive.write(srcPath, arcname=os.path.basename(srcPath))
+
+    return _collectVolumes(outputBase)
+
+
 def _collectVolumes(outputBase: str) -> list[str]:
     """
     收集 outputBase 对应的 7z 分卷文件（严格匹配 baseName.7z.NNN）
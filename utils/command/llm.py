@@ -7,7 +7,7 @@ LLM 功能控制台命令：
     /llm model [switch <model>]
     /llm visionmodel [switch <model>] | reset
     /llm memory -on | -off | -once | -autoapprove
-    /llm memory list | add | edit | del | ui
+    /llm memory list | add | edit | del | ui | budget
     /llm status
     /llm review
 
@@ -47,6 +47,8 @@ from utils.llm import (
     setLLMEnabled,
     setMemoryAutoApprove,
     setMemoryEnabled,
+    getMemoryContextMaxChars,
+    setMemoryContextMaxChars,
     setModel,
     setVisionModel,
     addGroupTriggerKeyword,
@@ -58,10 +60,17 @@ from utils.llm import (
     setKnowledgeMaxResults,
     getKnowledgeMinScore,
     setKnowledgeMinScore,
+    getKnowledgeRerankTopK,
+    setKnowledgeRerankTopK,
+    getKnowledgeAutoReindex,
+    setKnowledgeAutoReindex,
     reindexKnowledgeBase,
     getKnowledgeEntries,
     getKnowledgeStats,
     retrieveKnowledge,
+    getRetrievalCacheStats,
+    getDecryptedCacheStats,
+    getURLCacheStats,
 )
 from utils.llm.review import (
     canEditReviewItem,
@@ -100,6 +109,21 @@ def _printStatus():
     print(f"  记忆模式：{'开启' if getMemoryEnabled() else '关闭'}")
     print(f"  记忆自动批准：{'开启' if getMemoryAutoApprove() else '关闭'}")
     print(f"  知识库：{'开启' if getKnowledgeEnabled() else '关闭'}")
+    cacheStats = getRetrievalCacheStats()
+    print("  检索缓存：" + "，".join(
+        f"{label} {stats['hits']}/{stats['hits'] + stats['misses']} 命中（{stats['hitRate']:.0%}，{stats['size']} 条）"
+        for label, stats in (("知识库", cacheStats["knowledge"]), ("记忆", cacheStats["memory"]))
+    ))
+    decryptStats = getDecryptedCacheStats()
+    print(
+        f"  记忆解密缓存：{decryptStats['hits']}/{decryptStats['hits'] + decryptStats['misses']} 命中"
+        f"（{decryptStats['hitRate']:.0%}，{decryptStats['size']} 条，{decryptStats['bytes'] / 1024:.1f} KB）"
+    )
+    urlStats = getURLCacheStats()
+    print(
+        f"  URL 读取缓存：{urlStats['hits']} 命中 / {urlStats['revalidated']} 条件请求 304 / {urlStats['misses']} 次下载"
+        f"（{urlStats['size']} 条，{urlStats['bytes'] / 1024:.1f} KB）"
+    )
     print(f"  One-shot：{'已设置（下次调用生效）' if isContextOnceSet() else '未设置'}")
     print(f"  速率限制：{LLM_RATE_LIMIT_SECONDS} 秒")
     qsize = getReviewQueue().qsize()
@@ -222,7 +246,8 @@ async def _handleMemoryCommand(args, app=None):
     """处理 /llm memory 子命令。"""
     if not args:
         print(f"记忆模式：{'开启' if getMemoryEnabled() else '关闭'}")
-        print(f"One-shot：{'已设置' if isContextOnceSet() else '未设置'}\n")
+        print(f"One-shot：{'已设置' if isContextOnceSet() else '未设置'}")
+        print(f"记忆块字符预算：{getMemoryContextMaxChars()}\n")
         return
 
     action = args[0].lower()
@@ -347,8 +372,19 @@ async def _handleMemoryCommand(args, app=None):
             from utils.llm.memory.ui import memoryMenuController
             await memoryMenuController(app)
 
+        case "budget":
+            if not rest:
+                print(f"当前记忆块字符预算：{getMemoryContextMaxChars()}\n")
+                return
+            try:
+                value = int(rest[0])
+                setMemoryContextMaxChars(value)
+                await logAction("System", "LLM 记忆块字符预算调整", f"已设置为 {value}", LogLevel.INFO, LogChildType.WITH_ONE_CHILD)
+            except ValueError as e:
+                print(f"❌ {e}\n")
+
         case _:
-            print("❌ 用法：/llm memory [-on|-off|-once|list|add|edit|del|ui]\n")
+            print("❌ 用法：/llm memory [-on|-off|-once|list|add|edit|del|ui|budget]\n")
 
 
 
@@ -358,7 +394,9 @@ async def _handleKnowledgeCommand(args):
     if not args:
         print(f"知识库：{'开启' if getKnowledgeEnabled() else '关闭'}")
         print(f"召回数：{getKnowledgeMaxResults()}")
-        print(f"最低分：{getKnowledgeMinScore()}\n")
+        print(f"最低分：{getKnowledgeMinScore()}")
+        print(f"语义重排候选数：{getKnowledgeRerankTopK()}")
+        print(f"目录监听自动刷新：{'开启' if getKnowledgeAutoReindex() else '关闭'}\n")
         return
 
     action = args[0].lower()
@@ -430,7 +468,8 @@ async def _handleKnowledgeCommand(args):
             try:
                 limit = getKnowledgeMaxResults()
                 minScore = getKnowledgeMinScore()
-                results = await retrieveKnowledge(query, limit=limit, minScore=minScore)
+                rerankTopK = getKnowledgeRerankTopK()
+                results = await retrieveKnowledge(query, limit=limit, minScore=minScore, rerankTopK=rerankTopK)
                 if not results:
                     print(f"[Knowledge] 未找到相关条目（查询：{query}）\n")
                     return
@@ -468,8 +507,33 @@ async def _handleKnowledgeCommand(args):
             except ValueError as e:
                 print(f"❌ {e}\n")
 
+        case "rerank":
+            if not rest:
+                print(f"当前语义重排候选数：{getKnowledgeRerankTopK()}\n")
+                return
+            try:
+                value = int(rest[0])
+                setKnowledgeRerankTopK(value)
+                await logAction("System", "LLM 知识库语义重排候选数调整", f"已设置为 {value}", LogLevel.INFO, LogChildType.WITH_ONE_CHILD)
+            except ValueError as e:
+                print(f"❌ {e}\n")
+
+        case "watch":
+            if not rest or rest[0].lower() not in ("on", "off"):
+                print(f"目录监听自动刷新：{'开启' if getKnowledgeAutoReindex() else '关闭'}\n")
+                return
+            enabled = rest[0].lower() == "on"
+            setKnowledgeAutoReindex(enabled)
+            await logAction("System", f"LLM 知识库自动刷新{'开启' if enabled else '关闭'}", "OK", LogLevel.INFO, LogChildType.WITH_ONE_CHILD)
+            if enabled:
+                # 关闭期间丢弃的改动补扫一次（未变化的文件按 mtime / size 跳过）
+                try:
+                    await reindexKnowledgeBase()
+                except Exception as e:
+                    print(f"❌ 索引刷新失败：{e}\n")
+
         case _:
-            print("❌ 用法：/llm knowledge [on|off|reindex|list|stats|search|maxresults|minscore]\n")
+            print("❌ 用法：/llm knowledge [on|off|reindex|list|stats|search|maxresults|minscore|rerank|watch]\n")
 
 
 
@@ -738,6 +802,7 @@ def getHelp():
             "/llm memory -autoapprove             切换记忆自动批准（跳过审核）\n"
             "/llm memory del <id>                 删除一条 memory\n"
             "/llm memory ui                       打开 Memory 管理界面\n"
+            "/llm memory budget <n>               设置记忆块字符预算（200-20000）\n"
             "/llm memory list [-all] [-scope <type> -id <id>] [-limit n]\n"
             "/llm memory add -scope <type> [-id <id>] -text <content> [-tags ...] [-priority n] [-off]\n"
             "/llm memory edit -mid <id> [-text ...] [-tags ...] [-priority n] [-enabled on|off]\n"
@@ -748,6 +813,8 @@ def getHelp():
             "/llm knowledge search <query>        测试检索（显示评分）\n"
             "/llm knowledge maxresults <n>        设置召回数（1-10）\n"
             "/llm knowledge minscore <float>      设置最低分数阈值\n"
+            "/llm knowledge rerank <n>            设置语义重排候选数（0-50，0 为关闭）\n"
+            "/llm knowledge watch on|off          开启/关闭目录监听自动刷新\n"
         ),
         "example": (
             "/llm status                          查看当前配置\n"
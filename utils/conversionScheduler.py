@@ -0,0 +1,175 @@
+"""
+utils/conversionScheduler.py
+
+进程级 ffmpeg 转换调度器
+
+以前转换并发只受单个表情包内的下载信号量约束，_activeGifJobs 与 memoryMonitor 的任务登记
+也只负责"记账"：两个人同时要大的视频表情包，就能同时拉起十几个 ffmpeg，把 bot 拖住。
+这里所有转换都要先向 conversionScheduler 申请槽位：
+    - 上限：FFMPEG_MAX_CONCURRENT，为 0 时按 CPU 核数自动取（核数 - 1，至少 1）；
+      isMemoryLow() 时临时降到 1，已在跑的转换不受影响
+    - 公平：槽位空出时，优先给"正在运行的转换最少"的用户，一个人的大包不会饿死其他人
+    - 小任务优先：运行数相同时，排队转换更少（剩余工作量更小）的用户先拿到槽位
+    - 取消：等待中的调用方被取消（/killsticker、请求任务被 cancel）时从队列移除；
+      已分到槽位但还没用上的，槽位立即归还
+    - 排队位置：getConversionQueuePosition(ownerID) 供 handler 向用户反馈
+
+只在事件循环线程中使用，不加锁。
+"""
+
+import os
+import asyncio
+import itertools
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Hashable
+
+from config import FFMPEG_MAX_CONCURRENT
+
+from utils.memoryMonitor import isMemoryLow
+
+
+
+
+def defaultWorkerCount() -> int:
+    """按 CPU 核数推算的默认并发数：留一个核给事件循环"""
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+
+
+class ConversionScheduler:
+    """按用户公平分配、小任务优先的转换槽位"""
+
+    def __init__(self, maxWorkers: int = 0):
+        self.maxWorkers = maxWorkers
+        self._active = 0
+        self._running: dict[Hashable, int] = {}                                  # ownerID → 运行中的转换数
+        self._waiting: dict[Hashable, deque[tuple[int, asyncio.Future]]] = {}    # ownerID → (序号, future)
+        self._seq = itertools.count()
+
+
+    def limit(self) -> int:
+        """当前允许同时运行的转换数（每次分配槽位时重新计算）"""
+        if isMemoryLow():
+            return 1
+        return self.maxWorkers or defaultWorkerCount()
+
+
+    # ── 申请 / 归还 ────────────────────────────────
+
+    async def acquire(self, ownerID: Hashable = None):
+        """等待一个转换槽位；被取消时不会占着槽位"""
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(ownerID, deque()).append((next(self._seq), future))
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(ownerID)       # 已分到槽位，但调用方在恢复前被取消
+            else:
+                self._dropWaiter(ownerID, future)
+            raise
+
+
+    def release(self, ownerID: Hashable = None):
+        self._active -= 1
+        remaining = self._running.get(ownerID, 0) - 1
+        if remaining > 0:
+            self._running[ownerID] = remaining
+        else:
+            self._running.pop(ownerID, None)
+        self._dispatch()
+
+
+    @asynccontextmanager
+    async def slot(self, ownerID: Hashable = None):
+        """
+        在槽位内执行一段转换：
+
+            async with conversionScheduler.slot(userID):
+                await convertToGif(path)
+        """
+        await self.acquire(ownerID)
+        try:
+            yield
+        finally:
+            self.release(ownerID)
+
+
+    # ── 内部 ──────────────────────────────────────
+
+    def _rank(self, ownerID: Hashable) -> tuple[int, int, int]:
+        """越小越先：(运行中的转换数, 排队中的转换数, 最早排队序号)"""
+        queue = self._waiting[ownerID]
+        return self._running.get(ownerID, 0), len(queue), queue[0][0]
+
+
+    def _dispatch(self):
+        limit = self.limit()
+        while self._active < limit and self._waiting:
+            ownerID = min(self._waiting, key=self._rank)
+            queue = self._waiting[ownerID]
+            _, future = queue.popleft()
+            if not queue:
+                del self._waiting[ownerID]
+            if future.done():
+                continue
+
+            self._active += 1
+            self._running[ownerID] = self._running.get(ownerID, 0) + 1
+            future.set_result(None)
+
+
+    def _dropWaiter(self, ownerID: Hashable, future: asyncio.Future):
+        queue = self._waiting.get(ownerID)
+        if queue is None:
+            return
+        for item in queue:
+            if item[1] is future:
+                queue.remove(item)
+                break
+        if not queue:
+            del self._waiting[ownerID]
+
+
+    # ── 观察 ──────────────────────────────────────
+
+    def queuePosition(self, ownerID: Hashable) -> int:
+        """
+        用户的排队位置。
+
+        返回：
+            0 表示该用户没有排队的转换，或已有转换在运行；
+            否则为 1 + 会先于该用户拿到槽位的其他用户数
+        """
+        if ownerID not in self._waiting or self._running.get(ownerID):
+            return 0
+        rank = self._rank(ownerID)
+        return 1 + sum(1 for other in self._waiting if other != ownerID and self._rank(other) < rank)
+
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit(),
+            "running": self._active,
+            "waiting": sum(len(q) for q in self._waiting.values()),
+            "waitingOwners": len(self._waiting),
+        }
+
+
+
+
+conversionScheduler = ConversionScheduler(FFMPEG_MAX_CONCURRENT)
+
+
+def getConversionQueuePosition(ownerID: Hashable) -> int:
+    """见 ConversionScheduler.queuePosition"""
+    return conversionScheduler.queuePosition(ownerID)
+
+
+def getConversionStats() -> dict:
+    """转换调度统计：{"limit", "running", "waiting", "waitingOwners"}"""
+    return conversionScheduler.stats()
@@ -11,8 +11,9 @@ utils/core/crypto.py
     - chatHistory.db  聊天记录原文（utils/chatHistory.py）
     - llmMemory.db    LLM 对用户的长期记忆（utils/llm/memory/database.py）
     - todos.db        用户的待办事项内容（utils/todos/database.py）
+    - visionCache.db  用户图片的视觉模型描述（utils/llm/visionCache.py）
 
-这三个库**共用同一把密钥**（data/.chatKey），由本模块统一管理。
+这些库**共用同一把密钥**（data/.chatKey），由本模块统一管理。
 加密口径：只加密承载用户隐私的「内容正文列」（content），
 不加密用于检索 / 排序的元数据列（scope/chat_id/timestamp/priority 等），
 因为加密列无法进入 WHERE / ORDER BY。
@@ -89,7 +90,7 @@ def getFernet() -> Fernet:
     获取 Fernet 加密器实例（带缓存）。
 
     首次调用时从磁盘加载密钥，后续调用直接返回缓存的实例。
-    三个加密库（chatHistory / llmMemory / todos）共用同一实例。
+    所有加密库（chatHistory / llmMemory / todos / visionCache）共用同一实例。
     """
     global _fernetCache
 
@@ -17,3 +17,34 @@ CREATE TABLE IF NOT EXISTS knowledge_entries (
 
 CREATE INDEX IF NOT EXISTS idx_knowledge_category ON knowledge_entries(category);
 CREATE INDEX IF NOT EXISTS idx_knowledge_source ON knowledge_entries(source_file);
+-- 每个来源文件内 title 唯一：reindex 的批量 upsert 依赖它做 ON CONFLICT
+CREATE UNIQUE INDEX IF NOT EXISTS idx_knowledge_source_title ON knowledge_entries(source_file, title);
+
+-- 持久化的倒排索引：每条目三个字段的词频表（JSON），按 source_hash + 分词规则版本判断是否过期。
+-- 倒排表、字段长度、平均长度在加载时由这些词频表在内存中推导，启动时无需重新分词。
+CREATE TABLE IF NOT EXISTS knowledge_index_docs (
+    entry_id INTEGER PRIMARY KEY,
+    source_hash TEXT NOT NULL,
+    tokenizer_version INTEGER NOT NULL,
+    fields_json TEXT NOT NULL
+);
+
+-- 上次索引时各 Markdown 文件的 mtime / size，未变化的文件 reindex 时不再解析。
+CREATE TABLE IF NOT EXISTS knowledge_files (
+    source_file TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+
+-- LSA 语义重排模型（单行）：reindex 时由倒排索引拟合，signature 匹配时重启直接读回。
+-- idf / components / doc_vectors 为 float32 原始字节（components: 词表 × rank，doc_vectors: 条目 × rank）。
+CREATE TABLE IF NOT EXISTS knowledge_semantic (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    signature TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    terms_json TEXT NOT NULL,
+    doc_ids_json TEXT NOT NULL,
+    idf BLOB NOT NULL,
+    components BLOB NOT NULL,
+    doc_vectors BLOB NOT NULL
+);
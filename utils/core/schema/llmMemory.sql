@@ -15,6 +15,8 @@ CREATE TABLE IF NOT EXISTS memory_entries (
 );
 
 CREATE INDEX IF NOT EXISTS idx_memory_scope ON memory_entries(scope_type, scope_id);
+-- retrieveMemories：按 scope 取启用条目并在 scope 内按 priority 排序
+CREATE INDEX IF NOT EXISTS idx_memory_scope_enabled_priority ON memory_entries(scope_type, scope_id, enabled, priority DESC);
 CREATE INDEX IF NOT EXISTS idx_memory_enabled ON memory_entries(enabled);
 CREATE INDEX IF NOT EXISTS idx_memory_priority ON memory_entries(priority DESC);
 CREATE INDEX IF NOT EXISTS idx_memory_updated_at ON memory_entries(updated_at DESC);
@@ -0,0 +1,13 @@
+-- LLM vision description cache schema snapshot
+-- 由 utils/llm/visionCache.py:_initSchema 通过 executescript 加载。
+
+CREATE TABLE IF NOT EXISTS vision_descriptions (
+    model TEXT NOT NULL,
+    image_key TEXT NOT NULL,
+    description BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    PRIMARY KEY (model, image_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_vision_last_used ON vision_descriptions(last_used_at);
@@ -120,7 +120,7 @@ async def _sendMultiVolume(
     )
 
     try:
-        volumes = create7zVolumes(filePath, volumeBase)
+        volumes = await create7zVolumes(filePath, volumeBase)
     except Exception as e:
         await logAction(
             "System",
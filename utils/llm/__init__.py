@@ -8,6 +8,7 @@ LLM 集成模块：
     - memory: structured memory 存储、检索与 LLM 自主操作
     - knowledge: 知识库（Markdown 文件管理、BM25 检索、上下文注入）
     - contextBuilder: 统一上下文组装
+    - retrievalCache: 知识库 / 记忆检索结果 LRU（写入时按代计数失效）
     - vision: 图片提取（photo/document/reply）与下载编码
     - review: console / chatScreen 共用审核动作（reply + memory 双类型）
 """
@@ -33,6 +34,8 @@ from .config import (
     setMemoryEnabled,
     getMemoryAutoApprove,
     setMemoryAutoApprove,
+    getMemoryContextMaxChars,
+    setMemoryContextMaxChars,
     getURLReadEnabled,
     setURLReadEnabled,
     getURLReadMaxUrls,
@@ -58,6 +61,10 @@ from .config import (
     setKnowledgeMaxResults,
     getKnowledgeMinScore,
     setKnowledgeMinScore,
+    getKnowledgeRerankTopK,
+    setKnowledgeRerankTopK,
+    getKnowledgeAutoReindex,
+    setKnowledgeAutoReindex,
     loadPrompts,
 )
 from .state import (
@@ -84,6 +91,8 @@ from .memory import (
     retrieveMemories,
     buildMemoryContextBlock,
     summarizeRetrievedMemories,
+    selectRelevantMemories,
+    getDecryptedCacheStats,
     MEMORY_SCOPE_GLOBAL,
     MEMORY_SCOPE_CHAT,
     MEMORY_SCOPE_USER,
@@ -102,5 +111,7 @@ from .knowledge import (
     getKnowledgeStats,
     reindexKnowledgeBase,
 )
+from .retrievalCache import getRetrievalCacheStats
+from .urlCache import getURLCacheStats
 from .client import generateReply, requestReply
 from .promptSafety import neutralizePromptDelimiters
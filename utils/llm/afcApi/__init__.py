@@ -8,7 +8,7 @@ LLM 模块经由此处感知 AFC，AFC 模块本身不依赖 LLM（单点耦合
 接口职责：
 - buildAFCContextBlock：上游桥接，构建工具上下文块，供 handlers/afc.py 推入 bot_data
 - handleAFCInLLMResponse：下游桥接，解析 LLM 回复中的 <AFC_ACTION>，执行工具，
-  携带结果二次调用 LLM，直到无工具调用或达到迭代上限
+  把结果追加到本轮对话后再次请求 LLM，直到无工具调用或达到迭代上限
 """
 
 from utils.llm.afcApi.contextBlock import buildAFCContextBlock
@@ -5,20 +5,48 @@ AFC 下游桥接：解析与执行 LLM 回复中的工具调用
 
 负责 LLM 生成回复后的 AFC 执行循环（解析 <AFC_ACTION> → 执行工具 →
 携带结果二次调用 LLM），直到无工具调用或达到迭代上限。
+
+多轮迭代共用 generateReply 建立的同一个 LLMConversation：工具结果作为新的
+user 消息增量追加，system 前缀与首轮组装好的上下文原样复用，不再每轮重建。
+
+同一条回复里的多个 <AFC_ACTION> 会并发执行（受本轮并发上限约束），
+全部结果合并进一条 follow-up 消息，只回一次 LLM。
 """
 
 import re
+import time
+import asyncio
 from typing import Optional
 
 from utils.afc.executor import execute as executeAFCTool
+from utils.core.logger import logSystemEvent, LogLevel, LogChildType
+from utils.llm.promptSafety import neutralizePromptDelimiters
 
 
 AFC_ACTION_PATTERN = re.compile(r"<AFC_ACTION>(.*?)</AFC_ACTION>", re.DOTALL)
 
+# 单条回复最多执行的 <AFC_ACTION> 数，超出的部分直接回报错误，不执行
+_MAX_ACTIONS_PER_RESPONSE = 8
+# 单轮回复（所有迭代共享）同时在跑的工具数上限
+_MAX_PARALLEL_TOOLS = 4
+
+
+def _cleanActionJSON(raw: str) -> str:
+    """去除 <AFC_ACTION> 内容里可能的 Markdown 代码块标记与首尾空白。"""
+    raw = raw.strip()
+    raw = re.sub(r'^```(?:json)?\s*', '', raw)  # 开头的 ```json 或 ```
+    raw = re.sub(r'\s*```$', '', raw)           # 结尾的 ```
+    return raw.strip()
+
+
+def extractAFCActions(llmResponse: str) -> list[str]:
+    """按出现顺序提取 LLM 回复中全部 <AFC_ACTION> 的 JSON（已清洗）。"""
+    return [_cleanActionJSON(m.group(1)) for m in AFC_ACTION_PATTERN.finditer(llmResponse)]
+
 
 def extractAFCAction(llmResponse: str) -> Optional[str]:
     """
-    提取并清洗 LLM 回复中的 <AFC_ACTION> JSON。
+    提取并清洗 LLM 回复中的第一个 <AFC_ACTION> JSON。
 
     鲁棒性处理：
         - 去除可能的 Markdown 代码块标记（```json / ```）
@@ -44,34 +72,80 @@ def extractAFCAction(llmResponse: str) -> Optional[str]:
     if not match:
         return None
 
-    raw = match.group(1).strip()
+    return _cleanActionJSON(match.group(1))
 
-    # 去除 Markdown 代码块标记
-    raw = re.sub(r'^```(?:json)?\s*', '', raw)  # 开头的 ```json 或 ```
-    raw = re.sub(r'\s*```$', '', raw)           # 结尾的 ```
 
-    return raw.strip()
+
+
+async def _executeActions(
+    actions: list[str],
+    semaphore: asyncio.Semaphore,
+    executed: dict[str, str],
+) -> list[str]:
+    """
+    并发执行一批 actionJSON，按输入顺序返回结果。
+
+    - 每个调用先拿 semaphore 再进 executor.execute（单次超时由 executor 的
+      _TOOL_TIMEOUT_SECONDS 保证）
+    - executed 是本轮回复内的成功结果表：同一 actionJSON 成功后不再执行，LLM 重复请求时直接复用；
+      <FUNCTION_ERROR>（超时、临时故障等）不入表，后续迭代再请求时会重新执行
+    - 同一批里重复的 actionJSON 只执行一次
+    - 超出 _MAX_ACTIONS_PER_RESPONSE 的调用不执行，回报 <FUNCTION_ERROR>
+    """
+    async def _runOne(actionJSON: str) -> str:
+        async with semaphore:
+            return await executeAFCTool(actionJSON)
+
+    pending: dict[str, asyncio.Task] = {}
+    for actionJSON in actions[:_MAX_ACTIONS_PER_RESPONSE]:
+        if actionJSON not in executed and actionJSON not in pending:
+            pending[actionJSON] = asyncio.create_task(_runOne(actionJSON))
+
+    outcomes = dict(executed)
+    if pending:
+        gathered = await asyncio.gather(*pending.values(), return_exceptions=True)
+        for actionJSON, outcome in zip(pending.keys(), gathered):
+            if isinstance(outcome, BaseException):
+                outcome = f"<FUNCTION_ERROR>{type(outcome).__name__}: {outcome}</FUNCTION_ERROR>"
+            outcomes[actionJSON] = outcome
+            if outcome.startswith("<FUNCTION_RESULT>"):
+                executed[actionJSON] = outcome
+
+    results = [outcomes[a] for a in actions[:_MAX_ACTIONS_PER_RESPONSE]]
+    skipped = len(actions) - _MAX_ACTIONS_PER_RESPONSE
+    if skipped > 0:
+        results.append(
+            f"<FUNCTION_ERROR>单次回复最多执行 {_MAX_ACTIONS_PER_RESPONSE} 个工具调用，"
+            f"其余 {skipped} 个已忽略</FUNCTION_ERROR>"
+        )
+    return results
+
+
+def _formatToolResults(results: list[str]) -> str:
+    """把一批工具结果渲染为 follow-up 消息里的结果段（多个时逐条编号）。"""
+    if len(results) == 1:
+        return f"[工具执行结果]\n{neutralizePromptDelimiters(results[0])}"
+
+    parts = []
+    for i, result in enumerate(results, start=1):
+        parts.append(f"[工具执行结果 {i}/{len(results)}]\n{neutralizePromptDelimiters(result)}")
+    return "\n\n".join(parts)
 
 
 async def handleAFCInLLMResponse(
     llmResponse: str,
+    conversation,
     userMessage: str,
-    chatID: str,
-    userID: str | int | None = None,
-    sessionID: str | int | None = None,
-    includeContext: bool = False,
     maxIterations: int = 10,
 ) -> str:
     """
     循环处理 AFC 调用，直到 LLM 不再输出 <AFC_ACTION> 或达到上限。
 
     参数:
-        llmResponse: LLM 的初始回复（可能含 <AFC_ACTION>）
-        userMessage: 原始用户消息（用于二次调用时的上下文）
-        chatID: 会话 ID
-        userID: 用户 ID
-        sessionID: 会话 ID（用于 memory scope）
-        includeContext: 是否包含上下文（二次调用时为 False）
+        llmResponse: LLM 的初始回复（可能含 <AFC_ACTION>，已作为 assistant 消息记入 conversation）
+        conversation: 本轮回复的 LLMConversation（utils/llm/client/_conversation.py），
+                      为避免 afcApi 与 client 的循环 import，类型不标注
+        userMessage: 原始用户消息（附在工具结果之后做 Query Reinforcement）
         maxIterations: 最多执行几轮工具调用
 
     返回:
@@ -79,42 +153,48 @@ async def handleAFCInLLMResponse(
 
     流程示例:
         1. LLM 回复含 <AFC_ACTION>{"tool":"weather",...}</AFC_ACTION>
-        2. 提取 JSON，调用 executor.execute()
-        3. 携带 <FUNCTION_RESULT>xxx</FUNCTION_RESULT> 作为新 userMessage 二次调用 LLM
+        2. 提取全部 JSON，并发调用 executor.execute()
+        3. 把各 <FUNCTION_RESULT>xxx</FUNCTION_RESULT> 合并为一条 user 消息追加到 conversation 并请求
         4. 重复直到无 <AFC_ACTION> 或达到 maxIterations
         5. 返回最终文本回复
     """
     currentResponse = llmResponse
+    safeUserMessage = neutralizePromptDelimiters(userMessage)
+    semaphore = asyncio.Semaphore(_MAX_PARALLEL_TOOLS)
+    executed: dict[str, str] = {}
 
     for iteration in range(maxIterations):
-        actionJSON = extractAFCAction(currentResponse)
-        if not actionJSON:
+        actions = extractAFCActions(currentResponse)
+        if not actions:
             # 无工具调用，结束循环
             break
 
-        # 执行工具
-        result = await executeAFCTool(actionJSON)
+        # 并发执行本条回复里的全部工具调用
+        toolStart = time.monotonic()
+        results = await _executeActions(actions, semaphore, executed)
+        toolMs = (time.monotonic() - toolStart) * 1000
 
-        # 携带工具结果作为新的 userMessage 二次调用 LLM
+        # 工具结果可能含外部数据（网络 API 返回等），与用户消息一样中和分隔符后再拼入结构标记
         followUpMessage = (
-            f"[工具执行结果]\n"
-            f"{result}\n\n"
+            f"{_formatToolResults(results)}\n\n"
             f"[原始用户消息]\n"
-            f"{userMessage}"
+            f"{safeUserMessage}"
         )
-
-        # 内部导入，避免循环依赖（afcApi 在 utils/llm/afcApi/，generateReply 在 utils/llm/__init__.py）
-        from utils.llm import generateReply
-
-        currentResponse = await generateReply(
-            userMessage=followUpMessage,
-            chatID=chatID,
-            userID=userID,
-            sessionID=sessionID,
-            includeContext=False,  # 二次调用不再拉 memory/history，避免重复注入
+        conversation.appendUser(followUpMessage)
+
+        llmStart = time.monotonic()
+        currentResponse = await conversation.request()
+        llmMs = (time.monotonic() - llmStart) * 1000
+
+        await logSystemEvent(
+            "AFC 迭代完成",
+            f"第 {iteration + 1} 轮 | 工具 x{len(actions)} {toolMs:.0f}ms | LLM {llmMs:.0f}ms "
+            f"| messages={len(conversation.messages)}",
+            LogLevel.INFO,
+            LogChildType.WITH_ONE_CHILD,
         )
 
     # 去除残留的 <AFC_ACTION> 标签（防止截断导致的格式错误）
     currentResponse = AFC_ACTION_PATTERN.sub("", currentResponse)
 
-    return currentResponse
\ No newline at end of file
+    return currentResponse
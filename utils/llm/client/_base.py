@@ -34,6 +34,49 @@ class LLMProvider(ABC):
         """
         ...
 
+    async def requestMessages(
+        self,
+        *,
+        systemMessages: list[str],
+        messages: list[dict],
+        model: str,
+        maxTokens: int,
+        temperature: float,
+    ) -> str:
+        """
+        发送多轮对话请求并返回文本回复。
+
+        messages 为 [{"role": "user" | "assistant", "content": str | list}, ...]，
+        首条为 user，角色交替。content 格式同 requestReply 的 userContent。
+
+        默认实现把多轮对话折叠成单条 user 消息再走 requestReply，
+        供不支持原生多轮的 provider 兜底；内置 provider 均覆盖为原生多轮请求。
+        """
+        if len(messages) == 1:
+            return await self.requestReply(
+                systemMessages=systemMessages,
+                userContent=messages[0]["content"],
+                model=model,
+                maxTokens=maxTokens,
+                temperature=temperature,
+            )
+
+        parts: list[str] = []
+        for msg in messages:
+            content = msg["content"]
+            if isinstance(content, list):
+                content = "\n".join(b["text"] for b in content if b.get("type") == "text")
+            label = "[助手回复]" if msg["role"] == "assistant" else "[用户]"
+            parts.append(f"{label}\n{content}")
+
+        return await self.requestReply(
+            systemMessages=systemMessages,
+            userContent="\n\n".join(parts),
+            model=model,
+            maxTokens=maxTokens,
+            temperature=temperature,
+        )
+
     def isAvailable(self) -> bool:
         """该提供商是否可用（API key 已配置）。"""
         return bool(self._apiKey)
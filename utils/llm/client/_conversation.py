@@ -0,0 +1,49 @@
+"""
+utils/llm/client/_conversation.py
+
+单轮回复内的多轮对话状态。
+
+generateReply 为每条用户消息建一个 LLMConversation：system 前缀只构建一次，
+AFC 工具循环往里增量追加 assistant / 工具结果消息，后续请求复用同一前缀
+（与各 provider 的前缀缓存兼容），不再每轮重建 system messages 和上下文。
+"""
+
+from dataclasses import dataclass, field
+
+from ._base import LLMProvider
+from ._request import requestMessagesWithRetry
+
+
+
+
+@dataclass
+class LLMConversation:
+    """一次回复生成过程中的对话状态（system 前缀 + 增量消息列表）。"""
+    provider: LLMProvider
+    model: str
+    systemMessages: list[str]
+    maxTokens: int
+    temperature: float
+    messages: list[dict] = field(default_factory=list)
+
+
+    def appendUser(self, content: str | list):
+        self.messages.append({"role": "user", "content": content})
+
+
+    def appendAssistant(self, text: str):
+        self.messages.append({"role": "assistant", "content": text})
+
+
+    async def request(self) -> str:
+        """发送当前对话，把回复作为 assistant 消息追加后返回。"""
+        reply = await requestMessagesWithRetry(
+            self.provider,
+            systemMessages=self.systemMessages,
+            messages=self.messages,
+            model=self.model,
+            maxTokens=self.maxTokens,
+            temperature=self.temperature,
+        )
+        self.appendAssistant(reply)
+        return reply
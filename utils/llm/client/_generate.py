@@ -4,15 +4,20 @@ utils/llm/client/_generate.py
 LLM 回复生成编排逻辑：
     - 构建 system messages（人设 + guardrails，按 includeContext 决定是否追加记忆操作指令）
     - 可选双调用架构：visionModel != model 时分离描述与回复，否则单次调用
+      （描述结果经 visionCache 持久缓存，重复图片跳过视觉调用）
     - 通过 urlContexts 透传低信任 URL 内容到 contextBuilder
 """
 
+import asyncio
+
 from utils.core.logger import logSystemEvent, LogLevel, LogChildType
 
 from ..config import getForceFallbackPrompt, loadPrompts, loadLLMConfig, _FALLBACK_PROMPTS
 from ..contextBuilder import buildConversationContext
 from ..promptSafety import neutralizePromptDelimiters
+from ..visionCache import computeImageKeys, getCachedDescription, storeDescription
 from ._guardrails import SYSTEM_GUARDRAILS, MEMORY_ACTION_INSTRUCTIONS, VISION_DESCRIBE_PROMPT, OPS_FEEDBACK_INSTRUCTIONS
+from ._conversation import LLMConversation
 from ._request import requestWithRetry
 from ._router import getProvider
 
@@ -62,10 +67,25 @@ async def _describeImages(
     描述长度低于阈值时自动重试一次（有些中转服务偶尔会丢图片数据）
     失败时返回空字符串，不阻断主调用
 
+    先按 file_unique_id / 内容 SHA-256 查 visionCache，命中则直接返回缓存描述；
+    只有通过长度校验的描述才会写入缓存，失败结果不缓存。
+
     参数:
         model: 视觉模型名。由调用方从请求级配置快照传入（generateReply 已读
                过一次 llmConfig），避免此处再 getVisionModel() 重复读盘。
     """
+    # 哈希计算需解码 base64 并遍历整张图片，放到线程里避免阻塞事件循环
+    imageKeys = await asyncio.to_thread(computeImageKeys, images)
+    cached = await getCachedDescription(imageKeys, model=model)
+    if cached:
+        await logSystemEvent(
+            "LLM 图片描述缓存命中",
+            f"model={model}, images={len(images)}, key={imageKeys[0][:48]}",
+            LogLevel.INFO,
+            LogChildType.WITH_ONE_CHILD,
+        )
+        return cached
+
     provider = getProvider(model)
 
     await logSystemEvent(
@@ -132,6 +152,7 @@ async def _describeImages(
         LogChildType.WITH_ONE_CHILD,
     )
 
+    await storeDescription(imageKeys, description, model=model)
     return description
 
 
@@ -182,7 +203,7 @@ async def generateReply(
     # 本快照覆盖的读盘调用点（原先每处独立 loadLLMConfig）：
     #   - 此处 model / visionModel（原 getModel + getVisionModel）
     #   - buildConversationContext → buildKnowledgeContext 的
-    #     knowledgeEnabled / knowledgeMaxResults / knowledgeMinScore
+    #     knowledgeEnabled / knowledgeMaxResults / knowledgeMinScore / knowledgeRerankTopK
     # 未覆盖（有意保持独立读取，见各自说明）：
     #   - _request.requestWithRetry 内的 getModel()：仅 fallback 重决策时用，
     #     此刻重读反而能拿到运维刚改的救场配置，故不传快照。
@@ -232,37 +253,34 @@ async def generateReply(
     else:
         userContent = textContent
 
-    provider = getProvider(model)
-    llmResponse = await requestWithRetry(
-        provider,
-        systemMessages=systemMessages,
-        userContent=userContent,
+    conversation = LLMConversation(
+        provider=getProvider(model),
         model=model,
+        systemMessages=systemMessages,
         maxTokens=maxTokens,
         temperature=temperature,
     )
+    conversation.appendUser(userContent)
+    llmResponse = await conversation.request()
 
     # ========== AFC 执行循环 ==========
     # AFC 调用链透传：
     # handlers/llm.py → utils/llm/client/_generate.py (此处) → utils/llm/contextBuilder.py
     # 目的：将 PTB context 透传到 buildConversationContext，用于读取 bot_data 推送层
     #
-    # 从 LLM 回复中提取 <AFC_ACTION>，执行工具，携带结果二次调用 LLM，
-    # 直到无工具调用或达到迭代上限。
+    # 从 LLM 回复中提取 <AFC_ACTION>，执行工具，把工具结果作为新一条 user 消息
+    # 追加到同一个 conversation 再请求，直到无工具调用或达到迭代上限。
     #
     # 插入点选择：在 LLM client 层处理，对所有调用方（Telegram / console / 未来 API）生效。
     # 调用链：此处 → utils/llm/afcApi/responseHandler.py:handleAFCInLLMResponse
     #       → utils/afc/executor.py:execute (工具执行)
-    #       → 二次调用 utils/llm/__init__.py:generateReply (携带工具结果)
+    #       → conversation.request()（复用本轮 system 前缀与已组装的上下文）
     from utils.llm.afcApi import handleAFCInLLMResponse
 
     llmResponse = await handleAFCInLLMResponse(
         llmResponse=llmResponse,
+        conversation=conversation,
         userMessage=userMessage,
-        chatID=chatID,
-        userID=userID,
-        sessionID=sessionID,
-        includeContext=includeContext,
     )
 
     return llmResponse
@@ -31,16 +31,40 @@ async def requestWithRetry(
     遇到网络超时等瞬时错误时自动重试，最多 LLM_REQUEST_MAX_RETRIES 次。
     非瞬时错误（如 API key 无效、模型不存在）直接抛出。
     """
+    return await _withRetry(lambda: provider.requestReply(
+        systemMessages=systemMessages,
+        userContent=userContent,
+        model=model,
+        maxTokens=maxTokens,
+        temperature=temperature,
+    ))
+
+
+async def requestMessagesWithRetry(
+    provider,
+    *,
+    systemMessages: list[str],
+    messages: list[dict],
+    model: str,
+    maxTokens: int,
+    temperature: float,
+) -> str:
+    """带重试的多轮对话请求（重试策略同 requestWithRetry）。"""
+    return await _withRetry(lambda: provider.requestMessages(
+        systemMessages=systemMessages,
+        messages=messages,
+        model=model,
+        maxTokens=maxTokens,
+        temperature=temperature,
+    ))
+
+
+async def _withRetry(makeRequest) -> str:
+    """按瞬时错误重试 makeRequest()（每次调用生成新的协程）。"""
     lastErr: Exception | None = None
     for attempt in range(1 + LLM_REQUEST_MAX_RETRIES):
         try:
-            return await provider.requestReply(
-                systemMessages=systemMessages,
-                userContent=userContent,
-                model=model,
-                maxTokens=maxTokens,
-                temperature=temperature,
-            )
+            return await makeRequest()
         except Exception as e:
             lastErr = e
             # 判断是否为可重试的瞬时错误
@@ -34,6 +34,28 @@ class AnthropicProvider(LLMProvider):
         return self._client
 
 
+    @staticmethod
+    def _translateContent(userContent: str | list) -> str | list:
+        """将通用中间格式翻译为 Anthropic content array（纯文本原样返回）。"""
+        if not isinstance(userContent, list):
+            return userContent
+
+        content = []
+        for block in userContent:
+            if block["type"] == "text":
+                content.append({"type": "text", "text": block["text"]})
+            elif block["type"] == "image_base64":
+                content.append({
+                    "type": "image",
+                    "source": {
+                        "type": "base64",
+                        "media_type": block["mimeType"],
+                        "data": block["data"],
+                    },
+                })
+        return content
+
+
     async def requestReply(
         self,
         *,
@@ -42,35 +64,40 @@ class AnthropicProvider(LLMProvider):
         model: str,
         maxTokens: int,
         temperature: float,
+    ) -> str:
+        return await self.requestMessages(
+            systemMessages=systemMessages,
+            messages=[{"role": "user", "content": userContent}],
+            model=model,
+            maxTokens=maxTokens,
+            temperature=temperature,
+        )
+
+
+    async def requestMessages(
+        self,
+        *,
+        systemMessages: list[str],
+        messages: list[dict],
+        model: str,
+        maxTokens: int,
+        temperature: float,
     ) -> str:
         client = self._getClient()
         systemText = "\n\n".join(systemMessages)
 
-        # 多模态：将通用中间格式翻译为 Anthropic content array
-        if isinstance(userContent, list):
-            content = []
-            for block in userContent:
-                if block["type"] == "text":
-                    content.append({"type": "text", "text": block["text"]})
-                elif block["type"] == "image_base64":
-                    content.append({
-                        "type": "image",
-                        "source": {
-                            "type": "base64",
-                            "media_type": block["mimeType"],
-                            "data": block["data"],
-                        },
-                    })
-        else:
-            content = userContent
+        # system 前缀（人设 + guardrails）在同一轮 AFC 多次迭代、乃至不同消息之间都不变，
+        # 标记 cache_control 让 Anthropic 复用前缀缓存；不足最小缓存长度时服务端自动忽略。
+        system = [{"type": "text", "text": systemText, "cache_control": {"type": "ephemeral"}}]
 
         response = await client.messages.create(
             model=model,
             max_tokens=maxTokens,
             temperature=temperature,
-            system=systemText,
+            system=system,
             messages=[
-                {"role": "user", "content": content}
+                {"role": msg["role"], "content": self._translateContent(msg["content"])}
+                for msg in messages
             ],
         )
 
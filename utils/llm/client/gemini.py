@@ -33,6 +33,24 @@ class GeminiProvider(LLMProvider):
         return self._client
 
 
+    @staticmethod
+    def _translateParts(userContent: str | list) -> list:
+        """将通用中间格式翻译为 Gemini Part 列表。"""
+        if not isinstance(userContent, list):
+            return [types.Part.from_text(text=userContent)]
+
+        parts = []
+        for block in userContent:
+            if block["type"] == "text":
+                parts.append(types.Part.from_text(text=block["text"]))
+            elif block["type"] == "image_base64":
+                parts.append(types.Part.from_bytes(
+                    data=base64.b64decode(block["data"]),
+                    mime_type=block["mimeType"],
+                ))
+        return parts
+
+
     async def requestReply(
         self,
         *,
@@ -41,23 +59,36 @@ class GeminiProvider(LLMProvider):
         model: str,
         maxTokens: int,
         temperature: float,
+    ) -> str:
+        return await self.requestMessages(
+            systemMessages=systemMessages,
+            messages=[{"role": "user", "content": userContent}],
+            model=model,
+            maxTokens=maxTokens,
+            temperature=temperature,
+        )
+
+
+    async def requestMessages(
+        self,
+        *,
+        systemMessages: list[str],
+        messages: list[dict],
+        model: str,
+        maxTokens: int,
+        temperature: float,
     ) -> str:
         client = self._getClient()
         systemText = "\n\n".join(systemMessages)
 
-        # 多模态：将通用中间格式翻译为 Gemini Part 列表
-        if isinstance(userContent, list):
-            contents = []
-            for block in userContent:
-                if block["type"] == "text":
-                    contents.append(block["text"])
-                elif block["type"] == "image_base64":
-                    contents.append(types.Part.from_bytes(
-                        data=base64.b64decode(block["data"]),
-                        mime_type=block["mimeType"],
-                    ))
-        else:
-            contents = userContent
+        # Gemini 的助手角色名为 "model"
+        contents = [
+            types.Content(
+                role="model" if msg["role"] == "assistant" else "user",
+                parts=self._translateParts(msg["content"]),
+            )
+            for msg in messages
+        ]
 
         response = await client.aio.models.generate_content(
             model=model,
@@ -35,6 +35,26 @@ class OpenAICompatProvider(LLMProvider):
         return self._client
 
 
+    @staticmethod
+    def _translateContent(userContent: str | list) -> str | list:
+        """将通用中间格式翻译为 OpenAI vision content array（纯文本原样返回）。"""
+        if not isinstance(userContent, list):
+            return userContent
+
+        content = []
+        for block in userContent:
+            if block["type"] == "text":
+                content.append({"type": "text", "text": block["text"]})
+            elif block["type"] == "image_base64":
+                content.append({
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:{block['mimeType']};base64,{block['data']}"
+                    },
+                })
+        return content
+
+
     async def requestReply(
         self,
         *,
@@ -43,33 +63,40 @@ class OpenAICompatProvider(LLMProvider):
         model: str,
         maxTokens: int,
         temperature: float,
+    ) -> str:
+        return await self.requestMessages(
+            systemMessages=systemMessages,
+            messages=[{"role": "user", "content": userContent}],
+            model=model,
+            maxTokens=maxTokens,
+            temperature=temperature,
+        )
+
+
+    async def requestMessages(
+        self,
+        *,
+        systemMessages: list[str],
+        messages: list[dict],
+        model: str,
+        maxTokens: int,
+        temperature: float,
     ) -> str:
         client = self._getClient()
         systemText = "\n\n".join(systemMessages)
 
-        # 多模态：将通用中间格式翻译为 OpenAI vision content array
-        if isinstance(userContent, list):
-            content = []
-            for block in userContent:
-                if block["type"] == "text":
-                    content.append({"type": "text", "text": block["text"]})
-                elif block["type"] == "image_base64":
-                    content.append({
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:{block['mimeType']};base64,{block['data']}"
-                        },
-                    })
-        else:
-            content = userContent
-
+        # OpenAI / DeepSeek 的前缀缓存是自动的：只要 system + 历史消息逐字节不变，
+        # 多轮请求的公共前缀即可命中缓存，无需显式标记
         response = await client.chat.completions.create(
             model=model,
             max_tokens=maxTokens,
             temperature=temperature,
             messages=[
                 {"role": "system", "content": systemText},
-                {"role": "user", "content": content},
+                *[
+                    {"role": msg["role"], "content": self._translateContent(msg["content"])}
+                    for msg in messages
+                ],
             ],
         )
 
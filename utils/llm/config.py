@@ -55,6 +55,7 @@ _DEFAULT_CONFIG = {
     "groupTriggerKeywords": [],
     "memoryEnabled": False,
     "memoryAutoApprove": False,
+    "memoryContextMaxChars": 2000,
     "urlReadEnabled": False,
     "urlReadMaxUrls": 3,
     "urlReadMaxBytes": 512 * 1024,
@@ -72,6 +73,8 @@ _DEFAULT_CONFIG = {
     "knowledgeEnabled": True,
     "knowledgeMaxResults": 3,
     "knowledgeMinScore": 0.5,
+    "knowledgeRerankTopK": 10,
+    "knowledgeAutoReindex": True,
 }
 
 
@@ -271,6 +274,18 @@ def setMemoryAutoApprove(enabled: bool):
     _setConfig(memoryAutoApprove=enabled)
 
 
+def getMemoryContextMaxChars() -> int:
+    """获取记忆上下文块的字符预算（不含块头）"""
+    return loadLLMConfig()["memoryContextMaxChars"]
+
+
+def setMemoryContextMaxChars(value: int):
+    """设置记忆上下文块的字符预算"""
+    if not isinstance(value, int) or value < 200 or value > 20000:
+        raise ValueError("memoryContextMaxChars 必须在 200-20000 之间")
+    _setConfig(memoryContextMaxChars=value)
+
+
 
 
 # ── URL 读取 ────────────────────────────────────────
@@ -558,3 +573,25 @@ def setKnowledgeMinScore(value: float):
         raise ValueError("knowledgeMinScore 必须是大于等于 0 的数")
     _setConfig(knowledgeMinScore=float(value))
 
+
+def getKnowledgeRerankTopK() -> int:
+    """获取知识库语义重排候选数（0 为关闭）"""
+    return loadLLMConfig()["knowledgeRerankTopK"]
+
+
+def setKnowledgeRerankTopK(value: int):
+    """设置知识库语义重排候选数"""
+    if not isinstance(value, int) or value < 0 or value > 50:
+        raise ValueError("knowledgeRerankTopK 必须在 0-50 之间")
+    _setConfig(knowledgeRerankTopK=value)
+
+
+def getKnowledgeAutoReindex() -> bool:
+    """获取知识库目录监听自动刷新开关"""
+    return loadLLMConfig()["knowledgeAutoReindex"]
+
+
+def setKnowledgeAutoReindex(enabled: bool):
+    """设置知识库目录监听自动刷新开关"""
+    _setConfig(knowledgeAutoReindex=bool(enabled))
+
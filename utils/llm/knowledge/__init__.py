@@ -3,14 +3,18 @@ utils/llm/knowledge/
 
 知识库模块：
     - database: 知识条目 CRUD
-    - retriever: BM25 检索
+    - retriever: BM25 检索 + 语义重排
+    - index: 内存倒排索引
+    - vectorScorer / semantic: 可选的 NumPy 向量化评分与 LSA 语义表示
     - loader: Markdown 文件加载与索引刷新
+    - watcher: 知识库目录监听（inotify / 轮询），改动后自动刷新
     - tokenizer: 中英文分词与 BM25 评分
 """
 
 from .database import (
     initDatabase,
     upsertKnowledgeEntry,
+    bulkUpsertKnowledgeEntries,
     deleteEntriesBySource,
     getKnowledgeEntries,
     getKnowledgeStats,
@@ -20,22 +24,30 @@ from .database import (
 from .retriever import (
     retrieveKnowledge,
     rebuildTokenCacheFromDB,
+    syncKnowledgeIndex,
 )
 
 from .loader import (
     reindexKnowledgeBase,
+    reindexKnowledgeFiles,
     reindexOnStartup,
 )
 
+from .watcher import watchKnowledgeBase
+
 __all__ = [
     "initDatabase",
     "retrieveKnowledge",
     "upsertKnowledgeEntry",
+    "bulkUpsertKnowledgeEntries",
     "deleteEntriesBySource",
     "getKnowledgeEntries",
     "getKnowledgeStats",
     "buildKnowledgeContextBlock",
     "rebuildTokenCacheFromDB",
+    "syncKnowledgeIndex",
     "reindexKnowledgeBase",
+    "reindexKnowledgeFiles",
     "reindexOnStartup",
+    "watchKnowledgeBase",
 ]
\ No newline at end of file
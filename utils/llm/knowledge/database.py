@@ -5,17 +5,18 @@ utils/llm/knowledge/database.py
 
 提供：
     - knowledge_entries 表初始化
-    - CRUD 接口
+    - CRUD 接口（含 reindex 用的单事务批量 upsert）
     - 上下文格式化
 """
 
 import json
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, Optional
 
 from config import LLM_KNOWLEDGE_DB_PATH
 from utils.core.database import Database
 from utils.core.schema import loadSchema
+from utils.llm.retrievalCache import knowledgeCache
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
@@ -27,8 +28,25 @@ knowledgeDB = Database(LLM_KNOWLEDGE_DB_PATH, "LLMKnowledge")
 
 
 
+def _dedupeEntries(conn):
+    """
+    (source_file, title) 唯一索引建立前，清掉旧库里可能残留的重复行（保留最新的一行）。
+
+    以前靠"先 SELECT 再 INSERT / UPDATE"维持唯一，并发 reindex 时理论上会插重。
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'knowledge_entries'"
+    ).fetchone()
+    if exists:
+        conn.execute(
+            "DELETE FROM knowledge_entries WHERE id NOT IN "
+            "(SELECT MAX(id) FROM knowledge_entries GROUP BY source_file, title)"
+        )
+
+
 def initSchema(conn):
     """初始化知识库表结构。"""
+    _dedupeEntries(conn)
     conn.executescript(loadSchema("llmKnowledge"))
     conn.commit()
 
@@ -90,7 +108,9 @@ async def upsertKnowledgeEntry(
         conn.commit()
         return entryID
 
-    return await knowledgeDB.run(_upsert)
+    entryID = await knowledgeDB.run(_upsert)
+    knowledgeCache.bump()   # 检索结果含正文，写入后缓存即过期
+    return entryID
 
 
 
@@ -102,7 +122,108 @@ async def deleteEntriesBySource(sourceFile: str) -> int:
         conn.commit()
         return cursor.rowcount
 
-    return await knowledgeDB.run(_delete)
+    removed = await knowledgeDB.run(_delete)
+    knowledgeCache.bump()
+    return removed
+
+
+
+
+def _bulkUpsert(
+    conn,
+    entries: list[dict],
+    currentSources: Optional[set[str]],
+    removedSources: set[str],
+    force: bool,
+) -> dict:
+    """bulkUpsertKnowledgeEntries 的数据库线程部分（整体处于 Database.run 的同一事务中）"""
+    existing = {
+        (row["source_file"], row["title"])
+        for row in conn.execute("SELECT source_file, title FROM knowledge_entries")
+    }
+    now = datetime.now().strftime(TIMESTAMP_FORMAT)
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0, "removed": 0}
+
+    # 内容 hash / category / priority 都没变时 DO UPDATE 的 WHERE 不成立，
+    # 行保持原样（updated_at 不动），changes() 为 0 即"未变化"
+    changedClause = "" if force else (
+        "WHERE knowledge_entries.source_hash != excluded.source_hash "
+        "OR knowledge_entries.category != excluded.category "
+        "OR knowledge_entries.priority IS NOT excluded.priority"
+    )
+    upsertSQL = f"""
+        INSERT INTO knowledge_entries (category, title, content, tags_json, source_file, source_hash, priority, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(source_file, title) DO UPDATE SET
+            category = excluded.category,
+            content = excluded.content,
+            tags_json = excluded.tags_json,
+            source_hash = excluded.source_hash,
+            priority = excluded.priority,
+            updated_at = excluded.updated_at
+        {changedClause}
+    """
+
+    titlesBySource: dict[str, set[str]] = {}
+    for entry in entries:
+        sourceFile, title = entry["source_file"], entry["title"]
+        titlesBySource.setdefault(sourceFile, set()).add(title)
+        conn.execute(upsertSQL, (
+            entry["category"], title, entry["content"],
+            json.dumps(entry["tags"], ensure_ascii=False),
+            sourceFile, entry["source_hash"], entry.get("priority", 0), now, now,
+        ))
+        if conn.execute("SELECT changes()").fetchone()[0] == 0:
+            stats["unchanged"] += 1
+        elif (sourceFile, title) in existing:
+            stats["updated"] += 1
+        else:
+            stats["inserted"] += 1
+
+    # 重新解析过的文件改了 title：旧 title 的行不会再被 upsert 命中，一并删除
+    for sourceFile, titles in titlesBySource.items():
+        placeholders = ",".join("?" * len(titles))
+        cursor = conn.execute(
+            f"DELETE FROM knowledge_entries WHERE source_file = ? AND title NOT IN ({placeholders})",
+            (sourceFile, *titles),
+        )
+        stats["removed"] += cursor.rowcount
+
+    # 文件已不存在的来源
+    vanished = set(removedSources)
+    if currentSources is not None:
+        vanished |= {sourceFile for sourceFile, _ in existing} - currentSources
+    for sourceFile in vanished:
+        cursor = conn.execute("DELETE FROM knowledge_entries WHERE source_file = ?", (sourceFile,))
+        stats["removed"] += cursor.rowcount
+
+    return stats
+
+
+async def bulkUpsertKnowledgeEntries(
+    entries: list[dict],
+    currentSources: Optional[Iterable[str]] = None,
+    force: bool = False,
+    removedSources: Iterable[str] = (),
+) -> dict:
+    """
+    在单个事务中批量插入 / 更新知识条目（按 source_file + title 唯一），供 reindex 使用。
+
+    参数：
+        entries: [{"category", "title", "content", "tags", "source_file", "source_hash", "priority"}, ...]
+        currentSources: 本次扫描到的全部 source_file；给出时，不在其中的来源的条目在同一事务中删除
+        force: 内容未变化的条目也重写
+        removedSources: 明确已删除的 source_file（只处理部分文件时使用），其条目在同一事务中删除
+
+    返回：
+        {"inserted": n, "updated": n, "unchanged": n, "removed": n}
+    """
+    sources = set(currentSources) if currentSources is not None else None
+    removed = set(removedSources)
+    stats = await knowledgeDB.run(lambda conn: _bulkUpsert(conn, entries, sources, removed, force))
+    if stats["inserted"] or stats["updated"] or stats["removed"]:
+        knowledgeCache.bump()
+    return stats
 
 
 
@@ -0,0 +1,240 @@
+"""
+utils/llm/knowledge/index.py
+
+知识库内存倒排索引
+
+结构：
+    - 倒排表：term → {entry_id: {field: tf}}
+    - 每条目每字段的词频 Counter（增删条目时用来撤销倒排表）
+    - 每字段的文档长度与总长度（字段级 avgDocLen）
+    - 每条目的 category / priority（意图加成与优先级加成，不必回库查询）
+      以及 source_hash（增量同步时判断条目是否需要重新分词）
+
+评分为带 IDF 的三字段加权 BM25：
+    score = Σ_field weight(field) * Σ_t idf(t) * tf(k1+1) / (tf + k1(1 - b + b·len/avgLen))
+IDF 按条目粒度统计（任一字段含该词即计一次），查询只遍历自身 term 的倒排表。
+"""
+
+import json
+from collections import Counter
+
+from .tokenizer import countTokens, bm25Idf
+
+
+FIELDS = ("tags", "title", "content")
+
+# 三个字段的权重：tags(2.0) > title(1.5) > content(1.0)
+FIELD_WEIGHTS = {"tags": 2.0, "title": 1.5, "content": 1.0}
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+
+
+def tokenizeEntry(entry: dict) -> dict[str, Counter]:
+    """把一条知识条目切成三个字段的词频表"""
+    return {
+        "tags": countTokens(" ".join(entry["tags"])),
+        "title": countTokens(entry["title"]),
+        "content": countTokens(entry["content"]),
+    }
+
+
+
+
+def saturatedTf(tf: int, fieldLen: int, avgFieldLen: float) -> float:
+    """BM25 的 TF 饱和 + 长度归一化部分（不含 IDF 与字段权重）"""
+    norm = 1 - BM25_B + BM25_B * (fieldLen / avgFieldLen)
+    return tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+
+
+def fieldsToJSON(fields: dict[str, Counter]) -> str:
+    """字段词频表序列化（持久化到 knowledge_index_docs）"""
+    return json.dumps({field: dict(fields.get(field) or {}) for field in FIELDS}, ensure_ascii=False)
+
+
+def fieldsFromJSON(raw: str) -> dict[str, Counter]:
+    data = json.loads(raw)
+    return {field: Counter(data.get(field) or {}) for field in FIELDS}
+
+
+
+
+class KnowledgeIndex:
+    """知识条目倒排索引（单进程内存态，非线程安全，只在事件循环线程中读写）"""
+
+    def __init__(self):
+        # 每次增删改递增，派生结构（如向量评分矩阵）据此判断是否过期
+        self.generation = 0
+        self.clear()
+
+
+    def clear(self):
+        self._postings: dict[str, dict[int, dict[str, int]]] = {}
+        self._docFields: dict[int, dict[str, Counter]] = {}
+        self._docMeta: dict[int, dict] = {}
+        self._categoryDocs: dict[str, set[int]] = {}
+        self._priorityDocs: set[int] = set()
+        self._fieldLens: dict[str, dict[int, int]] = {field: {} for field in FIELDS}
+        self._fieldLenTotals: dict[str, int] = {field: 0 for field in FIELDS}
+        self.built = False
+        self.generation += 1
+
+
+    def __len__(self) -> int:
+        return len(self._docFields)
+
+
+    def __contains__(self, entryID: int) -> bool:
+        return entryID in self._docFields
+
+
+    # ── 增删 ──────────────────────────────────────
+
+    def addDocument(self, entryID: int, fields: dict[str, Counter], category: str, priority: int, sourceHash: str = ""):
+        """加入（或替换）一个条目"""
+        if entryID in self._docFields:
+            self.removeDocument(entryID)
+
+        self._docFields[entryID] = fields
+        self._docMeta[entryID] = {"sourceHash": sourceHash}
+        self.updateMeta(entryID, category, priority)
+        self.generation += 1
+
+        for field in FIELDS:
+            counts = fields.get(field) or Counter()
+            length = sum(counts.values())
+            self._fieldLens[field][entryID] = length
+            self._fieldLenTotals[field] += length
+            for term, tf in counts.items():
+                self._postings.setdefault(term, {}).setdefault(entryID, {})[field] = tf
+
+
+    def addEntry(self, entry: dict):
+        """分词并加入一个 knowledge_entries 行格式的条目（tags 已反序列化）"""
+        self.addDocument(
+            entry["id"], tokenizeEntry(entry), entry["category"], entry["priority"],
+            entry.get("source_hash", ""),
+        )
+
+
+    def updateMeta(self, entryID: int, category: str, priority: int):
+        """更新条目的 category / priority（二者不参与 source_hash，变更时无需重新分词）"""
+        meta = self._docMeta[entryID]
+        if meta.get("category") == category and meta.get("priority") == priority:
+            return
+        self.generation += 1
+
+        oldCategory = meta.get("category")
+        if oldCategory is not None and oldCategory != category:
+            self._discardCategory(entryID, oldCategory)
+
+        meta["category"] = category
+        meta["priority"] = priority
+        self._categoryDocs.setdefault(category, set()).add(entryID)
+        if priority:
+            self._priorityDocs.add(entryID)
+        else:
+            self._priorityDocs.discard(entryID)
+
+
+    def _discardCategory(self, entryID: int, category: str):
+        members = self._categoryDocs.get(category)
+        if members is not None:
+            members.discard(entryID)
+            if not members:
+                del self._categoryDocs[category]
+
+
+    def removeDocument(self, entryID: int):
+        """移除一个条目（不存在时忽略）"""
+        fields = self._docFields.pop(entryID, None)
+        if fields is None:
+            return
+        meta = self._docMeta.pop(entryID)
+        self._discardCategory(entryID, meta["category"])
+        self._priorityDocs.discard(entryID)
+        self.generation += 1
+
+        for field in FIELDS:
+            self._fieldLenTotals[field] -= self._fieldLens[field].pop(entryID, 0)
+            for term in (fields.get(field) or ()):
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                postings.pop(entryID, None)
+                if not postings:
+                    del self._postings[term]
+
+
+    def rebuild(self, entries: list[dict]):
+        """清空后由全部启用条目重建"""
+        self.clear()
+        for entry in entries:
+            self.addEntry(entry)
+        self.built = True
+
+
+    # ── 查询 ──────────────────────────────────────
+
+    def avgFieldLen(self, field: str) -> float:
+        """字段级平均文档长度（空库 fallback 50.0，与 computeAvgDocLen 一致）"""
+        if not self._docFields:
+            return 50.0
+        return max(self._fieldLenTotals[field] / len(self._docFields), 1.0)
+
+
+    def docMeta(self, entryID: int) -> dict:
+        return self._docMeta[entryID]
+
+
+    def fieldLen(self, field: str, entryID: int) -> int:
+        return self._fieldLens[field][entryID]
+
+
+    def postingsItems(self):
+        """遍历 (term, {entry_id: {field: tf}})，供派生结构批量构建"""
+        return self._postings.items()
+
+
+    def sourceHashes(self) -> dict[int, str]:
+        """{entry_id: source_hash}，增量同步时与数据库对比"""
+        return {entryID: meta["sourceHash"] for entryID, meta in self._docMeta.items()}
+
+
+    def categoryMembers(self, category: str) -> set[int]:
+        return self._categoryDocs.get(category, set())
+
+
+    def prioritizedIDs(self) -> set[int]:
+        """priority 非零的条目（即使不命中任何 term 也有分数）"""
+        return self._priorityDocs
+
+
+    def scoreTerms(self, queryTokens: list[str]) -> dict[int, float]:
+        """
+        对查询 token 做三字段加权 BM25（带 IDF）。
+
+        只遍历查询 term 的倒排表；返回 {entry_id: 分数}，未命中的条目不出现。
+        """
+        docCount = len(self._docFields)
+        if not docCount:
+            return {}
+
+        avgLens = {field: self.avgFieldLen(field) for field in FIELDS}
+        scores: dict[int, float] = {}
+
+        for term in dict.fromkeys(queryTokens):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = bm25Idf(docCount, len(postings))
+
+            for entryID, fieldTfs in postings.items():
+                termScore = 0.0
+                for field, tf in fieldTfs.items():
+                    termScore += FIELD_WEIGHTS[field] * saturatedTf(tf, self._fieldLens[field][entryID], avgLens[field])
+                scores[entryID] = scores.get(entryID, 0.0) + idf * termScore
+
+        return scores
@@ -5,21 +5,26 @@ utils/llm/knowledge/loader.py
 
 提供：
     - YAML frontmatter 解析
-    - source_hash 增量更新
-    - 批量索引刷新
+    - 文件 mtime / size 快速跳过 + source_hash 增量更新
+    - 批量索引刷新（全目录扫描，或只处理指定文件，供目录监听使用）
 """
 
+import asyncio
 import os
 import hashlib
-from typing import Optional
+from typing import Iterable, Optional
 
 import yaml
 
 from config import LLM_KNOWLEDGE_DIR
 from utils.core.logger import logSystemEvent, LogLevel
 
-from .database import upsertKnowledgeEntry, deleteEntriesBySource
-from .retriever import rebuildTokenCacheFromDB
+from .database import knowledgeDB, bulkUpsertKnowledgeEntries
+from .retriever import syncKnowledgeIndex
+
+
+# 全量扫描与监听触发的部分刷新串行执行，避免交错写 knowledge_files
+_reindexLock = asyncio.Lock()
 
 
 
@@ -98,12 +103,50 @@ def _parseMarkdownFile(filepath: str) -> Optional[dict]:
 
 
 
+async def _loadFileStats() -> dict[str, tuple[int, int]]:
+    """读取上次索引时记录的文件 mtime / size：{source_file: (mtime_ns, size)}"""
+    def _query(conn):
+        cursor = conn.execute("SELECT source_file, mtime_ns, size FROM knowledge_files")
+        return {row["source_file"]: (row["mtime_ns"], row["size"]) for row in cursor.fetchall()}
+
+    return await knowledgeDB.run(_query)
+
+
+async def _saveFileStats(fileStats: dict[str, tuple[int, int]]):
+    """覆盖写入本次扫描到的文件 mtime / size（已删除的文件一并清除）"""
+    def _write(conn):
+        conn.execute("DELETE FROM knowledge_files")
+        conn.executemany(
+            "INSERT INTO knowledge_files (source_file, mtime_ns, size) VALUES (?, ?, ?)",
+            [(sourceFile, mtime, size) for sourceFile, (mtime, size) in fileStats.items()],
+        )
+
+    await knowledgeDB.run(_write)
+
+
+async def _updateFileStats(updates: dict[str, tuple[int, int]], removed: Iterable[str]):
+    """只更新 / 删除指定文件的 mtime / size 记录"""
+    def _write(conn):
+        conn.executemany(
+            "INSERT OR REPLACE INTO knowledge_files (source_file, mtime_ns, size) VALUES (?, ?, ?)",
+            [(sourceFile, mtime, size) for sourceFile, (mtime, size) in updates.items()],
+        )
+        conn.executemany(
+            "DELETE FROM knowledge_files WHERE source_file = ?",
+            [(sourceFile,) for sourceFile in removed],
+        )
+
+    await knowledgeDB.run(_write)
+
+
+
+
 async def reindexKnowledgeBase(force: bool = False) -> dict:
     """
     扫描 data/llm/knowledge/*.md，增量更新数据库
 
     参数：
-        force: 强制重建所有条目（忽略 source_hash）
+        force: 强制重建所有条目（忽略文件 mtime / size 与 source_hash，倒排索引全量重建）
 
     返回：
         {"added": n, "updated": n, "removed": n, "skipped": n}
@@ -112,78 +155,125 @@ async def reindexKnowledgeBase(force: bool = False) -> dict:
         os.makedirs(LLM_KNOWLEDGE_DIR, exist_ok=True)
         return {"added": 0, "updated": 0, "removed": 0, "skipped": 0}
 
-    stats = {"added": 0, "updated": 0, "removed": 0, "skipped": 0}
-
-    # 扫描所有 .md 文件
-    mdFiles = [f for f in os.listdir(LLM_KNOWLEDGE_DIR) if f.endswith('.md')]
-
-    for filename in mdFiles:
-        filepath = os.path.join(LLM_KNOWLEDGE_DIR, filename)
-        sourceFile = f"knowledge/{filename}"  # 相对路径
-
-        parsed = _parseMarkdownFile(filepath)
-        if not parsed:
-            await logSystemEvent(f"跳过无效文件: {filename}", level=LogLevel.WARNING)
-            stats["skipped"] += 1
-            continue
-
-        # 检查是否需要更新（对比 source_hash）
-        if not force:
-            from .database import knowledgeDB
-            def _checkHash(conn):
-                cursor = conn.execute(
-                    "SELECT source_hash FROM knowledge_entries WHERE source_file = ? AND title = ?",
-                    (sourceFile, parsed["title"])
-                )
-                row = cursor.fetchone()
-                return row["source_hash"] if row else None
-
-            existingHash = await knowledgeDB.run(_checkHash)
-            if existingHash == parsed["source_hash"]:
+    async with _reindexLock:
+        stats = {"added": 0, "updated": 0, "removed": 0, "skipped": 0}
+
+        # 扫描所有 .md 文件
+        mdFiles = [f for f in os.listdir(LLM_KNOWLEDGE_DIR) if f.endswith('.md')]
+
+        knownStats = {} if force else await _loadFileStats()
+        currentStats: dict[str, tuple[int, int]] = {}
+
+        parsedEntries = []
+
+        for filename in mdFiles:
+            filepath = os.path.join(LLM_KNOWLEDGE_DIR, filename)
+            sourceFile = f"knowledge/{filename}"  # 相对路径
+
+            # mtime / size 均未变化的文件不再读取解析
+            try:
+                st = os.stat(filepath)
+                fileStat = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                fileStat = None
+            if fileStat is not None and knownStats.get(sourceFile) == fileStat:
+                currentStats[sourceFile] = fileStat
+                stats["skipped"] += 1
+                continue
+
+            parsed = _parseMarkdownFile(filepath)
+            if not parsed:
+                await logSystemEvent(f"跳过无效文件: {filename}", level=LogLevel.WARNING)
                 stats["skipped"] += 1
                 continue
 
-        # Upsert
-        entryID = await upsertKnowledgeEntry(
-            category=parsed["category"],
-            title=parsed["title"],
-            content=parsed["content"],
-            tags=parsed["tags"],
-            sourceFile=sourceFile,
-            sourceHash=parsed["source_hash"],
-            priority=parsed["priority"],
+            # 解析成功即记录文件状态（无效文件不记录，下次仍会重试并报告）
+            if fileStat is not None:
+                currentStats[sourceFile] = fileStat
+
+            parsedEntries.append({**parsed, "source_file": sourceFile})
+
+        # 单事务批量写入：内容未变的条目不改写，文件已删除的来源一并清除
+        upsertStats = await bulkUpsertKnowledgeEntries(
+            parsedEntries,
+            currentSources={f"knowledge/{f}" for f in mdFiles},
+            force=force,
+        )
+        stats["added"] = upsertStats["inserted"]
+        stats["updated"] = upsertStats["updated"]
+        stats["removed"] = upsertStats["removed"]
+        stats["skipped"] += upsertStats["unchanged"]
+
+        await _saveFileStats(currentStats)
+
+        # 同步倒排索引：只对 source_hash 变化的条目重新分词
+        indexStats = await syncKnowledgeIndex(force=force)
+
+        await logSystemEvent(
+            "知识库索引刷新完成",
+            f"新增 {stats['added']}, 更新 {stats['updated']}, 删除 {stats['removed']}, 跳过 {stats['skipped']}；"
+            f"索引更新 {indexStats['changed']} 条（重新分词 {indexStats['tokenized']}），共 {indexStats['total']} 条"
         )
 
-        if entryID:
-            # 判断是新增还是更新（简化：有 existingHash 就是更新）
-            if force or (not force and existingHash):
-                stats["updated"] += 1
-            else:
-                stats["added"] += 1
+        return stats
+
+
+
+
+async def reindexKnowledgeFiles(filenames: Iterable[str]) -> dict:
+    """
+    只刷新指定的知识库文件（目录监听检测到变化时调用），不扫描、不解析其他文件
+
+    参数：
+        filenames: 知识库目录下的文件名（如 "persona.md"）；已不存在的文件视为删除
+
+    返回：
+        {"added": n, "updated": n, "removed": n, "skipped": n}
+    """
+    async with _reindexLock:
+        stats = {"added": 0, "updated": 0, "removed": 0, "skipped": 0}
+        parsedEntries = []
+        updatedStats: dict[str, tuple[int, int]] = {}
+        removedSources: set[str] = set()
+
+        for filename in sorted(set(filenames)):
+            if not filename.endswith('.md'):
+                continue
+            filepath = os.path.join(LLM_KNOWLEDGE_DIR, filename)
+            sourceFile = f"knowledge/{filename}"
+
+            try:
+                st = os.stat(filepath)
+            except OSError:
+                removedSources.add(sourceFile)
+                continue
+
+            parsed = _parseMarkdownFile(filepath)
+            if not parsed:
+                # 编辑途中可能短暂是不完整的文件：保留旧条目，等下一次写入事件
+                await logSystemEvent(f"跳过无效文件: {filename}", level=LogLevel.WARNING)
+                stats["skipped"] += 1
+                continue
 
-    # 删除数据库中存在但文件已删除的条目
-    from .database import knowledgeDB
-    def _getOrphanedSources(conn):
-        cursor = conn.execute("SELECT DISTINCT source_file FROM knowledge_entries")
-        return [row["source_file"] for row in cursor.fetchall()]
+            updatedStats[sourceFile] = (st.st_mtime_ns, st.st_size)
+            parsedEntries.append({**parsed, "source_file": sourceFile})
 
-    orphanedSources = await knowledgeDB.run(_getOrphanedSources)
-    currentFiles = {f"knowledge/{f}" for f in mdFiles}
+        if not parsedEntries and not removedSources:
+            return stats
 
-    for sourceFile in orphanedSources:
-        if sourceFile not in currentFiles:
-            deleted = await deleteEntriesBySource(sourceFile)
-            stats["removed"] += deleted
+        upsertStats = await bulkUpsertKnowledgeEntries(parsedEntries, removedSources=removedSources)
+        stats["added"] = upsertStats["inserted"]
+        stats["updated"] = upsertStats["updated"]
+        stats["removed"] = upsertStats["removed"]
+        stats["skipped"] += upsertStats["unchanged"]
 
-    # 重建 token 缓存
-    await rebuildTokenCacheFromDB()
+        await _updateFileStats(updatedStats, removedSources)
 
-    await logSystemEvent(
-        "知识库索引刷新完成",
-        f"新增 {stats['added']}, 更新 {stats['updated']}, 删除 {stats['removed']}, 跳过 {stats['skipped']}"
-    )
+        if stats["added"] or stats["updated"] or stats["removed"]:
+            # 语义模型是全库拟合，单文件改动不立即重拟合，由 retriever 合并后延迟执行
+            await syncKnowledgeIndex(deferSemantic=True)
 
-    return stats
+        return stats
 
 
 
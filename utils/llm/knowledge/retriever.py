@@ -4,19 +4,45 @@ utils/llm/knowledge/retriever.py
 知识库检索模块
 
 提供：
-    - BM25 关键词检索（含 token 缓存）
-    - Token 缓存管理
+    - BM25 关键词检索（内存倒排索引 + IDF；装了 NumPy 且条目较多时走向量化评分）
+    - 可选的 LSA 语义重排：BM25 取 top-K 候选，与语义相似度排名做 RRF 融合
+      （全量 reindex 时立即拟合；目录监听的单文件刷新只安排一次延迟拟合，期间继续用旧模型）
+    - 查询结果 LRU（utils/llm/retrievalCache.knowledgeCache），写库 / 索引变化时按代计数失效
+    - 索引管理：各条目的词频表持久化在 knowledge_index_docs，
+      启动时一次读入；之后只对 source_hash 变化的条目重新分词
 """
 
 import json
+import asyncio
+
+from utils.core.logger import logSystemEvent, LogLevel
+from utils.llm.retrievalCache import knowledgeCache
 
 from .database import knowledgeDB
-from .tokenizer import tokenize, _bm25, computeAvgDocLen
+from .tokenizer import tokenize, TOKENIZER_VERSION
+from .index import KnowledgeIndex, tokenizeEntry, fieldsToJSON, fieldsFromJSON
+from . import vectorScorer, semantic
+
+
+# 倒排索引：由全部启用条目构建，查询只触及查询词自身的倒排表
+_index = KnowledgeIndex()
+
+# 向量化评分后端（NumPy 可用时）：条目数达到该阈值才启用，小库纯 Python 更快
+_VECTOR_MIN_DOCS = 300
+_vectorScorer = vectorScorer.VectorScorer() if vectorScorer.available() else None
 
+# LSA 语义模型（NumPy 可用且条目 ≥ 2 时由 syncKnowledgeIndex 拟合 / 读回）
+_semanticModel: "semantic.LSAModel | None" = None
 
-# Token 缓存：{entry_id: {"title": [...], "content": [...], "tags": [...]}}
-_tokenCache: dict[int, dict[str, list[str]]] = {}
-_avgDocLen: float = 50.0
+# 拟合是对全库的随机化 SVD：串行执行，避免旧快照的结果覆盖新快照
+_semanticLock = asyncio.Lock()
+
+# 延迟拟合：第一次未处理的改动之后等这么多秒统一拟合一次（连续编辑合并为一次）
+_SEMANTIC_REFIT_DELAY = 60.0
+_pendingSemanticRefit: "asyncio.Task | None" = None
+
+# RRF 融合常数：score = Σ 1 / (k + rank)
+_RRF_K = 60
 
 
 # ========== Category 意图匹配触发词（5-8 个精准词）==========
@@ -42,52 +68,309 @@ _CATEGORY_TRIGGERS = {
 
 
 
-async def _loadAllEnabled() -> list[dict]:
-    """加载所有启用的知识条目（含 tags 反序列化）"""
+def _rowToEntry(row) -> dict:
+    entry = dict(row)
+    entry["tags"] = json.loads(entry["tags_json"])
+    return entry
+
+
+async def _loadEntriesByIDs(entryIDs: list[int]) -> dict[int, dict]:
+    """按 id 加载启用的知识条目（只取最终入选的几条）"""
+    if not entryIDs:
+        return {}
+
     def _query(conn):
+        placeholders = ",".join("?" * len(entryIDs))
         cursor = conn.execute(
-            "SELECT id, category, title, content, tags_json, priority FROM knowledge_entries WHERE enabled = 1"
+            "SELECT id, category, title, content, tags_json, priority FROM knowledge_entries "
+            f"WHERE enabled = 1 AND id IN ({placeholders})",
+            list(entryIDs),
         )
-        rows = cursor.fetchall()
-        result = []
-        for row in rows:
-            entry = dict(row)
-            entry["tags"] = json.loads(entry["tags_json"])
-            result.append(entry)
-        return result
+        return {row["id"]: _rowToEntry(row) for row in cursor.fetchall()}
 
     return await knowledgeDB.run(_query)
 
 
 
 
-def _rebuildTokenCache(entries: list[dict]):
-    """重建 token 缓存（启动 / reindex 时调用）"""
-    global _tokenCache, _avgDocLen
-    _tokenCache.clear()
+# SQLite 单条语句的变量数上限保守取 500
+_SQL_CHUNK = 500
+
+
+def _collectIndexChanges(conn, knownHashes: dict[int, str], force: bool) -> tuple[list, dict, int]:
+    """
+    在数据库线程中对比并准备增量（供 syncKnowledgeIndex 调用）。
+
+    对内存中缺失或 source_hash 变化的条目：
+        - 持久化的词频表仍有效（hash 与分词版本都一致）→ 直接反序列化
+        - 否则重新分词，并写回 knowledge_index_docs
+    同时清理已删除 / 已禁用条目的持久化行。
+
+    返回：
+        (全部启用条目的 [(id, category, priority)],
+         {id: (source_hash, fields)} 需要加入内存的条目,
+         本次重新分词的条目数)
+    """
+    rows = conn.execute(
+        """
+        SELECT e.id, e.category, e.priority, e.source_hash,
+               d.source_hash AS index_hash, d.tokenizer_version, d.fields_json
+        FROM knowledge_entries e
+        LEFT JOIN knowledge_index_docs d ON d.entry_id = e.id
+        WHERE e.enabled = 1
+        """
+    ).fetchall()
+
+    metas = []
+    changed: dict[int, tuple] = {}
+    stale: dict[int, str] = {}
+
+    for row in rows:
+        entryID = row["id"]
+        metas.append((entryID, row["category"], row["priority"]))
+        if not force and knownHashes.get(entryID) == row["source_hash"]:
+            continue
+        if (not force
+                and row["index_hash"] == row["source_hash"]
+                and row["tokenizer_version"] == TOKENIZER_VERSION):
+            changed[entryID] = (row["source_hash"], fieldsFromJSON(row["fields_json"]))
+        else:
+            stale[entryID] = row["source_hash"]
+
+    # 只对真正过期的条目读正文并分词
+    staleIDs = list(stale)
+    for start in range(0, len(staleIDs), _SQL_CHUNK):
+        chunk = staleIDs[start:start + _SQL_CHUNK]
+        placeholders = ",".join("?" * len(chunk))
+        cursor = conn.execute(
+            f"SELECT id, title, content, tags_json FROM knowledge_entries WHERE id IN ({placeholders})",
+            chunk,
+        )
+        for row in cursor.fetchall():
+            fields = tokenizeEntry(_rowToEntry(row))
+            conn.execute(
+                """
+                INSERT INTO knowledge_index_docs (entry_id, source_hash, tokenizer_version, fields_json)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(entry_id) DO UPDATE SET
+                    source_hash = excluded.source_hash,
+                    tokenizer_version = excluded.tokenizer_version,
+                    fields_json = excluded.fields_json
+                """,
+                (row["id"], stale[row["id"]], TOKENIZER_VERSION, fieldsToJSON(fields)),
+            )
+            changed[row["id"]] = (stale[row["id"]], fields)
+
+    conn.execute(
+        "DELETE FROM knowledge_index_docs "
+        "WHERE entry_id NOT IN (SELECT id FROM knowledge_entries WHERE enabled = 1)"
+    )
+    return metas, changed, len(stale)
+
+
+async def syncKnowledgeIndex(force: bool = False, deferSemantic: bool = False) -> dict:
+    """
+    增量同步内存倒排索引与持久化索引（启动 / reindex 后调用）。
+
+    参数：
+        force: 忽略内存与持久化索引，全部重新分词
+        deferSemantic: 不立即重新拟合语义模型，而是安排一次延迟拟合（目录监听的单文件刷新用）；
+            在此之前继续使用旧模型，新加入的条目语义名次记为最后
+
+    返回：
+        {"total": 启用条目数, "changed": 加入 / 替换的条目数,
+         "tokenized": 其中重新分词的条目数, "removed": 移出的条目数}
+    """
+    knownHashes = {} if force else _index.sourceHashes()
+    generationBefore = _index.generation
+    modelBefore = _semanticModel
+    metas, changed, tokenized = await knowledgeDB.run(
+        lambda conn: _collectIndexChanges(conn, knownHashes, force)
+    )
+
+    if force:
+        _index.clear()
+
+    enabledIDs = {entryID for entryID, _, _ in metas}
+    removed = [entryID for entryID in _index.sourceHashes() if entryID not in enabledIDs]
+    for entryID in removed:
+        _index.removeDocument(entryID)
+
+    for entryID, category, priority in metas:
+        if entryID in changed:
+            sourceHash, fields = changed[entryID]
+            _index.addDocument(entryID, fields, category, priority, sourceHash)
+        else:
+            _index.updateMeta(entryID, category, priority)
+
+    _index.built = True
+    if deferSemantic and not force:
+        _scheduleSemanticRefit()
+    else:
+        await _refreshSemanticModel(force)
+
+    if _index.generation != generationBefore or _semanticModel is not modelBefore:
+        knowledgeCache.bump()
 
-    allDocTokens = []
-    for entry in entries:
-        entryID = entry["id"]
-        titleTokens = tokenize(entry["title"])
-        contentTokens = tokenize(entry["content"])
-        tagsTokens = tokenize(" ".join(entry["tags"]))
+    return {
+        "total": len(metas),
+        "changed": len(changed),
+        "tokenized": tokenized,
+        "removed": len(removed),
+    }
 
-        _tokenCache[entryID] = {
-            "title": titleTokens,
-            "content": contentTokens,
-            "tags": tagsTokens,
-        }
 
-        # 用于计算平均文档长度（三个字段拼接）
-        allDocTokens.append(titleTokens + contentTokens + tagsTokens)
 
-    _avgDocLen = computeAvgDocLen(allDocTokens) if allDocTokens else 50.0
 
+async def _refreshSemanticModel(force: bool = False):
+    """
+    让语义模型与当前索引一致（syncKnowledgeIndex 末尾调用）。
+
+    signature 未变 → 不动；持久化模型的 signature 匹配 → 读回；
+    否则在工作线程中重新拟合并写回。拟合失败只记日志，检索退回纯 BM25 排序。
+    """
+    if not semantic.available():
+        return
+    async with _semanticLock:
+        await _refreshSemanticModelLocked(force)
+
+
+async def _refreshSemanticModelLocked(force: bool):
+    global _semanticModel
+    signature = semantic.computeSignature(_index.sourceHashes())
+    if not force and _semanticModel is not None and _semanticModel.signature == signature:
+        return
+
+    if not force:
+        stored = await knowledgeDB.run(lambda conn: semantic.LSAModel.loadFrom(conn, signature))
+        if stored is not None:
+            _semanticModel = stored
+            return
+
+    snapshot = semantic.indexSnapshot(_index)
+    try:
+        model = await asyncio.to_thread(semantic.fitModel, snapshot)
+    except Exception as e:
+        _semanticModel = None
+        await logSystemEvent("知识库语义模型拟合失败", str(e), LogLevel.WARNING)
+        return
+
+    if model is None:
+        await knowledgeDB.run(semantic.clearStored)
+    else:
+        await knowledgeDB.run(model.saveTo)
+    _semanticModel = model
+
+
+def _scheduleSemanticRefit():
+    """安排一次延迟拟合；已有待执行的拟合时不重复安排（它执行时会看到最新索引）"""
+    global _pendingSemanticRefit
+    if not semantic.available():
+        return
+    if _pendingSemanticRefit is not None and not _pendingSemanticRefit.done():
+        return
+    _pendingSemanticRefit = asyncio.create_task(_deferredSemanticRefit())
+
+
+async def _deferredSemanticRefit():
+    await asyncio.sleep(_SEMANTIC_REFIT_DELAY)
+    modelBefore = _semanticModel
+    try:
+        await _refreshSemanticModel()
+    except Exception as e:
+        await logSystemEvent("知识库语义模型延迟拟合失败", str(e), LogLevel.WARNING)
+        return
+    if _semanticModel is not modelBefore:
+        knowledgeCache.bump()
+
+
+def cancelSemanticRefit():
+    """取消尚未执行的延迟拟合（监听任务退出时调用）"""
+    global _pendingSemanticRefit
+    if _pendingSemanticRefit is not None:
+        _pendingSemanticRefit.cancel()
+        _pendingSemanticRefit = None
+
+
+
+
+def _triggeredBonuses(query: str) -> dict[str, float]:
+    """查询命中的 category 意图加成 {category: bonus}"""
+    return {
+        category: trigger["bonus"]
+        for category, trigger in _CATEGORY_TRIGGERS.items()
+        if any(kw in query for kw in trigger["keywords"])
+    }
+
+
+def _scoreQuery(queryTokens: list[str], bonuses: dict[str, float]) -> dict[int, float]:
+    """
+    计算候选条目的最终分数（纯 Python 评分）。
+
+    候选 = 命中查询词的条目 ∪ 意图加成类别的条目 ∪ priority 非零的条目
+    （后两类即使不命中任何词也可能过 minScore 门槛，与逐条评分的结果一致）。
+    """
+    scores = _index.scoreTerms(queryTokens)
+
+    candidates = set(scores)
+    for category in bonuses:
+        candidates |= _index.categoryMembers(category)
+    candidates |= _index.prioritizedIDs()
+
+    final = {}
+    for entryID in candidates:
+        meta = _index.docMeta(entryID)
+        final[entryID] = (
+            scores.get(entryID, 0.0)
+            + bonuses.get(meta["category"], 0.0)   # category 意图匹配加成
+            + meta["priority"] * 1.0                # 保持原有 priority 加成
+        )
+    return final
+
+
+def _rankQuery(queryTokens: list[str], bonuses: dict[str, float], limit: int, minScore: float) -> list[tuple[int, float]]:
+    """返回 [(entry_id, score)]，按 (-score, id) 排序，最多 limit 条"""
+    if _vectorScorer is not None and len(_index) >= _VECTOR_MIN_DOCS:
+        return _vectorScorer.rank(_index, queryTokens, bonuses, limit, minScore)
+
+    scores = _scoreQuery(queryTokens, bonuses)
+    return sorted(
+        ((entryID, score) for entryID, score in scores.items() if score >= minScore),
+        key=lambda item: (-item[1], item[0]),
+    )[:limit]
+
+
+
+
+def _rerankSemantic(queryTokens: list[str], ranked: list[tuple[int, float]]) -> list[tuple[int, float]]:
+    """
+    用 LSA 余弦相似度重排 BM25 候选（Reciprocal Rank Fusion）。
 
+    fused = 1 / (k + BM25 名次) + 1 / (k + 语义名次)；
+    模型里没有的条目（拟合后才加入）语义名次记为最后。同分按 BM25 名次。
+    返回的分数仍是 BM25 分数（minScore 门槛与日志含义不变）。
+    """
+    if _semanticModel is None or len(ranked) < 2:
+        return ranked
+
+    sims = _semanticModel.similarities(queryTokens, [entryID for entryID, _ in ranked])
+    if not sims:
+        return ranked
+
+    bm25Rank = {entryID: rank for rank, (entryID, _) in enumerate(ranked, 1)}
+    semanticOrder = sorted(bm25Rank, key=lambda entryID: (-sims.get(entryID, -2.0), bm25Rank[entryID]))
+    semanticRank = {entryID: rank for rank, entryID in enumerate(semanticOrder, 1)}
+
+    def _fused(item):
+        entryID = item[0]
+        return 1.0 / (_RRF_K + bm25Rank[entryID]) + 1.0 / (_RRF_K + semanticRank[entryID])
 
+    return sorted(ranked, key=lambda item: (-_fused(item), bm25Rank[item[0]]))
 
-async def retrieveKnowledge(query: str, limit: int = 3, minScore: float = 0.5) -> list[dict]:
+
+
+
+async def retrieveKnowledge(query: str, limit: int = 3, minScore: float = 0.5, rerankTopK: int = 0) -> list[dict]:
     """
     BM25 关键词检索 + 意图匹配优化（Phase 1.3）
 
@@ -95,6 +378,8 @@ async def retrieveKnowledge(query: str, limit: int = 3, minScore: float = 0.5) -
         query: 查询字符串
         limit: 最多返回条数
         minScore: 最低分数阈值
+        rerankTopK: 语义重排的候选数（BM25 先取 max(limit, rerankTopK) 条，
+            经 RRF 融合后再截取 limit 条）；0 关闭重排。未安装 NumPy 时忽略
 
     返回：
         [{"id", "category", "title", "content", "tags", "priority", "score"}, ...]
@@ -106,49 +391,35 @@ async def retrieveKnowledge(query: str, limit: int = 3, minScore: float = 0.5) -
     if not queryTokens:
         return []
 
-    entries = await _loadAllEnabled()
-
-    # 如果缓存为空，重建
-    if not _tokenCache:
-        _rebuildTokenCache(entries)
-
-    scored = []
-    for entry in entries:
-        entryID = entry["id"]
-        if entryID not in _tokenCache:
-            continue
-
-        cached = _tokenCache[entryID]
-
-        # 三个字段分别评分，权重：tags(2.0) > title(1.5) > content(1.0)
-        score = (
-            _bm25(queryTokens, cached["tags"], _avgDocLen) * 2.0
-            + _bm25(queryTokens, cached["title"], _avgDocLen) * 1.5
-            + _bm25(queryTokens, cached["content"], _avgDocLen) * 1.0
-        )
-
-        # 新增：category 意图匹配加成
-        categoryBonus = 0.0
-        category = entry["category"]
-
-        if category in _CATEGORY_TRIGGERS:
-            trigger = _CATEGORY_TRIGGERS[category]
-            if any(kw in query for kw in trigger["keywords"]):
-                categoryBonus = trigger["bonus"]
+    # 索引尚未构建（启动 reindex 未完成），现场同步一次（优先读持久化索引）
+    if not _index.built:
+        await syncKnowledgeIndex()
 
-        score += categoryBonus
-        score += entry["priority"] * 1.0  # 保持原有 priority 加成
+    bonuses = _triggeredBonuses(query)
+    cacheKey = (tuple(sorted(queryTokens)), tuple(sorted(bonuses)), limit, minScore, rerankTopK)
+    cached = knowledgeCache.get(cacheKey)
+    if cached is not None:
+        return cached
+    stamp = knowledgeCache.stamp()
 
-        if score >= minScore:
-            scored.append({**entry, "score": score})
+    if rerankTopK > 0 and _semanticModel is not None:
+        ranked = _rankQuery(queryTokens, bonuses, max(limit, rerankTopK), minScore)
+        ranked = _rerankSemantic(queryTokens, ranked)[:limit]
+    else:
+        ranked = _rankQuery(queryTokens, bonuses, limit, minScore)
 
-    scored.sort(key=lambda x: -x["score"])
-    return scored[:limit]
+    entries = await _loadEntriesByIDs([entryID for entryID, _ in ranked])
+    results = [
+        {**entries[entryID], "score": score}
+        for entryID, score in ranked
+        if entryID in entries
+    ]
+    knowledgeCache.put(cacheKey, results, stamp)
+    return results
 
 
 
 
 async def rebuildTokenCacheFromDB():
-    """从数据库重建 token 缓存（reindex 后调用）"""
-    entries = await _loadAllEnabled()
-    _rebuildTokenCache(entries)
+    """从数据库全量重建倒排索引（忽略持久化索引，全部重新分词）"""
+    await syncKnowledgeIndex(force=True)
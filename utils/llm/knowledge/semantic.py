@@ -0,0 +1,249 @@
+"""
+utils/llm/knowledge/semantic.py
+
+知识库 LSA 语义表示（可选，需 NumPy）
+
+2-gram 关键词检索召回不到换了说法的同义表达，这里在 reindex 时额外拟合一个
+本地的稠密表示，用于对 BM25 候选做语义重排（纯 CPU，无需网络 / GPU）：
+    - 文档 TF-IDF：三字段词频按 FIELD_WEIGHTS 加权合并，亚线性 TF（1 + log tf）× 平滑 IDF，行 L2 归一化
+    - 截断 SVD（随机化算法）：得到 term → 潜在语义空间的投影矩阵 V_k；
+      稀疏矩阵乘法直接用 COO 三元组 + np.add.at 实现，不依赖 SciPy
+    - 条目语义向量 = tfidf · V_k（L2 归一化）；查询向量同样投影后做余弦相似度
+
+模型按 signature（全部条目 id + source_hash + 分词版本 + 维度的摘要）持久化到
+knowledge_semantic，与 knowledge_index_docs 放在同一个库里；条目集合不变时重启直接读回。
+"""
+
+import hashlib
+import json
+import math
+
+from .index import FIELD_WEIGHTS, KnowledgeIndex
+from .tokenizer import TOKENIZER_VERSION
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# 潜在语义维度（条目数 / 词表更小时自动截断）
+LSA_RANK = 64
+
+# 随机化 SVD 的过采样列数与幂迭代次数
+_OVERSAMPLE = 10
+_POWER_ITERS = 2
+
+
+
+
+def available() -> bool:
+    return np is not None
+
+
+def computeSignature(sourceHashes: dict[int, str]) -> str:
+    """条目集合的摘要：任一条目增删改、分词规则或维度变化都会改变 signature"""
+    digest = hashlib.sha256(f"v{TOKENIZER_VERSION}:r{LSA_RANK}".encode("utf-8"))
+    for entryID in sorted(sourceHashes):
+        digest.update(f"|{entryID}:{sourceHashes[entryID]}".encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+
+
+def indexSnapshot(index: KnowledgeIndex) -> dict:
+    """
+    在事件循环线程中从倒排索引取出拟合所需的数据（之后的拟合可以放到线程里做）。
+
+    返回：
+        {"signature", "docIDs", "terms", "rows", "cols", "tfs", "docFreq"}
+        rows / cols / tfs 为 COO 三元组（条目位置, 词位置, 字段加权后的 tf）
+    """
+    sourceHashes = index.sourceHashes()
+    docIDs = sorted(sourceHashes)
+    position = {entryID: pos for pos, entryID in enumerate(docIDs)}
+
+    terms, docFreq, rows, cols, tfs = [], [], [], [], []
+    for term, postings in index.postingsItems():
+        col = len(terms)
+        terms.append(term)
+        docFreq.append(len(postings))
+        for entryID, fieldTfs in postings.items():
+            rows.append(position[entryID])
+            cols.append(col)
+            tfs.append(sum(FIELD_WEIGHTS[field] * tf for field, tf in fieldTfs.items()))
+
+    return {
+        "signature": computeSignature(sourceHashes),
+        "docIDs": docIDs,
+        "terms": terms,
+        "rows": rows,
+        "cols": cols,
+        "tfs": tfs,
+        "docFreq": docFreq,
+    }
+
+
+
+
+def _cooMatmul(rows, cols, vals, dense, outRows: int):
+    """稀疏 X（COO）乘稠密矩阵：X @ dense；传入 (cols, rows) 即为 X.T @ dense"""
+    out = np.zeros((outRows, dense.shape[1]))
+    np.add.at(out, rows, vals[:, None] * dense[cols])
+    return out
+
+
+def _normalizeRows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def fitModel(snapshot: dict, rank: int = LSA_RANK, seed: int = 0) -> "LSAModel | None":
+    """
+    由 indexSnapshot 的结果拟合 LSA 模型（纯计算，可在工作线程中运行）。
+
+    条目少于 2 条或词表为空时无法构成潜在空间，返回 None。
+    """
+    docCount = len(snapshot["docIDs"])
+    termCount = len(snapshot["terms"])
+    if docCount < 2 or termCount == 0:
+        return None
+
+    rows = np.asarray(snapshot["rows"], dtype=np.int64)
+    cols = np.asarray(snapshot["cols"], dtype=np.int64)
+    docFreq = np.asarray(snapshot["docFreq"], dtype=np.float64)
+    idf = np.log((1.0 + docCount) / (1.0 + docFreq)) + 1.0
+
+    # 亚线性 TF × IDF，再按行（条目）L2 归一化
+    vals = (1.0 + np.log(np.asarray(snapshot["tfs"], dtype=np.float64))) * idf[cols]
+    rowNorms = np.sqrt(np.bincount(rows, weights=vals * vals, minlength=docCount))
+    rowNorms[rowNorms == 0] = 1.0
+    vals = vals / rowNorms[rows]
+
+    # 随机化截断 SVD（Halko et al.）：X ≈ Q·B，B = Qᵀ·X 足够小，可直接做稠密 SVD
+    sketch = min(rank + _OVERSAMPLE, docCount, termCount)
+    rng = np.random.default_rng(seed)
+    basis = _cooMatmul(rows, cols, vals, rng.standard_normal((termCount, sketch)), docCount)
+    for _ in range(_POWER_ITERS):
+        basis, _r = np.linalg.qr(basis)
+        basis = _cooMatmul(rows, cols, vals, _cooMatmul(cols, rows, vals, basis, termCount), docCount)
+    basis, _r = np.linalg.qr(basis)
+
+    projected = _cooMatmul(cols, rows, vals, basis, termCount).T   # B = Qᵀ·X（sketch × termCount）
+    leftVectors, singular, rightVectors = np.linalg.svd(projected, full_matrices=False)
+
+    keep = int(min(rank, np.count_nonzero(singular > singular[0] * 1e-8))) if singular.size else 0
+    if keep == 0:
+        return None
+
+    components = rightVectors[:keep].T                                 # V_k（termCount × k）
+    docVectors = (basis @ leftVectors[:, :keep]) * singular[:keep]     # X·V_k = Q·U_b·Σ
+
+    return LSAModel(
+        signature=snapshot["signature"],
+        terms=snapshot["terms"],
+        idf=idf.astype(np.float32),
+        components=components.astype(np.float32),
+        docIDs=snapshot["docIDs"],
+        docVectors=_normalizeRows(docVectors).astype(np.float32),
+    )
+
+
+
+
+class LSAModel:
+    """拟合好的 LSA 投影与条目语义向量（只读）"""
+
+    def __init__(self, signature: str, terms: list[str], idf, components, docIDs: list[int], docVectors):
+        self.signature = signature
+        self.terms = terms
+        self.idf = idf
+        self.components = components
+        self.docIDs = list(docIDs)
+        self.docVectors = docVectors
+        self._vocab = {term: col for col, term in enumerate(terms)}
+        self._position = {entryID: pos for pos, entryID in enumerate(self.docIDs)}
+
+
+    @property
+    def rank(self) -> int:
+        return self.components.shape[1]
+
+
+    def queryVector(self, queryTokens: list[str]):
+        """把查询投影到潜在空间（L2 归一化）；没有任何已知词时返回 None"""
+        cols = [self._vocab[term] for term in dict.fromkeys(queryTokens) if term in self._vocab]
+        if not cols:
+            return None
+        vector = self.idf[cols] @ self.components[cols]
+        norm = float(np.linalg.norm(vector))
+        if norm == 0.0 or math.isnan(norm):
+            return None
+        return vector / norm
+
+
+    def similarities(self, queryTokens: list[str], entryIDs: list[int]) -> dict[int, float]:
+        """
+        查询与各条目的余弦相似度 {entry_id: sim}。
+
+        拟合之后才加入的条目不在模型中，不出现在结果里。
+        """
+        queryVector = self.queryVector(queryTokens)
+        if queryVector is None:
+            return {}
+        known = [entryID for entryID in entryIDs if entryID in self._position]
+        if not known:
+            return {}
+        positions = [self._position[entryID] for entryID in known]
+        sims = self.docVectors[positions] @ queryVector
+        return {entryID: float(sim) for entryID, sim in zip(known, sims)}
+
+
+    # ── 持久化 ──────────────────────────────────────
+
+    def saveTo(self, conn):
+        """写入 knowledge_semantic（单行，覆盖旧模型）"""
+        conn.execute("DELETE FROM knowledge_semantic")
+        conn.execute(
+            """
+            INSERT INTO knowledge_semantic (id, signature, rank, terms_json, doc_ids_json, idf, components, doc_vectors)
+            VALUES (1, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                self.signature,
+                self.rank,
+                json.dumps(self.terms, ensure_ascii=False),
+                json.dumps(self.docIDs),
+                self.idf.tobytes(),
+                self.components.tobytes(),
+                self.docVectors.tobytes(),
+            ),
+        )
+
+
+    @classmethod
+    def loadFrom(cls, conn, signature: str) -> "LSAModel | None":
+        """读回 signature 匹配的持久化模型，不存在或已过期返回 None"""
+        row = conn.execute(
+            "SELECT * FROM knowledge_semantic WHERE id = 1 AND signature = ?", (signature,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        terms = json.loads(row["terms_json"])
+        docIDs = json.loads(row["doc_ids_json"])
+        rank = row["rank"]
+        return cls(
+            signature=row["signature"],
+            terms=terms,
+            idf=np.frombuffer(row["idf"], dtype=np.float32),
+            components=np.frombuffer(row["components"], dtype=np.float32).reshape(len(terms), rank),
+            docIDs=docIDs,
+            docVectors=np.frombuffer(row["doc_vectors"], dtype=np.float32).reshape(len(docIDs), rank),
+        )
+
+
+def clearStored(conn):
+    """条目不足以拟合模型时清掉旧的持久化模型"""
+    conn.execute("DELETE FROM knowledge_semantic")
@@ -11,15 +11,16 @@ utils/llm/knowledge/tokenizer.py
 """
 
 import re
+import math
 from collections import Counter
 
 
-def tokenize(text: str) -> list[str]:
-    """
-    中英文混合分词。
+# 分词规则版本：规则变更时递增，持久化的倒排索引会据此整体失效重建
+TOKENIZER_VERSION = 1
 
-    返回 token 列表（已去重、转小写）。
-    """
+
+def _extractTokens(text: str) -> list[str]:
+    """按分词规则切出全部 token（不去重，保留出现次数）。"""
     if not text:
         return []
 
@@ -44,8 +45,37 @@ def tokenize(text: str) -> list[str]:
             for i in range(len(segment) - 1):
                 tokens.append(segment[i:i+2])
 
+    return tokens
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    中英文混合分词。
+
+    返回 token 列表（已去重、转小写）。
+    """
     # 去重但保留顺序（用 dict.fromkeys）
-    return list(dict.fromkeys(tokens))
+    return list(dict.fromkeys(_extractTokens(text)))
+
+
+def countTokens(text: str) -> Counter:
+    """
+    中英文混合分词并统计词频（倒排索引用）。
+
+    返回 Counter{token: 出现次数}；总次数即该字段的文档长度。
+    """
+    return Counter(_extractTokens(text))
+
+
+def bm25Idf(docCount: int, docFreq: int) -> float:
+    """
+    BM25 IDF（Lucene 变体，恒为正）。
+
+    参数：
+        docCount: 全库文档数
+        docFreq: 含该词的文档数
+    """
+    return math.log(1.0 + (docCount - docFreq + 0.5) / (docFreq + 0.5))
 
 
 def _bm25(queryTokens: list[str], docTokens: list[str], avgDocLen: float = 50.0, k1: float = 1.5, b: float = 0.75) -> float:
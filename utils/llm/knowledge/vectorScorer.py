@@ -0,0 +1,146 @@
+"""
+utils/llm/knowledge/vectorScorer.py
+
+知识库 BM25 向量化评分后端（可选，需 NumPy）
+
+把倒排索引展开为三个字段各一张稀疏矩阵（CSR：term 行 × 条目列），
+矩阵元素是预先算好的 TF 饱和值 tf(k1+1) / (tf + k1·norm)。
+查询时取出查询词对应的行，乘以 IDF 与字段权重，用 np.bincount 按条目聚合；
+category 意图加成与 priority 加成也以整列向量相加，最后按 (-score, id) 排序取 top-N。
+
+结果与 retriever 中的纯 Python 评分一致（同一套候选规则与排序键），
+矩阵只在索引 generation 变化后的首次查询时重建。未安装 NumPy 时 available() 为 False。
+"""
+
+from .index import FIELDS, FIELD_WEIGHTS, KnowledgeIndex, saturatedTf
+from .tokenizer import bm25Idf
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+
+
+def available() -> bool:
+    return np is not None
+
+
+
+
+class VectorScorer:
+    """由 KnowledgeIndex 派生的稀疏矩阵快照"""
+
+    def __init__(self):
+        self._generation = None
+
+
+    def _build(self, index: KnowledgeIndex):
+        entryIDs = sorted(index.sourceHashes())
+        position = {entryID: pos for pos, entryID in enumerate(entryIDs)}
+        avgLens = {field: index.avgFieldLen(field) for field in FIELDS}
+
+        vocab: dict[str, int] = {}
+        docFreq: list[int] = []
+        indptr = {field: [0] for field in FIELDS}
+        indices = {field: [] for field in FIELDS}
+        data = {field: [] for field in FIELDS}
+
+        for term, postings in index.postingsItems():
+            vocab[term] = len(docFreq)
+            docFreq.append(len(postings))
+            for entryID, fieldTfs in postings.items():
+                pos = position[entryID]
+                for field, tf in fieldTfs.items():
+                    indices[field].append(pos)
+                    data[field].append(saturatedTf(tf, index.fieldLen(field, entryID), avgLens[field]))
+            for field in FIELDS:
+                indptr[field].append(len(indices[field]))
+
+        self._entryIDs = np.asarray(entryIDs, dtype=np.int64)
+        self._vocab = vocab
+        self._docFreq = docFreq
+        self._indptr = {field: np.asarray(indptr[field], dtype=np.int64) for field in FIELDS}
+        self._indices = {field: np.asarray(indices[field], dtype=np.int64) for field in FIELDS}
+        self._data = {field: np.asarray(data[field], dtype=np.float64) for field in FIELDS}
+
+        categories = sorted({index.docMeta(entryID)["category"] for entryID in entryIDs})
+        self._categoryCodes = {category: code for code, category in enumerate(categories)}
+        self._docCategory = np.asarray(
+            [self._categoryCodes[index.docMeta(entryID)["category"]] for entryID in entryIDs],
+            dtype=np.int64,
+        )
+        self._priority = np.asarray(
+            [index.docMeta(entryID)["priority"] for entryID in entryIDs],
+            dtype=np.float64,
+        )
+        self._generation = index.generation
+
+
+    def rank(
+        self,
+        index: KnowledgeIndex,
+        queryTokens: list[str],
+        bonuses: dict[str, float],
+        limit: int,
+        minScore: float,
+    ) -> list[tuple[int, float]]:
+        """
+        返回 [(entry_id, score), ...]，按分数降序（同分按 id 升序），最多 limit 条。
+
+        参数：
+            bonuses: 本次查询命中的 category 意图加成 {category: bonus}
+        """
+        if self._generation != index.generation:
+            self._build(index)
+
+        docCount = len(self._entryIDs)
+        if not docCount or limit <= 0:
+            return []
+
+        # ── BM25：只取查询词所在行 ──
+        idxParts, valParts = [], []
+        for term in dict.fromkeys(queryTokens):
+            row = self._vocab.get(term)
+            if row is None:
+                continue
+            idf = bm25Idf(docCount, self._docFreq[row])
+            for field in FIELDS:
+                start, end = self._indptr[field][row], self._indptr[field][row + 1]
+                if start == end:
+                    continue
+                idxParts.append(self._indices[field][start:end])
+                valParts.append(self._data[field][start:end] * (idf * FIELD_WEIGHTS[field]))
+
+        if idxParts:
+            allIdx = np.concatenate(idxParts)
+            scores = np.bincount(allIdx, weights=np.concatenate(valParts), minlength=docCount)
+            candidate = np.bincount(allIdx, minlength=docCount) > 0
+        else:
+            scores = np.zeros(docCount)
+            candidate = np.zeros(docCount, dtype=bool)
+
+        # ── category 意图加成 + priority 加成（整列向量）──
+        if bonuses:
+            bonusByCode = np.zeros(len(self._categoryCodes) + 1)
+            for category, bonus in bonuses.items():
+                code = self._categoryCodes.get(category)
+                if code is not None:
+                    bonusByCode[code] = bonus
+            docBonus = bonusByCode[self._docCategory]
+            scores = scores + docBonus
+            candidate |= np.isin(self._docCategory, [
+                self._categoryCodes[c] for c in bonuses if c in self._categoryCodes
+            ])
+
+        scores = scores + self._priority
+        candidate |= self._priority != 0
+
+        passing = np.flatnonzero(candidate & (scores >= minScore))
+        if not len(passing):
+            return []
+
+        order = np.lexsort((self._entryIDs[passing], -scores[passing]))[:limit]
+        chosen = passing[order]
+        return [(int(self._entryIDs[pos]), float(scores[pos])) for pos in chosen]
@@ -0,0 +1,265 @@
+"""
+utils/llm/knowledge/watcher.py
+
+知识库目录监听：文件改动后自动刷新对应条目
+
+后台任务 watchKnowledgeBase() 监听 LLM_KNOWLEDGE_DIR 下的 .md 文件：
+    - Linux 上用 inotify（ctypes 调 libc，不引入额外依赖），fd 挂到事件循环的 add_reader 上
+    - 其他平台 / inotify 不可用时退回轮询：每 _POLL_INTERVAL 秒比较一次目录内文件的 mtime / size
+    - 事件先去抖：最后一次事件后静默一段时间才处理，编辑器保存时的多次写入合并为一次。
+      静默时长取自各后端的 debounce：inotify 为 _DEBOUNCE_SECONDS；轮询至少要跨过一整个扫描间隔
+      （interval + _POLL_DEBOUNCE_MARGIN），否则每次等待都会在两次扫描之间超时，什么也合并不了
+    - 只把涉及的文件交给 reindexKnowledgeFiles()（单事务写库 + 增量同步倒排索引），不做全目录扫描；
+      LSA 语义模型不随每次保存重拟合，而是合并为一次延迟拟合（retriever._SEMANTIC_REFIT_DELAY）
+    - inotify 事件队列溢出或目录本身被删除 / 移走时无法知道漏了哪些文件，退回一次全量 reindexKnowledgeBase()
+
+是否处理事件由 knowledgeAutoReindex 配置控制（/llm knowledge watch on|off），关闭期间监听照常运行但丢弃事件。
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+from typing import Optional
+
+from config import LLM_KNOWLEDGE_DIR
+from utils.core.logger import logSystemEvent, LogLevel
+from utils.llm.config import getKnowledgeAutoReindex
+
+from .loader import reindexKnowledgeBase, reindexKnowledgeFiles
+from .retriever import cancelSemanticRefit
+
+
+# 最后一次事件后的静默时间（秒）
+_DEBOUNCE_SECONDS = 1.5
+
+# 轮询后备方案的扫描间隔（秒）
+_POLL_INTERVAL = 3.0
+
+# 轮询时去抖静默时长比扫描间隔多出的余量（秒，留给目录扫描本身）
+_POLL_DEBOUNCE_MARGIN = 0.5
+
+
+# inotify 常量（<sys/inotify.h>）
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF
+_WATCH_LOST_MASK = _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_IGNORED
+
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+_EVENT_STRUCT = struct.Struct("iIII")
+
+
+
+
+def _parseEvents(data: bytes) -> list[tuple[str, int]]:
+    """把 read(inotify_fd) 读到的字节解析为 [(文件名, mask), ...]"""
+    events = []
+    offset = 0
+    while offset + _EVENT_STRUCT.size <= len(data):
+        _wd, mask, _cookie, length = _EVENT_STRUCT.unpack_from(data, offset)
+        offset += _EVENT_STRUCT.size
+        name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+        offset += length
+        events.append((name, mask))
+    return events
+
+
+def _scanDirectory(directory: str) -> dict[str, tuple[int, int]]:
+    """{文件名: (mtime_ns, size)}，只含 .md 文件；目录不存在时为空"""
+    snapshot = {}
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.name.endswith('.md') and entry.is_file():
+                    st = entry.stat()
+                    snapshot[entry.name] = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        pass
+    return snapshot
+
+
+
+
+class _InotifyWatcher:
+    """inotify 监听；next() 返回一批改动的文件名，None 表示需要全量扫描"""
+
+    name = "inotify"
+
+    def __init__(self, directory: str):
+        libcPath = ctypes.util.find_library("c") or "libc.so.6"
+        libc = ctypes.CDLL(libcPath, use_errno=True)
+
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        wd = libc.inotify_add_watch(fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(errno, os.strerror(errno))
+
+        self.lost = False
+        self.debounce = _DEBOUNCE_SECONDS
+        self._fd = fd
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._loop = asyncio.get_running_loop()
+        try:
+            self._loop.add_reader(fd, self._onReadable)
+        except NotImplementedError:
+            os.close(fd)
+            raise
+
+
+    def _onReadable(self):
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+
+        for name, mask in _parseEvents(data):
+            if mask & _IN_Q_OVERFLOW:
+                self._queue.put_nowait(None)
+            elif mask & _WATCH_LOST_MASK:
+                self.lost = True
+                self._queue.put_nowait(None)
+            elif name.endswith('.md'):
+                self._queue.put_nowait(name)
+
+
+    async def next(self) -> Optional[set[str]]:
+        item = await self._queue.get()
+        changed: set[str] = set()
+        rescan = False
+        while True:
+            if item is None:
+                rescan = True
+            else:
+                changed.add(item)
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+        return None if rescan else changed
+
+
+    def close(self):
+        if self._fd < 0:
+            return
+        self._loop.remove_reader(self._fd)
+        os.close(self._fd)
+        self._fd = -1
+
+
+
+
+class _PollingWatcher:
+    """轮询后备方案：定期比较目录内 .md 文件的 mtime / size"""
+
+    name = "polling"
+
+    def __init__(self, directory: str, interval: float = _POLL_INTERVAL):
+        self.lost = False
+        self.debounce = max(_DEBOUNCE_SECONDS, interval + _POLL_DEBOUNCE_MARGIN)
+        self._directory = directory
+        self._interval = interval
+        self._snapshot = _scanDirectory(directory)
+
+
+    async def next(self) -> Optional[set[str]]:
+        while True:
+            await asyncio.sleep(self._interval)
+            current = await asyncio.to_thread(_scanDirectory, self._directory)
+            changed = {
+                name for name in self._snapshot.keys() | current.keys()
+                if self._snapshot.get(name) != current.get(name)
+            }
+            self._snapshot = current
+            if changed:
+                return changed
+
+
+    def close(self):
+        pass
+
+
+
+
+def _openWatcher(directory: str):
+    """优先 inotify，不可用时退回轮询"""
+    if sys.platform.startswith("linux"):
+        try:
+            return _InotifyWatcher(directory)
+        except (OSError, AttributeError, NotImplementedError):
+            pass
+    return _PollingWatcher(directory)
+
+
+async def _collectBatch(watcher, debounce: Optional[float] = None) -> Optional[set[str]]:
+    """
+    等到第一批事件后继续收集，直到静默 debounce 秒；任一批要求全量扫描则返回 None
+
+    debounce 为 None 时取 watcher.debounce（轮询后端会按扫描间隔放大）
+    """
+    if debounce is None:
+        debounce = watcher.debounce
+    changed = await watcher.next()
+    while True:
+        try:
+            more = await asyncio.wait_for(watcher.next(), timeout=debounce)
+        except asyncio.TimeoutError:
+            return changed
+        changed = None if changed is None or more is None else changed | more
+
+
+
+
+async def watchKnowledgeBase():
+    """后台任务：监听知识库目录，改动的文件在去抖后自动刷新到数据库与倒排索引"""
+    os.makedirs(LLM_KNOWLEDGE_DIR, exist_ok=True)
+    watcher = _openWatcher(LLM_KNOWLEDGE_DIR)
+    await logSystemEvent("知识库目录监听已启动", f"{watcher.name}：{LLM_KNOWLEDGE_DIR}")
+
+    try:
+        while True:
+            changed = await _collectBatch(watcher)
+
+            # 目录被删除 / 移走：重新建目录并挂上监听
+            if watcher.lost:
+                watcher.close()
+                os.makedirs(LLM_KNOWLEDGE_DIR, exist_ok=True)
+                watcher = _openWatcher(LLM_KNOWLEDGE_DIR)
+
+            if not getKnowledgeAutoReindex():
+                continue
+
+            try:
+                if changed is None:
+                    await reindexKnowledgeBase()
+                    continue
+
+                stats = await reindexKnowledgeFiles(changed)
+                if stats["added"] or stats["updated"] or stats["removed"]:
+                    await logSystemEvent(
+                        "知识库自动刷新完成",
+                        f"{', '.join(sorted(changed))}：新增 {stats['added']}, 更新 {stats['updated']}, "
+                        f"删除 {stats['removed']}"
+                    )
+            except Exception as e:
+                await logSystemEvent("知识库自动刷新失败", str(e), LogLevel.WARNING)
+    finally:
+        watcher.close()
+        cancelSemanticRefit()
@@ -13,6 +13,8 @@ from .database import (
     MEMORY_SCOPE_USER,
     MEMORY_SCOPE_SESSION,
 )
+from .contentCache import getDecryptedCacheStats
+from .relevance import selectRelevantMemories
 from .action import (
     MemoryAction,
     parseMemoryActions,
@@ -0,0 +1,109 @@
+"""
+utils/llm/memory/contentCache.py
+
+记忆正文解密缓存（进程内，按字节数限额的 LRU）
+
+长期记忆很少改动，但每次检索未命中结果缓存（retrievalCache.memoryCache）时，
+都要对取回的每一行做一次 Fernet 解密（HMAC 校验 + AES 解密）。这里缓存解密后的明文：
+    - 键：memory id；条目同时记下取出时的密文，读取时密文逐字节比对一致才算命中。
+      Fernet 每次加密都会生成新的随机 IV，内容一改密文必变，所以即使绕过写接口直接改库也不会读到旧明文。
+    - 失效：updateMemory / deleteMemory 写库后 discard 对应 id（LLM 记忆动作也走这两个函数），
+      及时释放空间；正确性本身由密文比对保证。
+    - 限额：按"密文 + UTF-8 明文"的字节数计，超出 maxBytes 时从最久未用的条目开始淘汰。
+
+只在数据库工作线程中读写（_rowToMemoryDict 在 Database.run 内调用），用锁保护。
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+_DEFAULT_MAX_BYTES = 4 * 1024 * 1024
+
+
+
+
+class DecryptedContentCache:
+    """memory id → (密文, 明文) 的字节限额 LRU"""
+
+    def __init__(self, maxBytes: int = _DEFAULT_MAX_BYTES):
+        self.maxBytes = maxBytes
+        self._entries: OrderedDict[int, tuple[bytes, str, int]] = OrderedDict()   # id -> (密文, 明文, 字节数)
+        self._lock = threading.Lock()
+        self.clear()
+
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+    def get(self, memoryID: int, ciphertext) -> Optional[str]:
+        """密文与缓存时一致则返回明文，否则返回 None（调用方解密后 put）"""
+        with self._lock:
+            item = self._entries.get(memoryID)
+            if item is None or item[0] != ciphertext:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(memoryID)
+            self.hits += 1
+            return item[1]
+
+
+    def put(self, memoryID: int, ciphertext, plaintext: str):
+        if not isinstance(ciphertext, bytes):
+            return   # 历史明文行（str）无需缓存
+        size = len(ciphertext) + len(plaintext.encode("utf-8"))
+        if size > self.maxBytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(memoryID, None)
+            if old is not None:
+                self.bytes -= old[2]
+            self._entries[memoryID] = (ciphertext, plaintext, size)
+            self.bytes += size
+            while self.bytes > self.maxBytes:
+                _, (_, _, evictedSize) = self._entries.popitem(last=False)
+                self.bytes -= evictedSize
+                self.evictions += 1
+
+
+    def discard(self, memoryID: int):
+        """写入路径调用：丢弃该条目的缓存明文"""
+        with self._lock:
+            old = self._entries.pop(memoryID, None)
+            if old is not None:
+                self.bytes -= old[2]
+
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "bytes": self.bytes,
+            "maxBytes": self.maxBytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+
+
+decryptedCache = DecryptedContentCache()
+
+
+def getDecryptedCacheStats() -> dict:
+    """解密缓存统计，字段见 DecryptedContentCache.stats"""
+    return decryptedCache.stats()
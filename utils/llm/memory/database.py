@@ -5,8 +5,8 @@ LLM structured memory 数据库模块。
 
 提供：
     - memory_entries 表初始化
-    - CRUD 接口
-    - 分层检索（global -> chat -> user -> session）
+    - CRUD 接口（content 读出时经 contentCache 缓存解密结果）
+    - 分层检索（global -> chat -> user -> session，单条 SQL 完成排序与截断），结果按 scope 缓存（写入时按 scope 失效）
     - 上下文格式化（含 id/src，供 LLM 识别可操作的 inferred 记忆）
     - 检索摘要
 """
@@ -25,6 +25,9 @@ from utils.core.schema import loadSchema
 from utils.core.crypto import encryptText, decryptText
 from utils.core.logger import logSystemEvent, LogLevel
 from utils.llm.promptSafety import neutralizePromptDelimiters
+from utils.llm.retrievalCache import memoryCache
+
+from .contentCache import decryptedCache
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
@@ -47,6 +50,12 @@ _SCOPE_RANK = {
     MEMORY_SCOPE_CHAT: 1,
     MEMORY_SCOPE_GLOBAL: 0,
 }
+# _SCOPE_RANK 的 SQL 版本（检索时在库内排序）；未知 scope_type 等同 global
+_SCOPE_RANK_SQL = (
+    "CASE scope_type "
+    + " ".join(f"WHEN '{scopeType}' THEN {rank}" for scopeType, rank in _SCOPE_RANK.items())
+    + " ELSE 0 END"
+)
 
 
 memoryDB = Database(LLM_MEMORY_DB_PATH, "LLMMemory")
@@ -120,13 +129,30 @@ def _decryptContent(raw) -> str:
         return str(raw)
 
 
+def _cachedDecrypt(memoryID: int, raw) -> str:
+    """先查解密缓存（密文一致才命中），未命中再解密并写入缓存"""
+    cached = decryptedCache.get(memoryID, raw)
+    if cached is not None:
+        return cached
+    content = _decryptContent(raw)
+    decryptedCache.put(memoryID, raw, content)
+    return content
+
+
+def _scopeOf(cursor, memoryID: int) -> Optional[tuple[str, str]]:
+    """写入前查出条目所属 scope（检索缓存按 scope 失效），不存在返回 None"""
+    cursor.execute("SELECT scope_type, scope_id FROM memory_entries WHERE id = ?", (memoryID,))
+    row = cursor.fetchone()
+    return (row["scope_type"], row["scope_id"]) if row else None
+
+
 def _rowToMemoryDict(row) -> dict[str, Any]:
     """将 sqlite3.Row 转换为 memory 字典。"""
     return {
         "id": row["id"],
         "scope_type": row["scope_type"],
         "scope_id": row["scope_id"],
-        "content": _decryptContent(row["content"]),
+        "content": _cachedDecrypt(row["id"], row["content"]),
         "tags": json.loads(row["tags_json"] or "[]"),
         "enabled": bool(row["enabled"]),
         "priority": row["priority"],
@@ -172,7 +198,9 @@ async def addMemory(
             )
             return cursor.lastrowid
 
-        return await memoryDB.run(_query)
+        memoryID = await memoryDB.run(_query)
+        memoryCache.bump((scopeType, scopeID))
+        return memoryID
 
     except Exception as e:
         await logSystemEvent(
@@ -301,17 +329,22 @@ async def updateMemory(
                 params.append(_normalizeSource(source))
 
             if not updates:
-                return True
+                return True, None
 
+            scope = _scopeOf(cursor, memoryID)
             updates.append("updated_at = CURRENT_TIMESTAMP")
             params.append(memoryID)
             cursor.execute(
                 f"UPDATE memory_entries SET {', '.join(updates)} WHERE id = ?",
                 tuple(params)
             )
-            return cursor.rowcount > 0
+            return cursor.rowcount > 0, scope
 
-        return await memoryDB.run(_query)
+        updated, scope = await memoryDB.run(_query)
+        if scope is not None:
+            memoryCache.bump(scope)
+            decryptedCache.discard(memoryID)
+        return updated
 
     except Exception as e:
         await logSystemEvent(
@@ -328,10 +361,15 @@ async def deleteMemory(memoryID: int) -> bool:
     try:
         def _query(conn):
             cursor = conn.cursor()
+            scope = _scopeOf(cursor, memoryID)
             cursor.execute("DELETE FROM memory_entries WHERE id = ?", (memoryID,))
-            return cursor.rowcount > 0
+            return cursor.rowcount > 0, scope
 
-        return await memoryDB.run(_query)
+        deleted, scope = await memoryDB.run(_query)
+        if scope is not None:
+            memoryCache.bump(scope)
+            decryptedCache.discard(memoryID)
+        return deleted
 
     except Exception as e:
         await logSystemEvent(
@@ -345,6 +383,55 @@ async def deleteMemory(memoryID: int) -> bool:
 
 
 
+def _queryScopedMemories(
+    conn,
+    scopes: list[tuple[str, str]],
+    perScopeLimit: int,
+    totalLimit: int,
+) -> list[dict[str, Any]]:
+    """
+    retrieveMemories 的数据库线程部分：一次查询取回全部相关 scope，排序与截断都在 SQL 里完成，
+    只有最终入选的行才会被解密。
+
+    排序键（全部 DESC）：priority > scope 专属度 > updated_at > id。
+    priority 是显式赋的强权重排第一；scope 专属度仅在 priority 打平时
+    当兜底裁判（session>user>chat>global）；updated_at / id 再兜底，确保同键顺序确定、可测。
+    updated_at 为 NULL 的脏数据在 DESC 下排在最后，不影响其余行。
+    """
+    if totalLimit <= 0:
+        return []
+
+    scopeFilter = " OR ".join("(scope_type = ? AND scope_id = ?)" for _ in scopes)
+    params: list[Any] = [value for scope in scopes for value in scope]
+
+    # 单 scope 候选上限：窗口函数按 scope 内的 priority / updated_at 编号，超出的不进池
+    rowFilter = ""
+    if perScopeLimit > 0:
+        rowFilter = "WHERE scope_row <= ?"
+        params.append(perScopeLimit)
+    params.append(totalLimit)
+
+    # 未 ANALYZE 的库上规划器会选区分度很低的 idx_memory_enabled，这里固定走复合索引：
+    # 每个 scope 一次 (scope_type, scope_id, enabled) 等值查找（MULTI-INDEX OR）
+    cursor = conn.execute(
+        f"""
+        SELECT * FROM (
+            SELECT *, ROW_NUMBER() OVER (
+                PARTITION BY scope_type, scope_id
+                ORDER BY priority DESC, updated_at DESC, id DESC
+            ) AS scope_row
+            FROM memory_entries INDEXED BY idx_memory_scope_enabled_priority
+            WHERE enabled = 1 AND ({scopeFilter})
+        )
+        {rowFilter}
+        ORDER BY priority DESC, {_SCOPE_RANK_SQL} DESC, updated_at DESC, id DESC
+        LIMIT ?
+        """,
+        tuple(params),
+    )
+    return [_rowToMemoryDict(row) for row in cursor.fetchall()]
+
+
 async def retrieveMemories(
     chatID: str | int | None = None,
     userID: str | int | None = None,
@@ -352,7 +439,12 @@ async def retrieveMemories(
     perScopeLimit: int = 20,   # 单 scope 候选上限（防止过多地召回某 scope），非硬性名额
     totalLimit: int = 10,
 ) -> list[dict[str, Any]]:
-    """汇集各 scope 的启用记忆到统一候选池，按 priority 排序后取 totalLimit"""
+    """
+    汇集各 scope 的启用记忆到统一候选池（每个 scope 至多 perScopeLimit 条，<= 0 不限），
+    按 priority 排序后取 totalLimit；全部在一次查询中完成
+
+    结果按 (scope 组合, 名额) 缓存；任一相关 scope 有写入（add / update / delete）即失效。
+    """
     try:
         scopes = [(MEMORY_SCOPE_GLOBAL, "global")]
         if chatID is not None:
@@ -362,36 +454,17 @@ async def retrieveMemories(
         if sessionID is not None:
             scopes.append((MEMORY_SCOPE_SESSION, str(sessionID)))
 
-        pool: list[dict[str, Any]] = []
-        for scopeType, scopeID in scopes:
-            items = await getMemories(
-                scopeType=scopeType,
-                scopeID=scopeID,
-                enabledOnly=True,
-                limit=max(perScopeLimit, 0),
-            )
-            pool.extend(items)
-
-        # 排序键（全部 DESC）：priority > scope 专属度 > updated_at > id。
-        # priority 是显式赋的强权重排第一；scope 专属度仅在 priority 打平时
-        # 当兜底裁判（session>user>chat>global）；
-        # updated_at / id 再兜底，确保同键顺序确定、可测。
-        #
-        # 每个排序字段都必须带默认（.get(..., 0) / or datetime.min），绝不裸取 m["updated_at"]
-        # 这是因为单条脏数据（字段缺失/为 None）会让整个 sort 抛 TypeError，
-        # 这会让把"少一条记忆"放大成"整次检索归零"。
-        # 以防「个别历史明文行别拖垮整次查询」的坑。
-        # scope_type 缺失时 _SCOPE_RANK.get 兜底 0（等同 global，最泛），不抛出错误。
-        pool.sort(
-            key=lambda m: (
-                m.get("priority", 0),
-                _SCOPE_RANK.get(m.get("scope_type"), 0),
-                m.get("updated_at") or datetime.min,
-                m.get("id", 0),
-            ),
-            reverse=True,
+        cacheKey = (tuple(scopes), perScopeLimit, totalLimit)
+        cached = memoryCache.get(cacheKey)
+        if cached is not None:
+            return cached
+        stamp = memoryCache.stamp(scopes)
+
+        result = await memoryDB.run(
+            lambda conn: _queryScopedMemories(conn, scopes, perScopeLimit, totalLimit)
         )
-        return pool[:totalLimit]
+        memoryCache.put(cacheKey, result, stamp)
+        return result
 
     except Exception as e:
         await logSystemEvent(
@@ -405,6 +478,25 @@ async def retrieveMemories(
 
 
 
+def _formatMemoryLine(item: dict[str, Any]) -> str:
+    """单条记忆在上下文块中的一行（relevance 按这一行的长度计预算）"""
+    scopeType = item.get("scope_type", "?")
+    scopeID = item.get("scope_id", "?")
+    priority = item.get("priority", 0)
+    # content / tags 是不可信叶子（inferred 记忆可能源自用户对话），
+    # 进 [...]/<...> 结构标记前就中和分隔符，防止伪造高信任块越权。
+    content = neutralizePromptDelimiters(item.get("content", ""))
+    tags = [neutralizePromptDelimiters(t) for t in (item.get("tags") or [])]
+
+    source = item.get("source", "manual")
+    # w= 是语义中性的内部权重（避免"优先级/重要性"暗示 LLM 必须提及）；
+    # id/src 保留，LLM 识别可操作 inferred 记忆所必需。
+    line = f"- ({scopeType}:{scopeID}, w={priority}, id={item['id']}, src={source}) {content}"
+    if tags:
+        line += f" [tags: {', '.join(tags)}]"
+    return line
+
+
 def buildMemoryContextBlock(memories: list[dict[str, Any]]) -> str:
     """将检索到的 memories 格式化为上下文块"""
     if not memories:
@@ -418,21 +510,7 @@ def buildMemoryContextBlock(memories: list[dict[str, Any]]) -> str:
         "不代表与当前对话的相关性，不要因 w 高就强行提及。]"
     ]
     for item in memories:
-        scopeType = item.get("scope_type", "?")
-        scopeID = item.get("scope_id", "?")
-        priority = item.get("priority", 0)
-        # content / tags 是不可信叶子（inferred 记忆可能源自用户对话），
-        # 进 [...]/<...> 结构标记前就中和分隔符，防止伪造高信任块越权。
-        content = neutralizePromptDelimiters(item.get("content", ""))
-        tags = [neutralizePromptDelimiters(t) for t in (item.get("tags") or [])]
-
-        source = item.get("source", "manual")
-        # w= 是语义中性的内部权重（避免"优先级/重要性"暗示 LLM 必须提及）；
-        # id/src 保留，LLM 识别可操作 inferred 记忆所必需。
-        header = f"- ({scopeType}:{scopeID}, w={priority}, id={item['id']}, src={source}) {content}"
-        if tags:
-            header += f" [tags: {', '.join(tags)}]"
-        lines.append(header)
+        lines.append(_formatMemoryLine(item))
 
     return "\n".join(lines)
 
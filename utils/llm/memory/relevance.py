@@ -0,0 +1,81 @@
+"""
+utils/llm/memory/relevance.py
+
+按当前消息的相关性挑选记忆，并把记忆块控制在字符预算内
+
+retrieveMemories 只按 priority / scope / 时间排序；记忆多了以后，
+整块注入会让每次 prompt 都变长。这里在 retrieveMemories 取回的候选池上：
+    - 复用知识库的分词与倒排索引（KnowledgeIndex）：content / tags 两个字段做带 IDF 的加权 BM25，
+      IDF 按候选池统计（池内少见的词权重更高）
+    - 最终分数 = BM25 相关性 + priority × _PRIORITY_WEIGHT（与知识库的 priority 加成一致）；
+      分数相同保持 retrieveMemories 的原顺序，所以与消息毫不相关时退化为原排序
+    - 按分数从高到低贪心放入，单行放不下预算就跳过（后面更短的仍可能放得下），最多 limit 条
+"""
+
+from collections import Counter
+from typing import Any
+
+from utils.llm.knowledge.index import KnowledgeIndex
+from utils.llm.knowledge.tokenizer import countTokens, tokenize
+
+from .database import _formatMemoryLine
+
+
+_PRIORITY_WEIGHT = 1.0
+
+
+
+
+def scoreMemories(memories: list[dict[str, Any]], query: str) -> dict[int, float]:
+    """{memory id: 相关性 + priority 加成}"""
+    index = KnowledgeIndex()
+    for item in memories:
+        index.addDocument(
+            item["id"],
+            {
+                "tags": countTokens(" ".join(item.get("tags") or [])),
+                "title": Counter(),
+                "content": countTokens(item.get("content", "")),
+            },
+            item.get("scope_type", ""),
+            item.get("priority", 0),
+        )
+
+    relevance = index.scoreTerms(tokenize(query)) if query else {}
+    return {
+        item["id"]: relevance.get(item["id"], 0.0) + (item.get("priority") or 0) * _PRIORITY_WEIGHT
+        for item in memories
+    }
+
+
+
+
+def selectRelevantMemories(
+    memories: list[dict[str, Any]],
+    query: str,
+    *,
+    limit: int,
+    maxChars: int,
+) -> list[dict[str, Any]]:
+    """
+    从候选池中挑出与 query 最相关的记忆，总行长不超过 maxChars（块头不计）。
+
+    返回按分数从高到低排列的记忆列表。
+    """
+    if not memories or limit <= 0:
+        return []
+
+    scores = scoreMemories(memories, query)
+    ranked = sorted(memories, key=lambda item: scores[item["id"]], reverse=True)   # 稳定排序
+
+    selected = []
+    used = 0
+    for item in ranked:
+        lineLen = len(_formatMemoryLine(item)) + 1   # 含换行
+        if used + lineLen > maxChars:
+            continue
+        selected.append(item)
+        used += lineLen
+        if len(selected) >= limit:
+            break
+    return selected
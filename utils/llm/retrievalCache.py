@@ -0,0 +1,123 @@
+"""
+utils/llm/retrievalCache.py
+
+知识库 / 长期记忆检索结果的进程内 LRU 缓存
+
+群聊围绕同一话题时，相同或近似的查询会反复触发 retrieveKnowledge / retrieveMemories，
+每次都要回库、评分。这里按"规范化后的查询键"缓存最终结果：
+    - 知识库：键 = 查询 token 集合 + 命中的意图类别 + limit / minScore / rerankTopK
+    - 记忆：键 = chat / user / session 三个 scope + 名额参数
+失效主要靠代（generation）计数：
+    - 每个 scope 一个计数器（知识库只有一个全局 scope），写入路径
+      （upsertKnowledgeEntry / addMemory / updateMemory / deleteMemory …）递增对应计数器
+    - 条目记下查询开始时各相关 scope 的计数快照（stamp），取用时快照不一致即视为过期
+    - 快照在读库之前取，查询途中发生的写入会让这次结果一写入就过期，不会读到旧数据
+另有 LLM_RETRIEVAL_CACHE_TTL 兜底：离线脚本（scripts/edit_data.py、merge_data.py）直接改 SQLite 文件，
+不经过进程内的写接口、不会递增计数，条目最多再被复用 TTL 秒。
+
+只在事件循环线程中读写，不加锁。命中率可通过 getRetrievalCacheStats() 观察。
+"""
+
+import copy
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional
+
+from config import LLM_RETRIEVAL_CACHE_TTL
+
+
+_DEFAULT_MAX_SIZE = 256
+
+
+
+
+class RetrievalCache:
+    """按 scope 代计数失效、TTL 兜底的 LRU"""
+
+    def __init__(self, maxSize: int = _DEFAULT_MAX_SIZE, ttl: float = LLM_RETRIEVAL_CACHE_TTL):
+        self.maxSize = maxSize
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()   # key -> (stamp, 写入时刻, value)
+        self._generations: dict[Hashable, int] = {}
+        self.clear()
+
+
+    def clear(self):
+        """清空条目与统计（代计数保留，避免与已有 stamp 撞号）"""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+    def bump(self, scope: Hashable = None):
+        """写入路径调用：让涉及该 scope 的缓存结果全部过期"""
+        self._generations[scope] = self._generations.get(scope, 0) + 1
+
+
+    def stamp(self, scopes: Iterable[Hashable] = (None,)) -> tuple:
+        """查询开始前取各 scope 的代计数快照，随结果一起 put"""
+        return tuple((scope, self._generations.get(scope, 0)) for scope in scopes)
+
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """命中返回结果副本，未命中 / 已过期返回 None"""
+        item = self._entries.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+
+        stamp, storedAt, value = item
+        expired = self.ttl and time.monotonic() - storedAt > self.ttl
+        if expired or any(self._generations.get(scope, 0) != gen for scope, gen in stamp):
+            del self._entries[key]
+            self.stale += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(value)
+
+
+    def put(self, key: Hashable, value: Any, stamp: tuple):
+        """写入结果；stamp 必须是查询开始前 stamp() 的返回值"""
+        self._entries[key] = (stamp, time.monotonic(), copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxSize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxSize": self.maxSize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+
+
+# ── 模块级实例 ──────────────────────────────────────
+
+knowledgeCache = RetrievalCache()
+memoryCache = RetrievalCache()
+
+
+def getRetrievalCacheStats() -> dict[str, dict]:
+    """{"knowledge": {...}, "memory": {...}}，字段见 RetrievalCache.stats"""
+    return {
+        "knowledge": knowledgeCache.stats(),
+        "memory": memoryCache.stats(),
+    }
@@ -0,0 +1,211 @@
+"""
+utils/llm/urlCache.py
+
+URL 读取结果的进程内缓存（按字节数限额的 LRU）
+
+同一条链接常在几轮对话里被反复讨论，每条消息都重新下载、BeautifulSoup 解析一遍，
+还会挤占 readURLContextsForUserText 的总 deadline。这里缓存提取后的结果：
+    - 键：规范化后的最终 URL（redirect 逐跳校验通过后的落点）；另记"请求 URL → 最终 URL"别名，
+      下次同一链接直接找到落点条目
+    - TTL 按 Content-Type 区分（_TTL_BY_CONTENT_TYPE）；过期条目保留 ETag / Last-Modified，
+      下次抓取带 If-None-Match / If-Modified-Since 做条件请求，304 时沿用已提取的正文、免下载免解析
+    - 失败结果（命中黑名单、HTTP 错误、非文本、超时等）按请求 URL 做短时负缓存（_NEGATIVE_TTL）
+    - 限额：按正文 + 标题的 UTF-8 字节数计，超出 maxBytes 时淘汰最久未用的条目
+
+只复用抓取时的字节 / 字符上限与当前配置一致的条目（改了 urlReadMaxBytes / urlReadMaxChars 后，
+旧的截断结果不复用）。
+命中时调用方仍需按当前黑名单重新校验最终 URL，新加的 blocked host 立即生效。
+
+只在事件循环线程中读写，不加锁。命中率可通过 getURLCacheStats() 观察。
+"""
+
+import copy
+import time
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit
+
+
+_DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+_MAX_ALIASES = 1024
+
+# 新鲜期（秒），按 Content-Type 主类型匹配，未列出的走 _DEFAULT_TTL
+_TTL_BY_CONTENT_TYPE = {
+    "text/html": 10 * 60,
+    "application/xhtml+xml": 10 * 60,
+    "application/json": 5 * 60,
+    "application/rss+xml": 5 * 60,
+    "application/atom+xml": 5 * 60,
+    "text/plain": 30 * 60,
+    "text/markdown": 30 * 60,
+}
+_DEFAULT_TTL = 10 * 60
+_NEGATIVE_TTL = 60
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# 缓存条目里保存的 URLFetchResult 字段（requestedUrl / redirectChain 等由调用方按本次请求填写）
+_RESULT_FIELDS = (
+    "finalUrl", "ok", "status", "contentType", "title", "text", "error",
+    "bytesRead", "truncatedBytes", "truncatedChars",
+)
+
+
+
+
+def normalizeURL(url: str) -> str:
+    """scheme / host 小写，去掉默认端口、fragment 与 host 尾点，空 path 记为 /"""
+    try:
+        parts = urlsplit(url)
+        host = (parts.hostname or "").rstrip(".")
+        port = parts.port
+    except ValueError:
+        return url
+
+    scheme = parts.scheme.lower()
+    if ":" in host:
+        host = f"[{host}]"
+    netloc = host if port is None or port == _DEFAULT_PORTS.get(scheme) else f"{host}:{port}"
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+
+def ttlForContentType(contentType: str) -> int:
+    ct = contentType.lower().split(";")[0].strip()
+    return _TTL_BY_CONTENT_TYPE.get(ct, _DEFAULT_TTL)
+
+
+
+
+class URLCache:
+    """规范化 URL → 提取结果的字节限额 LRU，带条件请求所需的校验器"""
+
+    def __init__(self, maxBytes: int = _DEFAULT_MAX_BYTES):
+        self.maxBytes = maxBytes
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._aliases: OrderedDict[str, str] = OrderedDict()   # 请求 URL → 最终 URL
+        self.clear()
+
+
+    def clear(self):
+        self._entries.clear()
+        self._aliases.clear()
+        self.bytes = 0
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+    def lookup(self, url: str, *, maxBytes: int, maxChars: int = 0) -> Optional[dict]:
+        """
+        查找请求 URL 对应的条目（含已过期、可做条件请求的条目），没有返回 None。
+
+        返回条目副本：{"result": {...}, "fresh": bool, "etag": str, "lastModified": str}
+        """
+        key = normalizeURL(url)
+        target = self._aliases.get(key, key)
+        entry = self._entries.get(target)
+        if entry is None or entry["limits"] != (maxBytes, maxChars):
+            return None
+
+        fresh = time.monotonic() < entry["expiresAt"]
+        if not fresh and not entry["result"]["ok"]:
+            self._remove(target)   # 负缓存过期即作废
+            return None
+        if not fresh and not (entry["etag"] or entry["lastModified"]):
+            return None
+
+        self._entries.move_to_end(target)
+        if fresh:
+            self.hits += 1
+        return {
+            "result": copy.deepcopy(entry["result"]),
+            "fresh": fresh,
+            "etag": entry["etag"],
+            "lastModified": entry["lastModified"],
+        }
+
+
+    def store(self, requestedUrl: str, result: dict, *, maxBytes: int, maxChars: int = 0, etag: str = "", lastModified: str = ""):
+        """写入一次抓取结果：成功按最终 URL 存并记别名，失败按请求 URL 存负缓存"""
+        self.misses += 1
+        requestedKey = normalizeURL(requestedUrl)
+        snapshot = {field: result.get(field) for field in _RESULT_FIELDS}
+
+        if result.get("ok"):
+            key = normalizeURL(result.get("finalUrl") or requestedUrl)
+            ttl = ttlForContentType(result.get("contentType", ""))
+        else:
+            key = requestedKey
+            ttl = _NEGATIVE_TTL
+            etag = lastModified = ""
+
+        size = len((snapshot.get("text") or "").encode("utf-8")) + len((snapshot.get("title") or "").encode("utf-8"))
+        if size > self.maxBytes:
+            return
+
+        self._remove(key)
+        self._entries[key] = {
+            "result": snapshot,
+            "limits": (maxBytes, maxChars),
+            "expiresAt": time.monotonic() + ttl,
+            "etag": etag or "",
+            "lastModified": lastModified or "",
+            "size": size,
+        }
+        self.bytes += size
+
+        self._aliases.pop(requestedKey, None)
+        if key != requestedKey:
+            self._remove(requestedKey)   # 旧的负缓存被成功结果取代
+            self._aliases[requestedKey] = key
+            while len(self._aliases) > _MAX_ALIASES:
+                self._aliases.popitem(last=False)
+
+        while self.bytes > self.maxBytes:
+            evicted, _ = next(iter(self._entries.items()))
+            self._remove(evicted)
+            self.evictions += 1
+
+
+    def refresh(self, url: str):
+        """304 后调用：按原 Content-Type 重新计 TTL"""
+        key = normalizeURL(url)
+        entry = self._entries.get(self._aliases.get(key, key))
+        if entry is not None:
+            self.revalidated += 1
+            entry["expiresAt"] = time.monotonic() + ttlForContentType(entry["result"].get("contentType", ""))
+
+
+    def _remove(self, key: str):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old["size"]
+
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.revalidated + self.misses
+        return {
+            "size": len(self._entries),
+            "bytes": self.bytes,
+            "maxBytes": self.maxBytes,
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hitRate": (self.hits + self.revalidated) / lookups if lookups else 0.0,
+        }
+
+
+
+
+urlCache = URLCache()
+
+
+def getURLCacheStats() -> dict:
+    """URL 读取缓存统计，字段见 URLCache.stats（misses 即实际完整下载的次数）"""
+    return urlCache.stats()
@@ -0,0 +1,289 @@
+"""
+utils/llm/urlExtract.py
+
+URL 响应正文的解码与提取，放到事件循环之外执行
+
+以前 _extractHTML 直接在事件循环上跑 BeautifulSoup（lxml 解析器），几 MB 的页面
+能卡住所有 handler 几百毫秒。这里：
+    - 提取路径：装了 lxml 时用 lxml.html 建树（C 实现，解析期间释放 GIL），
+      去掉 script / style 等节点后按 markdown-body → article → main → body 选容器，
+      惰性遍历文本节点，攒够 maxChars 就停止；lxml 不可用或解析失败时退回 BeautifulSoup
+    - 执行位置按响应大小选择（extractOffLoop）：
+        < _INLINE_MAX_BYTES    直接在事件循环上执行，省掉线程切换
+        < _PROCESS_MIN_BYTES   有界线程池（_THREAD_POOL_SIZE）
+        其余                   有界进程池（_PROCESS_POOL_SIZE），进程池不可用时退回线程池
+    - 非 HTML（纯文本 / JSON / XML）只做解码 + 空行规范化，同样按大小选执行位置
+
+提交到进程池的 decodeAndExtract 是模块级函数，参数只有 bytes / str / int，可直接 pickle。
+进程池显式使用 forkserver（不支持时用 spawn）启动子进程，不用 Linux 默认的 fork：
+bot 是多线程的（url-extract 线程池可能正在 libxml2 里、数据库工作线程、to_thread 线程），
+fork 出的子进程可能继承一把被别的线程持有的 C 层锁而永久卡住，占着进程池的槽位直到重启。
+池均为惰性创建，首次使用时向 resourceManager 注册关闭回调。
+"""
+
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+
+_INLINE_MAX_BYTES = 32 * 1024
+_PROCESS_MIN_BYTES = 1024 * 1024
+_THREAD_POOL_SIZE = 2
+_PROCESS_POOL_SIZE = 1
+
+_DROP_TAGS = ("script", "style", "noscript", "template", "svg")
+
+# 正文容器优先级，与 BeautifulSoup 回退路径一致
+_CONTAINER_XPATHS = (
+    "//article[contains(concat(' ', normalize-space(@class), ' '), ' markdown-body ')]",
+    "//*[contains(concat(' ', normalize-space(@class), ' '), ' markdown-body ')]",
+    "//article",
+    "//main",
+    "//*[@role='main']",
+    "//body",
+)
+
+
+# ── 模块状态 ──────────────────────────────────────
+
+_threadPool: Optional[ThreadPoolExecutor] = None
+_processPool: Optional[ProcessPoolExecutor] = None
+_poolLock = threading.Lock()
+_shutdownRegistered = False
+
+
+
+
+# ============================================================================
+# 提取（同步，可在任意线程 / 子进程中运行）
+# ============================================================================
+
+def decodeAndExtract(rawData: bytes, contentType: str, maxChars: Optional[int] = None) -> tuple[str, str, bool]:
+    """
+    按 Content-Type 的 charset 解码并提取正文。
+
+    返回:
+        (title, body, truncated)；truncated 表示因 maxChars 提前停止了提取
+    """
+    charset = "utf-8"
+    if "charset=" in contentType:
+        try:
+            charset = contentType.split("charset=")[-1].split(";")[0].strip()
+        except Exception:
+            pass
+
+    try:
+        decoded = rawData.decode(charset, errors="replace")
+    except Exception:
+        decoded = rawData.decode("utf-8", errors="replace")
+
+    return extractContent(decoded, contentType, maxChars)
+
+
+def extractContent(text: str, contentType: str, maxChars: Optional[int] = None) -> tuple[str, str, bool]:
+    """根据 Content-Type 提取 (title, body, truncated)。非 HTML 走纯文本 normalize。"""
+    if "html" in contentType.lower():
+        return extractHTML(text, maxChars)
+    return "", normalizeText(text), False
+
+
+def extractHTML(html: str, maxChars: Optional[int] = None) -> tuple[str, str, bool]:
+    """从 HTML 提取 title 和正文，优先 lxml 快速路径，失败退回 BeautifulSoup。"""
+    if lxml is not None:
+        try:
+            return _extractHTMLWithLxml(html, maxChars)
+        except Exception:
+            pass
+    return _extractHTMLWithSoup(html, maxChars)
+
+
+def _extractHTMLWithLxml(html: str, maxChars: Optional[int]) -> tuple[str, str, bool]:
+    doc = lxml.html.document_fromstring(html)
+
+    for node in list(doc.iter(etree.Comment, etree.ProcessingInstruction, *_DROP_TAGS)):
+        node.drop_tree()   # 保留 tail 文本，与 BeautifulSoup 的 decompose 一致
+
+    titleNodes = doc.xpath("//title")
+    title = titleNodes[0].text_content().strip() if titleNodes else ""
+
+    container = doc
+    for xpath in _CONTAINER_XPATHS:
+        found = doc.xpath(xpath)
+        if found:
+            container = found[0]
+            break
+
+    # 惰性遍历：文本攒够 maxChars 即停，后面的节点不再访问
+    pieces: list[str] = []
+    used = 0
+    truncated = False
+    for piece in container.itertext():
+        piece = piece.strip()
+        if not piece:
+            continue
+        if maxChars is not None and used > maxChars:
+            truncated = True
+            break
+        pieces.append(piece)
+        used += len(piece) + 1
+
+    return title, normalizeText("\n".join(pieces)), truncated
+
+
+def _extractHTMLWithSoup(html: str, maxChars: Optional[int]) -> tuple[str, str, bool]:
+    try:
+        soup = BeautifulSoup(html, "lxml")
+    except Exception:
+        try:
+            soup = BeautifulSoup(html, "html.parser")
+        except Exception:
+            return "", normalizeText(html), False
+
+    for tag in soup(list(_DROP_TAGS)):
+        tag.decompose()
+
+    titleTag = soup.find("title")
+    title = titleTag.get_text(strip=True) if titleTag else ""
+
+    container = (
+        soup.find("article", class_="markdown-body")
+        or soup.find(class_="markdown-body")
+        or soup.find("article")
+        or soup.find("main")
+        or soup.find(attrs={"role": "main"})
+        or soup.find("body")
+    )
+
+    if container:
+        body = container.get_text(separator="\n", strip=True)
+    else:
+        body = soup.get_text(separator="\n", strip=True)
+
+    body = normalizeText(body)
+    truncated = maxChars is not None and len(body) > maxChars
+    return title, body, truncated
+
+
+def normalizeText(text: str) -> str:
+    """行尾空白清理，合并过多空行为最多两行。"""
+    lines = text.splitlines()
+    result: list[str] = []
+    emptyCount = 0
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            emptyCount += 1
+            if emptyCount <= 2:
+                result.append("")
+        else:
+            emptyCount = 0
+            result.append(line)
+
+    return "\n".join(result).strip()
+
+
+
+
+# ============================================================================
+# 执行池
+# ============================================================================
+
+def _getThreadPool() -> ThreadPoolExecutor:
+    global _threadPool
+    with _poolLock:
+        if _threadPool is None:
+            _threadPool = ThreadPoolExecutor(
+                max_workers=_THREAD_POOL_SIZE,
+                thread_name_prefix="url-extract",
+            )
+            _registerShutdown()
+        return _threadPool
+
+
+def _processContext():
+    """进程池的启动方式：forkserver，平台不支持时（Windows）用 spawn；不用 fork"""
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def _getProcessPool() -> ProcessPoolExecutor:
+    global _processPool
+    with _poolLock:
+        if _processPool is None:
+            _processPool = ProcessPoolExecutor(
+                max_workers=_PROCESS_POOL_SIZE,
+                mp_context=_processContext(),
+            )
+            _registerShutdown()
+        return _processPool
+
+
+def _registerShutdown() -> None:
+    """首次建池时注册关闭回调（调用方已持有 _poolLock）"""
+    global _shutdownRegistered
+    if _shutdownRegistered:
+        return
+    from utils.core.resourceManager import getResourceManager
+    getResourceManager().register("URL 提取执行池", shutdownPools, priority=5)
+    _shutdownRegistered = True
+
+
+async def shutdownPools() -> None:
+    """关闭执行池（由 resourceManager 调用），不等待仍在运行的提取任务"""
+    global _threadPool, _processPool
+    with _poolLock:
+        threadPool, processPool = _threadPool, _processPool
+        _threadPool = None
+        _processPool = None
+    if threadPool is not None:
+        threadPool.shutdown(wait=False, cancel_futures=True)
+    if processPool is not None:
+        processPool.shutdown(wait=False, cancel_futures=True)
+
+
+def _chooseExecutor(size: int) -> str:
+    """按响应字节数选择执行位置："inline" / "thread" / "process" """
+    if size < _INLINE_MAX_BYTES:
+        return "inline"
+    if size < _PROCESS_MIN_BYTES:
+        return "thread"
+    return "process"
+
+
+async def extractOffLoop(rawData: bytes, contentType: str, maxChars: Optional[int] = None) -> tuple[str, str, bool]:
+    """
+    在合适的执行位置运行 decodeAndExtract，返回 (title, body, truncated)。
+
+    调用方被取消时，尚未开始的任务会被撤掉；已在运行的任务跑完后结果丢弃。
+    """
+    global _processPool
+
+    where = _chooseExecutor(len(rawData))
+    if where == "inline":
+        return decodeAndExtract(rawData, contentType, maxChars)
+
+    if where == "process":
+        try:
+            future = _getProcessPool().submit(decodeAndExtract, rawData, contentType, maxChars)
+            return await asyncio.wrap_future(future)
+        except (BrokenProcessPool, OSError):
+            # 子进程创建失败 / 池已损坏：丢弃进程池，本次退回线程池
+            with _poolLock:
+                brokenPool, _processPool = _processPool, None
+            if brokenPool is not None:
+                brokenPool.shutdown(wait=False, cancel_futures=True)
+
+    future = _getThreadPool().submit(decodeAndExtract, rawData, contentType, maxChars)
+    return await asyncio.wrap_future(future)
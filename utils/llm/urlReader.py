@@ -5,8 +5,9 @@ LLM URL 读取：
     - URL 提取与意图判断（意图逻辑在 urlIntent.py，本模块仅 re-export）
     - SSRF 防护（blocked hosts、private IP、DNS 校验）
     - 手动 redirect 处理，逐跳校验
+    - 提取结果缓存 + ETag / Last-Modified 条件请求（缓存本身在 urlCache.py）
     - streaming byte cap + 二进制嗅探
-    - HTML / 纯文本提取
+    - HTML / 纯文本提取（在事件循环之外执行，见 urlExtract.py）
     - 低信任 URL context block 格式化
 """
 
@@ -15,11 +16,12 @@ import re
 import asyncio
 import ipaddress
 import socket
+import time
+from collections import OrderedDict
 from typing import Optional
 from urllib.parse import urlsplit, urljoin
 
 import aiohttp
-from bs4 import BeautifulSoup
 
 from utils.core.resourceManager import getResourceManager
 from utils.llm.config import (
@@ -34,6 +36,8 @@ from utils.llm.config import (
     getURLReadBlockedHosts,
 )
 from utils.llm.urlIntent import hasURLReadIntent  # re-export
+from utils.llm.urlCache import urlCache, normalizeURL
+from utils.llm.urlExtract import extractOffLoop
 from utils.core.logger import logSystemEvent, LogLevel, LogChildType
 
 
@@ -43,6 +47,14 @@ _CHUNK_SIZE = 8192
 _RETRY_BACKOFF_SECONDS = 0.5
 # 整个 readURLContextsForUserText 的总墙钟上限（秒），防止单个 URL 卡住整条 LLM 流水线
 _TOTAL_FETCH_DEADLINE = 15
+# 各 URL 自己按总 deadline 收尾（写结果、打日志）后，外层再多等的宽限（秒）
+_DEADLINE_GRACE_SECONDS = 1
+# 同一 host 的并发连接上限，多个同站链接排队，不会一起压到同一台慢服务器上
+_PER_HOST_CONNECTIONS = 2
+# _SafeResolver 的解析缓存：getaddrinfo 不返回记录 TTL，统一用保守的固定有效期（秒）
+_DNS_CACHE_TTL = 60
+_DNS_NEGATIVE_TTL = 30
+_DNS_CACHE_MAX_ENTRIES = 256
 
 
 
@@ -69,7 +81,8 @@ async def _getSession() -> aiohttp.ClientSession:
                 _session = aiohttp.ClientSession(
                     connector=aiohttp.TCPConnector(
                         resolver=_SafeResolver(),
-                        use_dns_cache=False,
+                        use_dns_cache=False,   # 缓存放在 _SafeResolver 内，命中时仍复核黑名单
+                        limit_per_host=_PER_HOST_CONNECTIONS,
                     ),
                     cookie_jar=aiohttp.DummyCookieJar(),
                     trust_env=False,
@@ -108,22 +121,50 @@ class _SafeResolver(aiohttp.abc.AbstractResolver):
 
     这样避免"校验时一个 DNS 结果、连接时另一个 DNS 结果"的 TOCTOU 问题。
     解析结果不安全时抛 OSError，aiohttp 会包成 ClientConnectorError。
+
+    每次抓取和每个 redirect 跳都会解析一次，因此按 (host, port, family) 缓存：
+        - 只缓存已通过公网校验的地址集（_DNS_CACHE_TTL 秒），连接拿到的仍是校验过的地址
+        - 解析到非公网地址的 host 记为负条目（_DNS_NEGATIVE_TTL 秒），期间直接拒绝，不再解析
+        - 命中时按当前 urlReadBlockedHosts 复核 host，新加的 blocked host 立即生效
+        - 解析失败（NXDOMAIN 等）不缓存；条目数超过 _DNS_CACHE_MAX_ENTRIES 时淘汰最久未用的
     """
 
     def __init__(self):
         self._resolver = aiohttp.resolver.DefaultResolver()
+        self._cache: OrderedDict[tuple, tuple[float, Optional[list], str]] = OrderedDict()   # key -> (过期时刻, 地址集, 拒绝原因)
 
     async def resolve(self, host: str, port: int = 0, family: int = socket.AF_UNSPEC):
+        key = (host.lower().rstrip("."), port, family)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            if _matchBlockedHost(key[0], getURLReadBlockedHosts()):
+                raise OSError(f"命中 blocked host：{key[0]}")
+            self._cache.move_to_end(key)
+            _, addrs, reason = cached
+            if addrs is None:
+                raise OSError(reason)
+            return [dict(addrInfo) for addrInfo in addrs]
+
         result = await self._resolver.resolve(host, port, family)
 
         for addrInfo in result:
             ip = addrInfo["host"]
             if not _isSafeIPAddress(ip):
-                raise OSError(f"DNS 解析结果 {ip}（host={host}）不是可路由公网地址")
+                reason = f"DNS 解析结果 {ip}（host={host}）不是可路由公网地址"
+                self._store(key, _DNS_NEGATIVE_TTL, None, reason)
+                raise OSError(reason)
 
+        self._store(key, _DNS_CACHE_TTL, [dict(addrInfo) for addrInfo in result], "")
         return result
 
+    def _store(self, key: tuple, ttl: float, addrs: Optional[list], reason: str):
+        self._cache[key] = (time.monotonic() + ttl, addrs, reason)
+        self._cache.move_to_end(key)
+        while len(self._cache) > _DNS_CACHE_MAX_ENTRIES:
+            self._cache.popitem(last=False)
+
     async def close(self):
+        self._cache.clear()
         await self._resolver.close()
 
 
@@ -180,6 +221,11 @@ def extractURLs(text: str) -> list[str]:
 # URL 安全校验
 # ============================================================================
 
+def _matchBlockedHost(host: str, blockedHosts: list[str]) -> bool:
+    """host（已小写、去尾点）是否为某个 blocked host 或其子域名"""
+    return any(host == bh or host.endswith(f".{bh}") for bh in blockedHosts)
+
+
 def _validateURL(url: str, *, blockedHosts: list[str] | None = None) -> tuple[bool, str]:
     """
     校验 URL 的基本安全性。
@@ -215,9 +261,8 @@ def _validateURL(url: str, *, blockedHosts: list[str] | None = None) -> tuple[bo
 
     if blockedHosts is None:
         blockedHosts = getURLReadBlockedHosts()
-    for bh in blockedHosts:
-        if host == bh or host.endswith(f".{bh}"):
-            return False, f"命中 blocked host：{host}"
+    if _matchBlockedHost(host, blockedHosts):
+        return False, f"命中 blocked host：{host}"
 
     # 直接 IP literal 判断是否公网
     try:
@@ -304,30 +349,74 @@ def _makeResult(requestedUrl: str) -> dict:
         "truncatedBytes": False,
         "truncatedChars": False,
         "redirectChain": [],
+        "etag": "",
+        "lastModified": "",
+        "cache": "",          # "" 实际下载 / "hit" 缓存命中 / "revalidated" 304 沿用缓存
     }
 
 
+def _applyCachedResult(result: dict, cached: dict) -> None:
+    """把缓存条目里的抓取结果填进本次请求的 result"""
+    for field, value in cached.items():
+        result[field] = value
+
+
 
 
 # ============================================================================
 # HTTP 抓取：手动 redirect + streaming byte cap + 重试
 # ============================================================================
 
-async def _fetchURL(url: str) -> dict:
+async def _fetchURL(url: str, *, deadline: Optional[float] = None) -> dict:
     """
     抓取单个 URL，返回 URLFetchResult dict。
 
     失败也返回 result，不对外抛异常。结束前会打一条 ops 日志。
+
+    deadline 为事件循环时钟上的截止时刻（readURLContextsForUserText 的总时限）：
+    每次尝试的超时取剩余预算，预算不够再退避重试时直接放弃。因总时限未完成的结果不写入负缓存。
+
+    新鲜的缓存条目直接返回（仍按当前黑名单校验请求 / 最终 URL）；
+    过期但带校验器的条目走条件请求，304 时沿用缓存的正文。
     """
     result = _makeResult(url)
     maxRetries = getURLReadMaxRetries()
     redirectLimit = getURLReadRedirectLimit()
+    maxBytes = getURLReadMaxBytes()
+    maxChars = getURLReadMaxChars()
+
+    cached = urlCache.lookup(url, maxBytes=maxBytes, maxChars=maxChars)
+    if cached is not None and cached["fresh"]:
+        _applyCachedResult(result, cached["result"])
+        result["cache"] = "hit"
+        if not result["ok"] or _isStillAllowed(url, result["finalUrl"]):
+            await _logFetchResult(result)
+            return result
+        # 最终 URL 已被加入黑名单：按正常流程重新抓取（会在校验阶段被拒绝）
+        result = _makeResult(url)
+        cached = None
+
+    loop = asyncio.get_running_loop()
+    outOfBudget = False
 
     for attempt in range(maxRetries + 1):
+        remaining = None if deadline is None else deadline - loop.time()
+        if remaining is not None and remaining <= 0:
+            outOfBudget = True
+            result["error"] = f"总时限 {_TOTAL_FETCH_DEADLINE}s 内未完成抓取"
+            break
+
         try:
-            await _fetchWithRedirect(url, redirectLimit, result)
+            await asyncio.wait_for(
+                _fetchWithRedirect(url, redirectLimit, result, conditional=cached),
+                timeout=remaining,
+            )
             break
         except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            if deadline is not None and loop.time() + _RETRY_BACKOFF_SECONDS >= deadline:
+                outOfBudget = True
+                result["error"] = f"总时限 {_TOTAL_FETCH_DEADLINE}s 内未完成抓取（{attempt + 1} 次尝试）：{type(e).__name__} {e}"
+                break
             if attempt < maxRetries:
                 await asyncio.sleep(_RETRY_BACKOFF_SECONDS)
                 continue
@@ -337,15 +426,45 @@ async def _fetchURL(url: str) -> dict:
             result["error"] = f"抓取时出现意外异常：{type(e).__name__} {e}"
             break
 
+    if result["cache"] == "revalidated":
+        urlCache.refresh(result["finalUrl"])
+    elif not outOfBudget:
+        urlCache.store(url, result, maxBytes=maxBytes, maxChars=maxChars, etag=result["etag"], lastModified=result["lastModified"])
+
     await _logFetchResult(result)
     return result
 
 
-async def _fetchWithRedirect(startUrl: str, redirectLimit: int, result: dict) -> None:
+def _isStillAllowed(requestedUrl: str, finalUrl: Optional[str]) -> bool:
+    """缓存命中时按当前黑名单复核请求 URL 与最终 URL（中间跳不再逐一复核）"""
+    blockedHosts = getURLReadBlockedHosts()
+    for candidate in (requestedUrl, finalUrl or requestedUrl):
+        ok, _ = _validateURL(candidate, blockedHosts=blockedHosts)
+        if not ok:
+            return False
+    return True
+
+
+def _conditionalHeaders(conditional: Optional[dict], url: str) -> Optional[dict]:
+    """当前跳正是缓存条目的最终 URL 时，生成 If-None-Match / If-Modified-Since"""
+    if conditional is None or normalizeURL(url) != normalizeURL(conditional["result"]["finalUrl"] or ""):
+        return None
+
+    headers = {}
+    if conditional["etag"]:
+        headers["If-None-Match"] = conditional["etag"]
+    if conditional["lastModified"]:
+        headers["If-Modified-Since"] = conditional["lastModified"]
+    return headers or None
+
+
+async def _fetchWithRedirect(startUrl: str, redirectLimit: int, result: dict, *, conditional: Optional[dict] = None) -> None:
     """
     手动处理 redirect，每一跳前都执行完整 URL 安全校验。
 
     结果通过传入的 result dict 原地填充；失败会写入 error 字段。
+    conditional 为 urlCache.lookup 返回的过期条目：落到它的最终 URL 时带条件请求头，
+    收到 304 则用缓存内容填充 result 并标记 cache="revalidated"。
     """
     currentUrl = startUrl
     redirectChain: list[str] = result["redirectChain"]
@@ -361,11 +480,22 @@ async def _fetchWithRedirect(startUrl: str, redirectLimit: int, result: dict) ->
             result["error"] = err
             return
 
-        async with session.get(currentUrl, allow_redirects=False) as resp:
+        conditionalHeaders = _conditionalHeaders(conditional, currentUrl)
+
+        async with session.get(currentUrl, allow_redirects=False, headers=conditionalHeaders) as resp:
             status = resp.status
             result["status"] = status
             result["finalUrl"] = currentUrl
 
+            # 304：内容未变，沿用缓存的提取结果
+            if status == 304 and conditionalHeaders:
+                chain = result["redirectChain"]
+                _applyCachedResult(result, conditional["result"])
+                result["redirectChain"] = chain
+                result["finalUrl"] = currentUrl
+                result["cache"] = "revalidated"
+                return
+
             # 3xx：手动处理 redirect
             if status in (301, 302, 303, 307, 308):
                 location = resp.headers.get("Location")
@@ -391,6 +521,8 @@ async def _fetchWithRedirect(startUrl: str, redirectLimit: int, result: dict) ->
 
             contentType = resp.headers.get("Content-Type", "")
             result["contentType"] = contentType
+            result["etag"] = resp.headers.get("ETag", "")
+            result["lastModified"] = resp.headers.get("Last-Modified", "")
 
             if not _isTextContentType(contentType, currentUrl):
                 result["error"] = f"非文本 Content-Type：{contentType or '(空)'}"
@@ -420,22 +552,11 @@ async def _fetchWithRedirect(startUrl: str, redirectLimit: int, result: dict) ->
                 result["error"] = "响应疑似二进制数据"
                 return
 
-            # 解码
-            charset = "utf-8"
-            if "charset=" in contentType:
-                try:
-                    charset = contentType.split("charset=")[-1].split(";")[0].strip()
-                except Exception:
-                    pass
-
-            try:
-                decoded = rawData.decode(charset, errors="replace")
-            except Exception:
-                decoded = rawData.decode("utf-8", errors="replace")
-
-            title, body = _extractContent(decoded, contentType)
+            # 解码 + 提取按响应大小放到线程池 / 进程池，攒够 maxChars 即停
+            title, body, truncatedChars = await extractOffLoop(rawData, contentType, getURLReadMaxChars())
             result["title"] = title
             result["text"] = body
+            result["truncatedChars"] = truncatedChars
             result["ok"] = True
             return
 
@@ -453,9 +574,10 @@ async def _logFetchResult(result: dict) -> None:
         bytesRead = result.get("bytesRead", 0)
         truncatedBytes = result.get("truncatedBytes", False)
         truncatedNote = "，内容被字节上限截断" if truncatedBytes else ""
+        cacheNote = {"hit": "，缓存命中", "revalidated": "，304 沿用缓存"}.get(result.get("cache"), "")
         await logSystemEvent(
             "LLM URL 抓取完成",
-            f"{url} | HTTP {status} | {ctype} | {bytesRead} bytes{truncatedNote}",
+            f"{url} | HTTP {status} | {ctype} | {bytesRead} bytes{truncatedNote}{cacheNote}",
             LogLevel.INFO,
             LogChildType.WITH_ONE_CHILD,
         )
@@ -464,9 +586,10 @@ async def _logFetchResult(result: dict) -> None:
     err = result.get("error") or "未知错误"
     status = result.get("status")
     statusPart = f"HTTP {status} | " if status else ""
+    cacheNote = "（负缓存）" if result.get("cache") == "hit" else ""
     await logSystemEvent(
         "LLM URL 抓取失败",
-        f"{url} | {statusPart}{err}",
+        f"{url} | {statusPart}{err}{cacheNote}",
         LogLevel.WARNING,
         LogChildType.WITH_ONE_CHILD,
     )
@@ -474,71 +597,6 @@ async def _logFetchResult(result: dict) -> None:
 
 
 
-# ============================================================================
-# 内容提取
-# ============================================================================
-
-def _extractContent(text: str, contentType: str) -> tuple[str, str]:
-    """根据 Content-Type 提取 (title, body)。非 HTML 走纯文本 normalize。"""
-    if "html" in contentType.lower():
-        return _extractHTML(text)
-    return "", _normalizeText(text)
-
-
-def _extractHTML(html: str) -> tuple[str, str]:
-    """从 HTML 提取 title 和正文，优先 markdown-body → article → main → body。"""
-    try:
-        soup = BeautifulSoup(html, "lxml")
-    except Exception:
-        try:
-            soup = BeautifulSoup(html, "html.parser")
-        except Exception:
-            return "", _normalizeText(html)
-
-    for tag in soup(["script", "style", "noscript", "template", "svg"]):
-        tag.decompose()
-
-    titleTag = soup.find("title")
-    title = titleTag.get_text(strip=True) if titleTag else ""
-
-    container = (
-        soup.find("article", class_="markdown-body")
-        or soup.find(class_="markdown-body")
-        or soup.find("article")
-        or soup.find("main")
-        or soup.find(attrs={"role": "main"})
-        or soup.find("body")
-    )
-
-    if container:
-        body = container.get_text(separator="\n", strip=True)
-    else:
-        body = soup.get_text(separator="\n", strip=True)
-
-    return title, _normalizeText(body)
-
-
-def _normalizeText(text: str) -> str:
-    """行尾空白清理，合并过多空行为最多两行。"""
-    lines = text.splitlines()
-    result: list[str] = []
-    emptyCount = 0
-
-    for line in lines:
-        line = line.strip()
-        if not line:
-            emptyCount += 1
-            if emptyCount <= 2:
-                result.append("")
-        else:
-            emptyCount = 0
-            result.append(line)
-
-    return "\n".join(result).strip()
-
-
-
-
 # ============================================================================
 # 公共 API
 # ============================================================================
@@ -566,48 +624,56 @@ async def readURLContextsForUserText(*, intentText: str, candidateText: str) ->
     maxUrls = getURLReadMaxUrls()
     urls = urls[:maxUrls]
 
-    tasks = [asyncio.create_task(_fetchURL(url)) for url in urls]
+    # 所有 URL 并发抓取（同一 host 的连接数由 connector 的 limit_per_host 限制），
+    # 共用一个截止时刻：每个 URL 的单次尝试超时都取剩余预算，到点自行以失败结果收尾
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + _TOTAL_FETCH_DEADLINE
+    tasks = [asyncio.create_task(_fetchURL(url, deadline=deadline)) for url in urls]
 
     try:
-        raw = await asyncio.wait_for(
-            asyncio.gather(*tasks, return_exceptions=True),
-            timeout=_TOTAL_FETCH_DEADLINE,
-        )
-    except asyncio.TimeoutError:
-        # 总 deadline 到了，取消还在跑的任务，保留已完成的结果
-        for t in tasks:
-            if not t.done():
-                t.cancel()
-
+        _, pending = await asyncio.wait(tasks, timeout=_TOTAL_FETCH_DEADLINE + _DEADLINE_GRACE_SECONDS)
+    except asyncio.CancelledError:
+        await _cancelTasks(tasks)
+        raise
+
+    if pending:
+        # 兜底：宽限期后仍未返回的任务取消并等其真正结束，不留悬挂任务
+        await _cancelTasks(pending)
         await logSystemEvent(
             "LLM URL 抓取整体超时",
-            f"{len(urls)} 个 URL，{_TOTAL_FETCH_DEADLINE}s 内未全部完成，返回已完成部分",
+            f"{len(urls)} 个 URL 中 {len(pending)} 个在 {_TOTAL_FETCH_DEADLINE}s 内未完成，其余结果照常返回",
             LogLevel.WARNING,
             LogChildType.WITH_ONE_CHILD,
         )
 
-        raw = []
-        for t in tasks:
-            if t.done() and not t.cancelled():
-                try:
-                    raw.append(t.result())
-                except Exception as e:
-                    raw.append(e)
-
-    # _fetchURL 已把所有异常转成 result dict，这里只做兜底
-    validResults: list[dict] = []
-    for r in raw:
-        if isinstance(r, Exception):
+    # 按原顺序返回；_fetchURL 已把所有异常转成 result dict，这里只做兜底
+    results: list[dict] = []
+    for url, task in zip(urls, tasks):
+        if task.cancelled():
+            result = _makeResult(url)
+            result["error"] = f"总时限 {_TOTAL_FETCH_DEADLINE}s 内未完成抓取"
+            results.append(result)
+            continue
+
+        exc = task.exception()
+        if exc is not None:
             await logSystemEvent(
                 "LLM URL 抓取兜底异常",
-                f"{type(r).__name__}: {r}",
+                f"{type(exc).__name__}: {exc}",
                 LogLevel.WARNING,
                 LogChildType.WITH_ONE_CHILD,
             )
             continue
-        validResults.append(r)
+        results.append(task.result())
+
+    return results
+
 
-    return validResults
+async def _cancelTasks(tasks) -> None:
+    """取消未完成的抓取任务，并等待取消真正完成"""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
 
 
 def buildURLContextBlock(results: list[dict]) -> str:
@@ -643,7 +709,7 @@ def buildURLContextBlock(results: list[dict]) -> str:
 
             text = result.get("text", "")
             truncatedBytes = result.get("truncatedBytes", False)
-            truncatedChars = False
+            truncatedChars = result.get("truncatedChars", False)   # 提取阶段已提前停止
 
             # 总字符上限优先
             if totalCharsUsed + len(text) > totalMaxChars:
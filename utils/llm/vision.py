@@ -29,6 +29,7 @@ class ImageRef:
     mimeType: str
     fileSize: int | None = None
     tooLarge: bool = False
+    fileUniqueID: str | None = None     # 跨 bot / 跨 file_id 稳定，用作图片描述缓存键
 
 
 
@@ -66,6 +67,7 @@ def extractImageRefs(message) -> list[ImageRef]:
             mimeType="image/jpeg",
             fileSize=photo.file_size,
             tooLarge=tooLarge,
+            fileUniqueID=getattr(photo, "file_unique_id", None),
         ))
         _logger.info(
             "LLM 图片分辨率: 可用 %s, 选取 %dx%d",
@@ -82,6 +84,7 @@ def extractImageRefs(message) -> list[ImageRef]:
                 mimeType=doc.mime_type,
                 fileSize=doc.file_size,
                 tooLarge=tooLarge,
+                fileUniqueID=getattr(doc, "file_unique_id", None),
             ))
 
     return refs
@@ -101,7 +104,7 @@ async def downloadImages(bot, refs: list[ImageRef]) -> tuple[list[dict], list[st
     下载图片引用列表并 base64 编码。
 
     返回:
-        images: [{"data": b64_str, "mimeType": "image/jpeg"}, ...]
+        images: [{"data": b64_str, "mimeType": "image/jpeg", "fileUniqueID": str | None}, ...]
         notes:  人类可读的文字说明列表（过大 / 下载失败时生成）
     """
     images: list[dict] = []
@@ -123,6 +126,7 @@ async def downloadImages(bot, refs: list[ImageRef]) -> tuple[list[dict], list[st
             images.append({
                 "data": base64.b64encode(raw).decode("ascii"),
                 "mimeType": ref.mimeType,
+                "fileUniqueID": ref.fileUniqueID,
             })
         except Exception as e:
             notes.append("[有一张图片下载失败]")
@@ -0,0 +1,186 @@
+"""
+utils/llm/visionCache.py
+
+双调用视觉架构的图片描述持久缓存：
+    - 以 (视觉模型, 图片键) 为主键存储描述文本，重复图片（贴纸、转发图）直接命中，跳过视觉调用
+    - 图片键两路：Telegram file_unique_id（跨 file_id 稳定），以及图片内容的 SHA-256
+      （转发图换了 file_id 也能命中）。两路都是精确键：不用感知哈希，
+      纯色图、同一界面的截图、同模板不同配字的表情图结构相近，用感知哈希会串用别人的描述
+    - 模型名纳入主键：换视觉模型后旧描述自然失效，不会混用
+    - TTL 过期 + 条数上限，超出时按 last_used_at 淘汰最久未使用的条目
+
+描述文本源自用户图片，属于用户隐私派生数据，与 llmMemory 同口径加密存储。
+"""
+
+
+import time
+import base64
+import hashlib
+from typing import Optional
+
+from config import (
+    LLM_VISION_CACHE_DB_PATH,
+    LLM_VISION_CACHE_TTL,
+    LLM_VISION_CACHE_MAX_ENTRIES,
+)
+
+from utils.core.database import Database
+from utils.core.schema import loadSchema
+from utils.core.crypto import encryptText, decryptText
+from utils.core.logger import logSystemEvent, LogLevel, LogChildType
+
+visionCacheDB = Database(LLM_VISION_CACHE_DB_PATH, "LLMVisionCache")
+
+
+
+
+def _initSchema(conn):
+    """初始化表结构（由 initDatabase 调用）"""
+    conn.executescript(loadSchema("llmVisionCache"))
+
+
+def initDatabase():
+    """初始化图片描述缓存数据库（由 appLifecycle 调用）"""
+    visionCacheDB.initSchema(_initSchema)
+
+
+
+
+def _contentHash(raw: bytes) -> str:
+    """图片字节的 SHA-256（十六进制）"""
+    return hashlib.sha256(raw).hexdigest()
+
+
+def computeImageKeys(images: list[dict]) -> list[str]:
+    """
+    为一组图片生成缓存键候选（按查询优先级排列）。
+
+    多张图片一次描述，因此键是整组图片的有序组合：
+        - uid:<id1>,<id2>...   仅当每张图都带 fileUniqueID 时生成
+        - sha256:<h1>,<h2>...  始终生成（旧版 hash: 前缀的感知哈希键不再查询，随 TTL 过期）
+    """
+    if not images:
+        return []
+
+    keys: list[str] = []
+    uniqueIDs = [img.get("fileUniqueID") for img in images]
+    if all(isinstance(uid, str) and uid for uid in uniqueIDs):
+        keys.append("uid:" + ",".join(uniqueIDs))
+
+    hashes = []
+    for img in images:
+        try:
+            raw = base64.b64decode(img["data"])
+        except Exception:
+            raw = str(img.get("data", "")).encode("utf-8")
+        hashes.append(_contentHash(raw))
+    keys.append("sha256:" + ",".join(hashes))
+
+    return keys
+
+
+
+
+async def getCachedDescription(imageKeys: list[str], *, model: str) -> Optional[str]:
+    """
+    按键候选依次查询未过期的描述；命中时刷新 last_used_at 并回填缺失的键。
+
+    查询失败不抛出，返回 None（退回正常视觉调用）。
+    """
+    if not imageKeys:
+        return None
+
+    now = time.time()
+    expireBefore = now - LLM_VISION_CACHE_TTL
+
+    def _query(conn):
+        hit = None
+        for key in imageKeys:
+            row = conn.execute(
+                "SELECT description FROM vision_descriptions "
+                "WHERE model = ? AND image_key = ? AND created_at >= ?",
+                (model, key, expireBefore),
+            ).fetchone()
+            if row:
+                hit = row["description"]
+                break
+        if hit is None:
+            return None
+
+        # 两路键都是精确键：同一张图可能先以 sha256 键入库、后以 uid 键查询（或反之），命中后补齐所有键
+        for key in imageKeys:
+            conn.execute(
+                """
+                INSERT INTO vision_descriptions (model, image_key, description, created_at, last_used_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(model, image_key) DO UPDATE SET last_used_at = excluded.last_used_at
+                """,
+                (model, key, hit, now, now),
+            )
+        return hit
+
+    try:
+        token = await visionCacheDB.run(_query)
+        if token is None:
+            return None
+        return decryptText(token)
+    except Exception as e:
+        await logSystemEvent(
+            "LLM 图片描述缓存读取失败",
+            f"{type(e).__name__}: {e}",
+            LogLevel.WARNING,
+            LogChildType.WITH_ONE_CHILD,
+        )
+        return None
+
+
+
+
+async def storeDescription(imageKeys: list[str], description: str, *, model: str) -> None:
+    """
+    写入描述（所有键候选各一行），并顺带清理过期条目、按条数上限淘汰。
+
+    写入失败只记日志，不影响本次回复。
+    """
+    if not imageKeys or not description:
+        return
+
+    now = time.time()
+    expireBefore = now - LLM_VISION_CACHE_TTL
+    token = encryptText(description)
+
+    def _query(conn):
+        for key in imageKeys:
+            conn.execute(
+                """
+                INSERT INTO vision_descriptions (model, image_key, description, created_at, last_used_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(model, image_key) DO UPDATE SET
+                    description = excluded.description,
+                    created_at = excluded.created_at,
+                    last_used_at = excluded.last_used_at
+                """,
+                (model, key, token, now, now),
+            )
+
+        conn.execute("DELETE FROM vision_descriptions WHERE created_at < ?", (expireBefore,))
+        conn.execute(
+            """
+            DELETE FROM vision_descriptions WHERE rowid IN (
+                SELECT rowid FROM vision_descriptions
+                ORDER BY last_used_at DESC
+                LIMIT -1 OFFSET ?
+            )
+            """,
+            (LLM_VISION_CACHE_MAX_ENTRIES,),
+        )
+
+    try:
+        await visionCacheDB.run(_query)
+    except Exception as e:
+        await logSystemEvent(
+            "LLM 图片描述缓存写入失败",
+            f"{type(e).__name__}: {e}",
+            LogLevel.WARNING,
+            LogChildType.WITH_ONE_CHILD,
+        )
@@ -0,0 +1,243 @@
+"""
+utils/stickerCache.py
+
+表情包文件的磁盘缓存（按内容寻址，按总字节数 LRU 淘汰）
+
+热门表情包每天都有人要，以前每次都要把整套 sticker 重新下载、再逐张跑一遍 ffmpeg。
+这里把两类文件落盘复用：
+    - 原始文件：originals/{file_unique_id}{.webp|.webm|.tgs}
+      file_unique_id 由 Telegram 保证对同一文件恒定（file_id 会变，不能当键）
+    - 转换结果：converted/{file_unique_id}_{参数摘要}{.gif}
+      参数摘要是转换参数（格式、MAX_GIF_FPS、调色板模式等）的 sha1 前 12 位，
+      改了任一参数后旧结果自然失效，不会被误用
+    - 淘汰：总字节数超出 maxBytes 时按 mtime 从旧到新删除，一直删到低水位（maxBytes 的 90%），
+      缓存满了之后不必每次写入都扫一遍目录；命中时 touch 一下 mtime，即 LRU
+    - 取出：优先硬链接到目标路径，跨文件系统等失败时退回复制
+
+所有方法都是同步的磁盘 IO，调用方（stickerDownloader）经 asyncio.to_thread 调用，
+字节计数与淘汰由 threading.Lock 保护。
+写入先落到同目录的临时文件再 os.replace，并发写同一个键不会留下半截文件；
+取出时文件恰好被淘汰（FileNotFoundError 等）按未命中处理。
+命中率可通过 getStickerCacheStats() 观察：调用方每张 sticker 调一次 recordLookup，
+重试、先查转换结果再查原始文件都不会重复计数。
+"""
+
+import os
+import re
+import json
+import uuid
+import shutil
+import hashlib
+import threading
+from typing import Optional
+
+from config import STICKER_CACHE_DIR, STICKER_CACHE_MAX_BYTES
+
+
+_ORIGINAL_EXTS = (".webp", ".webm", ".tgs")
+
+# Telegram 的 file_unique_id 只含 base64url 字符；其余输入一律不缓存，防止路径穿越
+_UNIQUE_ID_RE = re.compile(r'^[A-Za-z0-9_\-]{1,128}$')
+
+# 超出上限后淘汰到 maxBytes 的这个比例，摊薄目录扫描
+_LOW_WATER_RATIO = 0.9
+
+
+
+
+def _validUniqueID(fileUniqueID) -> bool:
+    return isinstance(fileUniqueID, str) and bool(_UNIQUE_ID_RE.match(fileUniqueID))
+
+
+def paramsDigest(params: dict) -> str:
+    """转换参数 → 12 位摘要（键顺序无关）"""
+    raw = json.dumps(params, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+
+
+class StickerCache:
+    """file_unique_id (+ 转换参数) → 磁盘文件，总字节数限额的 LRU"""
+
+    def __init__(self, rootDir: str = STICKER_CACHE_DIR, maxBytes: int = STICKER_CACHE_MAX_BYTES):
+        self.rootDir = rootDir
+        self.maxBytes = maxBytes
+        self._originalsDir = os.path.join(rootDir, "originals")
+        self._convertedDir = os.path.join(rootDir, "converted")
+        self._bytes: Optional[int] = None   # 首次写入时扫描目录得到
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    # ── 原始文件 ──────────────────────────────────
+
+    def restoreOriginal(self, fileUniqueID, destBase: str) -> Optional[str]:
+        """
+        把缓存的原始文件放到 destBase + 原扩展名。
+
+        返回：
+            放置后的路径；未命中返回 None
+        """
+        if not _validUniqueID(fileUniqueID):
+            return None
+        for ext in _ORIGINAL_EXTS:
+            cached = os.path.join(self._originalsDir, fileUniqueID + ext)
+            if os.path.isfile(cached):
+                return self._restore(cached, destBase + ext)
+        return None
+
+
+    def saveOriginal(self, fileUniqueID, srcPath: str):
+        """缓存下载好的原始文件（扩展名取自 srcPath，需已按真实类型修正）"""
+        ext = os.path.splitext(srcPath)[1].lower()
+        if not _validUniqueID(fileUniqueID) or ext not in _ORIGINAL_EXTS:
+            return
+        self._save(srcPath, os.path.join(self._originalsDir, fileUniqueID + ext))
+
+
+    # ── 转换结果 ──────────────────────────────────
+
+    def restoreConverted(self, fileUniqueID, params: dict, destBase: str) -> Optional[str]:
+        """把按 params 转换过的缓存文件放到 destBase + .{params['format']}，未命中返回 None"""
+        if not _validUniqueID(fileUniqueID):
+            return None
+        cached = self._convertedPath(fileUniqueID, params)
+        if os.path.isfile(cached):
+            return self._restore(cached, destBase + "." + params["format"])
+        return None
+
+
+    def saveConverted(self, fileUniqueID, params: dict, srcPath: str):
+        if not _validUniqueID(fileUniqueID):
+            return
+        self._save(srcPath, self._convertedPath(fileUniqueID, params))
+
+
+    def _convertedPath(self, fileUniqueID: str, params: dict) -> str:
+        return os.path.join(self._convertedDir, f"{fileUniqueID}_{paramsDigest(params)}.{params['format']}")
+
+
+    # ── 统计 ──────────────────────────────────────
+
+    def recordLookup(self, fileUniqueID, hit: bool):
+        """记一次查询（每张 sticker 一次）；不可缓存的 file_unique_id 不计入"""
+        if not _validUniqueID(fileUniqueID):
+            return
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+
+    # ── 内部 ──────────────────────────────────────
+
+    def _restore(self, cached: str, destPath: str) -> Optional[str]:
+        try:
+            try:
+                os.link(cached, destPath)
+            except OSError:
+                shutil.copyfile(cached, destPath)
+            os.utime(cached)   # LRU：命中即刷新 mtime
+        except OSError:
+            # 取出途中被淘汰 / 目标不可写：按未命中处理，调用方照常下载
+            return None
+        return destPath
+
+
+    def _save(self, srcPath: str, cachedPath: str):
+        try:
+            size = os.path.getsize(srcPath)
+            if size > self.maxBytes:
+                return
+
+            os.makedirs(os.path.dirname(cachedPath), exist_ok=True)
+            tmpPath = f"{cachedPath}.{uuid.uuid4().hex[:8]}.tmp"
+            try:
+                os.link(srcPath, tmpPath)
+            except OSError:
+                shutil.copyfile(srcPath, tmpPath)
+
+            with self._lock:
+                if self._bytes is None:
+                    self._bytes = self._scan()[1]
+                oldSize = os.path.getsize(cachedPath) if os.path.isfile(cachedPath) else 0
+                os.replace(tmpPath, cachedPath)
+                self._bytes += size - oldSize
+                if self._bytes > self.maxBytes:
+                    self._evict()
+        except OSError:
+            return
+
+
+    def _scan(self) -> tuple[list[tuple[float, int, str]], int]:
+        """列出所有缓存文件 (mtime, size, path) 与总字节数（跳过写入中的 .tmp）"""
+        files = []
+        for folder in (self._originalsDir, self._convertedDir):
+            try:
+                entries = list(os.scandir(folder))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if entry.name.endswith(".tmp") or not entry.is_file():
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, entry.path))
+        return files, sum(size for _, size, _ in files)
+
+
+    def _evict(self):
+        """按 mtime 从旧到新删到低水位（调用方持有 _lock）"""
+        target = self.maxBytes * _LOW_WATER_RATIO
+        files, total = self._scan()
+        files.sort()
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+        self._bytes = total
+
+
+    def clear(self):
+        with self._lock:
+            shutil.rmtree(self.rootDir, ignore_errors=True)
+            self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    def stats(self) -> dict:
+        with self._lock:
+            files, total = self._scan()
+            self._bytes = total
+        lookups = self.hits + self.misses
+        return {
+            "files": len(files),
+            "bytes": total,
+            "maxBytes": self.maxBytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+
+
+stickerCache = StickerCache()
+
+
+def getStickerCacheStats() -> dict:
+    """表情包磁盘缓存统计，字段见 StickerCache.stats（会扫描一遍缓存目录）"""
+    return stickerCache.stats()
@@ -10,15 +10,17 @@ Telegram 表情包下载与格式转换模块。
 ================================================================================
 核心功能
 
-1. createStickerZip(bot, stickerSet, setName, stickerSuffix, outputDir)
+1. createStickerZip(bot, stickerSet, setName, stickerSuffix, outputDir, ownerID)
     - 下载并打包完整的表情包
     - 支持并发下载多个贴纸（通过 Semaphore 控制并发数）
     - 自动生成 UUID 避免文件名冲突
-    - 打包为 .zip 文件
-    - 下载完成后自动清理临时目录
+    - 每张 sticker 就绪即流式写入 .zip（utils/archiver.ZipStream，线程中写入，
+      WebP/WebM/GIF 以 stored 方式存入），不再先攒满临时目录再整体打包
+    - 下载完成后自动清理临时目录；失败或被取消时删除写了一半的 zip
 
-2. downloadEachOne(bot, fileID, outPath, stickerSuffix)
-    - 下载单个贴纸
+2. downloadEachOne(bot, fileID, outPath, stickerSuffix, fileUniqueID=None, ownerID=None)
+    - 下载单个贴纸（传入 fileUniqueID 时先查磁盘缓存）
+    - GIF 转换以 ownerID 向全局转换调度器申请槽位
     - 自动检测文件的真实格式（通过 python-magic）
     - 支持 WebP、WebM、TGS 三种格式
     - 可选 GIF 转换
@@ -26,8 +28,8 @@ Telegram 表情包下载与格式转换模块。
 
 3. convertToGif(rawInputPath)
     - 将 WebP/WebM 格式转换为 GIF
-    - 使用 FFmpeg 进行高质量转换
-    - 自动检测静态/动态贴纸，调整帧率
+    - 单次 FFmpeg 调用完成限帧、调色板生成与应用
+    - 从容器头检测静态/动态贴纸，调整帧率
     - 根据贴纸尺寸选择最佳抖动算法
     - 生成优化的调色板
 
@@ -44,6 +46,22 @@ Telegram 表情包下载与格式转换模块。
     - _getSemaphore(): 延迟初始化，确保在正确的事件循环中创建
     - 最大并发数由 config.MAX_CONCURRENT_DOWNLOADS 控制
 
+GIF 转换不占下载信号量，改由 utils/conversionScheduler.py 的全局调度器控制：
+    - 并发上限按 CPU 核数推算（config.FFMPEG_MAX_CONCURRENT 可覆盖），内存不足时降到 1
+    - 按 ownerID（请求者）公平轮转，排队转换少的用户优先
+    - 请求任务被取消时，排队中的转换出队，运行中的 ffmpeg 被 kill
+
+
+================================================================================
+磁盘缓存
+
+原始文件与 GIF 转换结果按 Telegram file_unique_id 缓存在 STICKER_CACHE_DIR（utils/stickerCache.py）：
+    - GIF 结果的键另含 _GIF_PARAMS 摘要（格式、MAX_GIF_FPS、调色板模式等），参数变了不复用
+    - 转换结果命中：不下载、不转换，也不占下载信号量
+    - 原始文件命中：免下载，仅重新转换
+    - 总大小超出 STICKER_CACHE_MAX_BYTES 时按最近使用淘汰（一次删到 90%）
+    - 缓存读写在线程中执行，不阻塞事件循环
+
 
 ================================================================================
 格式支持
@@ -54,35 +72,38 @@ Telegram 表情包下载与格式转换模块。
     - application/x-tgsticker    Telegram Lottie 动画（.tgs）
 
 支持的输出格式：
-    - WebP/WebM        保持原格式
-    - GIF              转换为 GIF（仅支持 WebP 和 WebM）
+    - WebP/WebM/TGS    保持原格式
+    - GIF              转换为 GIF（TGS 需要安装 rlottie-python）
 
 注意：
-    - .tgs 格式是 Lottie 动画，FFmpeg 无法直接转换
+    - .tgs 格式是 Lottie 动画，FFmpeg 无法直接转换：由 utils/tgsRenderer.py 用 rlottie 逐帧渲染，
+      原始帧经 stdin 进入同一套 ffmpeg 调色板滤镜（先 unpremultiply）
+    - TGS 渲染受 TGS_RENDER_MAX_SIZE（边长）、TGS_MAX_FRAMES（帧数，超出降帧率）、
+      TGS_RENDER_TIMEOUT（整体超时）约束，同样占用全局转换槽位、写入转换缓存
     - 转换为 GIF 时会有质量损失和体积增大
 
 
 ================================================================================
 GIF 转换流程
 
-1. 检测静态/动态
-    - 使用 FFmpeg probe 检测帧数
-    - 静态图片：fps = 1
-    - 动态图片：fps = MAX_GIF_FPS（默认 24）
+1. 读取容器头（_probeSticker，纯 Python，不启动进程）
+    - WebP：RIFF 头里的 VP8 / VP8L / VP8X 块给出尺寸，VP8X 的动画标志位区分静态/动态
+    - WebM：沿 EBML 的 Segment → Tracks → TrackEntry → Video 读 PixelWidth / PixelHeight，始终视为动态
+    - 读不出来时按 512x512 动态处理
+    - 静态图片：fps = 1；动态图片：fps = MAX_GIF_FPS（默认 24）
 
-2. 获取尺寸并选择抖动算法
+2. 按尺寸选择抖动算法
     - 小尺寸 (≤256x256)：bayer:bayer_scale=3（更激进）
     - 大尺寸：sierra2_4a（更平滑）
 
-3. 生成调色板
-    - 使用 Lanczos 缩放到 512px 宽度
-    - palettegen 生成优化的 256 色调色板
-
-4. 应用调色板转换
-    - 使用 paletteuse 滤镜
-    - 应用选定的抖动算法
+3. 单次 ffmpeg 调用完成转换（_buildGifFilterGraph）
+    - fps 限帧 → Lanczos 缩放到 512px 宽度 → split 成两路
+    - 一路 palettegen 生成 256 色调色板，另一路等调色板就绪后 paletteuse
+    - 限帧放在 split 之前，缓冲的帧数最多 时长 × fps
     - 设置 alpha_threshold=128 处理透明度
 
+以前是 probe + palettegen + paletteuse 三个进程、输入读两遍；现在每张 sticker 只启动一个进程。
+
 
 ================================================================================
 错误处理
@@ -143,7 +164,6 @@ import sys
 import uuid
 import shutil
 import asyncio
-import tempfile
 
 import magic
 from telegram.error import TelegramError, NetworkError
@@ -153,10 +173,16 @@ from config import (
     MAX_CONCURRENT_DOWNLOADS,       # 最大并发下载数量
     MAX_DOWNLOADS_ATTEMPTS,         # 最大下载尝试次数
     MAX_GIF_FPS,                    # 最大 GIF 帧数
+    TGS_RENDER_MAX_SIZE,            # TGS 渲染边长上限
+    TGS_MAX_FRAMES,                 # TGS 渲染帧数上限
+    TGS_RENDER_TIMEOUT,             # TGS 渲染超时
     PROJECT_ROOT,                   # 项目根目录
 )
 
-from utils.archiver import createZip
+from utils import tgsRenderer
+from utils.archiver import ZipStream
+from utils.stickerCache import stickerCache
+from utils.conversionScheduler import conversionScheduler
 from utils.core.logger import logAction, LogLevel, LogChildType
 
 
@@ -199,6 +225,26 @@ def _getSemaphore():
 
 _activeGifJobs: int = 0  # 当前正在处理的 GIF 任务数（asyncio 单线程，无需锁）
 
+# GIF 转换参数，同时作为转换结果缓存键的一部分（见 utils/stickerCache.py）
+# 修改 convertToGif 的缩放 / 调色板 / 抖动策略时同步修改这里，旧缓存即自动失效
+_GIF_PARAMS = {
+    "format": "gif",
+    "fps": MAX_GIF_FPS,
+    "scale": 512,
+    "palette": "stats_mode=full",
+    "dither": "bayer3<=256,sierra2_4a",
+    "alphaThreshold": 128,
+    "pipeline": "single-pass",
+    "tgsMaxSize": TGS_RENDER_MAX_SIZE,
+    "tgsMaxFrames": TGS_MAX_FRAMES,
+}
+
+# .tgs 是 gzip 压缩的 Lottie JSON，libmagic 通常识别为 gzip
+_TGS_MIME_TYPES = {"application/x-tgsticker" , "application/json" , "application/gzip" , "application/x-gzip"}
+
+# 容器头最多读这么多字节（WebM 的 Tracks 通常在前几 KB）
+_PROBE_READ_BYTES = 64 * 1024
+
 def getActiveGifJobs() -> int:
     """获取当前正在处理的 GIF 任务数（createStickerZip 粒度）"""
     return _activeGifJobs
@@ -213,14 +259,15 @@ async def createStickerZip(
         stickerSet,
         setName,
         stickerSuffix,
-        outputDir=None
+        outputDir=None,
+        ownerID=None
     ):
 
     global _activeGifJobs
     if stickerSuffix == "gif":
         _activeGifJobs += 1
     try:
-        return await _createStickerZipImpl(bot, stickerSet, setName, stickerSuffix, outputDir)
+        return await _createStickerZipImpl(bot, stickerSet, setName, stickerSuffix, outputDir, ownerID)
     finally:
         if stickerSuffix == "gif":
             _activeGifJobs -= 1
@@ -233,7 +280,8 @@ async def _createStickerZipImpl(
         stickerSet,
         setName,
         stickerSuffix,
-        outputDir=None
+        outputDir=None,
+        ownerID=None
     ):
 
     if outputDir is None:
@@ -246,6 +294,10 @@ async def _createStickerZipImpl(
     tmpDir = os.path.join(outputDir , f"{setName}_{uniqueID}")
     os.makedirs(tmpDir , exist_ok=True)
 
+    # 每张 sticker 就绪后立即写入 zip 并删除，临时目录里只留正在下载 / 转换的文件
+    zipPath = os.path.join(outputDir , f"{setName}_{uniqueID}.zip")
+    archive = ZipStream(zipPath)
+
     try:
         downloadTasks = []
         # 启动并发下载任务，让若干个 Stickers 同时开始下载
@@ -253,7 +305,7 @@ async def _createStickerZipImpl(
             outPath = os.path.join(tmpDir , f"{i}.webp")
             downloadTasks.append(
                 asyncio.create_task(
-                    downloadEachOne(bot , s.file_id , outPath , stickerSuffix)
+                    _downloadIntoZip(archive , bot , s , outPath , stickerSuffix , ownerID)
                 )
             )
 
@@ -263,18 +315,18 @@ async def _createStickerZipImpl(
         ok = sum(1 for r in results if r["ok"])
         failed = sum(1 for r in results if not r["ok"])
         converted = sum(1 for r in results if r.get("converted"))
+        cached = sum(1 for r in results if r.get("cached"))
 
         await logAction(
             "System",
             "下载完成 (as GIF)" if stickerSuffix == "gif" else "下载完成 (as WebP/WebM)",
-            f"成功 {converted if stickerSuffix == 'gif' else ok} 张，失败 {failed} 张",
+            f"成功 {converted if stickerSuffix == 'gif' else ok} 张（缓存命中 {cached} 张），失败 {failed} 张",
             LogLevel.INFO,
             LogChildType.CHILD_WITH_CHILD
         )
 
-        # 打包为.zip
-        zipBase = os.path.join(outputDir , f"{setName}_{uniqueID}")
-        zipPath = createZip(tmpDir, zipBase)
+        # 写入中央目录，完成打包
+        zipPath = await archive.close()
         await logAction(
             "System",
             "打包完毕",
@@ -285,6 +337,11 @@ async def _createStickerZipImpl(
 
         return zipPath
 
+    except BaseException:
+        # 失败或被取消（/killsticker）：删掉写了一半的 zip
+        await archive.abort()
+        raise
+
     finally:
         # 无论获取成败，都清理临时目录
         shutil.rmtree(tmpDir , ignore_errors=True)
@@ -292,54 +349,107 @@ async def _createStickerZipImpl(
 
 
 
+async def _downloadIntoZip(archive , bot , sticker , outPath , stickerSuffix , ownerID):
+    """下载（并转换）一张 sticker，成功后写入 zip 并删除临时文件"""
+    result = await downloadEachOne(
+        bot , sticker.file_id , outPath , stickerSuffix ,
+        fileUniqueID=getattr(sticker , "file_unique_id" , None) ,
+        ownerID=ownerID
+    )
+
+    path = result.get("path")
+    if result["ok"] and path:
+        try:
+            await archive.add(path , removeAfter=True)
+        except OSError as e:
+            return {"ok": False , "error": str(e)}
+
+    return result
+
+
+
+
 # 单张 Sticker 的下载 + 转换 (可选)
-async def downloadEachOne(bot , fileID , outPath , stickerSuffix="webp"):
+# 传入 fileUniqueID 时先查磁盘缓存：转换结果命中则直接放入打包目录，原始文件命中则免下载
+# 缓存读写都是磁盘 IO，放到线程里执行；每张 sticker 只计一次命中 / 未命中
+# 下载受 _downloadSemaphore 约束；转换在下载信号量之外，向全局 conversionScheduler 以 ownerID 申请槽位
+async def downloadEachOne(bot , fileID , outPath , stickerSuffix="webp" , fileUniqueID=None , ownerID=None):
 
-    async with _getSemaphore():
-        for attempt in range(1 , MAX_DOWNLOADS_ATTEMPTS + 1):
-            try:
-                file = await bot.get_file(fileID)
-                await file.download_to_drive(outPath)
-
-                # 使用 magic 检测真实文件类型
-                mimeType = magic.from_file(outPath , mime=True)
-                # 根据 mime 类型修正扩展名
-                newPath = outPath
-
-                if mimeType == "video/webm":
-                    newPath = outPath.rsplit('.' , 1)[0] + ".webm"
-                    os.rename(outPath , newPath)
-
-                elif mimeType == "application/x-tgsticker" or mimeType == "application/json":
-                    newPath = outPath.rsplit('.' , 1)[0] + ".tgs"
-                    os.rename(outPath , newPath)
-
-                elif mimeType == "image/webp":
-                    pass
-
-                # 若用户选择 gif 格式，则进行转换
-                converted = False
-                if stickerSuffix == "gif":
-                    gifPath = await convertToGif(newPath)
-                    os.remove(newPath)
-                    newPath = gifPath
-                    converted = True
-
-                return {
-                    "ok": True,
-                    "converted": converted,
-                }
-
-            except (TelegramError , NetworkError , OSError) as e:
-                if attempt < MAX_DOWNLOADS_ATTEMPTS:
-                    # 指数级退避等待，防止 Tg API 限速
-                    await asyncio.sleep(2 ** attempt)
-                else:
+    outBase = outPath.rsplit('.' , 1)[0]
+    if stickerSuffix == "gif":
+        cachedGif = await asyncio.to_thread(stickerCache.restoreConverted , fileUniqueID , _GIF_PARAMS , outBase)
+        if cachedGif:
+            stickerCache.recordLookup(fileUniqueID , True)
+            return {"ok": True , "converted": True , "cached": True , "path": cachedGif}
+
+    newPath = await asyncio.to_thread(stickerCache.restoreOriginal , fileUniqueID , outBase)
+    cached = newPath is not None
+    stickerCache.recordLookup(fileUniqueID , cached)
+
+    if not cached:
+        async with _getSemaphore():
+            for attempt in range(1 , MAX_DOWNLOADS_ATTEMPTS + 1):
+                try:
+                    newPath = await _downloadOriginal(bot , fileID , outPath)
+                    await asyncio.to_thread(stickerCache.saveOriginal , fileUniqueID , newPath)
+                    break
+
+                except (TelegramError , NetworkError , OSError) as e:
+                    if attempt < MAX_DOWNLOADS_ATTEMPTS:
+                        # 指数级退避等待，防止 Tg API 限速
+                        await asyncio.sleep(2 ** attempt)
+                    else:
+                        return {"ok": False , "error": str(e)}
+
+                except Exception as e:
+                    # 其它不可预期错误，直接记录并退出下载
                     return {"ok": False , "error": str(e)}
 
-            except Exception as e:
-                # 其它不可预期错误，直接记录并退出下载
-                return {"ok": False , "error": str(e)}
+    # 若用户选择 gif 格式，则进行转换
+    converted = False
+    if stickerSuffix == "gif":
+        try:
+            async with conversionScheduler.slot(ownerID):
+                gifPath = await convertToGif(newPath)
+            os.remove(newPath)
+            newPath = gifPath
+            converted = True
+            await asyncio.to_thread(stickerCache.saveConverted , fileUniqueID , _GIF_PARAMS , gifPath)
+        except Exception as e:
+            return {"ok": False , "error": str(e)}
+
+    return {
+        "ok": True,
+        "converted": converted,
+        "cached": cached,
+        "path": newPath,
+    }
+
+
+
+
+async def _downloadOriginal(bot , fileID , outPath) -> str:
+    """下载原始文件并按真实类型修正扩展名，返回最终路径"""
+    file = await bot.get_file(fileID)
+    await file.download_to_drive(outPath)
+
+    # 使用 magic 检测真实文件类型
+    mimeType = magic.from_file(outPath , mime=True)
+    # 根据 mime 类型修正扩展名
+    newPath = outPath
+
+    if mimeType == "video/webm":
+        newPath = outPath.rsplit('.' , 1)[0] + ".webm"
+        os.rename(outPath , newPath)
+
+    elif mimeType in _TGS_MIME_TYPES:
+        newPath = outPath.rsplit('.' , 1)[0] + ".tgs"
+        os.rename(outPath , newPath)
+
+    elif mimeType == "image/webp":
+        pass
+
+    return newPath
 
 
 
@@ -349,110 +459,220 @@ async def convertToGif(rawInputPath: str) -> str:
     inputPath = os.path.abspath(rawInputPath)
     ext = os.path.splitext(inputPath)[1].lower()
 
-    # .tgs 是 Telegram Lottie 动画格式，FFmpeg 不直接支持
-    # 暂时抛出友好的错误提示
-    if ext == ".tgs":
+    # .tgs 是 Telegram Lottie 动画格式，FFmpeg 不直接支持，需先用 rlottie 渲染成帧
+    if ext == ".tgs" and not tgsRenderer.available():
         raise ValueError(
             f"现在还不支持将 .tgs 格式转换为 GIF 喵……\n"
-            "这是杜叔叔的 Lottie 动画格式，需要特殊处理"
+            "这是杜叔叔的 Lottie 动画格式，需要安装 rlottie-python 才能渲染"
             )
 
-    if ext not in [".webp" , ".webm"]:
+    if ext not in [".webp" , ".webm" , ".tgs"]:
         raise ValueError(f"不支持的格式喵：{ext}")
 
     _ensureFFmpeg()
 
     outputPath = inputPath.rsplit("." , 1)[0] + ".gif"
 
-    fps = MAX_GIF_FPS
-    w , h = 512 , 512
-
-    # 判断 Sticker 是否为静态 WebP，若是，则将帧率设为 1
-    # 同时获取尺寸信息（用 ffmpeg -f null 解码，从 stderr 解析帧数和分辨率）
-    if ext == ".webp":
-        probe = await asyncio.create_subprocess_exec(
-            FFMPEG,
-            "-i", inputPath,
-            "-f", "null",
-            "-",
-            stdout=asyncio.subprocess.DEVNULL,
-            stderr=asyncio.subprocess.PIPE,
-        )
-        _ , probeErr = await probe.communicate()
-        probeText = probeErr.decode(errors="ignore")
-
-        frameMatch = re.search(r'frame=\s*(\d+)', probeText)
-        if not frameMatch or int(frameMatch.group(1)) <= 1:
-            fps = 1
-
-        sizeMatch = re.search(r'Video:.*?(\d{2,5})x(\d{2,5})', probeText)
-        if sizeMatch:
-            w , h = int(sizeMatch.group(1)) , int(sizeMatch.group(2))
-    else:
-        # .webm 始终为动画，仅需获取尺寸
-        probe = await asyncio.create_subprocess_exec(
-            FFMPEG,
-            "-i", inputPath,
-            stdout=asyncio.subprocess.DEVNULL,
-            stderr=asyncio.subprocess.PIPE,
-        )
-        _ , probeErr = await probe.communicate()
-        sizeMatch = re.search(r'Video:.*?(\d{2,5})x(\d{2,5})', probeErr.decode(errors="ignore"))
-        if sizeMatch:
-            w , h = int(sizeMatch.group(1)) , int(sizeMatch.group(2))
-
+    if ext == ".tgs":
+        try:
+            await asyncio.wait_for(_convertTgsToGif(inputPath , outputPath) , TGS_RENDER_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"TGS 渲染超时喵（超过 {TGS_RENDER_TIMEOUT} 秒）")
+        return outputPath
+
+    # 从容器头读尺寸与静态/动态，静态 WebP 帧率设为 1
+    w , h , animated = _probeSticker(inputPath)
+    fps = _GIF_PARAMS["fps"] if animated else 1
     dither = "bayer:bayer_scale=3" if w <= 256 and h <= 256 else "sierra2_4a"
 
-    # 开始转换 GIF
-    with tempfile.TemporaryDirectory() as tmpdir:
-        palettePath = os.path.join(tmpdir , "palette.png")
+    # 限帧 + 缩放 + 调色板生成 + 调色板应用，一个进程跑完
+    await _runFFmpeg(
+        "-i", inputPath,
+        "-filter_complex", _buildGifFilterGraph(fps , dither),
+        outputPath,
+    )
+    return outputPath
 
-        # 生成调色板 (%temp%/palette.png) 用的滤镜
-        vfPalette = (
-            "scale=512:-1:flags=lanczos,"
-            "palettegen=stats_mode=full"
-        )
 
-        # 把 webp / webm 转成 gif 用的 filter_complex
-        filterGraph = (
-            "scale=512:-1:flags=lanczos[x];"
-            f"[x][1:v]paletteuse="
-            f"dither={dither}:alpha_threshold=128"
+async def _convertTgsToGif(inputPath: str , outputPath: str):
+    """rlottie 逐帧渲染 → stdin 原始帧 → 与 WebP / WebM 相同的调色板滤镜"""
+    frames = await tgsRenderer.openTgs(
+        inputPath,
+        maxSize=TGS_RENDER_MAX_SIZE,
+        maxFps=_GIF_PARAMS["fps"],
+        maxFrames=TGS_MAX_FRAMES,
+    )
+    try:
+        dither = "bayer:bayer_scale=3" if frames.width <= 256 and frames.height <= 256 else "sierra2_4a"
+        await _runFFmpeg(
+            "-f", "rawvideo",
+            "-pix_fmt", "bgra",
+            "-s", f"{frames.width}x{frames.height}",
+            "-framerate", str(frames.fps),
+            "-i", "pipe:0",
+            "-filter_complex", _buildGifFilterGraph(frames.fps , dither , prefilter="unpremultiply=inplace=1,"),
+            outputPath,
+            feed=lambda stdin: tgsRenderer.feedFrames(frames , stdin),
         )
+    finally:
+        await tgsRenderer.closeTgs(frames)
 
-        # 在转换 GIF 前，获取临时调色盘
-        proc1 = await asyncio.create_subprocess_exec(
-            FFMPEG,
-            "-y",
-            "-i", inputPath,
-            "-vf", vfPalette,
-            palettePath,
-            stdout=asyncio.subprocess.DEVNULL,
-            stderr=asyncio.subprocess.PIPE,
-        )
 
-        _ , err1 = await proc1.communicate()
-
-        if proc1.returncode != 0:
-            raise RuntimeError(err1.decode(errors="ignore"))
-        
-        proc2 = await asyncio.create_subprocess_exec(
-            FFMPEG,
-            "-y",
-            "-i", inputPath,
-            "-i", palettePath,
-            "-r", str(fps),
-            "-filter_complex", filterGraph,
-            outputPath,
-            stdout=asyncio.subprocess.DEVNULL,
-            stderr=asyncio.subprocess.PIPE,
-        )
+async def _runFFmpeg(*args , feed=None):
+    """
+    运行一次 ffmpeg，非零退出抛出 RuntimeError。
 
-        _ , err2 = await proc2.communicate()
-        if proc2.returncode != 0:
-            raise RuntimeError(f"GIF 转换失败喵：{err2.decode(errors='ignore')}")
+    feed 为 async (stdin) -> None 时通过 stdin 输入数据（写完自动关闭）；
+    调用方被取消（/killsticker、超时等）时一并 kill 掉 ffmpeg，不留孤儿进程。
+    """
+    proc = await asyncio.create_subprocess_exec(
+        FFMPEG,
+        "-y",
+        "-hide_banner",
+        "-loglevel", "error",
+        *args,
+        stdin=asyncio.subprocess.PIPE if feed else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
 
-    return outputPath
+    errTask = None
+    try:
+        if feed is None:
+            _ , err = await proc.communicate()
+        else:
+            # communicate() 会立刻关闭 stdin，这里边写边读 stderr
+            errTask = asyncio.ensure_future(proc.stderr.read())
+            try:
+                await feed(proc.stdin)
+            except (BrokenPipeError , ConnectionResetError):
+                pass    # ffmpeg 提前退出，原因见 stderr
+            finally:
+                proc.stdin.close()
+            await proc.wait()
+            err = await errTask
+    except asyncio.CancelledError:
+        if errTask is not None:
+            errTask.cancel()
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        raise
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"GIF 转换失败喵：{err.decode(errors='ignore')}")
+
+
+def _buildGifFilterGraph(fps , dither: str , prefilter: str = "") -> str:
+    """单次转换用的 filter_complex：限帧、缩放后 split，一路生成调色板，一路应用调色板"""
+    return (
+        f"[0:v]{prefilter}fps={fps},"
+        f"scale={_GIF_PARAMS['scale']}:-1:flags=lanczos,"
+        "split[frames][paletteSrc];"
+        f"[paletteSrc]palettegen={_GIF_PARAMS['palette']}[palette];"
+        f"[frames][palette]paletteuse="
+        f"dither={dither}:alpha_threshold={_GIF_PARAMS['alphaThreshold']}"
+    )
+
+
+
+
+# ── 容器头探测 ────────────────────────────────────
+
+def _probeSticker(path: str) -> tuple[int , int , bool]:
+    """
+    从文件头读出 (宽, 高, 是否动态)，代替单独跑一次 ffmpeg probe。
+
+    读不出来（文件损坏、未知编码）时返回 (512, 512, True)，转换照常进行。
+    """
+    try:
+        with open(path , "rb") as f:
+            data = f.read(_PROBE_READ_BYTES)
+    except OSError:
+        return 512 , 512 , True
+
+    try:
+        if path.lower().endswith(".webp"):
+            info = _probeWebP(data)
+        else:
+            info = _probeWebM(data)
+    except (IndexError , ValueError):
+        info = None
+
+    return info or (512 , 512 , True)
+
+
+def _probeWebP(data: bytes) -> tuple[int , int , bool]|None:
+    if len(data) < 30 or data[:4] != b"RIFF" or data[8:12] != b"WEBP":
+        return None
+
+    chunk = data[12:16]
+    if chunk == b"VP8X":
+        # 扩展格式：flags 的 bit1 为动画，画布尺寸为 24 位 (值 + 1)
+        animated = bool(data[20] & 0x02)
+        w = int.from_bytes(data[24:27] , "little") + 1
+        h = int.from_bytes(data[27:30] , "little") + 1
+        return w , h , animated
+
+    if chunk == b"VP8L":
+        # 无损：签名 0x2f 后 14 位宽 - 1、14 位高 - 1
+        bits = int.from_bytes(data[21:25] , "little")
+        return (bits & 0x3FFF) + 1 , ((bits >> 14) & 0x3FFF) + 1 , False
+
+    if chunk == b"VP8 ":
+        # 有损：帧标签 3 字节 + 起始码 3 字节后是 14 位宽 / 高
+        w = int.from_bytes(data[26:28] , "little") & 0x3FFF
+        h = int.from_bytes(data[28:30] , "little") & 0x3FFF
+        return w , h , False
+
+    return None
+
+
+# 需要进入的 EBML 容器：Segment → Tracks → TrackEntry → Video
+_EBML_CONTAINERS = {0x18538067 , 0x1654AE6B , 0xAE , 0xE0}
+_EBML_PIXEL_WIDTH = 0xB0
+_EBML_PIXEL_HEIGHT = 0xBA
+_EBML_CLUSTER = 0x1F43B675
+
+
+def _readVint(data: bytes , pos: int , keepMarker: bool) -> tuple[int , int , bool]:
+    """读一个 EBML 变长整数，返回 (值, 新位置, 是否为"未知长度")"""
+    first = data[pos]
+    length , mask = 1 , 0x80
+    while length <= 8 and not first & mask:
+        length += 1
+        mask >>= 1
+    if length > 8 or pos + length > len(data):
+        raise ValueError("bad vint")
+
+    value = first if keepMarker else first & (mask - 1)
+    for b in data[pos + 1 : pos + length]:
+        value = (value << 8) | b
+    unknown = not keepMarker and value == (1 << (7 * length)) - 1
+    return value , pos + length , unknown
+
+
+def _probeWebM(data: bytes) -> tuple[int , int , bool]|None:
+    w = h = None
+    pos = 0
+    while pos < len(data):
+        elementID , pos , _ = _readVint(data , pos , keepMarker=True)
+        size , pos , unknown = _readVint(data , pos , keepMarker=False)
+
+        if elementID in _EBML_CONTAINERS:
+            continue            # 进入容器，接着读它的第一个子元素
+        if elementID == _EBML_CLUSTER or unknown:
+            break               # 已经到帧数据，Tracks 不会再出现
+
+        if elementID == _EBML_PIXEL_WIDTH:
+            w = int.from_bytes(data[pos : pos + size] , "big")
+        elif elementID == _EBML_PIXEL_HEIGHT:
+            h = int.from_bytes(data[pos : pos + size] , "big")
+        if w and h:
+            return w , h , True
+        pos += size
+
+    return None
 
 
 
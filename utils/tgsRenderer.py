@@ -0,0 +1,125 @@
+"""
+utils/tgsRenderer.py
+
+Telegram .tgs 动画贴纸（gzip 压缩的 Lottie JSON）逐帧渲染
+
+FFmpeg 不认识 Lottie，以前 .tgs 只能原样打包，选 GIF 时直接失败。
+这里用 rlottie（rlottie-python，纯 CPU）把动画渲染成 BGRA 原始帧，
+由 stickerDownloader.convertToGif 通过 stdin 喂给与 WebP / WebM 相同的单次 ffmpeg 调色板流程：
+    - 尺寸上限：长边缩到 TGS_RENDER_MAX_SIZE 以内（保持比例，取偶数）
+    - 帧率上限：min(动画帧率, MAX_GIF_FPS)
+    - 帧数上限：超出 TGS_MAX_FRAMES 时进一步降帧率，保持动画时长不变
+    - 渲染在线程中逐帧进行（ctypes 调用期间释放 GIL），不阻塞事件循环
+
+rlottie 输出的是预乘 alpha 的 ARGB32（小端即 BGRA 字节序），调用方需在滤镜里 unpremultiply。
+rlottie-python 是可选依赖，不在 requirements.txt 的基础依赖里，需要时手动安装（见 README）。
+未安装时 available() 为 False：.tgs 仍可按原格式打包，但无法转为 GIF。
+"""
+
+import asyncio
+import threading
+
+try:
+    from rlottie_python import LottieAnimation
+except ImportError:
+    LottieAnimation = None
+
+
+
+
+def available() -> bool:
+    return LottieAnimation is not None
+
+
+def planFrames(totalFrames: int, sourceFps: float, maxFps: float, maxFrames: int) -> tuple[float, list[int]]:
+    """
+    按帧率 / 帧数上限挑选要渲染的源帧。
+
+    返回：
+        (输出帧率, 源帧序号列表)；动画信息异常时只渲染第 0 帧
+    """
+    if totalFrames <= 0 or sourceFps <= 0:
+        return 1.0, [0]
+
+    duration = totalFrames / sourceFps
+    count = max(1, min(maxFrames, round(duration * min(sourceFps, maxFps))))
+    step = totalFrames / count
+    indices = [min(totalFrames - 1, int(i * step)) for i in range(count)]
+    return round(count / duration, 3), indices
+
+
+def fitSize(width: int, height: int, maxSize: int) -> tuple[int, int]:
+    """长边缩到 maxSize 以内，保持比例；宽高取偶数（部分像素格式要求）"""
+    if width <= 0 or height <= 0:
+        return maxSize, maxSize
+    scale = min(1.0, maxSize / max(width, height))
+    return max(2, int(width * scale) // 2 * 2), max(2, int(height * scale) // 2 * 2)
+
+
+
+
+class TgsFrames:
+    """打开一个 .tgs，按上限规划好尺寸与帧序列，逐帧渲染为 BGRA 字节"""
+
+    def __init__(self, path: str, *, maxSize: int, maxFps: float, maxFrames: int):
+        if LottieAnimation is None:
+            raise RuntimeError("未安装 rlottie-python，无法渲染 .tgs")
+
+        # render 在工作线程里跑；调用方被取消后线程可能还在渲染，close 需等它结束再释放
+        self._lock = threading.Lock()
+        self._anim = LottieAnimation.from_tgs(path)
+        try:
+            srcWidth, srcHeight = self._anim.lottie_animation_get_size()
+            self.width, self.height = fitSize(srcWidth, srcHeight, maxSize)
+            self.fps, self.frameIndices = planFrames(
+                self._anim.lottie_animation_get_totalframe(),
+                self._anim.lottie_animation_get_framerate(),
+                maxFps,
+                maxFrames,
+            )
+        except Exception:
+            self.close()
+            raise
+
+
+    def render(self, frameNum: int) -> bytes:
+        """渲染一帧，返回 width * height * 4 字节的预乘 BGRA"""
+        with self._lock:
+            if self._anim is None:
+                raise RuntimeError("TGS 动画已关闭")
+            return self._anim.lottie_animation_render(
+                frame_num=frameNum,
+                width=self.width,
+                height=self.height,
+            )
+
+
+    def close(self):
+        with self._lock:
+            if self._anim is not None:
+                self._anim.lottie_animation_destroy()
+                self._anim = None
+
+
+
+
+async def openTgs(path: str, *, maxSize: int, maxFps: float, maxFrames: int) -> TgsFrames:
+    """在线程中解压、解析 .tgs（大动画的 JSON 解析也可能耗时）"""
+    return await asyncio.to_thread(TgsFrames, path, maxSize=maxSize, maxFps=maxFps, maxFrames=maxFrames)
+
+
+async def closeTgs(frames: TgsFrames) -> None:
+    """
+    在线程中释放动画。
+
+    超时 / 取消后工作线程可能还在渲染当前帧并持有锁，直接在事件循环里 close 会卡住整帧渲染的时间。
+    """
+    await asyncio.to_thread(frames.close)
+
+
+async def feedFrames(frames: TgsFrames, stdin) -> None:
+    """逐帧在线程中渲染并写入 ffmpeg 的 stdin；写完后由调用方关闭 stdin"""
+    for frameNum in frames.frameIndices:
+        data = await asyncio.to_thread(frames.render, frameNum)
+        stdin.write(data)
+        await stdin.drain()